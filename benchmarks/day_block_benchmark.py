@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - Keras 日単位（24出力）モデルベンチマーク
+
+Keras_train.py と同じ隠れ層構成（128→128→64→32）で、1行1時刻・1出力のモデル（hourly）と
+1行1日・24出力のモデル（day_block、common/day_blocks.py）を tf.data パイプラインで早期終了まで
+学習し、学習のスループット（1秒あたりの目的変数の時間数）・収束時間・テストRMSEと、
+推論のスループット（翌日予測と同じ 336 時間 = 14日分の NumPy 推論・テスト年全体の Keras 推論）を比較する。
+
+テストRMSEは各モデルのテストデータ（day_block は 24 時間そろった日のみ）の1時刻ごとの誤差で計算する。
+
+使用例:
+    py -3.10 benchmarks/day_block_benchmark.py
+    py -3.10 benchmarks/day_block_benchmark.py --years 2019,2020,2021 --epochs 300 --repeat 2000
+    （最も新しい年をテスト年、それ以前を学習年とする）
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import assemble_combination, split_years
+from common.day_blocks import config as day_config, load_day_split
+
+# 翌日予測の行数（過去7日 + 翌7日）
+TOMORROW_HOURS = 336
+
+
+def build_model(input_dim: int, n_outputs: int, learning_rate: float):
+    """Keras_train.py（create_keras_model）と同じ隠れ層構成のモデル"""
+    import keras
+    from keras import regularizers
+    l2 = regularizers.l2(0.001)
+    model = keras.Sequential([
+        keras.Input(shape=(input_dim,)),
+        keras.layers.Dense(128, activation='relu', kernel_regularizer=l2),
+        keras.layers.Dropout(0.1),
+        keras.layers.Dense(128, activation='relu', kernel_regularizer=l2),
+        keras.layers.Dropout(0.1),
+        keras.layers.Dense(64, activation='relu', kernel_regularizer=l2),
+        keras.layers.Dense(32, activation='relu'),
+        keras.layers.Dense(n_outputs),
+    ])
+    model.compile(loss='mean_squared_error', optimizer=keras.optimizers.Adam(learning_rate=learning_rate))
+    return model
+
+
+def standardize(X: np.ndarray, y: np.ndarray, X_test: np.ndarray) -> Dict:
+    """学習データの平均・標準偏差で標準化する（目的変数は全時刻共通の1組）"""
+    x_mean, x_std = X.mean(axis=0), X.std(axis=0) + 1e-12
+    y_mean, y_std = float(y.mean()), float(y.std())
+    return {
+        'X': ((X - x_mean) / x_std).astype(np.float32),
+        'X_test': ((X_test - x_mean) / x_std).astype(np.float32),
+        'y': ((y - y_mean) / y_std).astype(np.float32),
+        'y_mean': y_mean, 'y_std': y_std,
+    }
+
+
+def run(name: str, X: np.ndarray, y: np.ndarray, X_test: np.ndarray, y_test: np.ndarray, batch_size: int,
+        epochs: int, patience: int, validation_split: float, repeat: int) -> Dict:
+    """
+    1つのモデル構成について早期終了まで学習し、学習・推論のスループットと精度を計測する
+
+    Returns:
+        Dict: 計測結果
+    """
+    import keras
+    from common.keras_pipeline import make_datasets, scaled_learning_rate, LinearWarmup, EpochTimer
+    from common import keras_pipeline
+    from common.mlp_inference import convert_keras_mlp
+
+    data = standardize(X, y, X_test)
+    n_outputs = 1 if y.ndim == 1 else y.shape[1]
+    keras.utils.set_random_seed(42)
+    base_lr = 0.001
+    model = build_model(X.shape[1], n_outputs, base_lr)
+    timer = EpochTimer()
+    early_stopping = keras.callbacks.EarlyStopping(monitor='val_loss', min_delta=0.0001, patience=patience,
+                                                   restore_best_weights=True)
+    train_ds, val_ds, steps = make_datasets(data['X'], data['y'], None, validation_split, batch_size)
+    target_lr = scaled_learning_rate(base_lr, batch_size)
+    warmup = LinearWarmup(target_lr, steps * keras_pipeline.config.WARMUP_EPOCHS)
+    start_time = time.perf_counter()
+    model.fit(train_ds, validation_data=val_ds, epochs=epochs, verbose=0, callbacks=[warmup, timer, early_stopping])
+    elapsed = time.perf_counter() - start_time
+
+    # テスト年全体の Keras 推論（元スケールの1時刻ごとの誤差）
+    start_time = time.perf_counter()
+    y_pred = model.predict(data['X_test'], batch_size=4096, verbose=0)
+    keras_sec = time.perf_counter() - start_time
+    y_pred = y_pred.reshape(-1) * data['y_std'] + data['y_mean']
+    rmse = float(np.sqrt(np.mean((y_pred - np.asarray(y_test, dtype=np.float64).reshape(-1)) ** 2)))
+
+    # 翌日予測と同じ 336 時間分の NumPy 推論（hourly: 336行 / day_block: 14行）
+    mlp = convert_keras_mlp(model, None, None)
+    rows = TOMORROW_HOURS // n_outputs
+    window = np.ascontiguousarray(data['X_test'][:rows])
+    mlp.predict(window)
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        mlp.predict(window)
+    numpy_sec = (time.perf_counter() - start_time) / repeat
+
+    n_fit = len(X) - int(len(X) * validation_split)
+    steady = timer.epoch_times[1:] or timer.epoch_times
+    epoch_sec = float(np.mean(steady))
+    return {
+        'name': name, 'rows': len(X), 'outputs': n_outputs, 'batch_size': batch_size, 'steps': steps,
+        'epochs': len(timer.epoch_times), 'epoch_sec': epoch_sec,
+        'train_hours_per_sec': n_fit * n_outputs / epoch_sec,
+        'time_to_best': timer.time_to_best, 'total_sec': elapsed, 'rmse': rmse,
+        'keras_hours_per_sec': y_pred.size / keras_sec,
+        'numpy_window_us': numpy_sec * 1e6, 'numpy_rows': rows,
+    }
+
+
+def print_table(results: List[Dict]) -> None:
+    """計測結果を表形式で出力する"""
+    print(f"\n{'構成':<11}{'学習行':>8}{'出力':>5}{'batch':>7}{'step/ep':>9}{'epoch数':>8}{'epoch時間':>11}"
+          f"{'学習 時間/秒':>14}{'収束時間':>10}{'合計':>9}{'RMSE':>9}")
+    for r in results:
+        print(f"{r['name']:<11}{r['rows']:>8,}{r['outputs']:>5}{r['batch_size']:>7}{r['steps']:>9}{r['epochs']:>8}"
+              f"{r['epoch_sec']:10.3f}s{r['train_hours_per_sec']:>14,.0f}{r['time_to_best']:9.1f}s"
+              f"{r['total_sec']:8.1f}s{r['rmse']:9.2f}")
+    print(f"\n{'構成':<11}{'336時間の順伝播':>16}{'NumPy推論 336時間':>20}{'Keras推論 時間/秒':>20}")
+    for r in results:
+        print(f"{r['name']:<11}{r['numpy_rows']:>13}行{r['numpy_window_us']:17.1f}µs{r['keras_hours_per_sec']:>20,.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keras 日単位（24出力）モデルベンチマーク")
+    parser.add_argument('--years', default='', help="対象年（カンマ区切り、最も新しい年をテスト年とする。デフォルト: 利用可能な直近4年）")
+    parser.add_argument('--epochs', type=int, default=500, help="最大エポック数")
+    parser.add_argument('--patience', type=int, default=20, help="早期終了の忍耐度")
+    parser.add_argument('--validation-split', type=float, default=0.2, help="検証データの割合（学習データ末尾）")
+    parser.add_argument('--repeat', type=int, default=1000, help="NumPy 推論の繰り返し回数")
+    parser.add_argument('--data-dir', default=None, help="入力データディレクトリ")
+    parser.add_argument('--cache-dir', default=None, help="年別特徴量ブロックのキャッシュディレクトリ")
+    args = parser.parse_args()
+
+    if args.years:
+        years = [int(y) for y in args.years.split(',') if y.strip()]
+    else:
+        from data.data import get_available_years
+        years = get_available_years(args.data_dir)[-4:]
+    if len(years) < 2:
+        parser.error("学習年・テスト年として2年以上が必要です")
+
+    train_years, test_year = split_years(years)
+    print(f"=== Keras 日単位（24出力）モデルベンチマーク (学習年: {train_years}, テスト年: {test_year}) ===")
+    from common import keras_pipeline
+    combo = assemble_combination(train_years, test_year, args.data_dir, args.cache_dir)
+    train_days, test_days = load_day_split(years, data_dir=args.data_dir, cache_dir=args.cache_dir)
+    print(f"hourly: 学習 {len(combo.X_train):,}行 / day_block: 学習 {len(train_days):,}日 "
+          f"（元の行の{train_days.coverage:.1%}）, 特徴量 {len(train_days.columns)}列")
+
+    runs = [
+        ('hourly', combo.X_train, combo.y_train, combo.X_test, combo.y_test, keras_pipeline.config.BATCH_SIZE),
+        ('day_block', train_days.X, train_days.y, test_days.X, test_days.y, day_config.BATCH_DAYS),
+    ]
+    results = []
+    for name, X, y, X_test, y_test, batch_size in runs:
+        result = run(name, np.asarray(X, dtype=np.float32), np.asarray(y, dtype=np.float64),
+                     np.asarray(X_test, dtype=np.float32), y_test, batch_size,
+                     args.epochs, args.patience, args.validation_split, args.repeat)
+        results.append(result)
+        print(f"  {name}: 完了 {result['total_sec']:.1f}秒")
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
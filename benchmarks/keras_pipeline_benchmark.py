@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - Keras 入力パイプラインベンチマーク
+
+Keras_train.py と同じ構成のモデル（128→128→64→32→1）を、従来の NumPy 配列入力
+（batch_size=64）と tf.data パイプライン（common/keras_pipeline.py: 大きなバッチ・
+学習率の拡大とウォームアップ）で早期終了まで学習し、エポック時間・検証損失が最良となる
+までの経過時間（収束時間）・テストRMSEを比較する。
+
+検証データはどちらも学習データ末尾（時系列順）の validation_split とする。
+
+使用例:
+    py -3.10 benchmarks/keras_pipeline_benchmark.py
+    py -3.10 benchmarks/keras_pipeline_benchmark.py --years 2019,2020,2021 --epochs 100 --batch-sizes 512,1024,2048
+    （最も新しい年をテスト年、それ以前を学習年とする）
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import assemble_combination, split_years
+
+
+def build_model(input_dim: int, learning_rate: float):
+    """Keras_train.py（create_keras_model）と同じ構成のモデル"""
+    import keras
+    from keras import regularizers
+    l2 = regularizers.l2(0.001)
+    model = keras.Sequential([
+        keras.Input(shape=(input_dim,)),
+        keras.layers.Dense(128, activation='relu', kernel_regularizer=l2),
+        keras.layers.Dropout(0.1),
+        keras.layers.Dense(128, activation='relu', kernel_regularizer=l2),
+        keras.layers.Dropout(0.1),
+        keras.layers.Dense(64, activation='relu', kernel_regularizer=l2),
+        keras.layers.Dense(32, activation='relu'),
+        keras.layers.Dense(1),
+    ])
+    model.compile(loss='mean_squared_error', optimizer=keras.optimizers.Adam(learning_rate=learning_rate))
+    return model
+
+
+def run(pipeline: str, batch_size: int, X: np.ndarray, y: np.ndarray, X_test: np.ndarray, y_test: np.ndarray,
+        y_mean: float, y_std: float, epochs: int, patience: int, validation_split: float) -> Dict:
+    """
+    1つの入力方法について早期終了まで学習し、時間と精度を計測する
+
+    Returns:
+        Dict: 計測結果
+    """
+    import keras
+    from common.keras_pipeline import make_datasets, scaled_learning_rate, time_ordered_split, LinearWarmup, EpochTimer
+    from common import keras_pipeline
+
+    keras.utils.set_random_seed(42)
+    base_lr = 0.001
+    model = build_model(X.shape[1], base_lr)
+    timer = EpochTimer()
+    early_stopping = keras.callbacks.EarlyStopping(monitor='val_loss', min_delta=0.0001, patience=patience,
+                                                   restore_best_weights=True)
+    start_time = time.perf_counter()
+    if pipeline == 'numpy':
+        n_fit, _ = time_ordered_split(len(X), validation_split)
+        model.fit(X[:n_fit], y[:n_fit], validation_data=(X[n_fit:], y[n_fit:]), epochs=epochs,
+                  batch_size=batch_size, verbose=0, callbacks=[timer, early_stopping])
+    else:
+        train_ds, val_ds, steps = make_datasets(X, y, None, validation_split, batch_size)
+        target_lr = scaled_learning_rate(base_lr, batch_size)
+        warmup = LinearWarmup(target_lr, steps * keras_pipeline.config.WARMUP_EPOCHS)
+        model.fit(train_ds, validation_data=val_ds, epochs=epochs, verbose=0,
+                  callbacks=[warmup, timer, early_stopping])
+    elapsed = time.perf_counter() - start_time
+
+    y_pred = model.predict(X_test, batch_size=4096, verbose=0).reshape(-1) * y_std + y_mean
+    steady = timer.epoch_times[1:] or timer.epoch_times
+    return {
+        'pipeline': pipeline, 'batch_size': batch_size, 'epochs': len(timer.epoch_times),
+        'epoch_sec': float(np.mean(steady)), 'best_epoch': timer.best_epoch, 'best_val_loss': timer.best_value,
+        'time_to_best': timer.time_to_best, 'total_sec': elapsed,
+        'rmse': float(np.sqrt(np.mean((y_pred - y_test) ** 2))),
+    }
+
+
+def print_table(results: List[Dict]) -> None:
+    """計測結果を表形式で出力する"""
+    print(f"\n{'入力':<10}{'batch':>7}{'epoch数':>9}{'epoch時間':>11}{'最良epoch':>11}{'収束時間':>10}"
+          f"{'合計':>9}{'val_loss':>10}{'RMSE':>9}")
+    for r in results:
+        print(f"{r['pipeline']:<10}{r['batch_size']:>7}{r['epochs']:>9}{r['epoch_sec']:10.3f}s{r['best_epoch']:>11}"
+              f"{r['time_to_best']:9.1f}s{r['total_sec']:8.1f}s{r['best_val_loss']:10.5f}{r['rmse']:9.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keras 入力パイプラインベンチマーク")
+    parser.add_argument('--years', default='', help="対象年（カンマ区切り、最も新しい年をテスト年とする。デフォルト: 利用可能な直近4年）")
+    parser.add_argument('--batch-sizes', default='1024', help="tf.data パイプラインのバッチサイズ（カンマ区切り）")
+    parser.add_argument('--numpy-batch-size', type=int, default=64, help="従来の NumPy 入力のバッチサイズ")
+    parser.add_argument('--epochs', type=int, default=200, help="最大エポック数")
+    parser.add_argument('--patience', type=int, default=20, help="早期終了の忍耐度")
+    parser.add_argument('--validation-split', type=float, default=0.2, help="検証データの割合（学習データ末尾）")
+    parser.add_argument('--data-dir', default=None, help="入力データディレクトリ")
+    parser.add_argument('--cache-dir', default=None, help="年別特徴量ブロックのキャッシュディレクトリ")
+    args = parser.parse_args()
+
+    if args.years:
+        years = [int(y) for y in args.years.split(',') if y.strip()]
+    else:
+        from data.data import get_available_years
+        years = get_available_years(args.data_dir)[-4:]
+    if len(years) < 2:
+        parser.error("学習年・テスト年として2年以上が必要です")
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',') if b.strip()]
+
+    train_years, test_year = split_years(years)
+    print(f"=== Keras 入力パイプラインベンチマーク (学習年: {train_years}, テスト年: {test_year}) ===")
+    combo = assemble_combination(train_years, test_year, args.data_dir, args.cache_dir)
+    X, y = np.asarray(combo.X_train, dtype=np.float32), np.asarray(combo.y_train, dtype=np.float64)
+    X_test, y_test = np.asarray(combo.X_test, dtype=np.float32), np.asarray(combo.y_test, dtype=np.float64)
+    x_mean, x_std = X.mean(axis=0), X.std(axis=0) + 1e-12
+    y_mean, y_std = float(y.mean()), float(y.std())
+    X, X_test = ((X - x_mean) / x_std).astype(np.float32), ((X_test - x_mean) / x_std).astype(np.float32)
+    y_scaled = ((y - y_mean) / y_std).astype(np.float32)
+    print(f"学習 {len(X):,}行 / テスト {len(X_test):,}行 / 最大 {args.epochs}エポック（忍耐度 {args.patience}）")
+
+    runs = [('numpy', args.numpy_batch_size)] + [('tf_data', b) for b in batch_sizes]
+    results = []
+    for pipeline, batch_size in runs:
+        result = run(pipeline, batch_size, X, y_scaled, X_test, y_test, y_mean, y_std,
+                     args.epochs, args.patience, args.validation_split)
+        results.append(result)
+        print(f"  {pipeline} (batch {batch_size}): 完了 {result['total_sec']:.1f}秒")
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - Keras NumPy 推論エンジンベンチマーク
+
+学習済み Keras モデル（.h5）について、新しいプロセスでの起動から予測完了までの時間
+（コールドスタート）を、TensorFlow で読み込む従来の方法と NumPy 推論エンジン
+（common/mlp_inference.py の <モデル名>_mlp.npz）で比較する。両者の予測値の最大差も出力する。
+
+予測行は翌日予測と同じ 336 行（過去7日 + 翌7日）の乱数特徴量とする。
+
+使用例:
+    py -3.10 benchmarks/mlp_inference_benchmark.py
+    py -3.10 benchmarks/mlp_inference_benchmark.py --model-h5 train/Keras/Keras_model.h5 --repeat 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict
+
+# プロジェクトルート（子プロセス・本プロセスでの common/ のインポートに使用）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# 子プロセスで実行するコード（起動時刻からの経過時間・予測値の先頭を JSON で出力）
+COMMON = """
+import time
+start_time = time.perf_counter()
+import sys, json
+import numpy as np
+sys.path.insert(0, {root!r})
+X = np.random.default_rng(0).random(({rows}, {n_features})).astype(np.float32) * np.array({span}, dtype=np.float32)
+"""
+
+TENSORFLOW = COMMON + """
+import pickle
+from tensorflow.keras.models import load_model
+model = load_model({h5!r}, compile=False)
+with open({h5!r}.replace('.h5', '_scaler.pkl'), 'rb') as f:
+    x_scaler = pickle.load(f)
+with open({h5!r}.replace('.h5', '_y_scaler.pkl'), 'rb') as f:
+    y_scaler = pickle.load(f)
+y = y_scaler.inverse_transform(model.predict(x_scaler.transform(X).astype(np.float32), verbose=0))
+print(json.dumps({{'sec': time.perf_counter() - start_time, 'pred': y.ravel().tolist()}}))
+"""
+
+NUMPY = COMMON + """
+from common.mlp_inference import load_for_model
+mlp = load_for_model({h5!r})
+y = mlp.predict_kw(X)
+print(json.dumps({{'sec': time.perf_counter() - start_time, 'pred': y.ravel().tolist(),
+                   'tensorflow': 'tensorflow' in sys.modules}}))
+"""
+
+
+def cold_start(code: str) -> Dict:
+    """新しいプロセスでコードを実行し、最後の行の JSON を返す"""
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            env={**os.environ, 'TF_CPP_MIN_LOG_LEVEL': '3'})
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keras NumPy 推論エンジンベンチマーク")
+    parser.add_argument('--model-h5', default=os.path.join(PROJECT_ROOT, 'train', 'Keras', 'Keras_model.h5'),
+                        help="学習済み Keras モデル（.h5、<モデル名>_mlp.npz を学習時に書き出したもの）")
+    parser.add_argument('--rows', type=int, default=336, help="予測行数")
+    parser.add_argument('--repeat', type=int, default=3, help="計測の繰り返し回数（最短時間を採用）")
+    args = parser.parse_args()
+
+    sys.path.insert(0, PROJECT_ROOT)
+    from common.mlp_inference import load_for_model
+    mlp = load_for_model(args.model_h5)
+    if mlp is None:
+        parser.error(f"NumPy推論エンジンがありません（Keras_train.py で再学習してください）: {args.model_h5}")
+    n_features = mlp.n_features
+    params = dict(root=PROJECT_ROOT, rows=args.rows, n_features=n_features, h5=os.path.abspath(args.model_h5),
+                  span=[12.0, 6.0, 23.0, 35.0, 1.0][:n_features] + [1.0] * max(0, n_features - 5))
+
+    print(f"=== Keras NumPy 推論エンジンベンチマーク ({mlp.summary()}, {args.rows}行) ===")
+    results = {}
+    for name, code in (('TensorFlow', TENSORFLOW), ('NumPy', NUMPY)):
+        runs = [cold_start(code.format(**params)) for _ in range(args.repeat)]
+        results[name] = min(runs, key=lambda r: r['sec'])
+        print(f"  {name:<11} 起動→予測完了 {results[name]['sec'] * 1000:9.1f}ms")
+
+    import numpy as np
+    diff = np.max(np.abs(np.array(results['TensorFlow']['pred']) - np.array(results['NumPy']['pred'])))
+    print(f"  高速化 {results['TensorFlow']['sec'] / results['NumPy']['sec']:.1f}倍 / 予測値の最大差 {diff:.2e} kW / "
+          f"NumPy経路での TensorFlow 読み込み: {'あり' if results['NumPy']['tensorflow'] else 'なし'}")
+
+
+if __name__ == "__main__":
+    main()
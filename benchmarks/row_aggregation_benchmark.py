@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 学習行集約ベンチマーク
+
+学習年数を変えながら、同一特徴量行の集約（common/row_aggregation.py）による
+行数削減率と、LightGBM / RandomForest / Keras の学習時間・テストRMSEを
+集約なし・集約ありで比較する。
+
+使用例:
+    py -3.10 benchmarks/row_aggregation_benchmark.py
+    py -3.10 benchmarks/row_aggregation_benchmark.py --years 2016,2017,2018,2019,2020,2021 --sizes 1,3,5 --models lightgbm,randomforest
+    （最も新しい年をテスト年とし、その直前の 1 / 3 / 5 年を学習年とする）
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import assemble_combination, split_years
+from common.row_aggregation import aggregate_rows
+
+# 学習関数: (X, y, sample_weight, X_test) -> 予測値
+FitPredict = Callable[[np.ndarray, np.ndarray, Optional[np.ndarray], np.ndarray], np.ndarray]
+
+
+def fit_lightgbm(X: np.ndarray, y: np.ndarray, w: Optional[np.ndarray], X_test: np.ndarray) -> np.ndarray:
+    import lightgbm as lgb
+    model = lgb.LGBMRegressor(n_estimators=100, random_state=42, verbose=-1)
+    model.fit(X, y, sample_weight=w)
+    return model.predict(X_test)
+
+
+def fit_random_forest(X: np.ndarray, y: np.ndarray, w: Optional[np.ndarray], X_test: np.ndarray) -> np.ndarray:
+    from sklearn.ensemble import RandomForestRegressor
+    model = RandomForestRegressor(n_estimators=50, max_features='sqrt', n_jobs=-1, random_state=42)
+    model.fit(X, y, sample_weight=w)
+    return model.predict(X_test)
+
+
+def fit_keras(X: np.ndarray, y: np.ndarray, w: Optional[np.ndarray], X_test: np.ndarray,
+              epochs: int = 5) -> np.ndarray:
+    import keras
+    from sklearn.preprocessing import StandardScaler
+    x_scaler = StandardScaler().fit(X, sample_weight=w)
+    y_scaler = StandardScaler().fit(y.reshape(-1, 1), sample_weight=w)
+    keras.utils.set_random_seed(42)
+    model = keras.Sequential([
+        keras.Input(shape=(X.shape[1],)),
+        keras.layers.Dense(128, activation='relu'),
+        keras.layers.Dense(64, activation='relu'),
+        keras.layers.Dense(1),
+    ])
+    model.compile(loss='mean_squared_error', optimizer=keras.optimizers.Adam(0.001))
+    model.fit(x_scaler.transform(X), y_scaler.transform(y.reshape(-1, 1)).ravel(), sample_weight=w,
+              epochs=epochs, batch_size=64, verbose=0)
+    y_pred = model.predict(x_scaler.transform(X_test), verbose=0)
+    return y_scaler.inverse_transform(y_pred).ravel()
+
+
+MODELS: Dict[str, FitPredict] = {
+    'lightgbm': fit_lightgbm,
+    'randomforest': fit_random_forest,
+    'keras': fit_keras,
+}
+
+
+def timed(fit: FitPredict, X: np.ndarray, y: np.ndarray, w: Optional[np.ndarray],
+          X_test: np.ndarray, y_test: np.ndarray) -> Tuple[float, float]:
+    """学習・予測の実行時間とテストRMSEを返す"""
+    start_time = time.perf_counter()
+    y_pred = fit(X, y, w, X_test)
+    elapsed = time.perf_counter() - start_time
+    return elapsed, float(np.sqrt(np.mean((y_pred - y_test) ** 2)))
+
+
+def run(years: List[int], sizes: List[int], models: List[str],
+        data_dir: Optional[str] = None, cache_dir: Optional[str] = None) -> List[Dict]:
+    """
+    学習年数ごとにベンチマークを実行する
+
+    Returns:
+        List[Dict]: 学習年数・モデルごとの結果
+    """
+    train_years_all, test_year = split_years(years)
+    results = []
+
+    # ライブラリの読み込み・初回コンパイルを計測から除くため、小さなデータで1回ずつ実行しておく
+    rng = np.random.default_rng(0)
+    X_warm, y_warm = rng.random((256, 4), dtype=np.float32), rng.random(256, dtype=np.float32)
+    for name in models:
+        MODELS[name](X_warm, y_warm, None, X_warm[:8])
+
+    for size in sizes:
+        train_years = train_years_all[-size:]
+        if len(train_years) < size:
+            print(f"学習年が不足しているためスキップ: {size}年")
+            continue
+        combo = assemble_combination(train_years, test_year, data_dir, cache_dir)
+        X, y = np.asarray(combo.X_train, dtype=np.float32), np.asarray(combo.y_train, dtype=np.float32)
+        X_test, y_test = np.asarray(combo.X_test), np.asarray(combo.y_test, dtype=np.float64)
+        aggregated = aggregate_rows(X, y)
+        print(f"\n学習年={train_years} テスト年={test_year}: {aggregated.summary()}")
+
+        for name in models:
+            full_time, full_rmse = timed(MODELS[name], X, y, None, X_test, y_test)
+            agg_time, agg_rmse = timed(MODELS[name], aggregated.X, aggregated.y, aggregated.weight, X_test, y_test)
+            result = {
+                'train_years': size, 'model': name,
+                'rows': len(X), 'aggregated_rows': len(aggregated.X), 'reduction': aggregated.reduction,
+                'fit_sec': full_time, 'aggregated_fit_sec': agg_time + aggregated.elapsed,
+                'rmse': full_rmse, 'aggregated_rmse': agg_rmse,
+            }
+            results.append(result)
+            print(f"  {name:<13} 学習時間 {full_time:7.2f}秒 → {result['aggregated_fit_sec']:7.2f}秒 "
+                  f"(集約込み, {full_time / max(result['aggregated_fit_sec'], 1e-9):.2f}倍) "
+                  f"RMSE {full_rmse:8.2f} → {agg_rmse:8.2f} kW")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="学習行集約ベンチマーク")
+    parser.add_argument('--years', default='', help="対象年（カンマ区切り、最も新しい年をテスト年とする。デフォルト: 利用可能な全年）")
+    parser.add_argument('--sizes', default='1,3,5', help="学習年数（カンマ区切り）")
+    parser.add_argument('--models', default='lightgbm,randomforest,keras', help="対象モデル（カンマ区切り）")
+    parser.add_argument('--data-dir', default=None, help="入力データディレクトリ")
+    parser.add_argument('--cache-dir', default=None, help="年別特徴量ブロックのキャッシュディレクトリ")
+    args = parser.parse_args()
+
+    if args.years:
+        years = [int(y) for y in args.years.split(',') if y.strip()]
+    else:
+        from data.data import get_available_years
+        years = get_available_years(args.data_dir)
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    models = [m.strip().lower() for m in args.models.split(',') if m.strip()]
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        parser.error(f"未対応のモデルです: {unknown}")
+    if len(years) < 2:
+        parser.error("学習年・テスト年として2年以上が必要です")
+
+    print(f"=== 学習行集約ベンチマーク (対象年: {years}) ===")
+    run(years, sizes, models, args.data_dir, args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
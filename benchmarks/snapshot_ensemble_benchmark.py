@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - Keras スナップショットアンサンブル推論ベンチマーク
+
+スナップショットアンサンブルで学習した Keras モデル（Keras_train.py の SNAPSHOT_ENSEMBLE、
+<モデル名>_mlp.npz に各スナップショットの重みを積み重ねて保存）について、NumPy 推論エンジンでの
+1回の予測時間を次の3通りで比較する。
+
+    stacked: 積み重ねた重みで全スナップショットを同時に順伝播し平均する（翌日予測の方法）
+    loop:    スナップショットごとに順伝播して平均する
+    single:  最後のスナップショットのみで順伝播する（アンサンブルしない場合の下限）
+
+予測行は翌日予測の日単位モデル（14日 = 14行）・時刻単位モデル（336行）と1年分（8760行）の乱数特徴量とする。
+
+使用例:
+    py -3.10 benchmarks/snapshot_ensemble_benchmark.py
+    py -3.10 benchmarks/snapshot_ensemble_benchmark.py --model-h5 train/Keras/Keras_model.h5 --rows 14,336 --repeat 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Callable
+
+import numpy as np
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.mlp_inference import load_for_model
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    """repeat 回実行した1回あたりの時間（秒、初回の実行は除く）"""
+    func()
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start_time) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keras スナップショットアンサンブル推論ベンチマーク")
+    parser.add_argument('--model-h5', default=os.path.join(PROJECT_ROOT, 'train', 'Keras', 'Keras_model.h5'),
+                        help="スナップショットアンサンブルで学習した Keras モデル（.h5）")
+    parser.add_argument('--rows', default='14,336,8760', help="予測行数（カンマ区切り）")
+    parser.add_argument('--repeat', type=int, default=1000, help="繰り返し回数（8760行以上は1/10）")
+    args = parser.parse_args()
+
+    mlp = load_for_model(args.model_h5)
+    if mlp is None:
+        parser.error(f"NumPy推論エンジンがありません（Keras_train.py で再学習してください）: {args.model_h5}")
+    if mlp.kernels[0].ndim == 2:
+        parser.error(f"スナップショットアンサンブルのモデルではありません（AI_KERAS_SNAPSHOTS=1 で学習）: {args.model_h5}")
+    members = mlp.members()
+
+    print(f"=== Keras スナップショットアンサンブル推論ベンチマーク ({mlp.summary()}) ===")
+    print(f"{'行数':>7}{'stacked':>12}{'loop':>12}{'single':>12}{'stacked/loop':>14}{'最大差':>11}")
+    rng = np.random.default_rng(0)
+    for rows in [int(r) for r in args.rows.split(',') if r.strip()]:
+        X = rng.standard_normal((rows, mlp.n_features)).astype(np.float32)
+        repeat = max(1, args.repeat // 10) if rows >= 8760 else args.repeat
+        stacked = best_time(lambda: mlp.predict(X), repeat)
+        loop = best_time(lambda: np.mean([m.predict(X) for m in members], axis=0), repeat)
+        single = best_time(lambda: members[-1].predict(X), repeat)
+        diff = np.max(np.abs(mlp.predict(X) - np.mean([m.predict(X) for m in members], axis=0)))
+        print(f"{rows:>7}{stacked * 1e6:10.0f}µs{loop * 1e6:10.0f}µs{single * 1e6:10.0f}µs"
+              f"{stacked / loop:13.2f}倍{diff:11.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 起動時間（インポート時間）ベンチマーク
+
+学習・翌日予測スクリプトと共通モジュール（common/）について、新しいプロセスでモジュールを
+読み込む（スクリプトはインポートのみで main は実行しない）までの時間と、その時点で読み込まれて
+いる重いライブラリ（pandas / scikit-learn / matplotlib / TensorFlow など）を出力する。
+
+翌日予測スクリプト（tomorrow/）は TARGET_MS 以内での起動を目標とし、超えた場合は印を付ける。
+--detail を指定すると、python -X importtime の累積時間の上位モジュールも出力する。
+
+使用例:
+    py -3.10 benchmarks/startup_benchmark.py
+    py -3.10 benchmarks/startup_benchmark.py --repeat 5 --detail 8
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+import subprocess
+from typing import Dict, List
+
+# プロジェクトルート（子プロセスでの common/ のインポートに使用）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# 翌日予測スクリプトの起動時間の目標（ms）
+TARGET_MS = 200
+
+# 読み込みを確認する重いライブラリ
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'matplotlib', 'joblib', 'lightgbm',
+                 'tensorflow', 'keras', 'pycaret', 'psutil')
+
+# 子プロセスで実行するコード（インポート時間・読み込まれた重いライブラリを JSON で出力）
+# スクリプトは __main__ 以外の名前でファイルから読み込む（dataclass の型解決のため sys.modules に登録する）
+CODE = """
+import time
+start_time = time.perf_counter()
+import sys, json, importlib.util
+sys.path.insert(0, {root!r})
+spec = importlib.util.spec_from_file_location('startup_target', {path!r})
+module = importlib.util.module_from_spec(spec)
+sys.modules['startup_target'] = module
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start_time
+print(json.dumps({{'sec': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+# 参考値: numpy のみを読み込む時間（各モジュールの下限）
+BASELINE = """
+import time
+start_time = time.perf_counter()
+import json
+import numpy
+print(json.dumps({'sec': time.perf_counter() - start_time}))
+"""
+
+
+def target_files() -> List[str]:
+    """計測対象（翌日予測・学習スクリプト、共通モジュール）のプロジェクトルートからの相対パス"""
+    patterns = ['tomorrow/*/*_tomorrow.py', 'train/*/*_train.py', 'common/*.py']
+    paths = []
+    for pattern in patterns:
+        paths += sorted(glob.glob(os.path.join(PROJECT_ROOT, pattern)))
+    return [os.path.relpath(p, PROJECT_ROOT) for p in paths if not p.endswith('__init__.py')]
+
+
+def run_json(code: str, *options: str) -> Dict:
+    """新しいプロセスでコードを実行し、最後の行の JSON と標準エラー出力を返す（失敗時は error に最終行）"""
+    result = subprocess.run([sys.executable, *options, '-c', code], capture_output=True, text=True,
+                            cwd=PROJECT_ROOT, env={**os.environ, 'TF_CPP_MIN_LOG_LEVEL': '3'})
+    if result.returncode != 0:
+        return {'error': (result.stderr.strip().splitlines() or ['不明なエラー'])[-1], 'stderr': result.stderr}
+    return {**json.loads(result.stdout.strip().splitlines()[-1]), 'stderr': result.stderr}
+
+
+def import_code(path: str) -> str:
+    """モジュールを読み込む子プロセスのコード"""
+    return CODE.format(root=PROJECT_ROOT, path=os.path.join(PROJECT_ROOT, path), heavy=HEAVY_MODULES)
+
+
+def import_profile(path: str, top: int) -> List[str]:
+    """python -X importtime の累積時間の上位モジュール（対象モジュール自身を除く）"""
+    stderr = run_json(import_code(path), '-X', 'importtime')['stderr']
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        # 最上位（インデントなし）のインポートのみを集計する
+        if name.startswith(' ') and not name.startswith('  '):
+            rows.append((int(parts[1]), name.strip()))
+    rows.sort(reverse=True)
+    return [f"{name} {us / 1000:.0f}ms" for us, name in rows[:top]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="起動時間（インポート時間）ベンチマーク")
+    parser.add_argument('--repeat', type=int, default=3, help="計測の繰り返し回数（最短時間を採用）")
+    parser.add_argument('--detail', type=int, default=0, help="importtime の上位モジュールを出力する件数")
+    parser.add_argument('paths', nargs='*', help="計測対象（デフォルト: 翌日予測・学習スクリプト、共通モジュール）")
+    args = parser.parse_args()
+
+    paths = args.paths or target_files()
+    baseline = min(run_json(BASELINE)['sec'] for _ in range(args.repeat))
+
+    print(f"=== 起動時間ベンチマーク（{len(paths)}モジュール, 最短/{args.repeat}回, 参考: numpy のみ "
+          f"{baseline * 1000:.0f}ms, 翌日予測の目標 {TARGET_MS}ms） ===")
+    print(f"{'モジュール':<48}{'時間':>9}  読み込まれた重いライブラリ")
+    over_target = []
+    for path in paths:
+        runs = [run_json(import_code(path)) for _ in range(args.repeat)]
+        if 'error' in runs[0]:
+            print(f"{path:<48}{'失敗':>9}  {runs[0]['error']}")
+            continue
+        best = min(runs, key=lambda r: r['sec'])
+        ms = best['sec'] * 1000
+        mark = ''
+        if path.startswith('tomorrow') and ms > TARGET_MS:
+            mark = f'  ← 目標 {TARGET_MS}ms 超過'
+            over_target.append(path)
+        print(f"{path:<48}{ms:7.0f}ms  {', '.join(best['heavy']) or '-'}{mark}")
+        if args.detail:
+            print(f"{'':<50}{' / '.join(import_profile(path, args.detail))}")
+
+    if over_target:
+        print(f"目標 {TARGET_MS}ms を超えた翌日予測スクリプト: {', '.join(over_target)}")
+    else:
+        print(f"翌日予測スクリプトはすべて目標 {TARGET_MS}ms 以内です")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 決定木エンジンベンチマーク
+
+RandomForest モジュールで選択できる決定木エンジン（common/tree_engines.py）を
+同じ学習・テストデータで比較し、学習時間・予測時間（翌日予測相当の168行 / テスト年全体）・
+保存サイズ（joblib 非圧縮、翌日予測と同じ形式）・読み込み時間・テストRMSEを表にする。
+
+パラメータは学習スクリプトの既定値（RandomForest / ExtraTrees: 100本・max_features='sqrt'、
+HistGradientBoosting: 300反復・葉63・MONTH / WEEK / HOUR をカテゴリ変数）に合わせる。
+
+使用例:
+    py -3.10 benchmarks/tree_engine_benchmark.py
+    py -3.10 benchmarks/tree_engine_benchmark.py --years 2019,2020,2021 --engines extra_trees,hist_gradient_boosting
+    （最も新しい年をテスト年、それ以前を学習年とする）
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import assemble_combination, split_years, feature_columns
+from common.forest_artifacts import save_forest, load_forest
+from common.tree_engines import ENGINES, engine_class
+
+# 翌日予測1回分の行数（7日 x 24時間）
+PREDICT_ROWS = 168
+
+
+def engine_params(engine: str) -> Dict[str, Any]:
+    """学習スクリプト（RandomForestConfig）の既定値に合わせたエンジンごとのパラメータ"""
+    if engine == 'hist_gradient_boosting':
+        columns = feature_columns()
+        categorical = [columns.index(name) for name in ("MONTH", "WEEK", "HOUR") if name in columns]
+        return {'max_iter': 300, 'learning_rate': 0.1, 'max_leaf_nodes': 63, 'min_samples_leaf': 20,
+                'categorical_features': categorical or None, 'early_stopping': False, 'random_state': 42}
+    return {'n_estimators': 100, 'max_features': 'sqrt', 'n_jobs': -1, 'random_state': 42}
+
+
+def best_time(func: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """repeat 回実行した最短時間（秒）と最後の結果を返す"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+
+def run(engine: str, X: np.ndarray, y: np.ndarray, X_test: np.ndarray, y_test: np.ndarray,
+        repeat: int) -> Dict:
+    """
+    1つのエンジンについて学習・予測・保存を計測する
+
+    Returns:
+        Dict: 計測結果
+    """
+    start_time = time.perf_counter()
+    model = engine_class(engine)(**engine_params(engine)).fit(X, y)
+    fit_sec = time.perf_counter() - start_time
+
+    X_predict = np.ascontiguousarray(X_test[:PREDICT_ROWS])
+    predict_sec, _ = best_time(lambda: model.predict(X_predict), repeat)
+    test_sec, y_pred = best_time(lambda: model.predict(X_test), 1)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'model.sav')
+        size_mb = save_forest(model, path)
+        load_sec, _ = best_time(lambda: load_forest(path), 3)
+
+    return {
+        'engine': engine, 'fit_sec': fit_sec, 'predict_sec': predict_sec, 'test_predict_sec': test_sec,
+        'size_mb': size_mb, 'load_sec': load_sec,
+        'rmse': float(np.sqrt(np.mean((y_pred - y_test) ** 2))),
+    }
+
+
+def print_table(results: List[Dict], n_test: int) -> None:
+    """計測結果を表形式で出力する"""
+    print(f"\n{'エンジン':<24}{'学習':>10}{f'予測{PREDICT_ROWS}行':>12}{f'予測{n_test:,}行':>14}"
+          f"{'サイズ':>11}{'読み込み':>11}{'RMSE':>10}")
+    for r in results:
+        print(f"{r['engine']:<26}{r['fit_sec']:9.2f}s{r['predict_sec'] * 1000:12.2f}ms"
+              f"{r['test_predict_sec'] * 1000:14.1f}ms{r['size_mb']:10.1f}MB{r['load_sec'] * 1000:10.1f}ms"
+              f"{r['rmse']:10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="決定木エンジンベンチマーク")
+    parser.add_argument('--years', default='', help="対象年（カンマ区切り、最も新しい年をテスト年とする。デフォルト: 利用可能な直近4年）")
+    parser.add_argument('--engines', default=','.join(ENGINES), help="対象エンジン（カンマ区切り）")
+    parser.add_argument('--repeat', type=int, default=5, help="予測時間の計測の繰り返し回数（最短時間を採用）")
+    parser.add_argument('--data-dir', default=None, help="入力データディレクトリ")
+    parser.add_argument('--cache-dir', default=None, help="年別特徴量ブロックのキャッシュディレクトリ")
+    args = parser.parse_args()
+
+    if args.years:
+        years = [int(y) for y in args.years.split(',') if y.strip()]
+    else:
+        from data.data import get_available_years
+        years = get_available_years(args.data_dir)[-4:]
+    engines = [e.strip().lower() for e in args.engines.split(',') if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        parser.error(f"未対応のエンジンです: {unknown}")
+    if len(years) < 2:
+        parser.error("学習年・テスト年として2年以上が必要です")
+
+    train_years, test_year = split_years(years)
+    print(f"=== 決定木エンジンベンチマーク (学習年: {train_years}, テスト年: {test_year}) ===")
+    combo = assemble_combination(train_years, test_year, args.data_dir, args.cache_dir)
+    X, y = np.asarray(combo.X_train, dtype=np.float32), np.asarray(combo.y_train, dtype=np.float32)
+    X_test = np.asarray(combo.X_test, dtype=np.float32)
+    y_test = np.asarray(combo.y_test, dtype=np.float64)
+    print(f"学習 {len(X):,}行 / テスト {len(X_test):,}行 / 特徴量 {X.shape[1]}")
+
+    results = []
+    for engine in engines:
+        results.append(run(engine, X, y, X_test, y_test, args.repeat))
+        print(f"  {engine}: 完了")
+    print_table(results, len(X_test))
+
+
+if __name__ == "__main__":
+    main()
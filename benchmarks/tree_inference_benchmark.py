@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 決定木推論エンジンベンチマーク
+
+LightGBM / RandomForest の学習済みモデルについて、ライブラリ本来の predict と
+NumPy 推論エンジン（common/tree_inference.py）の予測時間を行数ごとに比較する。
+モデル読み込み時間（pickle / .npz）と、両者の予測値の最大差も出力する。
+
+学習済みモデル（.sav）を指定しない場合は、年別特徴量ブロックから学習した
+小さなモデル（LightGBM 100本 / RandomForest 50本）で計測する。
+予測行は学習・テストデータから復元抽出する。
+
+使用例:
+    py -3.10 benchmarks/tree_inference_benchmark.py
+    py -3.10 benchmarks/tree_inference_benchmark.py --rows 1,168,10000,1000000 --models lightgbm
+    py -3.10 benchmarks/tree_inference_benchmark.py --model-sav train/RandomForest/RandomForest_model.sav
+    （.sav は pickle / joblib 形式のどちらでもよい）
+"""
+
+import os
+import sys
+import time
+import pickle
+import tempfile
+import argparse
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import joblib
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import assemble_years
+from common.tree_inference import compile_model, save_compiled, load_compiled
+
+
+def fit_lightgbm(X: np.ndarray, y: np.ndarray) -> Any:
+    import lightgbm as lgb
+    return lgb.LGBMRegressor(n_estimators=100, random_state=42, verbose=-1).fit(X, y)
+
+
+def fit_random_forest(X: np.ndarray, y: np.ndarray) -> Any:
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(n_estimators=50, max_features='sqrt', n_jobs=-1, random_state=42).fit(X, y)
+
+
+MODELS: Dict[str, Callable[[np.ndarray, np.ndarray], Any]] = {
+    'lightgbm': fit_lightgbm,
+    'randomforest': fit_random_forest,
+}
+
+
+def best_time(func: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """repeat 回実行した最短時間（秒）と最後の結果を返す"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+
+def load_times(model: Any, work_dir: str) -> Tuple[float, float, Any]:
+    """pickle と .npz の読み込み時間を計測し、読み込んだ変換済みモデルを返す"""
+    model_path = os.path.join(work_dir, 'model.sav')
+    npz_path = os.path.join(work_dir, 'model_compiled.npz')
+    with open(model_path, 'wb') as f:
+        pickle.dump(model, f)
+    save_compiled(compile_model(model), npz_path)
+
+    def load_pickle():
+        with open(model_path, 'rb') as f:
+            return pickle.load(f)
+
+    pickle_sec, _ = best_time(load_pickle, 3)
+    npz_sec, compiled = best_time(lambda: load_compiled(npz_path), 3)
+    return pickle_sec, npz_sec, compiled
+
+
+def run(name: str, model: Any, X_pool: np.ndarray, rows: List[int], repeat: int) -> List[Dict]:
+    """
+    1つのモデルについて行数ごとに予測時間を計測する
+
+    Returns:
+        List[Dict]: 行数ごとの結果
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        pickle_sec, npz_sec, compiled = load_times(model, work_dir)
+    print(f"\n[{name}] {compiled.summary()}")
+    print(f"  読み込み時間: pickle {pickle_sec * 1000:8.1f}ms / .npz {npz_sec * 1000:8.1f}ms")
+
+    rng = np.random.default_rng(0)
+    results = []
+    for n_rows in rows:
+        X = np.ascontiguousarray(X_pool[rng.integers(0, len(X_pool), n_rows)])
+        # 大量行は1回のみ計測する
+        n_repeat = repeat if n_rows <= 10_000 else 1
+        native_sec, native_pred = best_time(lambda: model.predict(X), n_repeat)
+        compiled_sec, compiled_pred = best_time(lambda: compiled.predict(X), n_repeat)
+        result = {
+            'model': name, 'rows': n_rows, 'native_sec': native_sec, 'compiled_sec': compiled_sec,
+            'max_abs_diff': float(np.max(np.abs(native_pred - compiled_pred))),
+        }
+        results.append(result)
+        print(f"  {n_rows:>9,}行  predict {native_sec * 1000:10.2f}ms  NumPy {compiled_sec * 1000:10.2f}ms "
+              f"({native_sec / max(compiled_sec, 1e-9):6.2f}倍)  最大差 {result['max_abs_diff']:.2e}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="決定木推論エンジンベンチマーク")
+    parser.add_argument('--years', default='', help="学習に使用する年（カンマ区切り、デフォルト: 利用可能な直近3年）")
+    parser.add_argument('--rows', default='1,168,10000,1000000', help="予測行数（カンマ区切り）")
+    parser.add_argument('--models', default='lightgbm,randomforest', help="学習して計測するモデル（カンマ区切り）")
+    parser.add_argument('--model-sav', action='append', default=[], help="計測する学習済みモデル（.sav、複数指定可）")
+    parser.add_argument('--repeat', type=int, default=5, help="計測の繰り返し回数（最短時間を採用）")
+    parser.add_argument('--data-dir', default=None, help="入力データディレクトリ")
+    parser.add_argument('--cache-dir', default=None, help="年別特徴量ブロックのキャッシュディレクトリ")
+    args = parser.parse_args()
+
+    if args.years:
+        years = [int(y) for y in args.years.split(',') if y.strip()]
+    else:
+        from data.data import get_available_years
+        years = get_available_years(args.data_dir)[-3:]
+    rows = [int(r) for r in args.rows.split(',') if r.strip()]
+    models = [m.strip().lower() for m in args.models.split(',') if m.strip()] if not args.model_sav else []
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        parser.error(f"未対応のモデルです: {unknown}")
+
+    print(f"=== 決定木推論エンジンベンチマーク (対象年: {years}, 行数: {rows}) ===")
+    _, X, y = assemble_years(years, args.data_dir, args.cache_dir)
+    X, y = np.asarray(X, dtype=np.float32), np.asarray(y, dtype=np.float32)
+
+    for path in args.model_sav:
+        model = joblib.load(path)
+        run(os.path.basename(path), model, X, rows, args.repeat)
+    for name in models:
+        run(name, MODELS[name](X, y), X, rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 共通モジュール
+
+学習（train/）・翌日予測（tomorrow/）・データ作成（data/）の各スクリプトから
+共有される処理をまとめたパッケージ。
+
+各スクリプトはプロジェクトルートを sys.path に追加してから
+``from common.xxx import ...`` の形式でインポートする。
+"""
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 学習済みモデルに付随する .npz ファイルの保存・照合
+
+決定木推論エンジン（tree_inference）・NumPy 推論エンジン（mlp_inference）・
+分位点予測の葉の学習行（forest_quantiles）は、学習済みモデルファイルと並べて .npz に保存し、
+読み込み時に保存元モデルファイルの名前・サイズ・更新時刻で対応を確認する。
+
+    meta = {'format_version': 1, 'source_file': file_stamp(model_path)}
+    save_npz_atomic(path, meta, weights=weights)       # 一時ファイルへ書き出してから置き換え
+"""
+
+import os
+import json
+from typing import Any, Dict
+
+import numpy as np
+
+
+def file_stamp(path: str) -> Dict[str, Any]:
+    """
+    ファイルの名前・サイズ・更新時刻（変換後にモデルファイルが更新されたかの判定に使用する）
+
+    Args:
+        path: ファイルパス
+
+    Returns:
+        Dict[str, Any]: name, size, mtime_ns
+    """
+    stat = os.stat(path)
+    return {'name': os.path.basename(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def save_npz_atomic(path: str, meta: Dict[str, Any], **arrays: np.ndarray) -> None:
+    """
+    メタ情報（JSON 文字列として 'meta' に格納）と配列を .npz（非圧縮）に保存する
+
+    一時ファイルへ書き出してから置き換えるため、予測側が書き込み途中のファイルを読むことはない。
+
+    Args:
+        path: 保存先パス
+        meta: メタ情報（JSON に変換できる値）
+        **arrays: 保存する配列
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+    os.replace(tmp_path, path)
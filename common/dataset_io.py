@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 学習用バイナリデータセット入出力モジュール
+
+学習・テストデータを .npy 配列（Xtrain / Xtest / Ytrain / Ytest）と
+JSONヘッダ（列名・dtype・形状・内容ハッシュ）の組として保存し、
+各学習スクリプトが np.load(mmap_mode='r') で読み込むためのモジュール。
+
+メモリマップはOSのページキャッシュを共有するため、複数プロセスが同じ
+データセットを読み込んでもコピーは発生しない。CSV（data/Xtrain.csv 等）は
+エクスポート用として従来通り出力される。
+
+構成:
+    data/dataset/Xtrain.npy, Xtest.npy, Ytrain.npy, Ytest.npy
+    data/dataset/dataset.json   ヘッダ（最後に書き込むため途中中断時は無効となる）
+"""
+
+import os
+import json
+import hashlib
+import datetime as dt
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@dataclass(frozen=True)
+class DatasetIOConfig:
+    """バイナリデータセット入出力設定クラス（設定値統一管理）"""
+    DATASET_DIR: str = os.path.join(PROJECT_ROOT, 'data', 'dataset')
+    HEADER_FILE: str = "dataset.json"
+    ARRAY_NAMES: List[str] = field(default_factory=lambda: ["Xtrain", "Xtest", "Ytrain", "Ytest"])
+    FORMAT_VERSION: int = 1
+    HASH_CHUNK_BYTES: int = 16 * 1024 * 1024
+
+
+# 統一設定インスタンス
+config = DatasetIOConfig()
+
+
+@dataclass
+class TrainingDataset:
+    """バイナリデータセット（各配列は読み取り専用メモリマップ）"""
+    X_train: np.ndarray
+    X_test: np.ndarray
+    y_train: np.ndarray
+    y_test: np.ndarray
+    header: Dict[str, Any]
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return list(self.header['feature_columns'])
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """X_train, X_test, y_train, y_test を返す"""
+        return self.X_train, self.X_test, self.y_train, self.y_test
+
+
+def array_hash(arrays: List[np.ndarray]) -> str:
+    """
+    配列群の内容ハッシュ（SHA-1、dtype・形状を含む）を計算する
+
+    Args:
+        arrays: 配列リスト
+
+    Returns:
+        str: 16進ハッシュ文字列
+    """
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode('ascii'))
+        flat = array.reshape(-1).view(np.uint8)
+        for start in range(0, len(flat), config.HASH_CHUNK_BYTES):
+            digest.update(flat[start:start + config.HASH_CHUNK_BYTES])
+    return digest.hexdigest()
+
+
+def header_path(dataset_dir: Optional[str] = None) -> str:
+    return os.path.join(dataset_dir or config.DATASET_DIR, config.HEADER_FILE)
+
+
+def dataset_exists(dataset_dir: Optional[str] = None) -> bool:
+    """ヘッダが書き込み済み（＝完全な）データセットが存在するか"""
+    return os.path.exists(header_path(dataset_dir))
+
+
+def write_dataset(X_train: np.ndarray,
+                  X_test: np.ndarray,
+                  y_train: np.ndarray,
+                  y_test: np.ndarray,
+                  feature_columns: List[str],
+                  target_columns: List[str],
+                  dataset_dir: Optional[str] = None,
+                  extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    学習・テストデータをバイナリデータセットとして保存する
+
+    配列は一時ファイル経由で置換し、ヘッダは最後に書き込む。
+    書き込み開始時に既存ヘッダを削除するため、途中で中断した場合は
+    データセットが存在しない扱いとなる。
+
+    Args:
+        X_train, X_test: 特徴量行列
+        y_train, y_test: 目的変数
+        feature_columns: 特徴量列名
+        target_columns: 目的変数列名
+        dataset_dir: 保存先ディレクトリ（デフォルト: config値）
+        extra: ヘッダに追加する情報（対象年など）
+
+    Returns:
+        Dict[str, Any]: 書き込んだヘッダ
+    """
+    dataset_dir = dataset_dir or config.DATASET_DIR
+    os.makedirs(dataset_dir, exist_ok=True)
+    if dataset_exists(dataset_dir):
+        os.remove(header_path(dataset_dir))
+
+    arrays = dict(zip(config.ARRAY_NAMES, (X_train, X_test, y_train, y_test)))
+    for name, array in arrays.items():
+        tmp_path = os.path.join(dataset_dir, f"{name}.tmp.npy")
+        np.save(tmp_path, np.ascontiguousarray(array))
+        os.replace(tmp_path, os.path.join(dataset_dir, f"{name}.npy"))
+
+    header = {
+        'version': config.FORMAT_VERSION,
+        'created': dt.datetime.now().isoformat(timespec='seconds'),
+        'feature_columns': list(feature_columns),
+        'target_columns': list(target_columns),
+        'arrays': {name: {'dtype': np.asarray(a).dtype.str, 'shape': list(np.shape(a))}
+                   for name, a in arrays.items()},
+        'hash': array_hash(list(arrays.values())),
+    }
+    if extra:
+        header.update(extra)
+    tmp_path = header_path(dataset_dir) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, header_path(dataset_dir))
+    return header
+
+
+def read_header(dataset_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    データセットのヘッダを読み込む
+
+    Raises:
+        FileNotFoundError: データセットが存在しない場合
+        ValueError: 形式バージョンが異なる場合
+    """
+    with open(header_path(dataset_dir), 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    if header.get('version') != config.FORMAT_VERSION:
+        raise ValueError(f"データセット形式のバージョンが異なります: {header.get('version')}")
+    return header
+
+
+def read_dataset(dataset_dir: Optional[str] = None, verify: bool = False) -> TrainingDataset:
+    """
+    バイナリデータセットをメモリマップで読み込む（コピーなし）
+
+    Args:
+        dataset_dir: データセットディレクトリ（デフォルト: config値）
+        verify: 内容ハッシュを検証するか（全データを読むため通常は不要）
+
+    Returns:
+        TrainingDataset: データセット
+
+    Raises:
+        FileNotFoundError: データセットが存在しない場合
+        ValueError: ヘッダと配列の形状・dtype・ハッシュが一致しない場合
+    """
+    dataset_dir = dataset_dir or config.DATASET_DIR
+    header = read_header(dataset_dir)
+    arrays = []
+    for name in config.ARRAY_NAMES:
+        array = np.load(os.path.join(dataset_dir, f"{name}.npy"), mmap_mode='r')
+        expected = header['arrays'][name]
+        if array.dtype.str != expected['dtype'] or list(array.shape) != expected['shape']:
+            raise ValueError(f"{name}.npy がヘッダと一致しません: {array.dtype}{array.shape}")
+        arrays.append(array)
+    if verify and array_hash(arrays) != header['hash']:
+        raise ValueError("データセットの内容ハッシュが一致しません")
+    return TrainingDataset(*arrays, header=header)
+
+
+def is_newer_than(dataset_dir: Optional[str], paths: List[str]) -> bool:
+    """
+    データセットが指定ファイル（CSVエクスポート等）以降に作成されたか
+
+    Args:
+        dataset_dir: データセットディレクトリ
+        paths: 比較対象ファイル（存在しないものは無視）
+
+    Returns:
+        bool: データセットの方が新しい（または同時）場合 True
+    """
+    if not dataset_exists(dataset_dir):
+        return False
+    dataset_mtime = os.path.getmtime(header_path(dataset_dir))
+    return all(os.path.getmtime(p) <= dataset_mtime for p in paths if os.path.exists(p))
+
+
+def load_training_arrays(xtrain_csv: str,
+                         xtest_csv: str,
+                         ytrain_csv: str,
+                         ytest_csv: str,
+                         dtype: str = 'float32',
+                         dataset_dir: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """
+    学習・テストデータを読み込む（バイナリデータセット優先、CSVはフォールバック）
+
+    CSVと同じディレクトリの dataset/ に、CSV以降に作成されたバイナリデータセットがあれば
+    メモリマップで読み込む（dtype が一致すればコピーなし）。無い場合はCSVを
+    指定 dtype で直接読み込む。
+
+    Args:
+        xtrain_csv, xtest_csv, ytrain_csv, ytest_csv: CSVパス
+        dtype: 配列のデータ型
+        dataset_dir: バイナリデータセットのディレクトリ（デフォルト: CSVと同じディレクトリの dataset/）
+
+    Returns:
+        Tuple: X_train, X_test, y_train（1次元）, y_test（1次元）, 特徴量列名
+    """
+    csv_paths = [xtrain_csv, xtest_csv, ytrain_csv, ytest_csv]
+    if dataset_dir is None:
+        dataset_dir = os.path.join(os.path.dirname(xtrain_csv), os.path.basename(config.DATASET_DIR))
+    if is_newer_than(dataset_dir, csv_paths):
+        print(f"バイナリデータセットを読み込み中（メモリマップ）: {dataset_dir}")
+        dataset = read_dataset(dataset_dir)
+        X_train, X_test, y_train, y_test = (a.astype(dtype, copy=False) for a in dataset.arrays())
+        return X_train, X_test, y_train.reshape(-1), y_test.reshape(-1), dataset.feature_columns
+
+    import pandas as pd
+    print("CSVを読み込み中（バイナリデータセットなし）...")
+    X_train_df = pd.read_csv(xtrain_csv, dtype=dtype)
+    X_test = pd.read_csv(xtest_csv, dtype=dtype).to_numpy()
+    y_train = pd.read_csv(ytrain_csv, dtype=dtype).to_numpy().reshape(-1)
+    y_test = pd.read_csv(ytest_csv, dtype=dtype).to_numpy().reshape(-1)
+    return X_train_df.to_numpy(), X_test, y_train, y_test, list(X_train_df.columns)
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 日単位（24時間ブロック）データセット構築モジュール
+
+時刻単位の特徴量行列（1行1時刻: MONTH, WEEK, HOUR, TEMP, CALENDAR, ...）を、1行1日の
+特徴量行列と 24 時間分の目的変数に組み替える。Keras の 24 出力モデル
+（Keras_train.py の ARCHITECTURE='day_block'）は1回の順伝播で1日分を予測する。
+
+    日単位の特徴量: 日で一定の列（DAY_COLUMNS: MONTH, WEEK, CALENDAR）は1列、
+                    それ以外の列（TEMP・需要ラグ特徴量など）は時刻ごとの 24 列（TEMP_00 〜 TEMP_23）。
+                    HOUR は出力の位置で表すため使用しない。
+    目的変数:       1日 24 時間の KW（形状 (日数, 24)）
+
+日の区切りは時刻キー（epoch-hour、指定時）または HOUR 列の巻き戻りから求める。学習用には
+24 時間そろった日のみを使用し、予測用には欠けた時刻の特徴量を同じ日の前後の時刻で補って
+全ての行を予測する。予測値は to_hourly で元の行順の1行1時刻に戻す。
+
+学習済みモデルの入力構成は <モデル名>_day_blocks.json に保存し、翌日予測で読み込む
+（ファイルが無いモデルは1行1時刻のモデル）。
+"""
+
+import os
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.year_blocks import config as block_config, assemble_combination, assemble_years, feature_columns, split_years
+from common.time_split import tail_holdout, take_rows
+
+
+@dataclass(frozen=True)
+class DayBlockConfig:
+    """日単位データセット設定クラス（設定値統一管理）"""
+    FORMAT_VERSION: int = 1
+    HOURS_PER_DAY: int = 24
+    # 日で一定の列（日単位の特徴量として1列のみ使用）
+    DAY_COLUMNS: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "CALENDAR"])
+    # 時刻を表す列（出力の位置で表すため特徴量に含めない）
+    HOUR_COLUMN: str = "HOUR"
+    # 1バッチの日数（32日 = 768時間分の目的変数）
+    BATCH_DAYS: int = 32
+    # 学習済みモデルに対応する入力構成ファイルの接尾辞
+    LAYOUT_SUFFIX: str = "_day_blocks.json"
+
+
+# 統一設定インスタンス
+config = DayBlockConfig()
+
+
+@dataclass
+class DayBlocks:
+    """日単位に組み替えたデータセット"""
+    X: np.ndarray                # 日単位の特徴量（日数 x 特徴量数）
+    y: Optional[np.ndarray]      # 24 時間分の目的変数（日数 x 24、欠けた時刻は NaN）
+    row_index: np.ndarray        # 各日・各時刻の元の行番号（日数 x 24、欠けた時刻は -1）
+    n_rows: int                  # 元の行数
+    columns: List[str]           # 日単位の特徴量列名
+
+    def __len__(self) -> int:
+        return len(self.X)
+
+    @property
+    def coverage(self) -> float:
+        """元の行のうち日単位の行に含まれる割合"""
+        return float(np.count_nonzero(self.row_index >= 0)) / max(1, self.n_rows)
+
+    def to_hourly(self, Y: np.ndarray) -> np.ndarray:
+        """
+        日単位の予測値（日数 x 24）を元の行順の1行1時刻に戻す
+
+        Args:
+            Y: 日単位の予測値
+
+        Returns:
+            np.ndarray: 元の行数の予測値（日単位の行に含まれない行は NaN）
+        """
+        Y = np.asarray(Y).reshape(len(self.row_index), -1)
+        out = np.full(self.n_rows, np.nan, dtype=Y.dtype if Y.dtype.kind == 'f' else np.float32)
+        present = self.row_index >= 0
+        out[self.row_index[present]] = Y[present]
+        return out
+
+    def hourly_targets(self) -> np.ndarray:
+        """目的変数を時系列順の1行1時刻に並べる（日単位の行に含まれる時刻のみ）"""
+        return self.y[self.row_index >= 0]
+
+
+@dataclass(frozen=True)
+class DayLayout:
+    """時刻単位の特徴量列から日単位の特徴量への組み替え方"""
+    columns: List[str]
+
+    @property
+    def day_columns(self) -> List[str]:
+        return [c for c in self.columns if c in config.DAY_COLUMNS]
+
+    @property
+    def hourly_columns(self) -> List[str]:
+        return [c for c in self.columns if c not in config.DAY_COLUMNS and c != config.HOUR_COLUMN]
+
+    @property
+    def feature_columns(self) -> List[str]:
+        """日単位の特徴量列名"""
+        return self.day_columns + [f"{c}_{h:02d}" for c in self.hourly_columns
+                                   for h in range(config.HOURS_PER_DAY)]
+
+    def day_and_hour(self, X: np.ndarray, keys: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        各行の日番号（0 から連番）と時刻を求める
+
+        時刻キー指定時はキーから、未指定時は HOUR 列から求める（HOUR が前の行以下に
+        戻った位置を日の区切りとする。行は時系列順であること）。
+        """
+        hours_per_day = config.HOURS_PER_DAY
+        if keys is not None:
+            keys = np.asarray(keys, dtype=np.int64)
+            day = keys // hours_per_day
+            hour = keys % hours_per_day
+        else:
+            if config.HOUR_COLUMN not in self.columns:
+                raise ValueError(f"{config.HOUR_COLUMN} 列が無いため日の区切りを求められません")
+            hour = np.rint(np.asarray(X[:, self.columns.index(config.HOUR_COLUMN)])).astype(np.int64)
+            if len(hour) and (hour.min() < 0 or hour.max() >= hours_per_day):
+                raise ValueError(f"{config.HOUR_COLUMN} 列が 0〜{hours_per_day - 1} の範囲外です")
+            day = np.concatenate([[0], np.cumsum(np.diff(hour) <= 0)]) if len(hour) else hour
+        _, day = np.unique(day, return_inverse=True)
+        return day.reshape(-1), hour
+
+    def to_day_blocks(self,
+                      X: np.ndarray,
+                      y: Optional[np.ndarray] = None,
+                      keys: Optional[np.ndarray] = None,
+                      complete_only: bool = True) -> DayBlocks:
+        """
+        時刻単位の行を日単位の行に組み替える
+
+        Args:
+            X: 時刻単位の特徴量（列は self.columns の順）
+            y: 時刻単位の目的変数
+            keys: 時刻キー（epoch-hour、指定時は日の区切りに使用）
+            complete_only: True の場合は 24 時間そろった日のみ（学習用）、False の場合は
+                           欠けた時刻の特徴量を同じ日の前後の時刻で補って全ての日（予測用）
+
+        Returns:
+            DayBlocks: 日単位のデータセット
+
+        Raises:
+            ValueError: 特徴量の列数が列構成と異なる場合
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != len(self.columns):
+            raise ValueError(f"特徴量の列数が列構成と異なります: {X.shape} / {self.columns}")
+        hours_per_day = config.HOURS_PER_DAY
+        n_rows = len(X)
+        day, hour = self.day_and_hour(X, keys)
+        n_days = int(day.max()) + 1 if n_rows else 0
+
+        # 同じ日・時刻の行が重複する場合は後の行を使用する
+        row_index = np.full((n_days, hours_per_day), -1, dtype=np.int64)
+        row_index[day, hour] = np.arange(n_rows)
+        present = row_index >= 0
+        if complete_only:
+            keep = present.all(axis=1)
+            row_index, present = row_index[keep], present[keep]
+        n_days = len(row_index)
+
+        # 欠けた時刻は直前の時刻（先頭が欠けている場合は最初の時刻）の行で補う
+        first = np.argmax(present, axis=1)
+        source = np.where(present, np.arange(hours_per_day), -1)
+        np.maximum.accumulate(source, axis=1, out=source)
+        source = np.where(source < 0, first[:, None], source)
+        rows = np.take_along_axis(row_index, source, axis=1)
+
+        day_cols = [self.columns.index(c) for c in self.day_columns]
+        hourly_cols = [self.columns.index(c) for c in self.hourly_columns]
+        dtype = X.dtype if X.dtype.kind == 'f' else np.float32
+        hourly = X[rows][:, :, hourly_cols].transpose(0, 2, 1).reshape(n_days, len(hourly_cols) * hours_per_day)
+        X_day = np.ascontiguousarray(np.hstack([X[rows[:, 0]][:, day_cols], hourly]), dtype=dtype)
+
+        y_day = None
+        if y is not None:
+            y = np.asarray(y).reshape(-1)
+            y_day = np.where(present, y[np.maximum(row_index, 0)], np.nan).astype(
+                y.dtype if y.dtype.kind == 'f' else np.float32)
+        return DayBlocks(X_day, y_day, row_index, n_rows, self.feature_columns)
+
+
+def layout_path(model_path: str) -> str:
+    """学習済みモデルに対応する入力構成ファイルのパス"""
+    return os.path.splitext(model_path)[0] + config.LAYOUT_SUFFIX
+
+
+def save_layout(layout: DayLayout, model_path: str) -> str:
+    """
+    日単位モデルの入力構成を保存する（学習時のモデル保存直後に呼び出す）
+
+    Args:
+        layout: 入力構成
+        model_path: 保存済みモデルのパス
+
+    Returns:
+        str: 入力構成ファイルのパス
+    """
+    path = layout_path(model_path)
+    meta: Dict[str, Any] = {'format_version': config.FORMAT_VERSION, 'columns': layout.columns,
+                            'feature_columns': layout.feature_columns, 'hours_per_day': config.HOURS_PER_DAY}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def remove_layout(model_path: str) -> None:
+    """入力構成ファイルを削除する（1行1時刻のモデルを保存したとき）"""
+    path = layout_path(model_path)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def load_layout(model_path: str) -> Optional[DayLayout]:
+    """
+    学習済みモデルの入力構成を読み込む
+
+    Args:
+        model_path: 学習済みモデルのパス
+
+    Returns:
+        Optional[DayLayout]: 入力構成（1行1時刻のモデルの場合は None）
+
+    Raises:
+        ValueError: 入力構成ファイルの形式が異なる場合
+    """
+    path = layout_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format_version') != config.FORMAT_VERSION or meta.get('hours_per_day') != config.HOURS_PER_DAY:
+        raise ValueError(f"日単位モデルの入力構成ファイルの形式が異なります: {path}")
+    return DayLayout(list(meta['columns']))
+
+
+def load_day_split(years: Sequence[int],
+                   test_size: Optional[float] = None,
+                   data_dir: Optional[str] = None,
+                   cache_dir: Optional[str] = None) -> Tuple[DayBlocks, DayBlocks]:
+    """
+    年指定から学習・テストデータを日単位で取得する（year_blocks.load_split と同じ分割規約）
+
+    日の区切りには年別特徴量ブロックの時刻キーを使用する。
+
+    Args:
+        years: 対象年リスト（最も新しい年をテスト年とする）
+        test_size: 単年指定時のテスト割合（デフォルト: year_blocks の config値）
+        data_dir: 入力データディレクトリ（デフォルト: year_blocks の config値）
+        cache_dir: キャッシュディレクトリ（デフォルト: year_blocks の config値）
+
+    Returns:
+        Tuple[DayBlocks, DayBlocks]: 学習データ, テストデータ（24 時間そろった日のみ）
+    """
+    if not years:
+        raise ValueError("対象年が指定されていません")
+    layout = DayLayout(feature_columns())
+    train_years, test_year = split_years(years)
+    if train_years:
+        combo = assemble_combination(train_years, test_year, data_dir, cache_dir)
+        return (layout.to_day_blocks(combo.X_train, combo.y_train, combo.keys_train),
+                layout.to_day_blocks(combo.X_test, combo.y_test, combo.keys_test))
+    keys, X, y = assemble_years(years, data_dir, cache_dir)
+    split = tail_holdout(len(X), block_config.SINGLE_YEAR_TEST_SIZE if test_size is None else test_size)
+    return tuple(layout.to_day_blocks(take_rows(X, index), take_rows(y, index), take_rows(keys, index))
+                 for index in (split.train_index, split.test_index))
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 需要ラグ・移動窓特徴量エンジン
+
+epoch-hour で並んだ電力需要（KW）から、翌日予測で利用できるラグ・移動窓特徴量を
+ベクトル演算で計算するモジュール。学習時（年別特徴量ブロックの組み立て）と
+tomorrow予測時は同じ特徴量定義（DemandFeatureSpec）と同じ計算関数を使用する。
+
+    KW_LAG48 / KW_LAG168   48時間前・168時間前（1週間前）の需要
+    KW_MEAN24 / KW_MAX24   48時間前を終端とする24時間の平均・ピーク
+
+翌日予測は当日の日中に実行し、当日の需要は実行時刻までしか確定していない。
+参照先を48時間以上前とすることで、翌日の全時刻の特徴量が確定済みの値（前日以前）のみから計算される。
+翌々日以降の時刻は参照先が未確定となり得る（tomorrow予測では欠損として処理を中止する）。
+
+時刻は欠損を含み得るため、行数ではなく epoch-hour の連続グリッド上で計算し、
+参照先の時刻が存在しない特徴量は NaN とする。
+
+tomorrow予測では DemandFeatureStore が直近の需要履歴と計算済み特徴量を保持し、
+新たに取り込んだ時刻の影響を受ける対象時刻のみを再計算する。
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class DemandFeatureSpec:
+    """需要ラグ・移動窓特徴量の定義（学習・tomorrow予測で共通）"""
+    # 翌日予測の全時刻で確定済みの値のみを参照するため48時間以上前とする
+    LAGS: Tuple[int, ...] = (48, 168)
+    ROLLING_WINDOW: int = 24
+    # 移動窓の終端を対象時刻の何時間前とするか（LAGS と同じ理由で48時間）
+    ROLLING_OFFSET: int = 48
+    ROLLING_STATS: Tuple[str, ...] = ("MEAN", "MAX")
+    PREFIX: str = "KW"
+    DATA_TYPE: str = 'float32'
+
+    @property
+    def columns(self) -> List[str]:
+        """特徴量列名"""
+        return ([f"{self.PREFIX}_LAG{lag}" for lag in self.LAGS] +
+                [f"{self.PREFIX}_{stat}{self.ROLLING_WINDOW}" for stat in self.ROLLING_STATS])
+
+    @property
+    def min_offset(self) -> int:
+        """特徴量が参照する最も近い過去（時間）"""
+        return min(min(self.LAGS), self.ROLLING_OFFSET)
+
+    @property
+    def max_offset(self) -> int:
+        """特徴量が参照する最も遠い過去（時間）"""
+        return max(max(self.LAGS), self.ROLLING_OFFSET + self.ROLLING_WINDOW - 1)
+
+
+# 共通の特徴量定義インスタンス
+DEFAULT_SPEC = DemandFeatureSpec()
+
+
+def _features_on_grid(grid: np.ndarray,
+                      grid_start: int,
+                      target_keys: np.ndarray,
+                      spec: DemandFeatureSpec) -> np.ndarray:
+    """
+    連続時刻グリッド上の需要から対象時刻の特徴量を計算する（共通計算処理）
+
+    Args:
+        grid: grid_start から1時間刻みの需要（欠損はNaN）
+        grid_start: グリッド先頭の epoch-hour
+        target_keys: 対象時刻の epoch-hour
+        spec: 特徴量定義
+
+    Returns:
+        np.ndarray: 特徴量（len(target_keys) × len(spec.columns)）
+    """
+    target_pos = np.asarray(target_keys, dtype=np.int64) - grid_start
+    out = np.full((len(target_pos), len(spec.columns)), np.nan, dtype=spec.DATA_TYPE)
+    if len(target_pos) == 0 or len(grid) == 0:
+        return out
+
+    def gather(pos: np.ndarray) -> np.ndarray:
+        valid = (pos >= 0) & (pos < len(grid))
+        return np.where(valid, grid[np.clip(pos, 0, len(grid) - 1)], np.nan)
+
+    for i, lag in enumerate(spec.LAGS):
+        out[:, i] = gather(target_pos - lag)
+
+    # 移動窓: 累積和で平均、窓ビューで最大値（窓内に欠損があれば NaN）
+    window = spec.ROLLING_WINDOW
+    end_pos = target_pos - spec.ROLLING_OFFSET  # 窓の終端（含む）
+    base = len(spec.LAGS)
+    finite = np.isfinite(grid)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(finite, grid, 0.0), dtype=np.float64)))
+    ccount = np.concatenate(([0], np.cumsum(finite)))
+    valid = (end_pos - window + 1 >= 0) & (end_pos < len(grid))
+    hi = np.clip(end_pos + 1, 0, len(grid))
+    lo = np.clip(end_pos + 1 - window, 0, len(grid))
+    complete = valid & (ccount[hi] - ccount[lo] == window)
+    for j, stat in enumerate(spec.ROLLING_STATS):
+        column = np.full(len(target_pos), np.nan)
+        if complete.any():
+            if stat == "MEAN":
+                column[complete] = (csum[hi[complete]] - csum[lo[complete]]) / window
+            elif stat == "MAX":
+                windows = np.lib.stride_tricks.sliding_window_view(grid, window)
+                column[complete] = windows[lo[complete]].max(axis=1)
+            else:
+                raise ValueError(f"未対応の移動窓統計量です: {stat}")
+        out[:, base + j] = column
+    return out
+
+
+def to_grid(keys: np.ndarray, kw: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    時刻・需要の組を連続時刻グリッド（欠損はNaN）へ展開する
+
+    Args:
+        keys: epoch-hour 配列
+        kw: 需要配列
+
+    Returns:
+        Tuple[np.ndarray, int]: グリッド（float64）, グリッド先頭の epoch-hour
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    if len(keys) == 0:
+        return np.empty(0), 0
+    start = int(keys.min())
+    grid = np.full(int(keys.max()) - start + 1, np.nan)
+    grid[keys - start] = np.asarray(kw, dtype=np.float64)
+    return grid, start
+
+
+def compute_demand_features(keys: np.ndarray,
+                            kw: np.ndarray,
+                            target_keys: Optional[np.ndarray] = None,
+                            spec: DemandFeatureSpec = DEFAULT_SPEC) -> np.ndarray:
+    """
+    需要系列からラグ・移動窓特徴量をベクトル演算で一括計算する（学習用）
+
+    Args:
+        keys: 需要の epoch-hour 配列（前年末などの助走期間を含めてよい）
+        kw: 需要配列
+        target_keys: 特徴量を求める時刻（デフォルト: keys）
+        spec: 特徴量定義
+
+    Returns:
+        np.ndarray: 特徴量（len(target_keys) × len(spec.columns)）
+    """
+    grid, start = to_grid(keys, kw)
+    return _features_on_grid(grid, start, keys if target_keys is None else target_keys, spec)
+
+
+@dataclass
+class DemandFeatureStore:
+    """
+    tomorrow予測用の増分需要特徴量ストア
+
+    直近 history_hours 時間の需要と、その先 spec.max_offset 時間までを含む
+    対象時刻の特徴量を連続グリッドで保持する（先の時刻ほど一部の特徴量のみ NaN 以外となる）。ingest() は新規・更新された需要の
+    影響範囲（取り込み時刻 + min_offset 〜 max_offset）の特徴量のみ再計算する。
+    """
+    spec: DemandFeatureSpec = DEFAULT_SPEC
+    history_hours: int = 24 * 35
+    start: int = 0
+    kw: np.ndarray = field(default_factory=lambda: np.empty(0))
+    features: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=np.float32))
+
+    @property
+    def end(self) -> int:
+        """保持している需要の最終時刻の翌時刻"""
+        return self.start + len(self.kw)
+
+    def _resize(self, new_start: int, new_end: int) -> None:
+        """需要・特徴量グリッドの範囲を [new_start, new_end) に変更する"""
+        n_cols = len(self.spec.columns)
+        kw = np.full(new_end - new_start, np.nan)
+        features = np.full((new_end - new_start + self.spec.max_offset, n_cols), np.nan, dtype=self.spec.DATA_TYPE)
+        if len(self.kw):
+            lo, hi = max(self.start, new_start), min(self.end, new_end)
+            if hi > lo:
+                kw[lo - new_start:hi - new_start] = self.kw[lo - self.start:hi - self.start]
+                f_hi = min(self.end, new_end) + self.spec.max_offset
+                features[lo - new_start:f_hi - new_start] = self.features[lo - self.start:f_hi - self.start]
+        self.start, self.kw, self.features = new_start, kw, features
+
+    def ingest(self, keys: np.ndarray, kw: np.ndarray) -> int:
+        """
+        需要を取り込み、影響を受ける時刻の特徴量のみ再計算する
+
+        Args:
+            keys: 需要の epoch-hour 配列
+            kw: 需要配列
+
+        Returns:
+            int: 再計算した対象時刻数
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        kw = np.asarray(kw, dtype=np.float64)
+        if len(keys) == 0:
+            return 0
+
+        # 値が変わらない時刻は取り込み対象から除外する
+        if len(self.kw):
+            inside = (keys >= self.start) & (keys < self.end)
+            current = np.full(len(keys), np.nan)
+            current[inside] = self.kw[keys[inside] - self.start]
+            changed = ~(current == kw)
+            keys, kw = keys[changed], kw[changed]
+            if len(keys) == 0:
+                return 0
+
+        old_end = self.end if len(self.kw) else None
+        new_end = max(old_end or 0, int(keys.max()) + 1)
+        new_start = new_end - self.history_hours
+        if len(self.kw):
+            new_start = max(new_start, min(self.start, int(keys.min())))
+        else:
+            new_start = max(new_start, int(keys.min()))
+        self._resize(new_start, new_end)
+
+        keep = keys >= self.start
+        self.kw[keys[keep] - self.start] = kw[keep]
+
+        # 影響範囲: 取り込み時刻 + min_offset 〜 取り込み時刻 + max_offset、
+        # および保持範囲の延長で新たに参照可能になった対象時刻
+        t_lo = int(keys.min()) + self.spec.min_offset
+        if old_end is not None:
+            t_lo = min(t_lo, old_end + self.spec.max_offset)
+        t_lo = max(t_lo, self.start)
+        t_hi = min(int(keys.max()) + self.spec.max_offset, self.end + self.spec.max_offset - 1)
+        if t_hi < t_lo:
+            return 0
+        targets = np.arange(t_lo, t_hi + 1, dtype=np.int64)
+        self.features[targets - self.start] = _features_on_grid(self.kw, self.start, targets, self.spec)
+        return len(targets)
+
+    def lookup(self, target_keys: np.ndarray) -> np.ndarray:
+        """
+        対象時刻の特徴量を取得する（保持範囲外は NaN）
+
+        Args:
+            target_keys: 対象時刻の epoch-hour 配列
+
+        Returns:
+            np.ndarray: 特徴量（len(target_keys) × len(spec.columns)）
+        """
+        pos = np.asarray(target_keys, dtype=np.int64) - self.start
+        out = np.full((len(pos), len(self.spec.columns)), np.nan, dtype=self.spec.DATA_TYPE)
+        valid = (pos >= 0) & (pos < len(self.features))
+        out[valid] = self.features[pos[valid]]
+        return out
+
+    def save(self, path: str) -> None:
+        """ストアを .npz 形式で保存する（一時ファイル経由で置換）"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, start=np.int64(self.start), kw=self.kw, features=self.features,
+                 columns=np.array(self.spec.columns))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, spec: DemandFeatureSpec = DEFAULT_SPEC) -> "DemandFeatureStore":
+        """
+        保存済みストアを読み込む（存在しない・特徴量定義が異なる場合は空のストア）
+
+        Args:
+            path: .npz ファイルパス
+            spec: 特徴量定義
+
+        Returns:
+            DemandFeatureStore: ストア
+        """
+        store = cls(spec=spec)
+        if not os.path.exists(path):
+            return store
+        with np.load(path) as saved:
+            if list(saved['columns']) != spec.columns:
+                return store
+            store.start = int(saved['start'])
+            store.kw = saved['kw']
+            store.features = saved['features']
+        return store
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 気温予報アーカイブモジュール
+
+temp.py が取得した気温予報を発表（取得）時刻ごとに追記保存し、
+「ある時点で既知だった予報」を高速に参照（as-of クエリ）するモジュール。
+
+保存形式（発表月ごとのセグメント、追記のみで既存データは書き換えない）:
+    YYYYMM.fca : 予報値ペイロード（0.1℃整数の差分列をzlib圧縮）
+    YYYYMM.idx : 固定長インデックス（発表時刻・有効時刻範囲・オフセット）
+"""
+
+import os
+import zlib
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from common.timekeys import to_epoch_hours, from_epoch_hours
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ForecastArchiveConfig:
+    """気温予報アーカイブ設定クラス（設定値統一管理）"""
+    ARCHIVE_DIR: str = "tomorrow/forecast_archive"
+    PAYLOAD_SUFFIX: str = ".fca"
+    INDEX_SUFFIX: str = ".idx"
+    VALUE_SCALE: int = 10            # 0.1℃単位で整数化
+    MISSING_VALUE: int = -32768      # 欠損値センチネル（0.1℃単位）
+    COMPRESSION_LEVEL: int = 6
+
+
+# 統一設定インスタンス
+config = ForecastArchiveConfig()
+
+# インデックス1件分の固定長レコード（リトルエンディアン、40バイト）
+INDEX_DTYPE = np.dtype([
+    ('issue', '<i8'),        # 発表時刻（epoch-hour）
+    ('first_valid', '<i8'),  # 最初の有効時刻（epoch-hour）
+    ('n', '<i4'),            # 有効時刻数（1時間間隔で連続）
+    ('length', '<i4'),       # 圧縮ペイロード長（バイト）
+    ('offset', '<i8'),       # ペイロードファイル内オフセット
+    ('crc', '<u4'),          # 圧縮ペイロードのCRC32
+    ('segment', '<i4'),      # 発表月（YYYYMM）
+])
+
+
+def _segment_of(issue_hour: int) -> int:
+    """発表時刻（epoch-hour）から発表月セグメント番号（YYYYMM）を求める"""
+    ts = from_epoch_hours(np.array([issue_hour]))[0]
+    return ts.year * 100 + ts.month
+
+
+def _segment_paths(archive_dir: str, segment: int) -> Tuple[str, str]:
+    """セグメントのペイロード・インデックスファイルパスを返す"""
+    base = os.path.join(archive_dir, f"{segment:06d}")
+    return base + config.PAYLOAD_SUFFIX, base + config.INDEX_SUFFIX
+
+
+def _list_segments(archive_dir: str) -> List[int]:
+    """アーカイブ内のセグメント番号を昇順で返す"""
+    if not os.path.isdir(archive_dir):
+        return []
+    segments = []
+    for name in os.listdir(archive_dir):
+        stem, ext = os.path.splitext(name)
+        if ext == config.INDEX_SUFFIX and stem.isdigit():
+            segments.append(int(stem))
+    return sorted(segments)
+
+
+def load_index(archive_dir: Optional[str] = None) -> np.ndarray:
+    """
+    全セグメントのインデックスを発表時刻順に連結して読み込む
+
+    インデックスは1発表あたり40バイトのため、毎時発表で数年分でも数MBに収まる。
+
+    Args:
+        archive_dir: アーカイブディレクトリ（デフォルト: config値）
+
+    Returns:
+        np.ndarray: INDEX_DTYPE の構造化配列
+    """
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    parts = []
+    for segment in _list_segments(archive_dir):
+        _, index_path = _segment_paths(archive_dir, segment)
+        # 書き込み途中の端数レコードは無視する
+        raw = np.fromfile(index_path, dtype=np.uint8)
+        usable = (len(raw) // INDEX_DTYPE.itemsize) * INDEX_DTYPE.itemsize
+        parts.append(raw[:usable].view(INDEX_DTYPE))
+    if not parts:
+        return np.empty(0, dtype=INDEX_DTYPE)
+    return np.concatenate(parts)
+
+
+def _encode_values(temps: np.ndarray) -> bytes:
+    """気温配列を 0.1℃整数の差分列に変換して圧縮する"""
+    scaled = np.round(np.asarray(temps, dtype=np.float64) * config.VALUE_SCALE)
+    scaled = np.where(np.isnan(scaled), config.MISSING_VALUE, scaled).astype('<i4')
+    deltas = np.diff(scaled, prepend=np.int32(0)).astype('<i4')
+    return zlib.compress(deltas.tobytes(), config.COMPRESSION_LEVEL)
+
+
+def _decode_values(payload: bytes) -> np.ndarray:
+    """圧縮ペイロードを気温配列（float32、欠損はNaN）に復元する"""
+    deltas = np.frombuffer(zlib.decompress(payload), dtype='<i4')
+    scaled = np.cumsum(deltas, dtype=np.int64)
+    temps = (scaled / config.VALUE_SCALE).astype(np.float32)
+    temps[scaled == config.MISSING_VALUE] = np.nan
+    return temps
+
+
+def append_issuance(issue_time: Union[str, pd.Timestamp, int],
+                    valid_times: Union[pd.Series, pd.DatetimeIndex, np.ndarray, list],
+                    temps: np.ndarray,
+                    archive_dir: Optional[str] = None) -> bool:
+    """
+    気温予報1発表分をアーカイブに追記する
+
+    既存ファイルは追記モードでのみ開き、過去の発表を書き換えることはない。
+    発表時刻は単調増加である必要があり、既に保存済みの発表時刻以前のものは
+    スキップする（同一時間内の再実行で重複保存しないため）。
+
+    Args:
+        issue_time: 発表（取得）時刻。int の場合は epoch-hour とみなす
+        valid_times: 有効時刻配列（1時間間隔で連続していること）
+        temps: 各有効時刻の気温[℃]
+        archive_dir: アーカイブディレクトリ（デフォルト: config値）
+
+    Returns:
+        bool: 追記した場合True、既存発表と重複してスキップした場合False
+
+    Raises:
+        ValueError: 有効時刻が空・非連続、または気温配列と長さが一致しない場合
+    """
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    issue_hour = int(issue_time) if isinstance(issue_time, (int, np.integer)) else int(to_epoch_hours([issue_time])[0])
+    valid_hours = to_epoch_hours(valid_times)
+    temps = np.asarray(temps, dtype=np.float64)
+
+    if len(valid_hours) == 0:
+        raise ValueError("有効時刻が空です")
+    if len(valid_hours) != len(temps):
+        raise ValueError(f"有効時刻と気温の件数が不一致: {len(valid_hours)} != {len(temps)}")
+    if np.any(np.diff(valid_hours) != 1):
+        raise ValueError("有効時刻が1時間間隔で連続していません")
+
+    # 最新セグメントの最終発表時刻のみ確認（全インデックスは読まない）
+    segments = _list_segments(archive_dir)
+    if segments:
+        _, last_index_path = _segment_paths(archive_dir, segments[-1])
+        last = np.fromfile(last_index_path, dtype=INDEX_DTYPE)
+        if len(last) and issue_hour <= int(last['issue'][-1]):
+            logger.info(f"発表時刻 {from_epoch_hours([issue_hour])[0]} は保存済みのためスキップします")
+            return False
+
+    os.makedirs(archive_dir, exist_ok=True)
+    segment = _segment_of(issue_hour)
+    payload_path, index_path = _segment_paths(archive_dir, segment)
+    payload = _encode_values(temps)
+
+    # ペイロードを先に書き込み、インデックスは最後に追記する
+    # （中断時に参照先のないインデックスが残らないようにするため）
+    with open(payload_path, 'ab') as f:
+        offset = f.tell()
+        f.write(payload)
+
+    entry = np.zeros(1, dtype=INDEX_DTYPE)
+    entry['issue'] = issue_hour
+    entry['first_valid'] = valid_hours[0]
+    entry['n'] = len(valid_hours)
+    entry['length'] = len(payload)
+    entry['offset'] = offset
+    entry['crc'] = zlib.crc32(payload)
+    entry['segment'] = segment
+    with open(index_path, 'ab') as f:
+        f.write(entry.tobytes())
+
+    logger.info(f"気温予報アーカイブ追記: 発表={from_epoch_hours([issue_hour])[0]}, "
+                f"{len(valid_hours)}時間分, {len(payload)}バイト ({index_path})")
+    return True
+
+
+def _read_payload(archive_dir: str, entry: np.void) -> np.ndarray:
+    """インデックスエントリに対応する気温配列を読み込む"""
+    payload_path, _ = _segment_paths(archive_dir, int(entry['segment']))
+    with open(payload_path, 'rb') as f:
+        f.seek(int(entry['offset']))
+        payload = f.read(int(entry['length']))
+    if zlib.crc32(payload) != int(entry['crc']):
+        raise ValueError(f"ペイロードのCRC不一致: {payload_path} offset={int(entry['offset'])}")
+    return _decode_values(payload)
+
+
+def load_issuance(issue_time: Union[str, pd.Timestamp, int],
+                  archive_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    指定時刻に発表された予報をそのまま読み込む
+
+    Args:
+        issue_time: 発表時刻。int の場合は epoch-hour とみなす
+        archive_dir: アーカイブディレクトリ（デフォルト: config値）
+
+    Returns:
+        Optional[pd.DataFrame]: 有効時刻インデックス・TEMP列のデータフレーム（該当なしはNone）
+    """
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    issue_hour = int(issue_time) if isinstance(issue_time, (int, np.integer)) else int(to_epoch_hours([issue_time])[0])
+    index = load_index(archive_dir)
+    pos = np.searchsorted(index['issue'], issue_hour)
+    if pos >= len(index) or int(index['issue'][pos]) != issue_hour:
+        return None
+    entry = index[pos]
+    temps = _read_payload(archive_dir, entry)
+    valid = from_epoch_hours(np.arange(int(entry['first_valid']), int(entry['first_valid']) + int(entry['n'])))
+    return pd.DataFrame({'TEMP': temps}, index=pd.Index(valid, name='VALID'))
+
+
+def query_as_of(as_of: Union[str, pd.Timestamp, int],
+                valid_start: Union[str, pd.Timestamp, int],
+                valid_end: Union[str, pd.Timestamp, int],
+                archive_dir: Optional[str] = None,
+                index: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    as-of クエリ: 指定時点で既知だった最新の予報を有効時刻ごとに返す
+
+    発表時刻 <= as_of の発表のうち、各有効時刻をカバーする最も新しい発表の値を採用する。
+    インデックスは二分探索で絞り込み、新しい発表から順に必要な分だけ復号する。
+
+    Args:
+        as_of: 基準時刻。int の場合は epoch-hour とみなす
+        valid_start: 有効時刻範囲の開始（含む）
+        valid_end: 有効時刻範囲の終了（含まない）
+        archive_dir: アーカイブディレクトリ（デフォルト: config値）
+        index: 読み込み済みインデックス（繰り返しクエリ時の再読み込み省略用）
+
+    Returns:
+        pd.DataFrame: 有効時刻インデックス、TEMP（気温）・ISSUE（採用した発表時刻）列。
+                      カバーする発表がない時刻は TEMP=NaN, ISSUE=NaT
+    """
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    as_of_hour, start_hour, end_hour = (
+        int(v) if isinstance(v, (int, np.integer)) else int(to_epoch_hours([v])[0])
+        for v in (as_of, valid_start, valid_end)
+    )
+    n_hours = max(end_hour - start_hour, 0)
+    temps = np.full(n_hours, np.nan, dtype=np.float32)
+    issues = np.full(n_hours, -1, dtype=np.int64)
+
+    if index is None:
+        index = load_index(archive_dir)
+    known = index[:np.searchsorted(index['issue'], as_of_hour, side='right')]
+    first_valid = known['first_valid']
+    covers = (first_valid < end_hour) & (first_valid + known['n'] > start_hour)
+    candidates = np.flatnonzero(covers)
+
+    filled = np.zeros(n_hours, dtype=bool)
+    for pos in candidates[::-1]:
+        if filled.all():
+            break
+        entry = known[pos]
+        lo = max(int(entry['first_valid']), start_hour)
+        hi = min(int(entry['first_valid']) + int(entry['n']), end_hour)
+        target = slice(lo - start_hour, hi - start_hour)
+        todo = ~filled[target]
+        if not todo.any():
+            continue
+        values = _read_payload(archive_dir, entry)[lo - int(entry['first_valid']):hi - int(entry['first_valid'])]
+        temps[target][todo] = values[todo]
+        issues[target][todo] = int(entry['issue'])
+        filled[target] |= todo
+
+    valid_index = pd.Index(from_epoch_hours(np.arange(start_hour, end_hour)), name='VALID')
+    issue_index = pd.Series(from_epoch_hours(np.where(issues >= 0, issues, 0)), index=valid_index)
+    issue_index[issues < 0] = pd.NaT
+    return pd.DataFrame({'TEMP': temps, 'ISSUE': issue_index}, index=valid_index)
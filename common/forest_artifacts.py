@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - RandomForest 学習済みモデルの保存形式とサイズ予算
+
+深さ無制限・100本の RandomForestRegressor は pickle で数百MBになり、翌日予測では
+読み込み（unpickle）が実行時間の大半を占める。
+
+保存形式:
+    joblib（非圧縮）で保存し、各木のノード配列を pickle ストリームではなく
+    生の配列データとして書き出す。読み込みは mmap_mode='r' で配列をメモリマップし、
+    バイト列の展開・一時コピーを省く。従来の pickle 形式のファイルも同じ関数で読み込める。
+
+サイズ予算:
+    目標サイズ（MB）を指定すると、木の大きさを制限する候補設定
+    （max_depth / min_samples_leaf / max_samples）ごとに少数本の試験フォレストを学習し、
+    保存サイズ・読み込み時間を本数比で推定、学習期間末尾の検証データで精度を評価する。
+    推定サイズが目標以下の候補のうち、検証RMSEが最小の設定を採用する。
+"""
+
+import os
+import time
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ForestArtifactConfig:
+    """RandomForest 保存形式・サイズ予算設定クラス（設定値統一管理）"""
+    # 読み込み時のメモリマップ指定（None の場合は通常の読み込み）
+    MMAP_MODE: Optional[str] = 'r'
+
+    # サイズ予算の試験フォレストの本数（推定値は本数比で拡大する）
+    PILOT_TREES: int = 10
+    # 精度評価に使用する学習期間末尾の割合（時系列順、学習データの末尾）
+    VALIDATION_SIZE: float = 0.1
+    # 木の大きさを制限する候補設定（制限の緩い順）
+    CANDIDATES: List[Dict[str, Any]] = field(default_factory=lambda: [
+        {'max_depth': None, 'min_samples_leaf': 1, 'max_samples': None},
+        {'max_depth': None, 'min_samples_leaf': 2, 'max_samples': None},
+        {'max_depth': None, 'min_samples_leaf': 5, 'max_samples': None},
+        {'max_depth': None, 'min_samples_leaf': 5, 'max_samples': 0.5},
+        {'max_depth': 20, 'min_samples_leaf': 10, 'max_samples': 0.5},
+        {'max_depth': 16, 'min_samples_leaf': 20, 'max_samples': 0.3},
+        {'max_depth': 12, 'min_samples_leaf': 50, 'max_samples': 0.2},
+    ])
+
+
+# 統一設定インスタンス
+config = ForestArtifactConfig()
+
+
+@dataclass
+class BudgetTrial:
+    """サイズ予算の候補設定ごとの評価結果"""
+    params: Dict[str, Any]
+    n_nodes: int
+    size_mb: float
+    load_sec: float
+    val_rmse: float
+
+    def summary(self) -> str:
+        params = ", ".join(f"{k}={v}" for k, v in self.params.items())
+        return (f"{params}: ノード {self.n_nodes:,}個 / 推定サイズ {self.size_mb:8.1f}MB / "
+                f"推定読み込み {self.load_sec * 1000:7.1f}ms / 検証RMSE {self.val_rmse:.3f}")
+
+    def max_nodes(self, budget_mb: float) -> int:
+        """目標サイズに収まるノード数（保存サイズはノード数にほぼ比例する、本数を変える段階的学習の上限に使用）"""
+        return int(budget_mb / self.size_mb * self.n_nodes)
+
+
+def save_forest(model: Any, path: str) -> float:
+    """
+    学習済みフォレストを joblib（非圧縮、メモリマップ読み込み可能）で保存する
+
+    Args:
+        model: 学習済みモデル
+        path: 保存先パス
+
+    Returns:
+        float: ファイルサイズ（MB）
+    """
+    tmp_path = path + ".tmp"
+    import joblib
+    joblib.dump(model, tmp_path, compress=0)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path) / 1024 ** 2
+
+
+def load_forest(path: str, mmap_mode: Optional[str] = None) -> Any:
+    """
+    保存済みフォレストを読み込む（従来の pickle 形式のファイルにも対応）
+
+    Args:
+        path: モデルファイルのパス
+        mmap_mode: メモリマップ指定（デフォルト: config値）
+
+    Returns:
+        Any: 学習済みモデル
+    """
+    import joblib
+    return joblib.load(path, mmap_mode=mmap_mode or config.MMAP_MODE)
+
+
+def _measure_artifact(model: Any, scale: float) -> Tuple[float, float]:
+    """保存サイズ（MB）と読み込み時間（秒）を計測し、本数比 scale で拡大して返す"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'pilot.sav')
+        size_mb = save_forest(model, path)
+        start_time = time.perf_counter()
+        load_forest(path)
+        load_sec = time.perf_counter() - start_time
+    return size_mb * scale, load_sec * scale
+
+
+def select_size_budget(X_train: np.ndarray,
+                       y_train: np.ndarray,
+                       model_params: Dict[str, Any],
+                       budget_mb: float,
+                       sample_weight: Optional[np.ndarray] = None,
+                       estimator_class: Optional[Type[Any]] = None
+                       ) -> Tuple[BudgetTrial, List[BudgetTrial]]:
+    """
+    目標サイズ以下で最も精度の高い木の大きさの制限を選択する
+
+    候補設定ごとに PILOT_TREES 本の試験フォレストを学習期間の先頭部分で学習し、
+    保存サイズ・読み込み時間を model_params の本数に拡大して推定、
+    末尾 VALIDATION_SIZE の期間で検証RMSEを計算する。
+
+    Args:
+        X_train: 学習用特徴量データ（時系列順）
+        y_train: 学習用目的変数データ
+        model_params: RandomForestRegressor のパラメータ（n_estimators を含む）
+        budget_mb: 目標サイズ（MB）
+        sample_weight: 学習行のサンプル重み（集約時）
+        estimator_class: バギング系の推定器クラス（RandomForestRegressor / ExtraTreesRegressor、デフォルト: RandomForestRegressor）
+
+    Returns:
+        Tuple[BudgetTrial, List[BudgetTrial]]: 採用した候補（params に max_depth / min_samples_leaf / max_samples）, 全候補の評価結果
+    """
+    n_val = max(1, int(len(X_train) * config.VALIDATION_SIZE))
+    n_fit = len(X_train) - n_val
+    weight_fit = sample_weight[:n_fit] if sample_weight is not None else None
+    n_estimators = model_params.get('n_estimators', 100)
+    scale = n_estimators / config.PILOT_TREES
+    if estimator_class is None:
+        from sklearn.ensemble import RandomForestRegressor as estimator_class
+
+    print(f"RandomForest サイズ予算: 目標 {budget_mb:.1f}MB / 候補 {len(config.CANDIDATES)}件 "
+          f"(試験 {config.PILOT_TREES}本 → {n_estimators}本で推定, 検証 末尾{n_val:,}行)")
+    trials = []
+    for candidate in config.CANDIDATES:
+        params = {**model_params, **candidate, 'n_estimators': config.PILOT_TREES}
+        if params.get('max_samples') is not None:
+            # max_samples はブートストラップ抽出時のみ有効（ExtraTrees の既定は bootstrap=False）
+            params['bootstrap'] = True
+        pilot = estimator_class(**params).fit(X_train[:n_fit], y_train[:n_fit], sample_weight=weight_fit)
+        size_mb, load_sec = _measure_artifact(pilot, scale)
+        y_val = pilot.predict(X_train[n_fit:])
+        trial = BudgetTrial(
+            params=dict(candidate),
+            n_nodes=int(sum(e.tree_.node_count for e in pilot.estimators_) * scale),
+            size_mb=size_mb, load_sec=load_sec,
+            val_rmse=float(np.sqrt(np.mean((y_val - np.asarray(y_train[n_fit:], dtype=np.float64)) ** 2))),
+        )
+        trials.append(trial)
+        print(f"  {trial.summary()}")
+
+    within_budget = [t for t in trials if t.size_mb <= budget_mb]
+    if within_budget:
+        chosen = min(within_budget, key=lambda t: t.val_rmse)
+        print(f"採用: {chosen.summary()}")
+    else:
+        chosen = min(trials, key=lambda t: t.size_mb)
+        print(f"目標サイズを満たす候補が無いため最小の設定を採用します: {chosen.summary()}")
+    return chosen, trials
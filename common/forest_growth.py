@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - OOB誤差による RandomForest の段階的な木の追加
+
+固定本数（n_estimators=100）で学習する代わりに、warm_start=True で INCREMENT 本ずつ
+木を追加し、追加ごとに OOB（out-of-bag: 各木のブートストラップ抽出に含まれなかった行）
+での予測誤差を記録する。OOB RMSE の改善率が TOLERANCE 未満の状態が PATIENCE 回
+続いた時点で打ち切る。
+
+ハイパーパラメータの比較（oob_sweep）も OOB RMSE で行う。各設定は1回の段階的学習のみで
+評価でき、k分割交差検証のように設定ごとに k 回学習する必要がない。評価に使った
+フォレストはそのまま採用モデルとなるため、選択後の再学習も不要。
+
+保存サイズ予算（common/forest_artifacts.py）と併用する場合は、試験フォレストから求めた
+ノード数の上限（max_nodes）を超える追加を行わず、候補設定の木が大きく初回の本数で上限を超えた
+場合は上限に収まる本数で学習し直す。
+
+OOB 行は学習期間内からランダムに選ばれるため、時系列の将来予測に対する誤差よりも
+楽観的になる。打ち切り判定・設定間の相対比較に使用する。
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ForestGrowthConfig:
+    """OOB 段階的学習設定クラス（設定値統一管理）"""
+    # 最初に学習する木の本数（少ないと一度も OOB にならない行が残り、scikit-learn はその行の
+    # OOB 予測を 0 とするため誤差が過大になる。25本で該当する行の割合は約 0.632^25 ≈ 0.001%）
+    INITIAL_ESTIMATORS: int = 25
+    # 1回に追加する木の本数
+    INCREMENT: int = 25
+    # 最大本数
+    MAX_ESTIMATORS: int = 500
+    # OOB RMSE の相対改善率がこれ未満の追加を「改善なし」とみなす
+    TOLERANCE: float = 0.002
+    # 改善なしが連続してこの回数に達したら打ち切る
+    PATIENCE: int = 2
+    # oob_sweep の既定の候補設定
+    SWEEP_CANDIDATES: List[Dict[str, Any]] = field(default_factory=lambda: [
+        {'max_features': 'sqrt', 'min_samples_leaf': 1},
+        {'max_features': 'sqrt', 'min_samples_leaf': 3},
+        {'max_features': 0.5, 'min_samples_leaf': 1},
+        {'max_features': 0.5, 'min_samples_leaf': 3},
+        {'max_features': 1.0, 'min_samples_leaf': 1},
+        {'max_features': 1.0, 'min_samples_leaf': 5},
+    ])
+
+
+# 統一設定インスタンス
+config = ForestGrowthConfig()
+
+
+@dataclass
+class GrowthResult:
+    """段階的学習の結果"""
+    # 学習済みモデル（oob_sweep で不採用となった候補は None）
+    model: Optional[Any]
+    params: Dict[str, Any]
+    # 追加ごとの (本数, OOB RMSE)
+    curve: List[Tuple[int, float]]
+    stopped_early: bool
+    elapsed: float = 0.0
+    # 保存サイズ予算（ノード数の上限）で本数を制限した
+    budget_limited: bool = False
+
+    @property
+    def n_estimators(self) -> int:
+        return self.curve[-1][0] if self.curve else 0
+
+    @property
+    def oob_rmse(self) -> float:
+        return self.curve[-1][1] if self.curve else float('nan')
+
+    def summary(self) -> str:
+        reason = "サイズ予算" if self.budget_limited else "OOB誤差の改善停止" if self.stopped_early else "最大本数"
+        return (f"OOB段階的学習: {self.n_estimators}本 ({reason}) / OOB RMSE {self.oob_rmse:.3f} / "
+                f"{self.elapsed:.2f}秒")
+
+
+def _oob_rmse(model: Any, y: np.ndarray, sample_weight: Optional[np.ndarray]) -> float:
+    """OOB 予測の RMSE（サンプル重みがある場合は重み付き）"""
+    prediction = np.asarray(model.oob_prediction_, dtype=np.float64).reshape(-1)
+    error = (prediction - np.asarray(y, dtype=np.float64).reshape(-1)) ** 2
+    return float(np.sqrt(np.average(error, weights=sample_weight)))
+
+
+def _node_counts(model: Any) -> np.ndarray:
+    """木ごとのノード数"""
+    return np.array([e.tree_.node_count for e in model.estimators_], dtype=np.int64)
+
+
+def grow_with_oob(X_train: np.ndarray,
+                  y_train: np.ndarray,
+                  model_params: Dict[str, Any],
+                  sample_weight: Optional[np.ndarray] = None,
+                  increment: Optional[int] = None,
+                  max_estimators: Optional[int] = None,
+                  tolerance: Optional[float] = None,
+                  patience: Optional[int] = None,
+                  verbose: bool = True,
+                  estimator_class: Optional[Type[Any]] = None,
+                  max_nodes: Optional[int] = None) -> GrowthResult:
+    """
+    OOB RMSE が改善しなくなるまで木を段階的に追加して学習する
+
+    Args:
+        X_train: 学習用特徴量データ
+        y_train: 学習用目的変数データ
+        model_params: RandomForestRegressor のパラメータ（n_estimators は無視する）
+        sample_weight: 学習行のサンプル重み（集約時）
+        increment: 1回に追加する本数（デフォルト: config値）
+        max_estimators: 最大本数（デフォルト: config値）
+        tolerance: 改善とみなす相対改善率（デフォルト: config値）
+        patience: 打ち切りまでの改善なし連続回数（デフォルト: config値）
+        verbose: 追加ごとに OOB RMSE を出力する
+        estimator_class: バギング系の推定器クラス（RandomForestRegressor / ExtraTreesRegressor、デフォルト: RandomForestRegressor）
+        max_nodes: 全ての木のノード数の上限（保存サイズ予算から求めた値、デフォルト: 上限なし）
+
+    Returns:
+        GrowthResult: 学習済みモデルと OOB 誤差の推移
+    """
+    increment = increment or config.INCREMENT
+    max_estimators = max_estimators or config.MAX_ESTIMATORS
+    tolerance = config.TOLERANCE if tolerance is None else tolerance
+    patience = patience or config.PATIENCE
+    if estimator_class is None:
+        from sklearn.ensemble import RandomForestRegressor as estimator_class
+
+    start_time = time.time()
+    params = {**model_params, 'n_estimators': max(increment, config.INITIAL_ESTIMATORS), 'warm_start': True,
+              'oob_score': True, 'bootstrap': True}
+    model = estimator_class(**params)
+    curve: List[Tuple[int, float]] = []
+    best_rmse, stalled, stopped_early, budget_limited = float('inf'), 0, False, False
+
+    while True:
+        model.fit(X_train, y_train, sample_weight=sample_weight)
+        rmse = _oob_rmse(model, y_train, sample_weight)
+        curve.append((model.n_estimators, rmse))
+        improved = rmse < best_rmse * (1.0 - tolerance)
+        if verbose:
+            print(f"  木 {model.n_estimators:4d}本: OOB RMSE {rmse:.3f}" + ("" if improved else " (改善なし)"))
+        if improved:
+            best_rmse, stalled = rmse, 0
+        else:
+            stalled += 1
+            if stalled >= patience:
+                stopped_early = True
+                break
+        if model.n_estimators + increment > max_estimators:
+            break
+        # 追加後のノード数を木1本あたりの平均ノード数で見積もり、サイズ予算を超える追加は行わない
+        if max_nodes and _node_counts(model).mean() * (model.n_estimators + increment) > max_nodes:
+            budget_limited = True
+            break
+        model.set_params(n_estimators=model.n_estimators + increment)
+
+    if max_nodes and _node_counts(model).sum() > max_nodes:
+        # 初回の本数で上限を超えた場合は上限に収まる本数で学習し直す（同じ乱数系列のため先頭の木と同一になる。
+        # 設定間の比較に使用するため OOB RMSE も削減後の本数で計算し直す）
+        keep = max(1, int(np.searchsorted(np.cumsum(_node_counts(model)), max_nodes, side='right')))
+        if verbose:
+            print(f"  サイズ予算のため木を {model.n_estimators}本 → {keep}本に削減します")
+        model = estimator_class(**{**params, 'n_estimators': keep})
+        model.fit(X_train, y_train, sample_weight=sample_weight)
+        curve.append((keep, _oob_rmse(model, y_train, sample_weight)))
+        budget_limited = True
+
+    # 以降の予測・保存に影響しないよう段階的学習用の設定を戻す
+    model.set_params(warm_start=False)
+    # ExtraTrees の既定は bootstrap=False のため、OOB 評価に使用したブートストラップ抽出を記録する
+    params = {**model_params, 'n_estimators': model.n_estimators, 'bootstrap': True}
+    return GrowthResult(model, params, curve, stopped_early, time.time() - start_time, budget_limited)
+
+
+def oob_sweep(X_train: np.ndarray,
+              y_train: np.ndarray,
+              model_params: Dict[str, Any],
+              candidates: Optional[List[Dict[str, Any]]] = None,
+              sample_weight: Optional[np.ndarray] = None,
+              estimator_class: Optional[Type[Any]] = None,
+              max_nodes: Optional[int] = None
+              ) -> Tuple[GrowthResult, List[GrowthResult]]:
+    """
+    候補設定ごとに段階的学習を1回ずつ行い、OOB RMSE が最小の設定を選ぶ
+
+    Args:
+        X_train: 学習用特徴量データ
+        y_train: 学習用目的変数データ
+        model_params: 共通の RandomForestRegressor パラメータ
+        candidates: 候補設定（model_params を上書きするパラメータ、デフォルト: config値）
+        sample_weight: 学習行のサンプル重み（集約時）
+        estimator_class: バギング系の推定器クラス（RandomForestRegressor / ExtraTreesRegressor、デフォルト: RandomForestRegressor）
+        max_nodes: 全ての木のノード数の上限（保存サイズ予算から求めた値、デフォルト: 上限なし）
+
+    Returns:
+        Tuple[GrowthResult, List[GrowthResult]]: 採用した結果（学習済みモデルを含む）, 全候補の結果
+    """
+    candidates = candidates or config.SWEEP_CANDIDATES
+    print(f"OOBハイパーパラメータ探索: 候補 {len(candidates)}件（各1回の段階的学習）")
+    results = []
+    best: Optional[GrowthResult] = None
+    for candidate in candidates:
+        result = grow_with_oob(X_train, y_train, {**model_params, **candidate}, sample_weight, verbose=False,
+                               estimator_class=estimator_class, max_nodes=max_nodes)
+        settings = ", ".join(f"{k}={v}" for k, v in candidate.items())
+        print(f"  {settings}: {result.summary()}")
+        results.append(result)
+        if best is None or result.oob_rmse < best.oob_rmse:
+            # 採用候補以外のフォレストは保持しない（メモリ節約）
+            if best is not None:
+                best.model = None
+            best = result
+        else:
+            result.model = None
+    print(f"採用: {best.params}")
+    return best, results
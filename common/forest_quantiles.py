@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 学習済みフォレストからの分位点予測（quantile regression forest）
+
+分位点ごとに別モデルを学習する代わりに、学習済みの RandomForest / ExtraTrees の
+各葉に属する学習行の目的変数を保存しておき、予測時に分位点を計算する
+（Meinshausen, "Quantile Regression Forests"）。
+
+    予測行 x が木 t で到達する葉 L_t(x) に属する学習行 i の重みを
+        w_i(x) = (1 / 木の本数) * Σ_t [i ∈ L_t(x)] * sw_i / Σ_{j ∈ L_t(x)} sw_j
+    （sw はサンプル重み x 木 t のブートストラップ抽出回数、集約しない場合は抽出回数）とし、重み付き経験分布の
+    分位点 min{ y : Σ_{y_i <= y} w_i(x) >= q } を予測値とする。
+
+区間の較正:
+    葉の学習行は木の分割に使用した行そのものであるため、葉内の値のばらつきは未知の行に対する
+    誤差より小さく、そのままではテスト期間の被覆率が目標（P10-P90 で 80%）を下回る。
+    葉には各木のブートストラップ抽出に含まれた行のみを入れ、学習行の一部について、
+    その行を抽出しなかった木（OOB）のみで区間を計算し、
+    区間外へのはみ出し量 max(下限 - y, y - 上限) の分位点（分割コンフォーマル法）を
+    拡幅量として保存、予測時に下限・上限を拡幅量だけ広げる（ブートストラップ抽出なしのモデルは拡幅しない）。
+
+保存形式:
+    全ての木の葉ごとの学習行を CSR 形式（葉ごとの行数と、葉ごとに連続した
+    目的変数・正規化済み重みの配列）で <モデル名>_quantiles.npz に保存する。
+    要素数は 木の本数 x 学習行数（ブートストラップ抽出時は約 63%）。
+
+計算:
+    予測行 x 木の組ごとに葉の学習行を一括で展開し、(予測行, 目的変数) の順に並べ替えて
+    予測行ごとの累積重みから全分位点を searchsorted で求める。行・木・葉についての
+    Python ループは無い（展開要素数が CHUNK_ENTRIES を超える場合のみ予測行を分割する）。
+"""
+
+import os
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.artifact_files import file_stamp, save_npz_atomic
+
+
+@dataclass(frozen=True)
+class ForestQuantileConfig:
+    """分位点予測設定クラス（設定値統一管理）"""
+    FORMAT_VERSION: int = 2
+    # 学習済みモデル（.sav）に対応する葉の学習行ファイルの接尾辞
+    QUANTILES_SUFFIX: str = "_quantiles.npz"
+    # 予測区間の分位点（下限 P10 / 上限 P90）
+    INTERVAL: Tuple[float, float] = (0.1, 0.9)
+    # 一度に展開する（予測行, 木, 葉内の学習行）の要素数の上限
+    CHUNK_ENTRIES: int = 8_000_000
+    # 区間の較正に使用する学習行の数（無作為抽出）と乱数シード
+    CALIBRATION_ROWS: int = 5000
+    CALIBRATION_SEED: int = 0
+
+
+# 統一設定インスタンス
+config = ForestQuantileConfig()
+
+
+@dataclass
+class LeafSamples:
+    """全ての木の葉に属する学習行（CSR 形式）"""
+    # 各木のノード番号の開始位置（木 t のノード n の通し番号 = node_offset[t] + n）
+    node_offset: np.ndarray
+    # ノードの通し番号ごとの values 内の開始位置・学習行数（内部ノードは 0 行）
+    leaf_start: np.ndarray
+    leaf_count: np.ndarray
+    # 葉ごとに連続した学習行の目的変数
+    values: np.ndarray
+    # 葉内で合計 1 に正規化した学習行の重み
+    weights: np.ndarray
+    source_file: Optional[Dict[str, Any]] = None
+    # 予測区間の下限・上限の拡幅量（OOB 行による較正、calibrate_interval）
+    interval_margin: float = 0.0
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.node_offset)
+
+    def summary(self) -> str:
+        return (f"木 {self.n_trees}本 / 葉の学習行 {len(self.values):,}要素 / "
+                f"{(self.values.nbytes + self.weights.nbytes + self.leaf_start.nbytes + self.leaf_count.nbytes) / 1024 ** 2:.1f}MB")
+
+    def predict_quantiles(self, leaves: np.ndarray, quantiles: Sequence[float],
+                          use_tree: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        予測行が到達した葉から分位点を計算する
+
+        Args:
+            leaves: 予測行ごと・木ごとの葉のノード番号（model.apply の結果, 形状 (行数, 木の本数)）
+            quantiles: 分位点（0〜1）
+            use_tree: 予測行ごとに使用する木（形状 (行数, 木の本数) の bool、デフォルト: 全ての木）
+
+        Returns:
+            np.ndarray: 分位点予測（形状 (行数, 分位点数)、使用する木が無い行は NaN）
+        """
+        leaves = np.asarray(leaves, dtype=np.int64)
+        if leaves.ndim != 2 or leaves.shape[1] != self.n_trees:
+            raise ValueError(f"葉の配列の形状が木の本数 {self.n_trees} と一致しません: {leaves.shape}")
+        q = np.asarray(quantiles, dtype=np.float64)
+        nodes = leaves + self.node_offset
+        result = np.empty((len(nodes), len(q)), dtype=np.float64)
+
+        # 展開要素数が上限を超えないよう予測行を分割する（葉の平均行数で見積もる）
+        per_row = max(1.0, float(self.leaf_count[nodes[:64]].sum(axis=1).mean())) if len(nodes) else 1.0
+        chunk = max(1, int(config.CHUNK_ENTRIES // per_row))
+        for begin in range(0, len(nodes), chunk):
+            mask = None if use_tree is None else use_tree[begin:begin + chunk]
+            result[begin:begin + chunk] = self._quantiles_for(nodes[begin:begin + chunk], q, mask)
+        return result
+
+    def predict_interval(self, leaves: np.ndarray) -> np.ndarray:
+        """
+        予測区間（INTERVAL の分位点を較正済みの拡幅量だけ広げたもの）を計算する
+
+        Args:
+            leaves: 予測行ごと・木ごとの葉のノード番号（model.apply の結果）
+
+        Returns:
+            np.ndarray: 予測区間（形状 (行数, 2)、下限・上限）
+        """
+        bands = self.predict_quantiles(leaves, config.INTERVAL)
+        bands[:, 0] -= self.interval_margin
+        bands[:, 1] += self.interval_margin
+        return bands
+
+    def _quantiles_for(self, nodes: np.ndarray, q: np.ndarray, use_tree: Optional[np.ndarray] = None) -> np.ndarray:
+        n_rows = len(nodes)
+        flat = nodes.reshape(-1)
+        counts = self.leaf_count[flat].astype(np.int64)
+        if use_tree is not None:
+            counts *= use_tree.reshape(-1)
+        ends = np.cumsum(counts)
+        if not len(ends) or ends[-1] == 0:
+            return np.full((n_rows, len(q)), np.nan)
+        # (予測行, 木) の組ごとに葉の学習行を展開する
+        index = np.repeat(self.leaf_start[flat] - (ends - counts), counts) + np.arange(ends[-1])
+        row = np.repeat(np.repeat(np.arange(n_rows), self.n_trees), counts)
+        values, weights = self.values[index], self.weights[index]
+
+        order = np.lexsort((values, row))
+        values, weights = values[order], weights[order]
+        cum_weight = np.cumsum(weights, dtype=np.float64)
+        # 各予測行の重みの合計は使用した木の本数（葉ごとに 1 に正規化済み）
+        row_count = np.bincount(row, minlength=n_rows)
+        row_end = np.cumsum(row_count)
+        row_start = row_end - row_count
+        base = np.where(row_start > 0, cum_weight[np.maximum(row_start - 1, 0)], 0.0)
+        total = np.where(row_count > 0, cum_weight[np.maximum(row_end - 1, 0)] - base, 0.0)
+        target = base[:, None] + q[None, :] * total[:, None] * (1.0 - 1e-9)
+        position = np.searchsorted(cum_weight, target.reshape(-1), side='left').reshape(target.shape)
+        position = np.clip(position, row_start[:, None], np.maximum(row_end - 1, row_start)[:, None])
+        result = values[np.minimum(position, len(values) - 1)].astype(np.float64)
+        result[row_count == 0] = np.nan
+        return result
+
+
+def build_leaf_samples(model: Any,
+                       X_train: np.ndarray,
+                       y_train: np.ndarray,
+                       sample_weight: Optional[np.ndarray] = None) -> LeafSamples:
+    """
+    学習済みフォレストの各葉に属する学習行を集計する
+
+    ブートストラップ抽出で学習したモデルは、各木の抽出に含まれた行のみを抽出回数を重みとして集計する
+    （木の学習と同じ行・重み。抽出に含まれなかった行は区間の較正に使用する）。
+
+    Args:
+        model: 学習済みの RandomForestRegressor / ExtraTreesRegressor
+        X_train: 学習に使用した特徴量データ
+        y_train: 学習に使用した目的変数データ
+        sample_weight: 学習行のサンプル重み（集約時）
+
+    Returns:
+        LeafSamples: 葉ごとの学習行
+    """
+    if not hasattr(model, 'estimators_') or not hasattr(model, 'apply'):
+        raise ValueError(f"分位点予測に未対応のモデルです: {type(model).__name__}")
+    node_counts = np.array([e.tree_.node_count for e in model.estimators_], dtype=np.int64)
+    node_offset = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+    n_nodes = int(node_counts.sum())
+
+    # 木ごとに学習行の到達した葉の通し番号（木の順・行の順）
+    nodes = (model.apply(X_train).astype(np.int64) + node_offset).T.reshape(-1)
+    rows = np.tile(np.arange(len(X_train)), len(node_counts))
+    weight = (np.ones(len(X_train)) if sample_weight is None
+              else np.asarray(sample_weight, dtype=np.float64))[rows]
+    if getattr(model, 'bootstrap', False):
+        draws = np.concatenate([np.bincount(sampled, minlength=len(X_train)) for sampled in model.estimators_samples_])
+        in_bag = draws > 0
+        nodes, rows, weight = nodes[in_bag], rows[in_bag], weight[in_bag] * draws[in_bag]
+
+    order = np.argsort(nodes, kind='stable')
+    leaf_count = np.bincount(nodes, minlength=n_nodes)
+    leaf_weight = np.bincount(nodes, weights=weight, minlength=n_nodes)
+    leaf_start = np.cumsum(leaf_count) - leaf_count
+    y = np.asarray(y_train, dtype=np.float32).reshape(-1)
+    return LeafSamples(
+        node_offset=node_offset,
+        leaf_start=leaf_start.astype(np.int64),
+        leaf_count=leaf_count.astype(np.int32),
+        values=y[rows[order]],
+        weights=(weight[order] / leaf_weight[nodes[order]]).astype(np.float32),
+    )
+
+
+def calibrate_interval(samples: LeafSamples,
+                       model: Any,
+                       X_train: np.ndarray,
+                       y_train: np.ndarray,
+                       sample_weight: Optional[np.ndarray] = None) -> Tuple[float, float]:
+    """
+    OOB 行の予測区間から区間の拡幅量を求める（分割コンフォーマル法）
+
+    学習行から CALIBRATION_ROWS 行を無作為抽出し、各行を学習に使用しなかった木のみで区間を計算する。
+    区間外へのはみ出し量の (目標被覆率 x (1 + 1/行数)) 分位点を拡幅量とする（負の場合は 0）。
+
+    Args:
+        samples: 葉ごとの学習行（build_leaf_samples の結果）
+        model: 学習済みの RandomForestRegressor / ExtraTreesRegressor（bootstrap=True）
+        X_train: 学習に使用した特徴量データ
+        y_train: 学習に使用した目的変数データ
+        sample_weight: 学習行のサンプル重み（集約時）
+
+    Returns:
+        Tuple[float, float]: 拡幅量, 拡幅前の OOB 被覆率（ブートストラップ抽出なしのモデルは 0, NaN）
+    """
+    if not getattr(model, 'bootstrap', False):
+        return 0.0, float('nan')
+    n_train = len(X_train)
+    rng = np.random.default_rng(config.CALIBRATION_SEED)
+    rows = np.sort(rng.choice(n_train, size=min(n_train, config.CALIBRATION_ROWS), replace=False))
+
+    # 行ごとに学習に使用した（ブートストラップ抽出に含まれた）木
+    in_bag = np.zeros((len(rows), samples.n_trees), dtype=bool)
+    for t, sampled in enumerate(model.estimators_samples_):
+        mask = np.zeros(n_train, dtype=bool)
+        mask[sampled] = True
+        in_bag[:, t] = mask[rows]
+    bands = samples.predict_quantiles(model.apply(X_train[rows]), config.INTERVAL, use_tree=~in_bag)
+
+    valid = ~np.isnan(bands[:, 0])
+    y = np.asarray(y_train, dtype=np.float64).reshape(-1)[rows][valid]
+    lower, upper = bands[valid, 0], bands[valid, 1]
+    weight = (np.ones(len(y)) if sample_weight is None
+              else np.asarray(sample_weight, dtype=np.float64)[rows][valid])
+    scores = np.maximum(lower - y, y - upper)
+    order = np.argsort(scores)
+    cum_weight = np.cumsum(weight[order]) / weight.sum()
+    target = min(1.0, (config.INTERVAL[1] - config.INTERVAL[0]) * (1.0 + 1.0 / len(y)))
+    margin = float(scores[order][min(np.searchsorted(cum_weight, target), len(y) - 1)])
+    coverage = float(np.average((y >= lower) & (y <= upper), weights=weight))
+    return max(0.0, margin), coverage
+
+
+def quantiles_path(model_path: str) -> str:
+    """学習済みモデル（.sav）に対応する葉の学習行ファイルのパス"""
+    return os.path.splitext(model_path)[0] + config.QUANTILES_SUFFIX
+
+
+def save_leaf_samples(samples: LeafSamples, model_path: str) -> str:
+    """
+    葉の学習行を .npz（非圧縮）に保存する（学習時のモデル保存直後に呼び出す）
+
+    Args:
+        samples: 葉ごとの学習行
+        model_path: 保存済みモデルのパス
+
+    Returns:
+        str: 保存先パス
+    """
+    path = quantiles_path(model_path)
+    meta = {'format_version': config.FORMAT_VERSION, 'source_file': file_stamp(model_path),
+            'interval_margin': samples.interval_margin}
+    # 開始位置は行数の累積和から復元できるため保存しない
+    save_npz_atomic(path, meta, node_offset=samples.node_offset, leaf_count=samples.leaf_count,
+                    values=samples.values, weights=samples.weights)
+    print(f"分位点予測用の葉の学習行を {path} に保存しました（{samples.summary()}）")
+    return path
+
+
+def remove_leaf_samples(model_path: str) -> None:
+    """古い葉の学習行ファイルを削除する（分位点予測を無効にして再学習した場合）"""
+    path = quantiles_path(model_path)
+    if os.path.exists(path):
+        os.remove(path)
+        print(f"古い分位点予測ファイル {path} を削除しました")
+
+
+def load_leaf_samples(model_path: str) -> Optional[LeafSamples]:
+    """
+    学習済みモデルに対応する葉の学習行を読み込む
+
+    ファイルが無い場合、または保存元モデルファイルが更新されている場合は None を返す。
+
+    Args:
+        model_path: 学習済みモデルのパス
+
+    Returns:
+        Optional[LeafSamples]: 葉ごとの学習行
+    """
+    path = quantiles_path(model_path)
+    if not os.path.exists(path) or not os.path.exists(model_path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('format_version') != config.FORMAT_VERSION:
+                raise ValueError(f"分位点予測ファイルの形式が異なります: {path}")
+            arrays = {name: data[name] for name in data.files if name != 'meta'}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"分位点予測ファイルを読み込めません: {e}")
+        return None
+    if meta.get('source_file') != file_stamp(model_path):
+        print(f"分位点予測ファイルが学習済みモデルと一致しないため使用しません: {path}")
+        return None
+    leaf_count = arrays.pop('leaf_count')
+    leaf_start = np.cumsum(leaf_count, dtype=np.int64) - leaf_count
+    return LeafSamples(leaf_start=leaf_start, leaf_count=leaf_count, source_file=meta['source_file'],
+                       interval_margin=meta['interval_margin'], **arrays)
+
+
+def interval_coverage(y_true: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> float:
+    """実測値が予測区間 [lower, upper] に含まれる割合"""
+    y_true = np.asarray(y_true, dtype=np.float64).reshape(-1)
+    return float(np.mean((y_true >= lower) & (y_true <= upper)))
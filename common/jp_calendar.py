@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 日本のカレンダー（祝日・飛び石・お盆・年末年始）テーブル
+
+2000〜2050年の各日について以下のフラグをビット和で保持する uint8 配列
+（1日1バイト、約19KB）を作成し、epoch-hour からの日オフセットで
+ベクトル参照するモジュール。行ごとに祝日判定を行わないため、
+参照コストは配列インデックス1回分のみとなる。
+
+    FLAG_HOLIDAY   国民の祝日・振替休日・国民の休日
+    FLAG_BRIDGE    飛び石平日（前日・翌日がともに休日の平日）
+    FLAG_OBON      お盆（8月13日〜16日）
+    FLAG_YEAR_END  年末年始（12月29日〜1月3日）
+
+テーブルは初回参照時にプロセス内で1回だけ作成する（祝日は年あたり約20日の
+規則計算、それ以外は NumPy のベクトル演算のため数ミリ秒で完了する）。
+祝日は「国民の祝日に関する法律」の2000年以降の規定と、2019〜2021年の特例に従う。
+"""
+
+import datetime as dt
+from functools import lru_cache
+from typing import Set
+
+import numpy as np
+
+# テーブル範囲
+START_YEAR: int = 2000
+END_YEAR: int = 2050
+START_DAY: int = (dt.date(START_YEAR, 1, 1) - dt.date(1970, 1, 1)).days
+
+# フラグ（ビット）定義
+FLAG_HOLIDAY: int = 1
+FLAG_BRIDGE: int = 2
+FLAG_OBON: int = 4
+FLAG_YEAR_END: int = 8
+
+# 特例年の祝日移動（東京オリンピック・パラリンピック特措法）・即位関連の休日
+_SPECIAL_HOLIDAYS = {
+    2019: [(4, 30), (5, 1), (5, 2), (10, 22)],
+}
+_MOVED_HOLIDAYS = {
+    2020: {'marine': (7, 23), 'sports': (7, 24), 'mountain': (8, 10)},
+    2021: {'marine': (7, 22), 'sports': (7, 23), 'mountain': (8, 8)},
+}
+
+
+def _nth_monday(year: int, month: int, n: int) -> dt.date:
+    """指定月の第n月曜日を取得する"""
+    first = dt.date(year, month, 1)
+    return first + dt.timedelta(days=(7 - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _equinox_day(year: int, base: float) -> int:
+    """春分・秋分の日（1980〜2099年の近似式）"""
+    return int(base + 0.242194 * (year - 1980) - (year - 1980) // 4)
+
+
+def national_holidays(year: int) -> Set[dt.date]:
+    """
+    指定年の祝日（国民の祝日・国民の休日・振替休日）を取得する
+
+    Args:
+        year: 西暦年（2000年以降）
+
+    Returns:
+        Set[dt.date]: 祝日の集合
+    """
+    moved = _MOVED_HOLIDAYS.get(year, {})
+    days = {
+        dt.date(year, 1, 1),
+        _nth_monday(year, 1, 2),
+        dt.date(year, 2, 11),
+        dt.date(year, 3, _equinox_day(year, 20.8431)),
+        dt.date(year, 4, 29),
+        dt.date(year, 5, 3),
+        dt.date(year, 5, 4),
+        dt.date(year, 5, 5),
+        dt.date(year, 9, _equinox_day(year, 23.2488)),
+        dt.date(year, 11, 3),
+        dt.date(year, 11, 23),
+    }
+    # 天皇誕生日
+    if year <= 2018:
+        days.add(dt.date(year, 12, 23))
+    elif year >= 2020:
+        days.add(dt.date(year, 2, 23))
+    # 海の日
+    if 'marine' in moved:
+        days.add(dt.date(year, *moved['marine']))
+    else:
+        days.add(dt.date(year, 7, 20) if year <= 2002 else _nth_monday(year, 7, 3))
+    # 山の日
+    if 'mountain' in moved:
+        days.add(dt.date(year, *moved['mountain']))
+    elif year >= 2016:
+        days.add(dt.date(year, 8, 11))
+    # 敬老の日
+    days.add(dt.date(year, 9, 15) if year <= 2002 else _nth_monday(year, 9, 3))
+    # 体育の日・スポーツの日
+    if 'sports' in moved:
+        days.add(dt.date(year, *moved['sports']))
+    else:
+        days.add(_nth_monday(year, 10, 2))
+    days.update(dt.date(year, m, d) for m, d in _SPECIAL_HOLIDAYS.get(year, []))
+
+    # 国民の休日（前日・翌日がともに祝日の日）
+    one = dt.timedelta(days=1)
+    sandwiched = {d + one for d in days if d + 2 * one in days and d + one not in days}
+    days |= {d for d in sandwiched if d.weekday() != 6}
+
+    # 振替休日（2007年以降は日曜の祝日以降の最初の平日、それ以前は翌月曜）
+    for d in sorted(days):
+        if d.weekday() != 6:
+            continue
+        substitute = d + one
+        if year >= 2007:
+            while substitute in days:
+                substitute += one
+        if substitute.year == year:
+            days.add(substitute)
+    return days
+
+
+@lru_cache(maxsize=1)
+def calendar_table() -> np.ndarray:
+    """
+    2000〜2050年の日別カレンダーフラグテーブルを取得する（初回のみ作成）
+
+    Returns:
+        np.ndarray: 日別フラグ配列（uint8、インデックスは START_DAY からの日数、読み取り専用）
+    """
+    first = np.datetime64(f"{START_YEAR}-01-01")
+    dates = np.arange(first, np.datetime64(f"{END_YEAR + 1}-01-01"), dtype='datetime64[D]')
+    table = np.zeros(len(dates), dtype=np.uint8)
+
+    holiday_days = [(d - dt.date(START_YEAR, 1, 1)).days
+                    for year in range(START_YEAR, END_YEAR + 1) for d in national_holidays(year)]
+    table[holiday_days] |= FLAG_HOLIDAY
+
+    month_day = (dates - dates.astype('datetime64[M]')).astype(np.int64) + 1
+    month = dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    table[(month == 8) & (month_day >= 13) & (month_day <= 16)] |= FLAG_OBON
+    table[((month == 12) & (month_day >= 29)) | ((month == 1) & (month_day <= 3))] |= FLAG_YEAR_END
+
+    # 飛び石平日: 休日（土日・祝日・年末年始）に挟まれた平日
+    weekday = (dates.astype(np.int64) + 3) % 7
+    off = (weekday >= 5) | ((table & (FLAG_HOLIDAY | FLAG_YEAR_END)) != 0)
+    bridge = ~off
+    bridge[1:-1] &= off[:-2] & off[2:]
+    bridge[[0, -1]] = False
+    table[bridge] |= FLAG_BRIDGE
+
+    table.setflags(write=False)
+    return table
+
+
+def calendar_flags(epoch_hours: np.ndarray) -> np.ndarray:
+    """
+    epoch-hour 配列に対応するカレンダーフラグをベクトル参照する
+
+    テーブル範囲（2000〜2050年）外の時刻は 0 とする。
+
+    Args:
+        epoch_hours: epoch-hour 配列
+
+    Returns:
+        np.ndarray: カレンダーフラグ（uint8）
+    """
+    table = calendar_table()
+    offset = np.asarray(epoch_hours, dtype=np.int64) // 24 - START_DAY
+    inside = (offset >= 0) & (offset < len(table))
+    return np.where(inside, table[np.clip(offset, 0, len(table) - 1)], 0).astype(np.uint8)
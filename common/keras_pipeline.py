@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - Keras 学習の tf.data 入力パイプライン
+
+NumPy 配列を model.fit に直接渡し batch_size=64 で学習すると、CPU では1エポックが
+数百〜数千の小さなステップになり、ステップごとの Python / カーネル起動の固定費が
+学習時間の大半を占める。
+
+    入力パイプライン: tf.data.Dataset で .cache() → .shuffle() → .batch() → .prefetch() とし、
+                      前処理済みの行をメモリに保持したまま次のバッチを学習と並行して準備する。
+    大きなバッチ:     BATCH_SIZE（1024）行ずつ学習し、ステップ数を 1/16 にする。
+    学習率:           バッチを大きくすると1エポックあたりの更新回数が減るため、基準バッチ
+                      （BASE_BATCH_SIZE）との比で学習率を拡大する（Adam では平方根スケーリング）。
+                      学習初期の発散を防ぐため、最初の WARMUP_EPOCHS エポックで 0 から線形に上げる。
+    検証データ:       学習データ末尾（時系列順）の validation_split を明示的な検証データセットとする
+                      （シャッフルの対象外）。
+
+エポックごとの所要時間と、検証損失が最良となるまでの経過時間（収束時間）を EpochTimer で記録する。
+
+スナップショットアンサンブル（CosineSnapshots）: 学習率をサイクルごとに余弦で最大値から最小値まで
+下げて最大値に戻すことを繰り返し、各サイクルの終わり（学習率が最小の時点）の重みを保存する。
+1回の学習で異なる局所解の複数のモデルが得られ、その平均で予測のばらつきを抑える。
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+
+@dataclass(frozen=True)
+class KerasPipelineConfig:
+    """tf.data 入力パイプライン設定クラス（設定値統一管理）"""
+    # 学習のバッチサイズ
+    BATCH_SIZE: int = 1024
+    # 学習率の基準とするバッチサイズ（従来の NumPy 入力の batch_size）
+    BASE_BATCH_SIZE: int = 64
+    # 学習率の拡大方法（'sqrt': 平方根比, 'linear': 線形比, 'none': 拡大しない）
+    LR_SCALING: str = 'sqrt'
+    # 拡大後の学習率の上限
+    MAX_LEARNING_RATE: float = 0.01
+    # ウォームアップのエポック数（学習率を 0 から拡大後の値まで線形に上げる）
+    WARMUP_EPOCHS: int = 5
+    # シャッフルバッファの行数（0 の場合は学習データ全体）
+    SHUFFLE_BUFFER: int = 0
+    SEED: int = 42
+
+
+# 統一設定インスタンス
+config = KerasPipelineConfig()
+
+
+def scaled_learning_rate(learning_rate: float, batch_size: Optional[int] = None) -> float:
+    """
+    基準バッチサイズとの比で学習率を拡大する
+
+    Args:
+        learning_rate: 基準バッチサイズでの学習率
+        batch_size: 学習のバッチサイズ（デフォルト: config値）
+
+    Returns:
+        float: 拡大後の学習率
+    """
+    ratio = (batch_size or config.BATCH_SIZE) / config.BASE_BATCH_SIZE
+    if config.LR_SCALING == 'linear':
+        scaled = learning_rate * ratio
+    elif config.LR_SCALING == 'sqrt':
+        scaled = learning_rate * np.sqrt(ratio)
+    else:
+        scaled = learning_rate
+    return float(min(max(scaled, learning_rate), config.MAX_LEARNING_RATE))
+
+
+def time_ordered_split(n_rows: int, validation_split: float) -> Tuple[int, int]:
+    """学習行数・検証行数（検証は時系列順の末尾）"""
+    n_val = int(n_rows * validation_split)
+    return n_rows - n_val, n_val
+
+
+def make_datasets(X: np.ndarray,
+                  y: np.ndarray,
+                  sample_weight: Optional[np.ndarray] = None,
+                  validation_split: float = 0.0,
+                  batch_size: Optional[int] = None) -> Tuple[tf.data.Dataset, Optional[tf.data.Dataset], int]:
+    """
+    学習・検証の tf.data.Dataset を作成する
+
+    Args:
+        X: 学習用特徴量データ（標準化済み、時系列順）
+        y: 学習用目的変数データ（標準化済み）
+        sample_weight: 学習行のサンプル重み（集約時）
+        validation_split: 検証データの割合（学習データ末尾から取る）
+        batch_size: バッチサイズ（デフォルト: config値）
+
+    Returns:
+        Tuple[tf.data.Dataset, Optional[tf.data.Dataset], int]: 学習データセット, 検証データセット, 1エポックのステップ数
+    """
+    batch_size = batch_size or config.BATCH_SIZE
+    n_fit, n_val = time_ordered_split(len(X), validation_split)
+
+    def tensors(lo: int, hi: int) -> tuple:
+        arrays = (np.asarray(X[lo:hi]), np.asarray(y[lo:hi]))
+        if sample_weight is not None:
+            arrays += (np.asarray(sample_weight[lo:hi], dtype=np.float32),)
+        return arrays
+
+    train_ds = (tf.data.Dataset.from_tensor_slices(tensors(0, n_fit))
+                .cache()
+                .shuffle(config.SHUFFLE_BUFFER or n_fit, seed=config.SEED, reshuffle_each_iteration=True)
+                .batch(batch_size)
+                .prefetch(tf.data.AUTOTUNE))
+    val_ds = None
+    if n_val:
+        val_ds = (tf.data.Dataset.from_tensor_slices(tensors(n_fit, len(X)))
+                  .batch(batch_size)
+                  .cache()
+                  .prefetch(tf.data.AUTOTUNE))
+    return train_ds, val_ds, int(np.ceil(n_fit / batch_size))
+
+
+class LinearWarmup(keras.callbacks.Callback):
+    """
+    最初の warmup_steps ステップで学習率を 0 から target_lr まで線形に上げるコールバック
+
+    学習率スケジュールオブジェクトではなく optimizer の学習率を直接更新するため、
+    保存したモデル（.h5）の読み込みに独自クラスの登録が不要。
+    """
+
+    def __init__(self, target_lr: float, warmup_steps: int):
+        super().__init__()
+        self.target_lr = target_lr
+        self.warmup_steps = max(1, warmup_steps)
+        self.step = 0
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.step <= self.warmup_steps:
+            lr = self.target_lr * min(1.0, (self.step + 1) / self.warmup_steps)
+            self.model.optimizer.learning_rate.assign(lr)
+        self.step += 1
+
+
+class CosineSnapshots(keras.callbacks.Callback):
+    """
+    cycle_epochs エポックごとに学習率を max_lr から min_lr まで余弦で下げ（次のサイクルの先頭で
+    max_lr に戻す）、各サイクルの終わりの重みをスナップショットとして保存するコールバック
+
+    LinearWarmup と同様に optimizer の学習率を直接更新する。
+    """
+
+    def __init__(self, max_lr: float, min_lr: float, cycle_epochs: int, steps_per_epoch: Optional[int] = None,
+                 monitor: str = 'val_loss'):
+        super().__init__()
+        self.steps_per_epoch = steps_per_epoch
+        self.max_lr = max_lr
+        self.min_lr = min_lr
+        self.cycle_epochs = max(1, cycle_epochs)
+        self.monitor = monitor
+        self.epoch = 0
+        self.snapshots: List[List[np.ndarray]] = []
+        self.snapshot_logs: List[Dict[str, float]] = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+
+    def on_train_batch_begin(self, batch, logs=None):
+        steps = self.params.get('steps') or self.steps_per_epoch or 1
+        progress = ((self.epoch % self.cycle_epochs) + batch / steps) / self.cycle_epochs
+        lr = self.min_lr + 0.5 * (self.max_lr - self.min_lr) * (1.0 + math.cos(math.pi * progress))
+        self.model.optimizer.learning_rate.assign(lr)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if (epoch + 1) % self.cycle_epochs:
+            return
+        self.snapshots.append([np.array(w, copy=True) for w in self.model.get_weights()])
+        value = (logs or {}).get(self.monitor, (logs or {}).get('loss'))
+        self.snapshot_logs.append({'epoch': epoch + 1, self.monitor: float(value) if value is not None else float('nan')})
+
+    def summary(self) -> str:
+        values = ", ".join(f"@{log['epoch']}: {log[self.monitor]:.5f}" for log in self.snapshot_logs)
+        return f"スナップショット {len(self.snapshots)}個（{self.monitor} {values or '記録なし'}）"
+
+
+class EpochTimer(keras.callbacks.Callback):
+    """エポックごとの所要時間と、検証損失が最良となったエポックまでの経過時間を記録するコールバック"""
+
+    def __init__(self, monitor: str = 'val_loss'):
+        super().__init__()
+        self.monitor = monitor
+        self.epoch_times: List[float] = []
+        self.best_epoch = 0
+        self.best_value = float('inf')
+        self.time_to_best = 0.0
+
+    def on_train_begin(self, logs=None):
+        self.start_time = time.perf_counter()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        now = time.perf_counter()
+        self.epoch_times.append(now - self.epoch_start)
+        value = (logs or {}).get(self.monitor, (logs or {}).get('loss'))
+        if value is not None and value < self.best_value:
+            self.best_value, self.best_epoch, self.time_to_best = float(value), epoch + 1, now - self.start_time
+
+    @property
+    def total_time(self) -> float:
+        return float(sum(self.epoch_times))
+
+    def summary(self) -> str:
+        if not self.epoch_times:
+            return "エポック時間: 記録なし"
+        # 初回エポックはグラフのトレース・キャッシュ作成を含むため平均から除く
+        steady = self.epoch_times[1:] or self.epoch_times
+        return (f"エポック {len(self.epoch_times)}回 / 平均 {np.mean(steady):.3f}秒（初回 {self.epoch_times[0]:.3f}秒） / "
+                f"最良 {self.monitor} {self.best_value:.5f} @ エポック {self.best_epoch}（経過 {self.time_to_best:.2f}秒） / "
+                f"合計 {self.total_time:.2f}秒")
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - LightGBM Dataset バイナリキャッシュ
+
+LightGBM は学習のたびに特徴量のビン境界を求め、全行をビン化（ヒストグラム用の
+離散化）する。同じ学習データ・同じビン化パラメータであれば結果は同一のため、
+構築済みの lgb.Dataset を save_binary で保存し、以降の学習（同じ年組み合わせの
+再学習・年組み合わせ最適化の再実行など）では読み込みのみで済ませる。
+
+キャッシュキー:
+    学習データ（特徴量・目的変数・サンプル重み）の内容ハッシュ
+    + ビン化に影響するパラメータ（max_bin, min_data_in_bin, bin_construct_sample_cnt など）
+    + カテゴリ変数の列番号（lgb.Dataset の categorical_feature 引数）
+    + LightGBM のバージョン
+    + 検証用 Dataset の場合は参照先（学習用 Dataset）のキー
+
+検証用 Dataset は reference= で学習用 Dataset のビン境界に揃えて作成・保存するため、
+キャッシュから読み込んだ場合も学習用 Dataset と整合する。
+"""
+
+import os
+import json
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import lightgbm as lgb
+
+from common.dataset_io import array_hash
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@dataclass(frozen=True)
+class LGBDatasetCacheConfig:
+    """LightGBM Dataset キャッシュ設定クラス（設定値統一管理）"""
+    CACHE_DIR: str = os.path.join(PROJECT_ROOT, 'data', 'cache', 'lgb_datasets')
+    # 保持するキャッシュファイル数（超過分は最終使用が古い順に削除）
+    MAX_ENTRIES: int = 32
+
+    # Dataset の構築結果（ビン化・特徴量の事前除外）に影響するパラメータ（別名を含む）
+    DATASET_PARAMS: List[str] = field(default_factory=lambda: [
+        'max_bin', 'max_bins', 'max_bin_by_feature', 'min_data_in_bin',
+        'bin_construct_sample_cnt', 'subsample_for_bin',
+        'data_random_seed', 'seed', 'random_state', 'random_seed',
+        'feature_pre_filter', 'min_data_in_leaf', 'min_child_samples', 'min_data_per_leaf',
+        'use_missing', 'zero_as_missing', 'categorical_feature', 'categorical_column',
+        'linear_tree', 'forcedbins_filename',
+    ])
+
+
+# 統一設定インスタンス
+config = LGBDatasetCacheConfig()
+
+
+def dataset_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """学習パラメータから Dataset の構築に影響するものを取り出す"""
+    return {k: params[k] for k in sorted(params) if k in config.DATASET_PARAMS and params[k] is not None}
+
+
+def dataset_key(X: np.ndarray,
+                y: np.ndarray,
+                params: Dict[str, Any],
+                weight: Optional[np.ndarray] = None,
+                reference_key: Optional[str] = None,
+                categorical_feature: Union[List[int], str] = 'auto') -> str:
+    """
+    Dataset のキャッシュキーを計算する
+
+    Args:
+        X: 特徴量行列
+        y: 目的変数
+        params: 学習パラメータ（ビン化に影響するもののみキーに含める）
+        weight: サンプル重み
+        reference_key: 参照先 Dataset のキー（検証用 Dataset の場合）
+        categorical_feature: カテゴリ変数の列番号（'auto' の場合は指定なし）
+
+    Returns:
+        str: 16進キー文字列
+    """
+    arrays = [X, np.asarray(y).reshape(-1)] + ([np.asarray(weight).reshape(-1)] if weight is not None else [])
+    digest = hashlib.sha1()
+    digest.update(array_hash(arrays).encode('ascii'))
+    keyed = [dataset_params(params), categorical_feature]
+    digest.update(json.dumps(keyed, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(lgb.__version__.encode('ascii'))
+    digest.update((reference_key or '').encode('ascii'))
+    return digest.hexdigest()
+
+
+def _evict(cache_dir: str) -> None:
+    """保持数を超えたキャッシュファイルを最終使用が古い順に削除する"""
+    paths = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith('.bin')]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[config.MAX_ENTRIES:]:
+        os.remove(path)
+
+
+def cached_dataset(X: np.ndarray,
+                   y: np.ndarray,
+                   params: Dict[str, Any],
+                   weight: Optional[np.ndarray] = None,
+                   reference: Optional[lgb.Dataset] = None,
+                   cache_dir: Optional[str] = None,
+                   categorical_feature: Union[List[int], str] = 'auto') -> lgb.Dataset:
+    """
+    lgb.Dataset をキャッシュから取得する（無ければ構築して save_binary で保存する）
+
+    返す Dataset には cache_key 属性（キャッシュキー）を設定する。検証用 Dataset は
+    reference に学習用 Dataset（本関数で取得したもの）を指定する。カテゴリ変数は
+    params ではなく categorical_feature で指定する（params 内の指定は LightGBM が無視する）。
+
+    Args:
+        X: 特徴量行列
+        y: 目的変数
+        params: 学習パラメータ
+        weight: サンプル重み
+        reference: ビン境界を揃える学習用 Dataset（検証用 Dataset の場合）
+        cache_dir: キャッシュディレクトリ（デフォルト: config値）
+        categorical_feature: カテゴリ変数の列番号（'auto' の場合は指定なし）
+
+    Returns:
+        lgb.Dataset: 構築済み Dataset
+    """
+    cache_dir = cache_dir or config.CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    reference_key = getattr(reference, 'cache_key', None) if reference is not None else None
+    key = dataset_key(X, y, params, weight, reference_key, categorical_feature)
+    path = os.path.join(cache_dir, f"{key}.bin")
+    ds_params = dataset_params(params)
+    ds_params['verbose'] = params.get('verbose', -1)
+
+    if os.path.exists(path):
+        dataset = lgb.Dataset(path, reference=reference, params=ds_params,
+                              categorical_feature=categorical_feature).construct()
+        os.utime(path)
+        print(f"LightGBM Dataset キャッシュ読み込み: {os.path.basename(path)} ({dataset.num_data():,}行)")
+    else:
+        dataset = lgb.Dataset(np.asarray(X), label=np.asarray(y).reshape(-1), weight=weight,
+                              reference=reference, params=ds_params, categorical_feature=categorical_feature,
+                              free_raw_data=True).construct()
+        tmp_path = path + ".tmp"
+        dataset.save_binary(tmp_path)
+        os.replace(tmp_path, path)
+        _evict(cache_dir)
+        print(f"LightGBM Dataset キャッシュ作成: {os.path.basename(path)} ({dataset.num_data():,}行)")
+    dataset.cache_key = key
+    return dataset
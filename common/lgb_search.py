@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - LightGBM ハイパーパラメータ探索（非同期逐次半減 / ASHA）
+
+LightGBM のパラメータ（num_leaves, learning_rate, min_child_samples など）を
+探索空間から乱数で生成し、ブースティング回数を資源として逐次半減法で評価する。
+
+    ラング（rung）: MIN_ROUNDS × REDUCTION_FACTOR^k 回（MAX_ROUNDS まで）
+    各ラングで評価済み試行の上位 1/REDUCTION_FACTOR を次のラングへ昇格させ、
+    それ以外（弱い設定）は少ない回数で打ち切る。
+
+非同期版（ASHA）のため、ワーカーが空くたびに「昇格可能な試行があれば昇格、
+無ければ新しい試行を開始」とし、ラング全体の完了を待たない。
+
+試行はプロセスプールで並列に実行し、各試行の LightGBM スレッド数は
+THREADS_PER_TRIAL（デフォルト: CPU数 / ワーカー数）に制限する。学習・検証データは
+一時ディレクトリに .npy として書き出し、各ワーカーはメモリマップで読み込む。
+
+評価結果は（データの内容ハッシュ, パラメータ, 回数）をキーとしてキャッシュ
+（data/cache/lgb_search/<データハッシュ>.jsonl）に追記するため、中断後の再実行や
+同じデータでの再探索は評価済みの試行を読み込みのみで再開する（乱数シード固定で
+同じ試行列を生成する）。
+
+最良の設定は JSON（train/LightGBM/LightGBM_params.json）として保存し、
+LightGBM_train.py の学習時に読み込む。
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import datetime as dt
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from common.dataset_io import array_hash
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@dataclass(frozen=True)
+class LGBSearchConfig:
+    """LightGBM ハイパーパラメータ探索設定クラス（設定値統一管理）"""
+    CACHE_DIR: str = os.path.join(PROJECT_ROOT, 'data', 'cache', 'lgb_search')
+    PARAMS_FILE: str = os.path.join(PROJECT_ROOT, 'train', 'LightGBM', 'LightGBM_params.json')
+
+    # 試行数・ラング設定
+    N_TRIALS: int = 27
+    MIN_ROUNDS: int = 25
+    MAX_ROUNDS: int = 675
+    REDUCTION_FACTOR: int = 3
+    SEED: int = 42
+
+    # 並列設定（None の場合は CPU 数から決定）
+    N_WORKERS: Optional[int] = None
+    THREADS_PER_TRIAL: Optional[int] = None
+
+    # 探索空間: パラメータ名 → (分布, 下限, 上限)
+    #   'log' は対数一様、'int_log' は対数一様の整数、'uniform' は一様
+    SEARCH_SPACE: Dict[str, Tuple[str, float, float]] = field(default_factory=lambda: {
+        'num_leaves': ('int_log', 15, 255),
+        'learning_rate': ('log', 0.01, 0.3),
+        'min_child_samples': ('int_log', 5, 200),
+        'subsample': ('uniform', 0.5, 1.0),
+        'colsample_bytree': ('uniform', 0.5, 1.0),
+        'reg_lambda': ('log', 1e-3, 10.0),
+    })
+
+    # キャッシュキーに含めないパラメータ（結果に影響しない実行設定）
+    UNKEYED_PARAMS: List[str] = field(default_factory=lambda: ['num_threads', 'n_jobs', 'verbose'])
+
+
+# 統一設定インスタンス
+config = LGBSearchConfig()
+
+
+@dataclass
+class TrialResult:
+    """1回の評価（試行 × ラング）の結果"""
+    trial_id: int
+    rung: int
+    rounds: int
+    params: Dict[str, Any]
+    rmse: float
+    seconds: float
+    cached: bool = False
+
+
+@dataclass
+class SearchResult:
+    """探索結果"""
+    best: TrialResult
+    results: List[TrialResult]
+    rungs: List[int]
+    data_hash: str
+    elapsed: float
+
+    def leaderboard(self, top: int = 10) -> List[TrialResult]:
+        """RMSE の昇順で並べた評価結果"""
+        return sorted(self.results, key=lambda r: r.rmse)[:top]
+
+    def summary(self) -> str:
+        evaluated = [r for r in self.results if not r.cached]
+        return (f"探索完了: 評価 {len(self.results)}回 (うちキャッシュ {len(self.results) - len(evaluated)}回), "
+                f"総ブースティング回数 {sum(r.rounds for r in evaluated):,}回, {self.elapsed:.1f}秒 / "
+                f"最良 RMSE {self.best.rmse:.3f} ({self.best.rounds}回, {self.best.params})")
+
+
+def rung_rounds(min_rounds: Optional[int] = None,
+                max_rounds: Optional[int] = None,
+                reduction_factor: Optional[int] = None) -> List[int]:
+    """各ラングのブースティング回数を返す（例: 25, 75, 225, 675）"""
+    rounds = min_rounds or config.MIN_ROUNDS
+    max_rounds = max_rounds or config.MAX_ROUNDS
+    eta = reduction_factor or config.REDUCTION_FACTOR
+    rungs = []
+    while rounds <= max_rounds:
+        rungs.append(int(rounds))
+        rounds *= eta
+    return rungs
+
+
+def sample_params(rng: np.random.Generator,
+                  space: Optional[Dict[str, Tuple[str, float, float]]] = None) -> Dict[str, Any]:
+    """
+    探索空間からパラメータを1組生成する（有効数字4桁に丸め、キャッシュキーを安定させる）
+
+    Args:
+        rng: 乱数生成器
+        space: 探索空間（デフォルト: config値）
+
+    Returns:
+        Dict[str, Any]: パラメータ
+    """
+    params: Dict[str, Any] = {}
+    for name, (kind, low, high) in (space or config.SEARCH_SPACE).items():
+        if kind in ('log', 'int_log'):
+            value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            value = float(rng.uniform(low, high))
+        params[name] = int(round(value)) if kind == 'int_log' else float(f"{value:.4g}")
+    if params.get('subsample', 1.0) < 1.0:
+        params['subsample_freq'] = 1
+    return params
+
+
+def _cache_key(params: Dict[str, Any], rounds: int, categorical_feature: Union[List[int], str] = 'auto') -> str:
+    keyed = {k: v for k, v in params.items() if k not in config.UNKEYED_PARAMS}
+    return json.dumps([keyed, rounds, categorical_feature], sort_keys=True, default=str)
+
+
+def _load_cache(path: str) -> Dict[str, Dict[str, Any]]:
+    """キャッシュファイル（JSON Lines）を読み込む（途中で中断した行は無視）"""
+    cache: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return cache
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            cache[_cache_key(entry['params'], entry['rounds'], entry.get('categorical_feature', 'auto'))] = entry
+    return cache
+
+
+# ---- ワーカー（プロセスプール内で実行） ----
+
+_WORKER_DATA: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(data_dir: str) -> None:
+    """ワーカーの初期化: 学習・検証データをメモリマップで開く"""
+    for name in ('X_train', 'y_train', 'X_val', 'y_val'):
+        _WORKER_DATA[name] = np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode='r')
+
+
+def _evaluate(params: Dict[str, Any], rounds: int,
+              categorical_feature: Union[List[int], str] = 'auto') -> Tuple[float, float]:
+    """
+    パラメータ・回数で学習し、検証データの RMSE を返す（ワーカー内で実行）
+
+    カテゴリ変数は params ではなく lgb.Dataset の categorical_feature 引数で指定する。
+
+    Returns:
+        Tuple[float, float]: RMSE, 学習時間（秒）
+    """
+    import lightgbm as lgb
+
+    start_time = time.time()
+    # min_child_samples は試行ごとに異なるため、Dataset 構築時の特徴量事前除外を無効にする
+    dataset_params = {'feature_pre_filter': False, 'verbose': -1}
+    train_set = lgb.Dataset(np.asarray(_WORKER_DATA['X_train']), label=np.asarray(_WORKER_DATA['y_train']),
+                            params=dataset_params, categorical_feature=categorical_feature)
+    booster = lgb.train(dict(params, feature_pre_filter=False), train_set, num_boost_round=rounds)
+    y_pred = booster.predict(np.asarray(_WORKER_DATA['X_val']))
+    rmse = float(np.sqrt(np.mean((y_pred - np.asarray(_WORKER_DATA['y_val'], dtype=np.float64)) ** 2)))
+    return rmse, time.time() - start_time
+
+
+# ---- スケジューラ ----
+
+class AshaScheduler:
+    """
+    非同期逐次半減法（ASHA）のスケジューラ
+
+    next_job() は上位ラングから順に昇格可能な試行を探し、無ければ新しい試行を返す。
+    """
+
+    def __init__(self, rungs: List[int], n_trials: int, reduction_factor: int, seed: int,
+                 space: Optional[Dict[str, Tuple[str, float, float]]] = None):
+        self.rungs = rungs
+        self.n_trials = n_trials
+        self.eta = reduction_factor
+        self.rng = np.random.default_rng(seed)
+        self.space = space
+        self.trials: List[Dict[str, Any]] = []
+        self.scores: List[Dict[int, float]] = [{} for _ in rungs]
+        self.promoted: List[set] = [set() for _ in rungs]
+
+    def next_job(self) -> Optional[Tuple[int, int]]:
+        """次に評価する（試行番号, ラング）を返す（無ければ None）"""
+        for rung in reversed(range(len(self.rungs) - 1)):
+            scores = self.scores[rung]
+            top = sorted(scores, key=scores.get)[:len(scores) // self.eta]
+            for trial_id in top:
+                if trial_id not in self.promoted[rung]:
+                    self.promoted[rung].add(trial_id)
+                    return trial_id, rung + 1
+        if len(self.trials) < self.n_trials:
+            self.trials.append(sample_params(self.rng, self.space))
+            return len(self.trials) - 1, 0
+        return None
+
+    def report(self, trial_id: int, rung: int, rmse: float) -> None:
+        self.scores[rung][trial_id] = rmse
+
+
+def _default_workers(n_workers: Optional[int], threads_per_trial: Optional[int],
+                     thread_budget: Optional[int] = None) -> Tuple[int, int]:
+    cpus = thread_budget or os.cpu_count() or 1
+    n_workers = n_workers or config.N_WORKERS or max(1, min(4, cpus // 2))
+    threads_per_trial = threads_per_trial or config.THREADS_PER_TRIAL or max(1, cpus // n_workers)
+    return n_workers, threads_per_trial
+
+
+def run_search(X_train: np.ndarray,
+               y_train: np.ndarray,
+               X_val: np.ndarray,
+               y_val: np.ndarray,
+               base_params: Dict[str, Any],
+               n_trials: Optional[int] = None,
+               n_workers: Optional[int] = None,
+               threads_per_trial: Optional[int] = None,
+               cache_dir: Optional[str] = None,
+               thread_budget: Optional[int] = None,
+               categorical_feature: Union[List[int], str] = 'auto') -> SearchResult:
+    """
+    ASHA によるハイパーパラメータ探索を実行する
+
+    Args:
+        X_train, y_train: 学習データ
+        X_val, y_val: 検証データ（時系列順で学習データより後の期間）
+        base_params: 全試行に共通の lgb.train パラメータ（目的関数など）
+        n_trials: 試行数（デフォルト: config値）
+        n_workers: 並列ワーカー数（1 の場合はプロセスを起動せず逐次実行）
+        threads_per_trial: 各試行の LightGBM スレッド数
+        cache_dir: 評価結果キャッシュのディレクトリ（デフォルト: config値）
+        thread_budget: 探索全体で使用するスレッド数（common/thread_budget.py の割当、デフォルト: CPU数）
+        categorical_feature: カテゴリ変数の列番号（'auto' の場合は指定なし、キャッシュキーに含める）
+
+    Returns:
+        SearchResult: 探索結果
+    """
+    start_time = time.time()
+    n_trials = n_trials or config.N_TRIALS
+    n_workers, threads_per_trial = _default_workers(n_workers, threads_per_trial, thread_budget)
+    rungs = rung_rounds()
+    scheduler = AshaScheduler(rungs, n_trials, config.REDUCTION_FACTOR, config.SEED)
+
+    arrays = {'X_train': X_train, 'y_train': np.asarray(y_train).reshape(-1),
+              'X_val': X_val, 'y_val': np.asarray(y_val).reshape(-1)}
+    data_hash = array_hash(list(arrays.values()))
+    cache_dir = cache_dir or config.CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{data_hash}.jsonl")
+    cache = _load_cache(cache_path)
+    print(f"ハイパーパラメータ探索: 試行数 {n_trials}, ラング {rungs}, "
+          f"ワーカー {n_workers} × {threads_per_trial}スレッド, キャッシュ {len(cache)}件")
+
+    base_params = {k: v for k, v in base_params.items() if k not in ('n_jobs', 'num_threads')}
+    results: List[TrialResult] = []
+    data_dir = tempfile.mkdtemp(prefix='lgb_search_')
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(data_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        executor_type = ThreadPoolExecutor if n_workers <= 1 else ProcessPoolExecutor
+        executor: Executor = executor_type(max_workers=n_workers, initializer=_init_worker, initargs=(data_dir,))
+        running: Dict[Future, Tuple[int, int, Dict[str, Any]]] = {}
+        with executor, open(cache_path, 'a', encoding='utf-8') as cache_file:
+            while True:
+                # 空いているワーカーに次の評価を割り当てる（キャッシュ済みは即時に結果を反映）
+                while len(running) < n_workers:
+                    job = scheduler.next_job()
+                    if job is None:
+                        break
+                    trial_id, rung = job
+                    params = dict(base_params, **scheduler.trials[trial_id])
+                    cached = cache.get(_cache_key(params, rungs[rung], categorical_feature))
+                    if cached is not None:
+                        scheduler.report(trial_id, rung, cached['rmse'])
+                        results.append(TrialResult(trial_id, rung, rungs[rung], scheduler.trials[trial_id],
+                                                   cached['rmse'], cached['seconds'], cached=True))
+                        continue
+                    future = executor.submit(_evaluate, dict(params, num_threads=threads_per_trial), rungs[rung],
+                                             categorical_feature)
+                    running[future] = (trial_id, rung, params)
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    trial_id, rung, params = running.pop(future)
+                    rmse, seconds = future.result()
+                    scheduler.report(trial_id, rung, rmse)
+                    result = TrialResult(trial_id, rung, rungs[rung], scheduler.trials[trial_id], rmse, seconds)
+                    results.append(result)
+                    cache_file.write(json.dumps({'params': params, 'rounds': rungs[rung], 'rmse': rmse,
+                                                 'seconds': seconds, 'categorical_feature': categorical_feature},
+                                                default=str) + "\n")
+                    cache_file.flush()
+                    print(f"  試行 {trial_id:3d} ラング {rung} ({rungs[rung]:4d}回): RMSE {rmse:.3f} ({seconds:.2f}秒)")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    # ブースティング回数は資源であると同時にパラメータでもあるため、全ラングの評価から最良を選ぶ
+    best = min(results, key=lambda r: r.rmse)
+    result = SearchResult(best, results, rungs, data_hash, time.time() - start_time)
+    print(result.summary())
+    return result
+
+
+def training_data_hash(X: np.ndarray, y: np.ndarray) -> str:
+    """探索・学習で照合する学習データ（検証データ分割・標準化の前）の内容ハッシュ"""
+    return array_hash([np.asarray(X), np.asarray(y).reshape(-1)])
+
+
+def normalize_years(target_years: Optional[str]) -> Optional[List[int]]:
+    """対象年の指定（カンマ区切り）を照合用の昇順リストにする（未指定は None）"""
+    years = sorted({int(y) for y in (target_years or '').split(',') if y.strip()})
+    return years or None
+
+
+def save_best_params(result: SearchResult,
+                     path: Optional[str] = None,
+                     training_hash: Optional[str] = None,
+                     target_years: Optional[str] = None) -> Dict[str, Any]:
+    """
+    最良の設定を JSON として保存する（学習スクリプトが読み込む）
+
+    Args:
+        result: 探索結果
+        path: 保存先（デフォルト: config値）
+        training_hash: 探索に使用した学習データの training_data_hash
+        target_years: 探索に使用した対象年
+
+    Returns:
+        Dict[str, Any]: 保存した内容
+    """
+    path = path or config.PARAMS_FILE
+    artifact = {
+        'created': dt.datetime.now().isoformat(timespec='seconds'),
+        'params': result.best.params,
+        'num_boost_round': result.best.rounds,
+        'rmse': result.best.rmse,
+        'data_hash': result.data_hash,
+        'training_hash': training_hash,
+        'target_years': normalize_years(target_years),
+        'rungs': result.rungs,
+        'n_trials': len({r.trial_id for r in result.results}),
+        'leaderboard': [{'trial_id': r.trial_id, 'rounds': r.rounds, 'rmse': r.rmse, 'params': r.params}
+                        for r in result.leaderboard()],
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    print(f"最良パラメータを {path} に保存しました")
+    return artifact
+
+
+def load_best_params(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    保存済みの最良設定を読み込む（存在しない場合は None）
+
+    Returns:
+        Optional[Dict[str, Any]]: {'params': ..., 'num_boost_round': ..., ...}
+    """
+    path = path or config.PARAMS_FILE
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def tuned_params_mismatch(tuned: Dict[str, Any],
+                          training_hash: Optional[str],
+                          target_years: Optional[str] = None) -> Optional[str]:
+    """
+    保存済みの最良設定が現在の学習データで探索したものでない理由を返す（一致する場合は None）
+
+    Args:
+        tuned: load_best_params の結果
+        training_hash: 現在の学習データの training_data_hash（照合できない場合は None）
+        target_years: 現在の対象年
+
+    Returns:
+        Optional[str]: 不一致の理由
+    """
+    if normalize_years(target_years) != tuned.get('target_years'):
+        return f"対象年が異なります（探索時 {tuned.get('target_years')} / 現在 {normalize_years(target_years)}）"
+    if training_hash is None or tuned.get('training_hash') is None:
+        return "学習データを照合できません"
+    if training_hash != tuned['training_hash']:
+        return "学習データが探索時と異なります"
+    return None
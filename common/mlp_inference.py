@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - Keras 全結合ネットワークの NumPy 推論エンジン
+
+Keras モデルは Dense 層のみの全結合ネットワーク（128→128→64→32→1）であり、翌日予測の
+数百行の推論に TensorFlow の読み込み（数秒・数百MB）は不要。学習時に各 Dense 層の
+重み・バイアス・活性化関数と、特徴量・目的変数の標準化パラメータを1つの .npz に書き出し、
+翌日予測では NumPy の float32 行列積で順伝播する。
+
+    <モデル名>_mlp.npz
+        meta         形式バージョン・活性化関数・保存元モデルファイルの情報（JSON）
+        kernel_<i>   i 層目の重み（入力次元 x 出力次元, float32）
+        bias_<i>     i 層目のバイアス（float32）
+        x_mean / x_scale / y_mean / y_scale   標準化パラメータ
+
+スナップショットアンサンブル（Keras_train.py の SNAPSHOT_ENSEMBLE）の場合は、各スナップショットの
+重みを先頭の次元に積み重ねて保存する（kernel_<i>: スナップショット数 x 入力次元 x 出力次元、
+bias_<i>: スナップショット数 x 1 x 出力次元）。推論は各層1回のバッチ行列積で全スナップショットを
+同時に順伝播し、標準化空間の予測値を平均する。学習済みモデル（.h5）は最後のスナップショットの
+重みのみを持つため、TensorFlow での予測はアンサンブルにならない。
+
+Dropout は推論時に恒等写像のため書き出さない。Dense / Dropout 以外の層を含むモデルは
+変換できず（ValueError）、翌日予測は TensorFlow でモデルを読み込む。
+
+このモジュールは TensorFlow / Keras をインポートしない（書き出し時も学習済みモデルの
+属性のみを参照する）。
+"""
+
+import os
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from common.artifact_files import file_stamp, save_npz_atomic
+
+
+@dataclass(frozen=True)
+class MlpInferenceConfig:
+    """NumPy 推論エンジン設定クラス（設定値統一管理）"""
+    FORMAT_VERSION: int = 1
+    # 学習済みモデル（.h5）に対応する変換済みファイルの接尾辞
+    MLP_SUFFIX: str = "_mlp.npz"
+    # 推論時に恒等写像となる（書き出さない）層
+    PASSTHROUGH_LAYERS: tuple = ('Dropout', 'InputLayer')
+    # 積み重ねた重みの順伝播で中間結果（スナップショット数 x 行数 x 出力次元）の要素数の上限
+    # （128KB: メモリ確保ごとのページフォールトを避け、キャッシュに収まる行数ずつ計算する）
+    CHUNK_ELEMENTS: int = 32768
+
+
+# 統一設定インスタンス
+config = MlpInferenceConfig()
+
+
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'elu': lambda x: np.where(x > 0, x, np.expm1(x)),
+}
+
+
+@dataclass
+class AffineScaler:
+    """標準化パラメータのみを保持するスケーラー（StandardScaler の transform / inverse_transform 互換）"""
+    mean: np.ndarray
+    scale: np.ndarray
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float32) - self.mean) / self.scale
+
+    def inverse_transform(self, X: np.ndarray) -> np.ndarray:
+        return np.asarray(X, dtype=np.float32) * self.scale + self.mean
+
+
+@dataclass
+class NumpyMLP:
+    """全結合ネットワークの NumPy 推論エンジン（標準化空間の入出力、Keras モデルの predict 互換）"""
+    kernels: List[np.ndarray]
+    biases: List[np.ndarray]
+    activations: List[str]
+    x_scaler: AffineScaler
+    y_scaler: AffineScaler
+    source_file: Optional[Dict[str, Any]] = None
+
+    @property
+    def n_snapshots(self) -> int:
+        """スナップショット数（積み重ねた重みの先頭の次元、単一モデルは 1）"""
+        return self.kernels[0].shape[0] if self.kernels[0].ndim == 3 else 1
+
+    @property
+    def n_features(self) -> int:
+        return self.kernels[0].shape[-2]
+
+    def predict(self, X: np.ndarray, verbose: int = 0, **kwargs) -> np.ndarray:
+        """標準化済み特徴量から標準化空間の予測値（形状 (行数, 出力数)）を計算する"""
+        X = np.asarray(X, dtype=np.float32)
+        if self.kernels[0].ndim == 2:
+            return self._forward(X)
+        # 積み重ねた重み: 全スナップショットを同時に順伝播し平均する（CHUNK_ELEMENTS に収まる行数ずつ）
+        rows = max(1, config.CHUNK_ELEMENTS // (self.n_snapshots * max(k.shape[-1] for k in self.kernels)))
+        if len(X) <= rows:
+            return self._forward(X).mean(axis=0)
+        return np.concatenate([self._forward(X[i:i + rows]).mean(axis=0) for i in range(0, len(X), rows)])
+
+    def _forward(self, X: np.ndarray) -> np.ndarray:
+        """順伝播（積み重ねた重みの場合は (スナップショット数, 行数, 出力次元) のバッチ行列積）"""
+        h = X
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            h = h @ kernel
+            h += bias
+            h = ACTIVATIONS[activation](h)
+        return h
+
+    def predict_kw(self, X: np.ndarray) -> np.ndarray:
+        """生の特徴量から元スケール（kW）の予測値を計算する"""
+        return self.y_scaler.inverse_transform(self.predict(self.x_scaler.transform(X)))
+
+    def members(self) -> List['NumpyMLP']:
+        """スナップショットごとの単一モデル（単一モデルの場合は自身のみ）"""
+        if self.kernels[0].ndim == 2:
+            return [self]
+        return [NumpyMLP([k[i] for k in self.kernels], [b[i, 0] for b in self.biases], self.activations,
+                         self.x_scaler, self.y_scaler, self.source_file)
+                for i in range(self.n_snapshots)]
+
+    def summary(self) -> str:
+        shape = "→".join([str(self.n_features)] + [str(k.shape[-1]) for k in self.kernels])
+        n_params = sum(k.size + b.size for k, b in zip(self.kernels, self.biases)) // self.n_snapshots
+        ensemble = f" / スナップショット {self.n_snapshots}個の平均" if self.kernels[0].ndim == 3 else ""
+        return f"全結合 {shape} / 活性化 {','.join(self.activations)} / パラメータ {n_params:,}個{ensemble}"
+
+
+def convert_keras_mlp(model: Any, x_scaler: Any, y_scaler: Any) -> NumpyMLP:
+    """
+    学習済み Keras モデルと標準化スケーラーを NumPy 推論エンジンに変換する
+
+    Args:
+        model: 学習済み Keras モデル（Dense / Dropout 層のみ）
+        x_scaler: 特徴量の StandardScaler
+        y_scaler: 目的変数の StandardScaler
+
+    Returns:
+        NumpyMLP: 変換結果
+
+    Raises:
+        ValueError: 変換できない層・活性化関数を含む場合
+    """
+    kernels, biases, activations = [], [], []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind in config.PASSTHROUGH_LAYERS:
+            continue
+        if kind != 'Dense':
+            raise ValueError(f"未対応の層です: {layer.name} ({kind})")
+        activation = getattr(layer.activation, '__name__', str(layer.activation))
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"未対応の活性化関数です: {layer.name} ({activation})")
+        kernel, bias = layer.get_weights()
+        kernels.append(np.ascontiguousarray(kernel, dtype=np.float32))
+        biases.append(np.asarray(bias, dtype=np.float32))
+        activations.append(activation)
+    if not kernels:
+        raise ValueError("Dense 層がありません")
+
+    def affine(scaler: Any) -> AffineScaler:
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        n = kernels[0].shape[0] if scaler is x_scaler else kernels[-1].shape[1]
+        return AffineScaler(
+            mean=np.asarray(mean if mean is not None else np.zeros(n), dtype=np.float32),
+            scale=np.asarray(scale if scale is not None else np.ones(n), dtype=np.float32),
+        )
+
+    return NumpyMLP(kernels, biases, activations, affine(x_scaler), affine(y_scaler))
+
+
+def stack_mlps(members: List[NumpyMLP]) -> NumpyMLP:
+    """
+    同じ構成の複数のモデルの重みを積み重ね、1回の順伝播で平均を予測するモデルにする
+
+    Args:
+        members: 変換済みのモデル（標準化パラメータは先頭のモデルのものを使用）
+
+    Returns:
+        NumpyMLP: 積み重ねた重みのモデル
+
+    Raises:
+        ValueError: モデルが無い、または構成が異なる場合
+    """
+    if not members:
+        raise ValueError("積み重ねるモデルがありません")
+    first = members[0]
+    for member in members[1:]:
+        if member.activations != first.activations or \
+                [k.shape for k in member.kernels] != [k.shape for k in first.kernels]:
+            raise ValueError("構成の異なるモデルは積み重ねられません")
+    return NumpyMLP(
+        kernels=[np.ascontiguousarray(np.stack([m.kernels[i] for m in members])) for i in range(len(first.kernels))],
+        biases=[np.stack([m.biases[i] for m in members])[:, None, :] for i in range(len(first.biases))],
+        activations=first.activations,
+        x_scaler=first.x_scaler,
+        y_scaler=first.y_scaler,
+    )
+
+
+def convert_keras_snapshots(model: Any, snapshots: List[List[np.ndarray]], x_scaler: Any, y_scaler: Any) -> NumpyMLP:
+    """
+    学習中に保存した重みのスナップショットを積み重ねた NumPy 推論エンジンに変換する
+
+    Args:
+        model: 学習済み Keras モデル（スナップショットと同じ構成、変換後に元の重みに戻す）
+        snapshots: 各スナップショットの model.get_weights()
+        x_scaler: 特徴量の StandardScaler
+        y_scaler: 目的変数の StandardScaler
+
+    Returns:
+        NumpyMLP: 積み重ねた重みのモデル
+
+    Raises:
+        ValueError: 変換できない層・活性化関数を含む場合
+    """
+    weights = model.get_weights()
+    try:
+        members = []
+        for snapshot in snapshots:
+            model.set_weights(snapshot)
+            members.append(convert_keras_mlp(model, x_scaler, y_scaler))
+    finally:
+        model.set_weights(weights)
+    return stack_mlps(members)
+
+
+def mlp_path(model_path: str) -> str:
+    """学習済みモデル（.h5）に対応する変換済みファイルのパス"""
+    return os.path.splitext(model_path)[0] + config.MLP_SUFFIX
+
+
+def save_mlp(mlp: NumpyMLP, path: str) -> None:
+    """変換結果を .npz（非圧縮）に保存する"""
+    meta = {'format_version': config.FORMAT_VERSION, 'activations': mlp.activations,
+            'snapshots': mlp.n_snapshots, 'source_file': mlp.source_file}
+    arrays = {'x_mean': mlp.x_scaler.mean, 'x_scale': mlp.x_scaler.scale,
+              'y_mean': mlp.y_scaler.mean, 'y_scale': mlp.y_scaler.scale}
+    for i, (kernel, bias) in enumerate(zip(mlp.kernels, mlp.biases)):
+        arrays[f'kernel_{i}'], arrays[f'bias_{i}'] = kernel, bias
+    save_npz_atomic(path, meta, **arrays)
+
+
+def load_mlp_file(path: str) -> NumpyMLP:
+    """保存済みの変換結果を読み込む"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        if meta.get('format_version') != config.FORMAT_VERSION:
+            raise ValueError(f"変換済みファイルの形式が異なります: {path}")
+        n_layers = len(meta['activations'])
+        return NumpyMLP(
+            kernels=[data[f'kernel_{i}'] for i in range(n_layers)],
+            biases=[data[f'bias_{i}'] for i in range(n_layers)],
+            activations=meta['activations'],
+            x_scaler=AffineScaler(data['x_mean'], data['x_scale']),
+            y_scaler=AffineScaler(data['y_mean'], data['y_scale']),
+            source_file=meta.get('source_file'),
+        )
+
+
+def export_for_model(model: Any, x_scaler: Any, y_scaler: Any, model_path: str,
+                     snapshots: Optional[List[List[np.ndarray]]] = None) -> Optional[str]:
+    """
+    保存済みの Keras モデルを変換し、対応する .npz に保存する（学習時のモデル保存直後に呼び出す）
+
+    変換できないモデルの場合は古い変換済みファイルを削除して None を返す。
+
+    Args:
+        model: 学習済み Keras モデル
+        x_scaler: 特徴量の StandardScaler
+        y_scaler: 目的変数の StandardScaler
+        model_path: 保存済みモデル（.h5）のパス
+        snapshots: スナップショットアンサンブルの各スナップショットの重み（指定時は積み重ねて保存）
+
+    Returns:
+        Optional[str]: 変換済みファイルのパス
+    """
+    path = mlp_path(model_path)
+    try:
+        if snapshots:
+            mlp = convert_keras_snapshots(model, snapshots, x_scaler, y_scaler)
+        else:
+            mlp = convert_keras_mlp(model, x_scaler, y_scaler)
+    except ValueError as e:
+        print(f"NumPy推論エンジンへの変換をスキップします: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    mlp.source_file = file_stamp(model_path)
+    save_mlp(mlp, path)
+    print(f"NumPy推論エンジンを {path} に保存しました（{mlp.summary()}）")
+    return path
+
+
+def load_for_model(model_path: str) -> Optional[NumpyMLP]:
+    """
+    学習済みモデルに対応する変換済みファイルを読み込む
+
+    ファイルが無い場合、または保存元モデルファイルが変換後に更新されている場合は None を返す
+    （呼び出し側は TensorFlow でモデルを読み込む）。
+
+    Args:
+        model_path: 学習済みモデル（.h5）のパス
+
+    Returns:
+        Optional[NumpyMLP]: 変換結果
+    """
+    path = mlp_path(model_path)
+    if not os.path.exists(path) or not os.path.exists(model_path):
+        return None
+    try:
+        mlp = load_mlp_file(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"NumPy推論エンジンを読み込めません（TensorFlowで予測）: {e}")
+        return None
+    if mlp.source_file != file_stamp(model_path):
+        print(f"NumPy推論エンジンが学習済みモデルと一致しないため使用しません: {path}")
+        return None
+    return mlp
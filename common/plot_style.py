@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - matplotlib の遅延読み込みと描画設定
+
+matplotlib.pyplot の読み込み（数百ms）と日本語フォントの探索（font_manager.fontManager.ttflist
+の走査）は、グラフを描画する関数の中で初めて行う。各スクリプトはモジュールレベルでは
+rcParams の辞書のみを定義し、描画関数の先頭で次のように pyplot を取得する。
+
+    PLOT_RC = {'figure.dpi': 100, 'font.size': 10, ...}
+
+    def create_plot(...):
+        plt = pyplot(PLOT_RC, japanese_fonts=PLOT_FONTS)
+
+選択した日本語フォントは data/cache/plot_font.json に保存し、以降の起動ではフォント一覧を
+走査しない。matplotlib のバージョン・フォントキャッシュ（fontlist-*.json）の更新時刻・
+候補フォントが保存時と異なる場合、または保存したフォントファイルが無い場合は再探索する。
+"""
+
+import os
+import json
+import glob
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@dataclass(frozen=True)
+class PlotStyleConfig:
+    """描画設定クラス（設定値統一管理）"""
+    FONT_CACHE_FILE: str = os.path.join(PROJECT_ROOT, 'data', 'cache', 'plot_font.json')
+    # 日本語フォントの候補（先頭から順に、最初に見つかったものを使用）
+    JAPANESE_FONTS: List[str] = field(default_factory=lambda: [
+        'Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic', 'TakaoPGothic', 'IPAPGothic',
+    ])
+    # 日本語フォントが無い場合・代替フォント
+    FALLBACK_FONT: str = 'DejaVu Sans'
+
+
+# 統一設定インスタンス
+config = PlotStyleConfig()
+
+# プロセス内で選択済みのフォント（候補フォントの組 → フォント名）
+_CHOSEN_FONTS: Dict[tuple, Optional[str]] = {}
+
+
+def _font_environment() -> Dict[str, Any]:
+    """フォント選択の前提（matplotlib のバージョン・フォントキャッシュの更新時刻）"""
+    import matplotlib
+    fontlists = glob.glob(os.path.join(matplotlib.get_cachedir(), 'fontlist-*.json'))
+    return {'matplotlib': matplotlib.__version__,
+            'fontlist_mtime_ns': max((os.stat(p).st_mtime_ns for p in fontlists), default=0)}
+
+
+def _read_font_cache(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_font_cache(path: str, cache: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"フォント選択のキャッシュを保存できません: {e}")
+
+
+def japanese_font(candidates: Optional[Sequence[str]] = None, cache_file: Optional[str] = None) -> Optional[str]:
+    """
+    利用可能な日本語フォントを選択する（ディスクキャッシュ付き）
+
+    Args:
+        candidates: 候補フォント名（デフォルト: config値）
+        cache_file: キャッシュファイル（デフォルト: config値）
+
+    Returns:
+        Optional[str]: フォント名（候補がいずれも無い場合は None）
+    """
+    candidates = tuple(candidates or config.JAPANESE_FONTS)
+    if candidates in _CHOSEN_FONTS:
+        return _CHOSEN_FONTS[candidates]
+
+    cache_file = cache_file or config.FONT_CACHE_FILE
+    environment = _font_environment()
+    cache = _read_font_cache(cache_file)
+    key = "|".join(candidates)
+    entry = cache.get('choices', {}).get(key) if cache.get('environment') == environment else None
+    if entry is not None and (entry['path'] is None or os.path.exists(entry['path'])):
+        _CHOSEN_FONTS[candidates] = entry['font']
+        return entry['font']
+
+    from matplotlib import font_manager
+    paths = {f.name: f.fname for f in font_manager.fontManager.ttflist}
+    font = next((name for name in candidates if name in paths), None)
+    if cache.get('environment') != environment:
+        cache = {'environment': environment, 'choices': {}}
+    cache['choices'][key] = {'font': font, 'path': paths.get(font)}
+    _write_font_cache(cache_file, cache)
+    _CHOSEN_FONTS[candidates] = font
+    return font
+
+
+def pyplot(rc: Optional[Dict[str, Any]] = None, japanese_fonts: Optional[Sequence[str]] = None) -> Any:
+    """
+    matplotlib.pyplot を読み込み、描画設定を適用して返す（描画関数の先頭で呼び出す）
+
+    Args:
+        rc: 適用する rcParams
+        japanese_fonts: 日本語フォントの候補（指定した場合のみ font.family を日本語フォントにする）
+
+    Returns:
+        Any: matplotlib.pyplot モジュール
+    """
+    import matplotlib.pyplot as plt
+    if rc:
+        plt.rcParams.update(rc)
+    if japanese_fonts is not None:
+        font = japanese_font(japanese_fonts)
+        plt.rcParams['font.family'] = [font, config.FALLBACK_FONT] if font else config.FALLBACK_FONT
+        plt.rcParams['axes.unicode_minus'] = False
+    return plt
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 学習行の集約（サンプル重み付き）
+
+MONTH / WEEK / HOUR / TEMP（0.1℃単位）/ CALENDAR のような離散的な特徴量では、
+複数年の学習データに同一の特徴量ベクトルが多数現れる。同一行をまとめ、
+行数をサンプル重み、目的変数をグループ平均とした集約データで学習すると、
+平均二乗誤差の損失は定数項を除いて元データと一致する:
+
+    Σ_i (f(x) - y_i)^2 = n (f(x) - ȳ)^2 + Σ_i (y_i - ȳ)^2
+
+このため勾配・ヘッセ行列の和が一致する LightGBM（L2損失）、重み付き分散で分割を
+評価する決定木、および sample_weight 付きの Keras（MSE）は元データと同等の学習となる。
+（ブートストラップを行う RandomForest は抽出単位が集約行になるため厳密には一致しない。
+LightGBM の min_child_samples も集約後の行数で判定される。）
+
+集約後の行は各グループの初出順（＝時系列順）に並べるため、末尾を検証データとする
+validation_split の意味は概ね保たれる。
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+
+@dataclass
+class AggregatedRows:
+    """集約済み学習データ"""
+    X: np.ndarray
+    y: np.ndarray
+    weight: np.ndarray
+    # 元の各行が属する集約行のインデックス
+    inverse: np.ndarray
+    n_source_rows: int
+    elapsed: float = 0.0
+
+    @property
+    def reduction(self) -> float:
+        """行数の削減率（0〜1）"""
+        return 1.0 - len(self.X) / self.n_source_rows if self.n_source_rows else 0.0
+
+    def summary(self) -> str:
+        return (f"学習行集約: {self.n_source_rows:,}行 → {len(self.X):,}行 "
+                f"(削減率 {self.reduction * 100:.1f}%, {self.elapsed:.3f}秒)")
+
+
+def aggregate_rows(X: np.ndarray, y: np.ndarray, dtype: Optional[str] = None) -> AggregatedRows:
+    """
+    同一の特徴量行をまとめ、行数を重み・目的変数の平均を目的変数とする
+
+    行をバイト列として比較するため、同じビットパターンの NaN は同一とみなす。
+
+    Args:
+        X: 特徴量行列
+        y: 目的変数（1次元）
+        dtype: 出力する X / y / weight のデータ型（デフォルト: X のデータ型）
+
+    Returns:
+        AggregatedRows: 集約済み学習データ
+    """
+    start_time = time.time()
+    X = np.ascontiguousarray(X)
+    y = np.asarray(y).reshape(-1)
+    if len(X) != len(y):
+        raise ValueError(f"行数が一致しません: X={len(X)}, y={len(y)}")
+    dtype = dtype or X.dtype
+    if len(X) == 0:
+        return AggregatedRows(X.astype(dtype), y.astype(dtype), np.empty(0, dtype=dtype),
+                              np.empty(0, dtype=np.int64), 0)
+
+    # 行をバイト列（void型）として一意化する
+    row_view = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).reshape(-1)
+    _, first_index, inverse = np.unique(row_view, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    # 初出順に並べ替える
+    order = np.argsort(first_index, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    inverse = rank[inverse]
+
+    counts = np.bincount(inverse, minlength=len(order))
+    y_sum = np.bincount(inverse, weights=y.astype(np.float64), minlength=len(order))
+    return AggregatedRows(
+        X=X[first_index[order]].astype(dtype, copy=False),
+        y=(y_sum / counts).astype(dtype),
+        weight=counts.astype(dtype),
+        inverse=inverse,
+        n_source_rows=len(X),
+        elapsed=time.time() - start_time,
+    )
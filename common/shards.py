@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - アウトオブコア（シャード分割）データセット
+
+多年・多エリアのデータセットをメモリに一括展開せずに作成・学習するためのモジュール。
+
+作成時は（エリア, 年）単位のパーティションを年別特徴量ブロック（common/year_blocks.py、
+メモリマップ）から1つずつ取り出し、特徴量計算（需要ラグ・移動窓特徴量は前年末を
+助走期間として年単位で計算）を行って、最大 MAX_SHARD_ROWS 行のシャードとして書き出す。
+同時にメモリ上に保持するのは1パーティション分のみとなる。
+
+    data/shards/train-00000-X.npy / -y.npy / -keys.npy   学習シャード
+    data/shards/test-00000-X.npy  / -y.npy / -keys.npy   テストシャード
+    data/shards/manifest.json                            マニフェスト（最後に書き込む）
+
+読み込み側（ShardSet）はシャードをメモリマップで開き、行範囲単位で取り出す。
+一度に取り出す行数はメモリ予算（MB）から budget_rows() で決める。
+学習・テストの分割は従来と同じく、エリアごとに最も新しい年をテスト年とする
+（単年指定時は末尾 SINGLE_YEAR_TEST_SIZE の割合）。
+"""
+
+import os
+import json
+import datetime as dt
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.year_blocks import (
+    config as block_config, load_year_block, feature_columns, split_years, _append_demand_features,
+)
+from common.time_split import tail_holdout
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@dataclass(frozen=True)
+class ShardConfig:
+    """シャードデータセット設定クラス（設定値統一管理）"""
+    SHARD_DIR: str = os.path.join(PROJECT_ROOT, 'data', 'shards')
+    MANIFEST_FILE: str = "manifest.json"
+    FORMAT_VERSION: int = 1
+
+    # 1シャードの最大行数
+    MAX_SHARD_ROWS: int = 1_000_000
+    # 読み込み時に一度に展開する行のメモリ予算（MB）
+    MEMORY_BUDGET_MB: int = 256
+
+    # エリア別入力データ（data/areas/<エリア名>/juyo-YYYY.csv 等）のディレクトリ
+    AREAS_DIR: str = os.path.join(PROJECT_ROOT, 'data', 'areas')
+    # 複数エリア時に付加するエリア番号列
+    AREA_COLUMN: str = "AREA"
+    # 単一エリア（data/ 直下の入力データ）のエリア名
+    DEFAULT_AREA: str = "default"
+
+
+# 統一設定インスタンス
+config = ShardConfig()
+
+
+def manifest_path(shard_dir: Optional[str] = None) -> str:
+    return os.path.join(shard_dir or config.SHARD_DIR, config.MANIFEST_FILE)
+
+
+def shards_exist(shard_dir: Optional[str] = None) -> bool:
+    """マニフェストが書き込み済み（＝完全な）シャードデータセットが存在するか"""
+    return os.path.exists(manifest_path(shard_dir))
+
+
+def discover_areas(areas_dir: Optional[str] = None) -> Dict[str, str]:
+    """
+    エリア別入力データディレクトリを取得する
+
+    AREAS_DIR 配下で juyo-*.csv を含むサブディレクトリをエリアとする。
+
+    Args:
+        areas_dir: エリア別入力データのディレクトリ（デフォルト: config値）
+
+    Returns:
+        Dict[str, str]: エリア名 → 入力データディレクトリ（名前順、無ければ空）
+    """
+    areas_dir = areas_dir or config.AREAS_DIR
+    if not os.path.isdir(areas_dir):
+        return {}
+    areas = {}
+    for name in sorted(os.listdir(areas_dir)):
+        path = os.path.join(areas_dir, name)
+        if os.path.isdir(path) and any(f.startswith("juyo-") for f in os.listdir(path)):
+            areas[name] = path
+    return areas
+
+
+def _area_cache_dir(area: str, cache_dir: Optional[str]) -> Optional[str]:
+    """エリアごとの年別特徴量ブロックのキャッシュディレクトリ"""
+    if area == config.DEFAULT_AREA:
+        return cache_dir
+    return os.path.join(cache_dir or block_config.CACHE_DIR, area)
+
+
+def iter_partitions(years: Sequence[int],
+                    areas: Dict[str, str],
+                    cache_dir: Optional[str] = None) -> Iterator[Tuple[str, int, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    （エリア, 年）パーティションを1つずつ特徴量計算して返す
+
+    Args:
+        years: 対象年リスト
+        areas: エリア名 → 入力データディレクトリ
+        cache_dir: 年別特徴量ブロックのキャッシュディレクトリ（デフォルト: config値）
+
+    Yields:
+        Tuple[str, int, np.ndarray, np.ndarray, np.ndarray]: エリア名, 年, keys, X, y
+    """
+    area_codes = {area: code for code, area in enumerate(areas)}
+    for area, data_dir in areas.items():
+        area_cache = _area_cache_dir(area, cache_dir)
+        for year in years:
+            block = load_year_block(year, data_dir, area_cache)
+            keys, X, y = block.keys, block.X, block.y
+            if block_config.DEMAND_FEATURES:
+                keys, X, y = _append_demand_features([year], keys, X, y, data_dir, area_cache)
+            if len(areas) > 1:
+                X = np.hstack([X, np.full((len(X), 1), area_codes[area], dtype=X.dtype)])
+            yield area, year, keys, X, y
+
+
+def write_shards(years: Sequence[int],
+                 areas: Optional[Dict[str, str]] = None,
+                 shard_dir: Optional[str] = None,
+                 cache_dir: Optional[str] = None,
+                 max_shard_rows: Optional[int] = None,
+                 test_size: Optional[float] = None) -> Dict[str, Any]:
+    """
+    多年・多エリアのデータセットをシャード単位で書き出す
+
+    パーティションごとに特徴量を計算して直ちにシャードへ書き出すため、
+    ピークメモリは1パーティション（1エリア・1年）分に抑えられる。
+
+    Args:
+        years: 対象年リスト（最も新しい年をテスト年とする）
+        areas: エリア名 → 入力データディレクトリ（デフォルト: 単一エリア data/）
+        shard_dir: 出力ディレクトリ（デフォルト: config値）
+        cache_dir: 年別特徴量ブロックのキャッシュディレクトリ（デフォルト: config値）
+        max_shard_rows: 1シャードの最大行数（デフォルト: config値）
+        test_size: 単年指定時のテスト割合（デフォルト: year_blocks の config値）
+
+    Returns:
+        Dict[str, Any]: 書き込んだマニフェスト
+
+    Raises:
+        ValueError: 年が指定されていない場合
+    """
+    if not years:
+        raise ValueError("対象年が指定されていません")
+    train_years, test_year = split_years(years)
+    years = train_years + [test_year]
+    areas = areas or {config.DEFAULT_AREA: block_config.DATA_DIR}
+    shard_dir = shard_dir or config.SHARD_DIR
+    max_shard_rows = max_shard_rows or config.MAX_SHARD_ROWS
+    test_size = block_config.SINGLE_YEAR_TEST_SIZE if test_size is None else test_size
+
+    os.makedirs(shard_dir, exist_ok=True)
+    if shards_exist(shard_dir):
+        os.remove(manifest_path(shard_dir))
+    for name in os.listdir(shard_dir):
+        if name.endswith(".npy") and name.startswith(("train-", "test-")):
+            os.remove(os.path.join(shard_dir, name))
+
+    shards: List[Dict[str, Any]] = []
+    counters = {'train': 0, 'test': 0}
+
+    def write(split: str, area: str, year: int, keys: np.ndarray, X: np.ndarray, y: np.ndarray) -> None:
+        for start in range(0, len(keys), max_shard_rows):
+            stop = min(start + max_shard_rows, len(keys))
+            name = f"{split}-{counters[split]:05d}"
+            counters[split] += 1
+            for suffix, array in (('X', X), ('y', y), ('keys', keys)):
+                np.save(os.path.join(shard_dir, f"{name}-{suffix}.npy"), np.ascontiguousarray(array[start:stop]))
+            shards.append({'name': name, 'split': split, 'area': area, 'year': int(year), 'rows': stop - start})
+
+    n_features = 0
+    for area, year, keys, X, y in iter_partitions(years, areas, cache_dir):
+        n_features = X.shape[1]
+        if len(years) == 1:
+            split = tail_holdout(len(keys), test_size)
+            for name, index in (('train', split.train_index), ('test', split.test_index)):
+                if len(index):
+                    write(name, area, year, keys[index[0]:index[-1] + 1],
+                          X[index[0]:index[-1] + 1], y[index[0]:index[-1] + 1])
+        else:
+            write('test' if year == test_year else 'train', area, year, keys, X, y)
+
+    columns = feature_columns() + ([config.AREA_COLUMN] if len(areas) > 1 else [])
+    if n_features != len(columns):
+        raise ValueError(f"特徴量列数が一致しません: {n_features} != {len(columns)}")
+    manifest = {
+        'version': config.FORMAT_VERSION,
+        'created': dt.datetime.now().isoformat(timespec='seconds'),
+        'years': years,
+        'areas': list(areas),
+        'feature_columns': columns,
+        'target_columns': list(block_config.TARGET_COLUMNS),
+        'dtype': block_config.DATA_TYPE,
+        'shards': shards,
+    }
+    tmp_path = manifest_path(shard_dir) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(shard_dir))
+    return manifest
+
+
+class ShardSet:
+    """
+    シャードデータセットの学習またはテスト部分（行はシャード順に連結した通し番号で参照）
+
+    各シャードはメモリマップで開くため、rows() で取り出した範囲のみがメモリに展開される。
+    """
+
+    def __init__(self, shard_dir: Optional[str] = None, split: str = 'train'):
+        self.shard_dir = shard_dir or config.SHARD_DIR
+        self.split = split
+        with open(manifest_path(self.shard_dir), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != config.FORMAT_VERSION:
+            raise ValueError(f"シャード形式のバージョンが異なります: {self.manifest.get('version')}")
+        self.shards = [s for s in self.manifest['shards'] if s['split'] == split]
+        if not self.shards:
+            raise ValueError(f"{split} シャードがありません: {self.shard_dir}")
+        self.offsets = np.concatenate(([0], np.cumsum([s['rows'] for s in self.shards]))).astype(np.int64)
+        self._arrays: Dict[Tuple[int, str], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return list(self.manifest['feature_columns'])
+
+    @property
+    def n_features(self) -> int:
+        return len(self.manifest['feature_columns'])
+
+    def shard_array(self, i: int, kind: str = 'X') -> np.ndarray:
+        """i番目のシャードの配列（X / y / keys）をメモリマップで取得する"""
+        if (i, kind) not in self._arrays:
+            path = os.path.join(self.shard_dir, f"{self.shards[i]['name']}-{kind}.npy")
+            self._arrays[(i, kind)] = np.load(path, mmap_mode='r')
+        return self._arrays[(i, kind)]
+
+    def rows(self, start: int, stop: int, kind: str = 'X') -> np.ndarray:
+        """
+        通し番号 [start, stop) の行を取り出す（1シャード内ならメモリマップのビュー）
+
+        Args:
+            start: 開始行
+            stop: 終了行（含まない）
+            kind: 'X' / 'y' / 'keys'
+
+        Returns:
+            np.ndarray: 取り出した行
+        """
+        start, stop = max(0, int(start)), min(len(self), int(stop))
+        first = int(np.searchsorted(self.offsets, start, side='right')) - 1
+        parts = []
+        i = first
+        while i < len(self.shards) and self.offsets[i] < stop:
+            lo = max(start, self.offsets[i]) - self.offsets[i]
+            hi = min(stop, self.offsets[i + 1]) - self.offsets[i]
+            parts.append(self.shard_array(i, kind)[lo:hi])
+            i += 1
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return self.shard_array(0, kind)[0:0]
+        return np.concatenate(parts)
+
+    def budget_rows(self, memory_budget_mb: Optional[float] = None, copies: int = 1) -> int:
+        """
+        メモリ予算内で一度に展開できる行数を求める
+
+        Args:
+            memory_budget_mb: メモリ予算（MB、デフォルト: config値）
+            copies: 展開後に作成する特徴量行列のコピー数（標準化後の配列など）
+
+        Returns:
+            int: 行数（最低1行）
+        """
+        memory_budget_mb = memory_budget_mb or config.MEMORY_BUDGET_MB
+        itemsize = np.dtype(self.manifest['dtype']).itemsize
+        row_bytes = itemsize * (self.n_features * (1 + copies) + 1)
+        return max(1, int(memory_budget_mb * 1024 * 1024) // row_bytes)
+
+    def iter_chunks(self,
+                    chunk_rows: Optional[int] = None,
+                    memory_budget_mb: Optional[float] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        メモリ予算内の行数ずつ X, y を順に返す
+
+        Args:
+            chunk_rows: 1回に返す行数（デフォルト: budget_rows() の値）
+            memory_budget_mb: メモリ予算（MB、chunk_rows 未指定時に使用）
+
+        Yields:
+            Tuple[np.ndarray, np.ndarray]: X, y
+        """
+        chunk_rows = chunk_rows or self.budget_rows(memory_budget_mb)
+        for start in range(0, len(self), chunk_rows):
+            yield self.rows(start, start + chunk_rows), self.rows(start, start + chunk_rows, 'y')
+
+    def area_ranges(self) -> List[Tuple[str, int, int]]:
+        """
+        エリアごとの行範囲を取得する（シャードはエリアごとに年順で連続して書き出される）
+
+        Returns:
+            List[Tuple[str, int, int]]: エリア名, 開始行, 終了行（含まない）
+        """
+        ranges: List[Tuple[str, int, int]] = []
+        for i, shard in enumerate(self.shards):
+            area = shard.get('area', config.DEFAULT_AREA)
+            if ranges and ranges[-1][0] == area:
+                ranges[-1] = (area, ranges[-1][1], int(self.offsets[i + 1]))
+            else:
+                ranges.append((area, int(self.offsets[i]), int(self.offsets[i + 1])))
+        return ranges
+
+    def tail_split(self, fraction: float) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        エリアごとに末尾 fraction の割合の行を時系列順の検証範囲とする
+
+        複数エリアの場合、全体の末尾は最後のエリアの最終年のみとなるため、
+        各エリアの行範囲の末尾から検証データを取り出す。
+
+        Args:
+            fraction: 検証データの割合（0〜1）
+
+        Returns:
+            Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]: 学習行範囲, 検証行範囲
+        """
+        fit_ranges, val_ranges = [], []
+        for _, start, stop in self.area_ranges():
+            n_val = int((stop - start) * fraction)
+            if stop - n_val > start:
+                fit_ranges.append((start, stop - n_val))
+            if n_val:
+                val_ranges.append((stop - n_val, stop))
+        return fit_ranges, val_ranges
+
+    def labels(self) -> np.ndarray:
+        """目的変数全体を取得する（1列のため全行を展開してよい）"""
+        return self.rows(0, len(self), 'y').reshape(-1)
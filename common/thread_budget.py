@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - CPUスレッド予算管理
+
+LightGBM（既定で全コア）・RandomForest（n_jobs=-1）・TensorFlow（intra/inter-op
+スレッドプール）・BLAS / OpenMP はそれぞれ独自に全コア分のスレッドを起動するため、
+年組み合わせ最適化やダッシュボードから複数の学習・予測を同時に実行すると
+コア数を大きく超えるスレッドが競合する。
+
+本モジュールは実行中のジョブごとにスレッド数（コア割当）を明示的に決め、
+各ライブラリへ同じ値を適用する。
+
+割当は data/cache/thread_budget/<PID>.json（リース）としてプロセス間で共有し、
+新しいジョブは他の実行中ジョブの割当を差し引いた空きスレッドから割り当てる
+（終了済みプロセスのリースは自動で破棄する）。要求スレッド数は引数または
+環境変数 AI_THREADS で指定する。未指定の場合は全スレッドを実行中ジョブ数（自身を含む）で
+等分した数とする（他に実行中のジョブが無ければ全スレッド）。起動後のジョブの割当は変更できないため、
+同時実行が前提の場合は DEFAULT_SHARE_JOBS を2以上にして後から起動するジョブの分を残す。
+
+    threads = configure_threads("LightGBM学習")   # 割当 + 各ライブラリへの適用
+    lgb.LGBMRegressor(n_jobs=threads) / RandomForestRegressor(n_jobs=threads)
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import datetime as dt
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@dataclass(frozen=True)
+class ThreadBudgetConfig:
+    """CPUスレッド予算設定クラス（設定値統一管理）"""
+    LEASE_DIR: str = os.path.join(PROJECT_ROOT, 'data', 'cache', 'thread_budget')
+    LOCK_FILE: str = "budget.lock"
+    # 全ジョブで共有するスレッド数（None の場合は CPU 数）
+    TOTAL_THREADS: Optional[int] = None
+    # 要求スレッド数を指定する環境変数
+    ENV_VAR: str = "AI_THREADS"
+    # 要求スレッド数未指定のジョブの割当を決める最小の分割数
+    # （1: 単独実行時は全スレッド、2以上: 単独実行時も後から起動するジョブの分を残す）
+    DEFAULT_SHARE_JOBS: int = 1
+    # ロック取得の待ち時間（秒、これより古いロックファイルは異常終了の残骸として削除）
+    LOCK_TIMEOUT_SEC: float = 10.0
+    # 割当後に設定するネイティブスレッドプールの環境変数（以降に起動されるライブラリ向け）
+    THREAD_ENV_VARS: List[str] = field(default_factory=lambda: [
+        'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+    ])
+
+
+# 統一設定インスタンス
+config = ThreadBudgetConfig()
+
+# threadpoolctl の制限オブジェクト（参照を保持している間のみ制限が有効）
+_THREADPOOL_LIMITS: Any = None
+
+
+@dataclass
+class ThreadBudget:
+    """ジョブに割り当てたスレッド数"""
+    job: str
+    threads: int
+    lease_path: Optional[str] = None
+
+    def release(self) -> None:
+        """リースを返却する（プロセス終了時にも自動で返却される）"""
+        if self.lease_path:
+            with suppress(FileNotFoundError):
+                os.remove(self.lease_path)
+        self.lease_path = None
+
+
+def total_threads() -> int:
+    """全ジョブで共有するスレッド数"""
+    return config.TOTAL_THREADS or os.cpu_count() or 1
+
+
+def _pid_alive(pid: int) -> bool:
+    """プロセスが実行中か（psutil が無い場合は OS の API で確認する）"""
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if pid <= 0:
+        return False
+    if os.name == 'nt':
+        # Windows の os.kill(pid, 0) は生存確認ではなく CTRL_C_EVENT の送信となるため使用しない
+        return _windows_pid_alive(pid)
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _windows_pid_alive(pid: int) -> bool:
+    """OpenProcess / GetExitCodeProcess によるプロセスの生存確認（Windows）"""
+    import ctypes
+    from ctypes import wintypes
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    STILL_ACTIVE = 259
+    ERROR_ACCESS_DENIED = 5
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        # 権限不足で開けない場合はプロセスが存在する
+        return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+    try:
+        exit_code = wintypes.DWORD()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+            return False
+        return exit_code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+@contextmanager
+def _budget_lock(lease_dir: str) -> Iterator[None]:
+    """リース一覧の読み書きを排他する（ロックファイルの排他作成による簡易ロック）"""
+    lock_path = os.path.join(lease_dir, config.LOCK_FILE)
+    deadline = time.time() + config.LOCK_TIMEOUT_SEC
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > config.LOCK_TIMEOUT_SEC:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f"スレッド予算のロックを取得できません: {lock_path}")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        # 他のプロセスが古いロックとして削除済みの場合がある
+        with suppress(FileNotFoundError):
+            os.remove(lock_path)
+
+
+def active_leases(lease_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    実行中ジョブのリース一覧を取得する（終了済みプロセスのリースは削除する）
+
+    Args:
+        lease_dir: リースディレクトリ（デフォルト: config値）
+
+    Returns:
+        List[Dict[str, Any]]: リース（pid, job, threads, started）
+    """
+    lease_dir = lease_dir or config.LEASE_DIR
+    leases = []
+    if not os.path.isdir(lease_dir):
+        return leases
+    for name in os.listdir(lease_dir):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(lease_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lease = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if _pid_alive(int(lease.get('pid', -1))):
+            leases.append(lease)
+        else:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+    return leases
+
+
+def allocate(job: str, requested: Optional[int] = None, lease_dir: Optional[str] = None) -> ThreadBudget:
+    """
+    ジョブにスレッドを割り当て、リースを登録する
+
+    他の実行中ジョブの割当を差し引いた空きスレッド（最低1）のうち、要求数まで割り当てる。
+    要求数が未指定の場合は、全スレッドを実行中ジョブ数（自身を含む、最低 DEFAULT_SHARE_JOBS）で
+    等分した数までとする。
+
+    Args:
+        job: ジョブ名（ログ・リース表示用）
+        requested: 要求スレッド数（デフォルト: 環境変数 AI_THREADS、未設定なら等分）
+        lease_dir: リースディレクトリ（デフォルト: config値）
+
+    Returns:
+        ThreadBudget: 割当結果
+    """
+    if requested is None and os.environ.get(config.ENV_VAR):
+        requested = int(os.environ[config.ENV_VAR])
+    lease_dir = lease_dir or config.LEASE_DIR
+    os.makedirs(lease_dir, exist_ok=True)
+    lease_path = os.path.join(lease_dir, f"{os.getpid()}.json")
+
+    with _budget_lock(lease_dir):
+        others = [l for l in active_leases(lease_dir) if int(l['pid']) != os.getpid()]
+        free = max(1, total_threads() - sum(int(l['threads']) for l in others))
+        share = total_threads() // max(config.DEFAULT_SHARE_JOBS, len(others) + 1)
+        threads = max(1, min(requested or share, free))
+        with open(lease_path, 'w', encoding='utf-8') as f:
+            json.dump({'pid': os.getpid(), 'job': job, 'threads': threads,
+                       'started': dt.datetime.now().isoformat(timespec='seconds')}, f, ensure_ascii=False)
+
+    budget = ThreadBudget(job, threads, lease_path)
+    atexit.register(budget.release)
+    print(f"スレッド割当: {job} = {threads}スレッド "
+          f"(全{total_threads()}, 他ジョブ使用中 {sum(int(l['threads']) for l in others)}, "
+          f"要求 {requested or f'等分 {share}'})")
+    return budget
+
+
+def apply_thread_budget(threads: int) -> None:
+    """
+    スレッド数を BLAS / OpenMP（threadpoolctl）・TensorFlow に適用する
+
+    LightGBM の num_threads と scikit-learn の n_jobs は呼び出し側がモデルのパラメータとして指定する。
+    TensorFlow は読み込み済みであれば threading 設定、未読み込みであれば環境変数で指定する
+    （演算の初回実行後は変更できない）。
+
+    Args:
+        threads: スレッド数
+    """
+    global _THREADPOOL_LIMITS
+    for name in config.THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+        _THREADPOOL_LIMITS = threadpool_limits(limits=threads)
+    except ImportError:
+        pass
+
+    # TensorFlow: 未読み込みの場合は初期化時に参照される環境変数で指定する
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(min(2, threads))
+    tf = sys.modules.get('tensorflow')
+    if tf is not None:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(min(2, threads))
+        except RuntimeError as e:
+            print(f"TensorFlowのスレッド数は初期化済みのため変更できません: {e}")
+
+
+def configure_threads(job: str, requested: Optional[int] = None) -> int:
+    """
+    スレッドを割り当てて各ライブラリに適用する（学習・予測スクリプトの起動時に呼び出す）
+
+    Args:
+        job: ジョブ名
+        requested: 要求スレッド数（デフォルト: 環境変数 AI_THREADS）
+
+    Returns:
+        int: 割り当てたスレッド数（LightGBM の num_threads / scikit-learn の n_jobs に指定する）
+    """
+    budget = allocate(job, requested)
+    apply_thread_budget(budget.threads)
+    return budget.threads
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 時系列分割エンジン
+
+キャッシュ済み特徴量行列（common/year_blocks.py）の行に対する学習・テスト分割を
+整数インデックス配列として返すモジュール。分割結果からはビュー（連続区間は
+スライスによるゼロコピー）を直接取り出せるため、分割と学習の間でCSVの
+書き出し・再読み込みを行う必要がない。
+
+ランダム分割（train_test_split）は未来の時刻を学習側に混入させるため使用せず、
+以下の時系列順の分割方式のみを提供する。
+
+    year_holdout      学習年 → テスト年（年組み合わせ最適化と同じ規約）
+    tail_holdout      末尾の一定割合をテストとする（単年指定時）
+    rolling_origin    固定長の学習窓をずらしながら直後の期間をテストとする
+    expanding_window  学習窓の開始を固定し、終端を伸ばしながら直後の期間をテストとする
+
+行は時刻キー（epoch-hour）の昇順に並んでいることを前提とする。
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class TimeSplit:
+    """学習・テスト分割（行インデックスは昇順の int64 配列）"""
+    name: str
+    train_index: np.ndarray
+    test_index: np.ndarray
+
+    @property
+    def n_train(self) -> int:
+        return len(self.train_index)
+
+    @property
+    def n_test(self) -> int:
+        return len(self.test_index)
+
+    def masks(self, n_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        分割をブールマスクとして取得する
+
+        Args:
+            n_rows: 全行数
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 学習行マスク, テスト行マスク
+        """
+        train_mask = np.zeros(n_rows, dtype=bool)
+        test_mask = np.zeros(n_rows, dtype=bool)
+        train_mask[self.train_index] = True
+        test_mask[self.test_index] = True
+        return train_mask, test_mask
+
+    def apply(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        特徴量・目的変数から学習・テスト部分を取り出す
+
+        Args:
+            X: 特徴量行列
+            y: 目的変数
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: X_train, X_test, y_train, y_test
+        """
+        return (take_rows(X, self.train_index), take_rows(X, self.test_index),
+                take_rows(y, self.train_index), take_rows(y, self.test_index))
+
+
+def take_rows(array: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """
+    行インデックスで配列を取り出す（連続区間ならスライスのビューを返す）
+
+    Args:
+        array: 対象配列（メモリマップ可）
+        index: 昇順の行インデックス
+
+    Returns:
+        np.ndarray: 取り出した行（連続区間はゼロコピー、それ以外はコピー）
+    """
+    if len(index) == 0:
+        return array[0:0]
+    start, stop = int(index[0]), int(index[-1]) + 1
+    if stop - start == len(index):
+        return array[start:stop]
+    return array[index]
+
+
+def years_of(keys: np.ndarray) -> np.ndarray:
+    """
+    epoch-hour 配列から西暦年をベクトル演算で取得する
+
+    Args:
+        keys: epoch-hour 配列
+
+    Returns:
+        np.ndarray: 西暦年（int64）
+    """
+    days = np.asarray(keys, dtype=np.int64) // 24
+    return days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+def _check_chronological(keys: np.ndarray, split: TimeSplit) -> TimeSplit:
+    """学習側にテスト期間以降の時刻が含まれていないことを確認する"""
+    if split.n_train == 0 or split.n_test == 0:
+        raise ValueError(f"{split.name}: 学習またはテストデータが空です "
+                         f"(学習={split.n_train}行, テスト={split.n_test}行)")
+    if keys[split.train_index[-1]] >= keys[split.test_index[0]]:
+        raise ValueError(f"{split.name}: 学習データにテスト期間以降の時刻が含まれています")
+    return split
+
+
+def year_holdout(keys: np.ndarray,
+                 test_year: int,
+                 train_years: Optional[Iterable[int]] = None) -> TimeSplit:
+    """
+    学習年・テスト年による分割を作成する
+
+    Args:
+        keys: epoch-hour 配列（昇順）
+        test_year: テスト年
+        train_years: 学習年（デフォルト: テスト年より前の全年）
+
+    Returns:
+        TimeSplit: 分割
+
+    Raises:
+        ValueError: 学習・テストが空の場合、または学習年がテスト年以降を含む場合
+    """
+    years = years_of(keys)
+    test_year = int(test_year)
+    if train_years is None:
+        train_mask = years < test_year
+        label = f"<{test_year}"
+    else:
+        train_years = sorted(set(int(y) for y in train_years))
+        train_mask = np.isin(years, train_years)
+        label = ",".join(str(y) for y in train_years)
+    split = TimeSplit(name=f"year_holdout[{label}→{test_year}]",
+                      train_index=np.flatnonzero(train_mask),
+                      test_index=np.flatnonzero(years == test_year))
+    return _check_chronological(keys, split)
+
+
+def tail_holdout(n_rows: int, test_size: float) -> TimeSplit:
+    """
+    末尾 test_size の割合を時系列順にテストとする分割を作成する
+
+    Args:
+        n_rows: 行数
+        test_size: テスト割合（0〜1）
+
+    Returns:
+        TimeSplit: 分割
+    """
+    n_test = int(np.ceil(n_rows * test_size))
+    return TimeSplit(name=f"tail_holdout[{test_size:g}]",
+                     train_index=np.arange(0, n_rows - n_test, dtype=np.int64),
+                     test_index=np.arange(n_rows - n_test, n_rows, dtype=np.int64))
+
+
+def _window_splits(keys: np.ndarray,
+                   name: str,
+                   train_hours: Optional[int],
+                   min_train_hours: int,
+                   test_hours: int,
+                   step_hours: Optional[int],
+                   gap_hours: int,
+                   n_splits: Optional[int]) -> List[TimeSplit]:
+    """rolling_origin / expanding_window 共通の窓分割生成処理"""
+    if test_hours <= 0:
+        raise ValueError("test_hours は正の値を指定してください")
+    keys = np.asarray(keys, dtype=np.int64)
+    if len(keys) == 0:
+        return []
+    step_hours = step_hours or test_hours
+    first, last = int(keys[0]), int(keys[-1])
+
+    # 時刻（行数ではない）で窓を決めるため、欠損時刻があっても期間長は一定になる
+    origins = np.arange(first + min_train_hours + gap_hours, last - test_hours + 2, step_hours, dtype=np.int64)
+    if n_splits is not None:
+        origins = origins[-n_splits:]
+
+    splits: List[TimeSplit] = []
+    for origin in origins:
+        train_end = origin - gap_hours
+        train_start = first if train_hours is None else train_end - train_hours
+        lo, hi = np.searchsorted(keys, [train_start, train_end])
+        t_lo, t_hi = np.searchsorted(keys, [origin, origin + test_hours])
+        if hi <= lo or t_hi <= t_lo:
+            continue
+        splits.append(TimeSplit(name=f"{name}[{len(splits)}]",
+                                train_index=np.arange(lo, hi, dtype=np.int64),
+                                test_index=np.arange(t_lo, t_hi, dtype=np.int64)))
+    return splits
+
+
+def rolling_origin(keys: np.ndarray,
+                   train_hours: int,
+                   test_hours: int,
+                   step_hours: Optional[int] = None,
+                   gap_hours: int = 0,
+                   n_splits: Optional[int] = None) -> List[TimeSplit]:
+    """
+    固定長の学習窓をずらしていくローリングオリジン分割を作成する
+
+    Args:
+        keys: epoch-hour 配列（昇順）
+        train_hours: 学習窓の長さ（時間）
+        test_hours: テスト窓の長さ（時間）
+        step_hours: オリジンの移動幅（デフォルト: test_hours）
+        gap_hours: 学習窓終端とテスト開始の間隔（時間）
+        n_splits: 最新側から採用する分割数（デフォルト: 全て）
+
+    Returns:
+        List[TimeSplit]: 時系列順の分割リスト
+    """
+    if train_hours <= 0:
+        raise ValueError("train_hours は正の値を指定してください")
+    return _window_splits(keys, "rolling_origin", train_hours, train_hours,
+                          test_hours, step_hours, gap_hours, n_splits)
+
+
+def expanding_window(keys: np.ndarray,
+                     test_hours: int,
+                     min_train_hours: int,
+                     step_hours: Optional[int] = None,
+                     gap_hours: int = 0,
+                     n_splits: Optional[int] = None) -> List[TimeSplit]:
+    """
+    学習窓の開始を固定し終端を伸ばしていく拡張窓分割を作成する
+
+    Args:
+        keys: epoch-hour 配列（昇順）
+        test_hours: テスト窓の長さ（時間）
+        min_train_hours: 最初の分割の学習窓の長さ（時間）
+        step_hours: オリジンの移動幅（デフォルト: test_hours）
+        gap_hours: 学習窓終端とテスト開始の間隔（時間）
+        n_splits: 最新側から採用する分割数（デフォルト: 全て）
+
+    Returns:
+        List[TimeSplit]: 時系列順の分割リスト
+    """
+    if min_train_hours <= 0:
+        raise ValueError("min_train_hours は正の値を指定してください")
+    return _window_splits(keys, "expanding_window", None, min_train_hours,
+                          test_hours, step_hours, gap_hours, n_splits)
+
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 時刻キー共通モジュール
+
+電力需要（TEPCO）・気温（気象庁 / Open-Meteo）はいずれも日本時間の
+ローカル時刻で提供されるため、1970-01-01 00:00（JST）からの経過時間数
+（epoch-hour）を int64 の結合キーとして使用する。
+
+pandas は日時配列を変換する関数の中で読み込む（calendar_fields は NumPy のみ）。
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from typing import TYPE_CHECKING, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# epoch-hour の基準時刻（JSTローカル時刻として解釈）
+EPOCH: np.datetime64 = np.datetime64("1970-01-01T00:00:00")
+ONE_HOUR: np.timedelta64 = np.timedelta64(1, 'h')
+JST_OFFSET: dt.timedelta = dt.timedelta(hours=9)
+
+
+def to_epoch_hours(values: Union[pd.Series, pd.DatetimeIndex, np.ndarray, list]) -> np.ndarray:
+    """
+    日時配列を epoch-hour（int64）へベクトル変換する
+
+    分以下は切り捨てる。タイムゾーン付きの値は JST に変換してから処理する。
+
+    Args:
+        values: 日時配列（Series / DatetimeIndex / datetime64配列 / 文字列リスト）
+
+    Returns:
+        np.ndarray: epoch-hour 配列（int64）
+    """
+    import pandas as pd
+    index = pd.DatetimeIndex(pd.to_datetime(values))
+    if index.tz is not None:
+        index = index.tz_convert("Asia/Tokyo").tz_localize(None)
+    return ((index - EPOCH) // ONE_HOUR).to_numpy(dtype=np.int64)
+
+
+def from_epoch_hours(hours: np.ndarray) -> pd.DatetimeIndex:
+    """
+    epoch-hour 配列を JST ローカル時刻の DatetimeIndex に戻す
+
+    Args:
+        hours: epoch-hour 配列
+
+    Returns:
+        pd.DatetimeIndex: 日時インデックス
+    """
+    import pandas as pd
+    return EPOCH + pd.to_timedelta(np.asarray(hours, dtype=np.int64), unit="h")
+
+
+def now_epoch_hour() -> int:
+    """
+    現在時刻（JST）の epoch-hour を取得する
+
+    Returns:
+        int: 現在時刻を時単位で切り捨てた epoch-hour
+    """
+    jst_now = (dt.datetime.now(dt.timezone.utc) + JST_OFFSET).replace(tzinfo=None)
+    return int(to_epoch_hours([jst_now])[0])
+
+
+def calendar_fields(epoch_hours: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    epoch-hour 配列から MONTH / WEEK / HOUR をベクトル演算で一括導出する
+
+    pandas の日時アクセサを経由せず NumPy の整数演算のみで計算する。
+    （1970-01-01 は木曜日のため曜日は (日数 + 3) % 7、月曜=0）
+
+    Args:
+        epoch_hours: epoch-hour 配列
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: MONTH(1-12), WEEK(0-6), HOUR(0-23)（int8）
+    """
+    hours = np.asarray(epoch_hours, dtype=np.int64)
+    days = hours // 24
+    month = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12 + 1
+    week = (days + 3) % 7
+    hour = hours % 24
+    return month.astype(np.int8), week.astype(np.int8), hour.astype(np.int8)
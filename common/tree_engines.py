@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - RandomForest モジュールの決定木エンジン
+
+RandomForest の学習・翌日予測スクリプトで選択できる scikit-learn の決定木エンジン。
+データ読み込み・評価・保存・可視化は共通で、モデルの作成のみエンジンごとに切り替える。
+
+    random_forest           RandomForestRegressor（従来）
+    extra_trees             ExtraTreesRegressor（分割閾値をランダムに選ぶため学習が速い）
+    hist_gradient_boosting  HistGradientBoostingRegressor（特徴量をビン化した勾配ブースティング、
+                            学習・予測が速く保存サイズも小さい）
+
+学習時は使用したエンジンとパラメータを <モデル名>_meta.json に保存し、
+翌日予測ではこのメタデータからエンジンを判定する（n_jobs の有無など）。
+scikit-learn の読み込み（1秒前後）は推定器クラスを取得するときに行う。
+"""
+
+import os
+import json
+import time
+from typing import Any, Dict, Optional, Type
+
+DEFAULT_ENGINE = 'random_forest'
+
+# エンジン名 → sklearn.ensemble の推定器クラス名
+ENGINES: Dict[str, str] = {
+    'random_forest': 'RandomForestRegressor',
+    'extra_trees': 'ExtraTreesRegressor',
+    'hist_gradient_boosting': 'HistGradientBoostingRegressor',
+}
+
+# 木を独立に学習するバギング系エンジン（n_jobs・warm_start による木の追加・OOB誤差・max_samples に対応）
+BAGGING_ENGINES = ('random_forest', 'extra_trees')
+
+
+def engine_class(engine: str) -> Type[Any]:
+    """
+    エンジン名から推定器クラスを取得する
+
+    Raises:
+        ValueError: 未対応のエンジン名の場合
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"未対応のエンジンです: {engine} (選択肢: {', '.join(ENGINES)})")
+    from sklearn import ensemble
+    return getattr(ensemble, ENGINES[engine])
+
+
+def is_bagging(engine: str) -> bool:
+    """バギング系エンジン（RandomForest / ExtraTrees）か"""
+    return engine in BAGGING_ENGINES
+
+
+def metadata_path(model_path: str) -> str:
+    """学習済みモデル（.sav）に対応するメタデータのパス"""
+    return os.path.splitext(model_path)[0] + '_meta.json'
+
+
+def save_engine_metadata(model_path: str,
+                         engine: str,
+                         params: Dict[str, Any],
+                         extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    使用したエンジン・パラメータを <モデル名>_meta.json に保存する
+
+    Args:
+        model_path: 学習済みモデルのパス
+        engine: エンジン名
+        params: 推定器のパラメータ
+        extra: 追加するメタデータ
+
+    Returns:
+        Dict[str, Any]: 保存したメタデータ
+    """
+    metadata = {
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'engine': engine,
+        'model_type': engine_class(engine).__name__,
+        'params': params,
+    }
+    metadata.update(extra or {})
+    path = metadata_path(model_path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+    print(f"モデルメタデータを {path} に保存しました (エンジン: {engine})")
+    return metadata
+
+
+def load_engine_metadata(model_path: str) -> Dict[str, Any]:
+    """
+    学習済みモデルのメタデータを読み込む（メタデータの無い従来のモデルは random_forest とみなす）
+
+    Args:
+        model_path: 学習済みモデルのパス
+
+    Returns:
+        Dict[str, Any]: メタデータ（engine を必ず含む）
+    """
+    path = metadata_path(model_path)
+    if not os.path.exists(path):
+        return {'engine': DEFAULT_ENGINE}
+    with open(path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    metadata.setdefault('engine', DEFAULT_ENGINE)
+    return metadata
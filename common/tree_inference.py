@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 決定木アンサンブルの NumPy 推論エンジン
+
+翌日予測で推論するのは 168〜336 行程度であり、この規模では LGBMRegressor.predict /
+RandomForestRegressor.predict の実行時間は木の走査ではなく、呼び出しごとの入力検証・
+スレッド起動・Python オブジェクトの準備が大半を占める。
+
+本モジュールは学習済みの LightGBM（Booster / LGBMRegressor）と scikit-learn の
+決定木アンサンブル（RandomForestRegressor / ExtraTreesRegressor / DecisionTreeRegressor）を
+全ての木のノードを連結した配列（特徴量・閾値・左右の子・葉の値）に変換し、
+全行 × 全木を一括で1段ずつ走査する NumPy 推論エンジンで予測する。
+
+変換結果は1つの .npz（非圧縮）として保存し、数ミリ秒で読み込める。
+学習時にモデル保存と同時に <モデル名>_compiled.npz を書き出し、翌日予測では
+保存元モデルファイル（サイズ・更新時刻）と一致する場合のみ使用する。
+
+    compiled = compile_model(model)          # 変換
+    save_compiled(compiled, path)            # 保存
+    compiled = load_compiled(path)           # 読み込み
+    y = compiled.predict(X)                  # 予測（元モデルの predict と同じ値、加算順による丸め誤差を除く）
+
+分岐の判定は各ライブラリと同じ規則に従う:
+    LightGBM       数値分岐 x <= threshold（欠損値は missing_type / default_left に従う）、
+                   カテゴリ分岐は左に進むカテゴリ集合（ビットセット）に含まれるか
+    scikit-learn   float32 に変換した x <= threshold（NaN は missing_go_to_left に従う）
+"""
+
+import os
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common.artifact_files import file_stamp, save_npz_atomic
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@dataclass(frozen=True)
+class TreeInferenceConfig:
+    """決定木推論エンジン設定クラス（設定値統一管理）"""
+    FORMAT_VERSION: int = 1
+    # 学習済みモデル（.sav）に対応する変換済みファイルの接尾辞
+    COMPILED_SUFFIX: str = "_compiled.npz"
+    # 一度に走査する（行, 木）の組数（大量行の予測時はこの単位で行を分割する）
+    CHUNK_PAIRS: int = 4_000_000
+    # 恒等変換で出力する LightGBM の目的関数（これ以外は予測値の変換が必要なため非対応）
+    IDENTITY_OBJECTIVES: Tuple[str, ...] = (
+        'regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape',
+    )
+
+
+# 統一設定インスタンス
+config = TreeInferenceConfig()
+
+# 欠損値の扱い（LightGBM の MissingType と同じ番号）
+MISSING_NONE = 0
+MISSING_ZERO = 1
+MISSING_NAN = 2
+# LightGBM がゼロとみなす絶対値の閾値（kZeroThreshold）
+_ZERO_THRESHOLD = 1e-35
+
+
+@dataclass
+class CompiledEnsemble:
+    """連結済みノード配列で表した決定木アンサンブル"""
+    # ノードごとの配列（幅優先順、兄弟ノードは隣接: 右の子 = left + 1）
+    # 葉は left = 自ノード・threshold = +inf とし、走査を続けても移動しない
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    is_leaf: np.ndarray
+    value: np.ndarray
+    default_left: np.ndarray
+    missing_type: np.ndarray
+    # カテゴリ分岐（is_categorical のノードは cat_bits[cat_start:cat_start+cat_len] のビットセットで判定）
+    is_categorical: np.ndarray
+    cat_start: np.ndarray
+    cat_len: np.ndarray
+    cat_bits: np.ndarray
+    # 各木の根ノード番号
+    roots: np.ndarray
+    # 最大の深さ（走査の段数）
+    max_depth: int
+    # 予測値 = 葉の値の合計 × scale + base
+    scale: float
+    base: float
+    n_features: int
+    # 入力を変換するデータ型（scikit-learn は float32 で閾値判定する）
+    input_dtype: str
+    source: str
+    # 保存元モデルファイルの情報（翌日予測時の一致確認用）
+    source_file: Optional[Dict[str, Any]] = None
+
+    def __post_init__(self):
+        # NaN を含まない入力では欠損値の判定を省略できる（ゼロを欠損値とする分岐が無い場合）
+        self._has_zero_missing = bool(np.any((self.missing_type == MISSING_ZERO) & ~self.is_leaf))
+        self._has_categorical = bool(np.any(self.is_categorical))
+        # 走査で毎段参照する列を1レコードにまとめる（1回の take で取り出す）
+        self._records = np.empty(len(self.feature), dtype=[('threshold', 'f8'), ('feature', 'i4'), ('left', 'i4')])
+        self._records['threshold'] = self.threshold
+        self._records['feature'] = self.feature
+        self._records['left'] = self.left
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def summary(self) -> str:
+        return (f"{self.source}: 木 {self.n_trees:,}本 / ノード {self.n_nodes:,}個 / "
+                f"最大深さ {self.max_depth} / 特徴量 {self.n_features}")
+
+    def _categorical_left(self, x: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """カテゴリ分岐ノード nodes で値 x が左に進むか判定する"""
+        # NaN・負のカテゴリは右（整数への変換は 0 方向への切り捨て）
+        x_cat = np.trunc(x)
+        valid = ~np.isnan(x_cat) & (x_cat >= 0)
+        category = np.where(valid, x_cat, 0.0).astype(np.int64)
+        word = category >> 5
+        valid &= word < self.cat_len[nodes]
+        bits = self.cat_bits[np.where(valid, self.cat_start[nodes] + word, 0)] if len(self.cat_bits) else 0
+        return valid & (((bits >> (category & 31)) & 1) == 1)
+
+    def _go_right_missing(self, x: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """欠損値（NaN / ゼロ）の扱いを含めて右に進むか判定する（葉は移動しない）"""
+        missing = self.missing_type[nodes]
+        # 数値分岐: 欠損値を扱わない分岐では NaN を 0 として比較する（LightGBM と同じ）
+        x_num = np.where(np.isnan(x) & (missing != MISSING_NAN), 0.0, x)
+        go_default = ((missing == MISSING_NAN) & np.isnan(x_num)) | \
+                     ((missing == MISSING_ZERO) & (np.abs(x_num) <= _ZERO_THRESHOLD))
+        with np.errstate(invalid='ignore'):
+            go_left = np.where(go_default, self.default_left[nodes], x_num <= self.threshold[nodes])
+        return ~go_left & ~self.is_leaf[nodes]
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows, n_trees = len(X), self.n_trees
+        X_flat = X.reshape(-1)
+        # (行, 木) の組ごとの現在ノード（組番号 p = 行 * 木数 + 木）と行の先頭位置
+        index_dtype = np.int32 if X_flat.size < 2 ** 31 else np.int64
+        nodes = np.tile(self.roots, n_rows)
+        pairs = np.arange(len(nodes))
+        current = nodes.copy()
+        row_offset = np.repeat(np.arange(n_rows, dtype=index_dtype) * self.n_features, n_trees)
+        plain = not self._has_zero_missing and not np.isnan(X_flat).any()
+
+        for depth in range(self.max_depth):
+            records = self._records.take(current)
+            x = X_flat.take(row_offset + records['feature'])
+            if plain:
+                go_right = x > records['threshold']
+            else:
+                go_right = self._go_right_missing(x, current)
+            if self._has_categorical:
+                categorical = np.flatnonzero(self.is_categorical.take(current))
+                if len(categorical):
+                    go_right[categorical] = ~self._categorical_left(x[categorical], current[categorical])
+            current = records['left'] + go_right
+
+            # 深い木では葉に到達した組を定期的に走査対象から外す
+            if depth % 4 == 3 and depth + 1 < self.max_depth:
+                done = self.is_leaf.take(current)
+                if done.mean() > 0.1:
+                    nodes[pairs[done]] = current[done]
+                    keep = ~done
+                    pairs, current, row_offset = pairs[keep], current[keep], row_offset[keep]
+                    if not len(current):
+                        break
+        nodes[pairs] = current
+        return self.value[nodes].reshape(n_rows, n_trees).sum(axis=1) * self.scale + self.base
+
+    def predict(self, X: Any) -> np.ndarray:
+        """
+        予測する
+
+        Args:
+            X: 特徴量行列（numpy配列 / DataFrame、列順は学習時と同じ）
+
+        Returns:
+            np.ndarray: 予測値（float64）
+        """
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"特徴量数が一致しません: 入力={X.shape[1]}, モデル={self.n_features}")
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        chunk_rows = max(1, config.CHUNK_PAIRS // max(self.n_trees, 1))
+        if len(X) <= chunk_rows:
+            return self._predict_chunk(X)
+        return np.concatenate([self._predict_chunk(X[i:i + chunk_rows]) for i in range(0, len(X), chunk_rows)])
+
+
+class _NodeBuffer:
+    """変換中のノード配列（葉は左右の子を -1 とする）"""
+
+    def __init__(self):
+        self.columns: Dict[str, List] = {name: [] for name in (
+            'feature', 'threshold', 'left', 'right', 'value', 'default_left', 'missing_type',
+            'is_categorical', 'cat_start', 'cat_len')}
+        self.cat_bits: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.columns['feature'])
+
+    def add(self, **values: Any) -> int:
+        index = len(self)
+        defaults = {'feature': 0, 'threshold': 0.0, 'left': -1, 'right': -1, 'value': 0.0,
+                    'default_left': False, 'missing_type': MISSING_NONE, 'is_categorical': False,
+                    'cat_start': 0, 'cat_len': 0}
+        defaults.update(values)
+        for name, column in self.columns.items():
+            column.append(defaults[name])
+        return index
+
+    def add_categories(self, categories: List[int]) -> Tuple[int, int]:
+        """カテゴリ集合をビットセットとして追加し、(開始位置, 語数) を返す"""
+        n_words = max(categories) // 32 + 1 if categories else 0
+        words = [0] * n_words
+        for category in categories:
+            words[category // 32] |= 1 << (category % 32)
+        start = len(self.cat_bits)
+        self.cat_bits.extend(words)
+        return start, n_words
+
+    def build(self, roots: List[int], scale: float, base: float, n_features: int,
+              input_dtype: str, source: str) -> CompiledEnsemble:
+        """全ての木を幅優先順（兄弟ノードを隣接）に並べ替えて配列化する"""
+        c = self.columns
+        left = np.asarray(c['left'], dtype=np.int64)
+        right = np.asarray(c['right'], dtype=np.int64)
+        is_leaf = left < 0
+
+        # 新しいノード番号: 根を先頭に並べ、各段の内部ノードの子を (左, 右) の順で続けて割り当てる
+        new_index = np.empty(len(left), dtype=np.int64)
+        frontier = np.asarray(roots, dtype=np.int64)
+        new_index[frontier] = np.arange(len(frontier))
+        next_index, max_depth = len(frontier), 0
+        while True:
+            internal = frontier[~is_leaf[frontier]]
+            if not len(internal):
+                break
+            frontier = np.stack([left[internal], right[internal]], axis=1).reshape(-1)
+            new_index[frontier] = np.arange(next_index, next_index + len(frontier))
+            next_index += len(frontier)
+            max_depth += 1
+        order = np.argsort(new_index)
+
+        def column(name: str, dtype: Any) -> np.ndarray:
+            return np.asarray(c[name], dtype=dtype)[order]
+
+        new_left = np.where(is_leaf, new_index, new_index[np.maximum(left, 0)])[order]
+        leaf = is_leaf[order]
+        return CompiledEnsemble(
+            feature=np.where(leaf, 0, column('feature', np.int32)).astype(np.int32),
+            threshold=np.where(leaf, np.inf, column('threshold', np.float64)),
+            left=new_left.astype(np.int32),
+            is_leaf=leaf,
+            value=column('value', np.float64),
+            default_left=column('default_left', bool),
+            missing_type=column('missing_type', np.int8),
+            is_categorical=column('is_categorical', bool),
+            cat_start=column('cat_start', np.int32),
+            cat_len=column('cat_len', np.int32),
+            cat_bits=np.asarray(self.cat_bits, dtype=np.uint32).astype(np.int64),
+            roots=np.arange(len(roots), dtype=np.int32),
+            max_depth=max_depth,
+            scale=float(scale), base=float(base), n_features=int(n_features),
+            input_dtype=input_dtype, source=source,
+        )
+
+
+def compile_lightgbm(model: Any) -> CompiledEnsemble:
+    """
+    LightGBM の学習済みモデルを変換する（best_iteration がある場合はそこまでの木）
+
+    Args:
+        model: lgb.Booster または LGBMRegressor
+
+    Returns:
+        CompiledEnsemble: 変換結果
+    """
+    booster = getattr(model, 'booster_', model)
+    dump = booster.dump_model()
+    objective = str(dump.get('objective', '')).split(' ')[0]
+    if objective not in config.IDENTITY_OBJECTIVES:
+        raise ValueError(f"未対応の目的関数です（恒等変換の回帰のみ対応）: {objective}")
+    if dump.get('num_tree_per_iteration', 1) != 1:
+        raise ValueError("多クラス・多出力モデルには対応していません")
+
+    missing_types = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+    buffer = _NodeBuffer()
+    roots = []
+    for tree in dump['tree_info']:
+        # 各ノードを追加してから子を接続する（深さ優先、再帰を使わない）
+        root = None
+        stack = [(tree['tree_structure'], None, None)]
+        while stack:
+            node, parent, is_left = stack.pop()
+            if 'split_index' not in node:
+                if 'leaf_coeff' in node:
+                    raise ValueError("linear_tree のモデルには対応していません")
+                index = buffer.add(value=float(node['leaf_value']))
+            elif node['decision_type'] == '==':
+                categories = sorted(int(c) for c in str(node['threshold']).split('||') if c != '')
+                cat_start, cat_len = buffer.add_categories(categories)
+                index = buffer.add(feature=int(node['split_feature']), is_categorical=True,
+                                   missing_type=missing_types.get(node.get('missing_type'), MISSING_NONE),
+                                   cat_start=cat_start, cat_len=cat_len)
+            else:
+                index = buffer.add(feature=int(node['split_feature']), threshold=float(node['threshold']),
+                                   default_left=bool(node.get('default_left', False)),
+                                   missing_type=missing_types.get(node.get('missing_type'), MISSING_NONE))
+            if parent is None:
+                root = index
+            elif is_left:
+                buffer.columns['left'][parent] = index
+            else:
+                buffer.columns['right'][parent] = index
+            if 'split_index' in node:
+                stack.append((node['right_child'], index, False))
+                stack.append((node['left_child'], index, True))
+        roots.append(root)
+
+    n_trees = len(roots)
+    scale = 1.0 / n_trees if dump.get('average_output') and n_trees else 1.0
+    return buffer.build(roots, scale, 0.0, dump['max_feature_idx'] + 1, 'float64', 'LightGBM')
+
+
+def compile_sklearn_forest(model: Any) -> CompiledEnsemble:
+    """
+    scikit-learn の決定木・決定木アンサンブル（回帰）を変換する
+
+    Args:
+        model: RandomForestRegressor / ExtraTreesRegressor / DecisionTreeRegressor
+
+    Returns:
+        CompiledEnsemble: 変換結果
+    """
+    estimators = getattr(model, 'estimators_', [model])
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("多出力モデルには対応していません")
+
+    buffer = _NodeBuffer()
+    roots = []
+    for estimator in estimators:
+        tree = estimator.tree_
+        offset = len(buffer)
+        is_leaf = tree.children_left == -1
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        c = buffer.columns
+        c['feature'].extend(np.where(is_leaf, 0, tree.feature).tolist())
+        c['threshold'].extend(np.where(is_leaf, 0.0, tree.threshold).tolist())
+        c['left'].extend(np.where(is_leaf, -1, tree.children_left + offset).tolist())
+        c['right'].extend(np.where(is_leaf, -1, tree.children_right + offset).tolist())
+        c['value'].extend(tree.value[:, 0, 0].tolist())
+        c['default_left'].extend(np.asarray(missing_left, dtype=bool).tolist())
+        c['missing_type'].extend([MISSING_NAN] * tree.node_count)
+        c['is_categorical'].extend([False] * tree.node_count)
+        c['cat_start'].extend([0] * tree.node_count)
+        c['cat_len'].extend([0] * tree.node_count)
+        roots.append(offset)
+
+    return buffer.build(roots, 1.0 / len(roots), 0.0, model.n_features_in_, 'float32', type(model).__name__)
+
+
+def compile_model(model: Any) -> CompiledEnsemble:
+    """学習済みモデルの種類に応じて変換する"""
+    if hasattr(model, 'dump_model') or hasattr(getattr(model, 'booster_', None), 'dump_model'):
+        return compile_lightgbm(model)
+    if hasattr(model, 'estimators_') or hasattr(model, 'tree_'):
+        return compile_sklearn_forest(model)
+    raise ValueError(f"未対応のモデルです: {type(model).__name__}")
+
+
+def compiled_path(model_path: str) -> str:
+    """学習済みモデル（.sav）に対応する変換済みファイルのパス"""
+    return os.path.splitext(model_path)[0] + config.COMPILED_SUFFIX
+
+
+def save_compiled(compiled: CompiledEnsemble, path: str) -> None:
+    """変換結果を .npz（非圧縮）に保存する"""
+    meta = {
+        'format_version': config.FORMAT_VERSION, 'scale': compiled.scale, 'base': compiled.base,
+        'max_depth': compiled.max_depth, 'n_features': compiled.n_features, 'input_dtype': compiled.input_dtype,
+        'source': compiled.source, 'source_file': compiled.source_file,
+    }
+    arrays = {name: getattr(compiled, name) for name in (
+        'feature', 'threshold', 'left', 'is_leaf', 'value', 'default_left', 'missing_type',
+        'is_categorical', 'cat_start', 'cat_len', 'cat_bits', 'roots')}
+    save_npz_atomic(path, meta, **arrays)
+
+
+def load_compiled(path: str) -> CompiledEnsemble:
+    """保存済みの変換結果を読み込む"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        if meta.get('format_version') != config.FORMAT_VERSION:
+            raise ValueError(f"変換済みファイルの形式が異なります: {path}")
+        arrays = {name: data[name] for name in data.files if name != 'meta'}
+    return CompiledEnsemble(
+        max_depth=meta['max_depth'], scale=meta['scale'], base=meta['base'], n_features=meta['n_features'],
+        input_dtype=meta['input_dtype'], source=meta['source'], source_file=meta.get('source_file'),
+        **arrays,
+    )
+
+
+def export_for_model(model: Any, model_path: str) -> Optional[str]:
+    """
+    保存済みの学習済みモデルを変換し、対応する .npz に保存する（学習時のモデル保存直後に呼び出す）
+
+    変換できないモデルの場合は古い変換済みファイルを削除して None を返す。
+
+    Args:
+        model: 学習済みモデル
+        model_path: 保存済みモデルのパス
+
+    Returns:
+        Optional[str]: 変換済みファイルのパス
+    """
+    path = compiled_path(model_path)
+    try:
+        compiled = compile_model(model)
+    except ValueError as e:
+        print(f"決定木推論エンジンへの変換をスキップします: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    compiled.source_file = file_stamp(model_path)
+    save_compiled(compiled, path)
+    print(f"決定木推論エンジンを {path} に保存しました（{compiled.summary()}）")
+    return path
+
+
+def load_for_model(model_path: str) -> Optional[CompiledEnsemble]:
+    """
+    学習済みモデルに対応する変換済みファイルを読み込む
+
+    ファイルが無い場合、または保存元モデルファイルが変換後に更新されている場合は None を返す
+    （呼び出し側は元モデルの predict を使用する）。
+
+    Args:
+        model_path: 学習済みモデルのパス
+
+    Returns:
+        Optional[CompiledEnsemble]: 変換結果
+    """
+    path = compiled_path(model_path)
+    if not os.path.exists(path) or not os.path.exists(model_path):
+        return None
+    try:
+        compiled = load_compiled(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"決定木推論エンジンを読み込めません（元モデルで予測）: {e}")
+        return None
+    if compiled.source_file != file_stamp(model_path):
+        print(f"決定木推論エンジンが学習済みモデルと一致しないため使用しません: {path}")
+        return None
+    return compiled
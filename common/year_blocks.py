@@ -0,0 +1,627 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 年別特徴量ブロックキャッシュモジュール
+
+電力需要・気温CSVを年単位で1回だけ解析・結合し、特徴量行列（X）・目的変数（y）・
+時刻キー（keys）を .npy 形式の年別ブロックとして保存するモジュール。
+
+ブロックはメモリマップ（mmap_mode='r'）で読み込むため、年組み合わせの組み立ては
+単年ならゼロコピーのビュー、複数年でも1回の連結（np.concatenate）で済む。
+入力CSVのチェックサムが変わった年のみ再作成する。
+
+キャッシュ構成:
+    data/cache/blocks/YYYY/keys.npy   時刻キー（epoch-hour, int64）
+    data/cache/blocks/YYYY/X.npy      特徴量（MONTH, WEEK, HOUR, TEMP, CALENDAR / float32）
+    data/cache/blocks/YYYY/y.npy      目的変数（KW / float32）
+    data/cache/blocks/YYYY/meta.json  チェックサム・入力ファイル情報
+
+pandas は入力CSVの解析・CSV書き出しの関数の中で読み込む（キャッシュ済みブロックの
+読み込み・列構成の参照には不要）。
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+from common.timekeys import to_epoch_hours, from_epoch_hours, calendar_fields
+from common.jp_calendar import calendar_flags
+from common.demand_features import DEFAULT_SPEC as DEMAND_SPEC, compute_demand_features
+from common.time_split import year_holdout, tail_holdout, take_rows
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@dataclass(frozen=True)
+class YearBlockConfig:
+    """年別特徴量ブロック設定クラス（設定値統一管理）"""
+    DATA_DIR: str = os.path.join(PROJECT_ROOT, 'data')
+    CACHE_DIR: str = os.path.join(PROJECT_ROOT, 'data', 'cache', 'blocks')
+
+    # 入力ファイル
+    JUYO_PATTERN: str = "juyo-{year}.csv"
+    TEMP_PATTERN: str = "temperature-{year}.csv"
+    ENCODING: str = "SHIFT-JIS"
+    JUYO_SKIPROWS: int = 3
+    JUYO_COLUMNS: List[str] = field(default_factory=lambda: ["DATE", "TIME", "KW"])
+    TEMP_SKIPROWS: int = 5
+    JUYO_DATETIME_FORMAT: str = "%Y/%m/%d %H:%M"
+    TEMP_DATETIME_FORMAT: str = "%Y/%m/%d %H:%M:%S"
+
+    # 気温欠損の補間上限（時間）。気象庁CSVでは1月1日0時の値が前年ファイルに含まれるため
+    TEMP_FILL_LIMIT_HOURS: int = 1
+
+    # ブロック列構成
+    FEATURE_COLUMNS: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "HOUR", "TEMP", "CALENDAR"])
+    TARGET_COLUMNS: List[str] = field(default_factory=lambda: ["KW"])
+    DATA_TYPE: str = 'float32'
+
+    # 需要ラグ・移動窓特徴量（common/demand_features.py）を組み立て時に付加するか
+    # （参照先が欠損・前年データなしで特徴量が揃わない行は学習データから除く）
+    DEMAND_FEATURES: bool = False
+
+    # 単年指定時のテスト割合（末尾から時系列順に確保）
+    SINGLE_YEAR_TEST_SIZE: float = 0.1
+
+    # ブロック形式バージョン（列構成・前処理を変更したら更新する）
+    BLOCK_VERSION: int = 2
+
+
+# 統一設定インスタンス
+config = YearBlockConfig()
+
+
+@dataclass
+class YearBlock:
+    """1年分の特徴量ブロック（各配列は読み取り専用メモリマップ）"""
+    year: int
+    keys: np.ndarray
+    X: np.ndarray
+    y: np.ndarray
+    checksum: str
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+@dataclass
+class CombinationData:
+    """学習年・テスト年の組み合わせから組み立てたデータセット"""
+    train_years: List[int]
+    test_year: int
+    keys_train: np.ndarray
+    X_train: np.ndarray
+    y_train: np.ndarray
+    keys_test: np.ndarray
+    X_test: np.ndarray
+    y_test: np.ndarray
+
+
+def source_paths(year: int, data_dir: Optional[str] = None) -> List[str]:
+    """年の入力CSV（電力需要・気温）のパスを返す"""
+    data_dir = data_dir or config.DATA_DIR
+    return [os.path.join(data_dir, config.JUYO_PATTERN.format(year=year)),
+            os.path.join(data_dir, config.TEMP_PATTERN.format(year=year))]
+
+
+def source_checksum(paths: Sequence[str]) -> str:
+    """
+    入力ファイル内容のチェックサム（SHA-1）を計算する
+
+    Args:
+        paths: 入力ファイルパスのリスト
+
+    Returns:
+        str: 16進チェックサム文字列
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_stats(paths: Sequence[str]) -> List[List[int]]:
+    """入力ファイルのサイズ・更新時刻（チェックサム再計算を省略する判定用）"""
+    return [[os.path.getsize(p), os.stat(p).st_mtime_ns] for p in paths]
+
+
+def read_juyo_csv(path: str) -> pd.DataFrame:
+    """
+    電力需要CSV（TEPCO形式）を読み込み、epoch-hour・KW列に変換する
+
+    Args:
+        path: juyo-YYYY.csv のパス
+
+    Returns:
+        pd.DataFrame: KEY（epoch-hour, int64）・KW（float32）列
+    """
+    import pandas as pd
+    df = pd.read_csv(
+        path,
+        encoding=config.ENCODING,
+        skiprows=config.JUYO_SKIPROWS,
+        header=None,
+        names=config.JUYO_COLUMNS,
+        usecols=[0, 1, 2],
+        dtype={'DATE': 'string', 'TIME': 'string'},
+        engine='c'
+    )
+    # TIME列は "0:00" または "0:00〜1:00" 形式（開始時刻を採用）
+    start_time = df['TIME'].str.split('〜', n=1).str[0].str.strip()
+    timestamps = pd.to_datetime(df['DATE'].str.strip() + ' ' + start_time,
+                                format=config.JUYO_DATETIME_FORMAT, errors='coerce')
+    kw = pd.to_numeric(df['KW'], errors='coerce')
+    valid = timestamps.notna().to_numpy() & kw.notna().to_numpy()
+    return pd.DataFrame({
+        'KEY': to_epoch_hours(timestamps[valid]),
+        'KW': kw[valid].to_numpy(dtype=np.float32),
+    })
+
+
+def read_temperature_csv(path: str) -> pd.DataFrame:
+    """
+    気温CSV（気象庁ダウンロード形式）を読み込み、epoch-hour・TEMP列に変換する
+
+    Args:
+        path: temperature-YYYY.csv のパス
+
+    Returns:
+        pd.DataFrame: KEY（epoch-hour, int64）・TEMP（float32）列
+    """
+    import pandas as pd
+    df = pd.read_csv(
+        path,
+        encoding=config.ENCODING,
+        skiprows=config.TEMP_SKIPROWS,
+        header=None,
+        usecols=[0, 1],
+        names=['DATETIME', 'TEMP'],
+        dtype={'DATETIME': 'string'},
+        engine='c'
+    )
+    timestamps = pd.to_datetime(df['DATETIME'].str.strip(), format=config.TEMP_DATETIME_FORMAT, errors='coerce')
+    if timestamps.isna().all():
+        # 秒なし形式（"2023/1/1 1:00"）のファイルにも対応
+        timestamps = pd.to_datetime(df['DATETIME'].str.strip(), format=config.JUYO_DATETIME_FORMAT, errors='coerce')
+    temp = pd.to_numeric(df['TEMP'], errors='coerce')
+    valid = timestamps.notna().to_numpy() & temp.notna().to_numpy()
+    return pd.DataFrame({
+        'KEY': to_epoch_hours(timestamps[valid]),
+        'TEMP': temp[valid].to_numpy(dtype=np.float32),
+    })
+
+
+def build_year_frame(year: int, data_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    1年分の電力需要・気温を epoch-hour キーで結合し特徴量を導出する
+
+    行の並び順には依存せず、両CSVの時刻をキーとしたベクトル化マージで揃える。
+    短い気温欠損（TEMP_FILL_LIMIT_HOURS 以内）は前後の値で補間し、
+    それ以上欠損している時刻は除外する。
+
+    Args:
+        year: 対象年
+        data_dir: データディレクトリ（デフォルト: config値）
+
+    Returns:
+        pd.DataFrame: KEY・MONTH・WEEK・HOUR・TEMP・CALENDAR・KW 列（KEY昇順）
+
+    Raises:
+        FileNotFoundError: 入力ファイルが存在しない場合
+    """
+    import pandas as pd
+    juyo_path, temp_path = source_paths(year, data_dir)
+    for path in (juyo_path, temp_path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+
+    juyo = read_juyo_csv(juyo_path).drop_duplicates('KEY', keep='last')
+    temp = read_temperature_csv(temp_path).drop_duplicates('KEY', keep='last')
+    merged = juyo.merge(temp, on='KEY', how='left', sort=True)
+    merged['TEMP'] = merged['TEMP'].interpolate(limit=config.TEMP_FILL_LIMIT_HOURS, limit_direction='both')
+    merged = merged.dropna(subset=['TEMP'])
+
+    dropped = len(juyo) - len(merged)
+    if dropped:
+        logger.warning(f"{year}年: 気温データと一致しない電力需要 {dropped} 行を除外しました")
+
+    month, week, hour = calendar_fields(merged['KEY'].to_numpy())
+    return pd.DataFrame({
+        'KEY': merged['KEY'].to_numpy(),
+        'MONTH': month,
+        'WEEK': week,
+        'HOUR': hour,
+        'TEMP': merged['TEMP'].to_numpy(dtype=np.float32),
+        'CALENDAR': calendar_flags(merged['KEY'].to_numpy()),
+        'KW': merged['KW'].to_numpy(dtype=np.float32),
+    })
+
+
+def _block_dir(year: int, cache_dir: Optional[str] = None) -> str:
+    return os.path.join(cache_dir or config.CACHE_DIR, f"{year:04d}")
+
+
+def _read_meta(block_dir: str) -> Optional[Dict]:
+    meta_path = os.path.join(block_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(block_dir: str, meta: Dict) -> None:
+    meta_path = os.path.join(block_dir, 'meta.json')
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, meta_path)
+
+
+def _open_block(year: int, block_dir: str, checksum: str) -> YearBlock:
+    return YearBlock(
+        year=year,
+        keys=np.load(os.path.join(block_dir, 'keys.npy'), mmap_mode='r'),
+        X=np.load(os.path.join(block_dir, 'X.npy'), mmap_mode='r'),
+        y=np.load(os.path.join(block_dir, 'y.npy'), mmap_mode='r'),
+        checksum=checksum,
+    )
+
+
+def load_year_block(year: int, data_dir: Optional[str] = None, cache_dir: Optional[str] = None) -> YearBlock:
+    """
+    年別特徴量ブロックを取得する（未作成・入力変更時のみCSVから再作成）
+
+    入力ファイルのサイズ・更新時刻が meta.json と一致する場合はチェックサム計算も省略する。
+    一致しない場合はチェックサムを再計算し、内容が変わっていなければ再作成せず
+    meta.json のファイル情報のみ更新する。
+
+    Args:
+        year: 対象年
+        data_dir: 入力データディレクトリ（デフォルト: config値）
+        cache_dir: キャッシュディレクトリ（デフォルト: config値）
+
+    Returns:
+        YearBlock: メモリマップされた年別ブロック
+    """
+    paths = source_paths(year, data_dir)
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+
+    block_dir = _block_dir(year, cache_dir)
+    stats = _source_stats(paths)
+    meta = _read_meta(block_dir)
+
+    if meta is not None and meta.get('version') == config.BLOCK_VERSION:
+        if meta.get('stats') == stats:
+            return _open_block(year, block_dir, meta['checksum'])
+        checksum = source_checksum(paths)
+        if meta.get('checksum') == checksum:
+            meta['stats'] = stats
+            _write_meta(block_dir, meta)
+            return _open_block(year, block_dir, checksum)
+    else:
+        checksum = source_checksum(paths)
+
+    frame = build_year_frame(year, data_dir)
+    os.makedirs(block_dir, exist_ok=True)
+    arrays = {
+        'keys': frame['KEY'].to_numpy(dtype=np.int64),
+        'X': np.ascontiguousarray(frame[config.FEATURE_COLUMNS].to_numpy(dtype=config.DATA_TYPE)),
+        'y': frame[config.TARGET_COLUMNS[0]].to_numpy(dtype=config.DATA_TYPE),
+    }
+    for name, array in arrays.items():
+        tmp_path = os.path.join(block_dir, f"{name}.tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(block_dir, f"{name}.npy"))
+
+    # meta.json は最後に書き込み、途中中断時は次回再作成させる
+    _write_meta(block_dir, {
+        'version': config.BLOCK_VERSION,
+        'year': year,
+        'checksum': checksum,
+        'stats': stats,
+        'rows': len(frame),
+        'feature_columns': config.FEATURE_COLUMNS,
+        'target_columns': config.TARGET_COLUMNS,
+    })
+    logger.info(f"{year}年: 特徴量ブロック作成 ({len(frame):,}行, {block_dir})")
+    return _open_block(year, block_dir, checksum)
+
+
+def feature_columns() -> List[str]:
+    """
+    組み立て後の特徴量列名を取得する（学習・tomorrow予測で共通）
+
+    Returns:
+        List[str]: 特徴量列名
+    """
+    if config.DEMAND_FEATURES:
+        return list(config.FEATURE_COLUMNS) + DEMAND_SPEC.columns
+    return list(config.FEATURE_COLUMNS)
+
+
+def _append_demand_features(years: Sequence[int],
+                            keys: np.ndarray,
+                            X: np.ndarray,
+                            y: np.ndarray,
+                            data_dir: Optional[str],
+                            cache_dir: Optional[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    需要ラグ・移動窓特徴量を計算して特徴量行列の右端に付加する
+
+    各年の前年ブロックが存在する場合は、その末尾（参照範囲分）を助走期間として使用する。
+    前年データが無い年の先頭（参照範囲分）や需要の欠損を参照する行は特徴量が NaN となるため除く
+    （NaN を扱えない Keras、学習時に NaN を含まない木モデルの分岐を避ける）。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: 特徴量が揃った行の keys, X（需要特徴量付き）, y
+    """
+    warmup_keys, warmup_y = [], []
+    for year in sorted(set(years)):
+        if year - 1 in years:
+            continue
+        try:
+            previous = load_year_block(year - 1, data_dir, cache_dir)
+        except FileNotFoundError:
+            continue
+        warmup_keys.append(previous.keys[-DEMAND_SPEC.max_offset:])
+        warmup_y.append(previous.y[-DEMAND_SPEC.max_offset:])
+    demand = compute_demand_features(np.concatenate(warmup_keys + [keys]),
+                                     np.concatenate(warmup_y + [y]),
+                                     target_keys=keys)
+    complete = np.isfinite(demand).all(axis=1)
+    X = np.hstack([X, demand.astype(X.dtype, copy=False)])
+    if complete.all():
+        return keys, X, y
+    logger.info(f"需要特徴量の参照先が無い {int((~complete).sum()):,}行を除きます（対象年 {sorted(set(years))}）")
+    return keys[complete], X[complete], y[complete]
+
+
+def assemble_years(years: Sequence[int],
+                   data_dir: Optional[str] = None,
+                   cache_dir: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    複数年のブロックを時系列順に連結する
+
+    単年の場合はメモリマップのビューをそのまま返し（ゼロコピー）、
+    複数年の場合も配列ごとに1回の np.concatenate のみで組み立てる。
+    DEMAND_FEATURES 有効時は需要ラグ・移動窓特徴量を右端の列に付加する（特徴量が揃わない行は除く）。
+
+    Args:
+        years: 対象年リスト
+        data_dir: 入力データディレクトリ（デフォルト: config値）
+        cache_dir: キャッシュディレクトリ（デフォルト: config値）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: keys, X, y
+    """
+    if not years:
+        raise ValueError("対象年が指定されていません")
+    years = sorted(set(int(y) for y in years))
+    blocks = [load_year_block(year, data_dir, cache_dir) for year in years]
+    if len(blocks) == 1:
+        keys, X, y = blocks[0].keys, blocks[0].X, blocks[0].y
+    else:
+        keys = np.concatenate([b.keys for b in blocks])
+        X = np.concatenate([b.X for b in blocks])
+        y = np.concatenate([b.y for b in blocks])
+    if config.DEMAND_FEATURES:
+        keys, X, y = _append_demand_features(years, keys, X, y, data_dir, cache_dir)
+    return keys, X, y
+
+
+def assemble_combination(train_years: Sequence[int],
+                         test_year: int,
+                         data_dir: Optional[str] = None,
+                         cache_dir: Optional[str] = None) -> CombinationData:
+    """
+    学習年・テスト年の組み合わせからデータセットを組み立てる
+
+    学習年・テスト年のブロックを1回で連結し、時系列分割エンジン（year_holdout）の
+    インデックスから学習・テスト部分をビューとして取り出す。
+
+    Args:
+        train_years: 学習年リスト
+        test_year: テスト年
+        data_dir: 入力データディレクトリ（デフォルト: config値）
+        cache_dir: キャッシュディレクトリ（デフォルト: config値）
+
+    Returns:
+        CombinationData: 学習・テストの keys / X / y
+
+    Raises:
+        ValueError: 学習年がテスト年以降を含む場合、または学習・テストデータが空の場合
+    """
+    train_years = sorted(set(int(y) for y in train_years))
+    if int(test_year) in train_years:
+        raise ValueError(f"テスト年 {test_year} が学習年に含まれています")
+    keys, X, y = assemble_years(train_years + [int(test_year)], data_dir, cache_dir)
+    split = year_holdout(keys, int(test_year), train_years)
+    X_train, X_test, y_train, y_test = split.apply(X, y)
+    return CombinationData(list(train_years), int(test_year),
+                           take_rows(keys, split.train_index), X_train, y_train,
+                           take_rows(keys, split.test_index), X_test, y_test)
+
+
+def split_years(years: Sequence[int]) -> Tuple[List[int], int]:
+    """
+    対象年を学習年・テスト年に分ける
+
+    最も新しい年をテスト年、それ以前を学習年とする（年組み合わせ最適化と同じ規約）。
+    指定順には依存しないため、load_split・シャード（common/shards.py）で同じテスト年となる。
+
+    Args:
+        years: 対象年リスト
+
+    Returns:
+        Tuple[List[int], int]: 学習年リスト（昇順）, テスト年
+    """
+    ordered = sorted(set(int(y) for y in years))
+    if not ordered:
+        raise ValueError("対象年が指定されていません")
+    return ordered[:-1], ordered[-1]
+
+
+def load_split(years: Sequence[int],
+               test_size: Optional[float] = None,
+               data_dir: Optional[str] = None,
+               cache_dir: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    年指定から学習・テストデータをCSVを経由せずに取得する
+
+    複数年指定時は最も新しい年をテスト年、それ以前を学習年とする（split_years）。
+    単年指定時は末尾 test_size の割合を時系列順にテストとする。
+
+    Args:
+        years: 対象年リスト（最も新しい年をテスト年とする）
+        test_size: 単年指定時のテスト割合（デフォルト: config値）
+        data_dir: 入力データディレクトリ（デフォルト: config値）
+        cache_dir: キャッシュディレクトリ（デフォルト: config値）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: X_train, X_test, y_train, y_test
+    """
+    if not years:
+        raise ValueError("対象年が指定されていません")
+    train_years, test_year = split_years(years)
+    if train_years:
+        combo = assemble_combination(train_years, test_year, data_dir, cache_dir)
+        return combo.X_train, combo.X_test, combo.y_train, combo.y_test
+    _, X, y = assemble_years(years, data_dir, cache_dir)
+    split = tail_holdout(len(X), config.SINGLE_YEAR_TEST_SIZE if test_size is None else test_size)
+    return split.apply(X, y)
+
+
+def training_keys(years: Sequence[int],
+                  test_size: Optional[float] = None,
+                  data_dir: Optional[str] = None,
+                  cache_dir: Optional[str] = None) -> np.ndarray:
+    """
+    load_split と同じ規約で分割した学習データの時刻キー（時系列順）を取得する
+
+    Args:
+        years: 対象年リスト（最も新しい年をテスト年とする）
+        test_size: 単年指定時のテスト割合（デフォルト: config値）
+        data_dir: 入力データディレクトリ（デフォルト: config値）
+        cache_dir: キャッシュディレクトリ（デフォルト: config値）
+
+    Returns:
+        np.ndarray: 学習データの epoch-hour
+    """
+    train_years, test_year = split_years(years)
+    if train_years:
+        return np.asarray(assemble_combination(train_years, test_year, data_dir, cache_dir).keys_train)
+    keys, _, _ = assemble_years([test_year], data_dir, cache_dir)
+    split = tail_holdout(len(keys), config.SINGLE_YEAR_TEST_SIZE if test_size is None else test_size)
+    return np.asarray(take_rows(keys, split.train_index))
+
+
+def training_watermark(years: Sequence[int],
+                       test_size: Optional[float] = None,
+                       data_dir: Optional[str] = None,
+                       cache_dir: Optional[str] = None,
+                       holdout_rows: int = 0) -> int:
+    """
+    load_split と同じ規約で分割した学習データのうち、モデルが学習した最終行の時刻キー（ウォーターマーク）を取得する
+
+    早期終了の検証データなど学習データ末尾の holdout_rows 行を学習に使わなかった場合は、
+    その直前の行をウォーターマークとする（差分更新の load_since で検証データの行から学習する）。
+
+    Args:
+        years: 対象年リスト（最も新しい年をテスト年とする）
+        test_size: 単年指定時のテスト割合（デフォルト: config値）
+        data_dir: 入力データディレクトリ（デフォルト: config値）
+        cache_dir: キャッシュディレクトリ（デフォルト: config値）
+        holdout_rows: 学習データ末尾の学習に使わなかった行数
+
+    Returns:
+        int: 学習した最終行の epoch-hour
+
+    Raises:
+        ValueError: 年が指定されていない場合、または学習した行が無い場合
+    """
+    if not years:
+        raise ValueError("対象年が指定されていません")
+    keys = training_keys(years, test_size, data_dir, cache_dir)
+    if holdout_rows < 0 or holdout_rows >= len(keys):
+        raise ValueError(f"学習した行がありません (学習データ={len(keys)}行, 除外={holdout_rows}行)")
+    return int(keys[len(keys) - 1 - holdout_rows])
+
+
+def load_since(watermark: int,
+               data_dir: Optional[str] = None,
+               cache_dir: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    ウォーターマークより後の時刻の行を取得する（差分学習用）
+
+    ウォーターマークの年から入力CSVが存在する年までを連結し（需要ラグ特徴量も同じ規約で付加）、
+    時刻キーがウォーターマークより後の行のみを返す。
+
+    Args:
+        watermark: 学習済みデータの最終 epoch-hour
+        data_dir: 入力データディレクトリ（デフォルト: config値）
+        cache_dir: キャッシュディレクトリ（デフォルト: config値）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: keys, X, y（該当行なしの場合は空配列）
+    """
+    years = []
+    year = int(from_epoch_hours(np.array([watermark]))[0].year)
+    while all(os.path.exists(p) for p in source_paths(year, data_dir)):
+        years.append(year)
+        year += 1
+    if not years:
+        width = len(feature_columns())
+        return (np.empty(0, dtype=np.int64), np.empty((0, width), dtype=config.DATA_TYPE),
+                np.empty(0, dtype=config.DATA_TYPE))
+    keys, X, y = assemble_years(years, data_dir, cache_dir)
+    index = np.flatnonzero(keys > watermark)
+    return take_rows(keys, index), take_rows(X, index), take_rows(y, index)
+
+
+def write_split_csv(output_dir: str,
+                    X_train: np.ndarray, X_test: np.ndarray,
+                    y_train: np.ndarray, y_test: np.ndarray) -> Dict[str, int]:
+    """
+    学習・テストデータを従来形式のCSV（X/Xtrain/Xtest/Ytrain/Ytest）で出力する
+
+    Args:
+        output_dir: 出力ディレクトリ
+        X_train, X_test: 特徴量行列
+        y_train, y_test: 目的変数
+
+    Returns:
+        Dict[str, int]: 各出力ファイルの行数
+    """
+    import pandas as pd
+    os.makedirs(output_dir, exist_ok=True)
+    X_train_df = pd.DataFrame(np.asarray(X_train), columns=feature_columns())
+    X_test_df = pd.DataFrame(np.asarray(X_test), columns=feature_columns())
+    outputs = {
+        'X.csv': pd.concat([X_train_df, X_test_df], ignore_index=True),
+        'Xtrain.csv': X_train_df,
+        'Xtest.csv': X_test_df,
+        'Ytrain.csv': pd.DataFrame(np.asarray(y_train).astype(np.int64), columns=config.TARGET_COLUMNS),
+        'Ytest.csv': pd.DataFrame(np.asarray(y_test).astype(np.int64), columns=config.TARGET_COLUMNS),
+    }
+    for name, df in outputs.items():
+        df.to_csv(os.path.join(output_dir, name), index=False)
+    return {name: len(df) for name, df in outputs.items()}
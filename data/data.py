@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+電力需要予測AIモデル - 学習用データセット作成モジュール
+
+指定年の電力需要（juyo-YYYY.csv）と気温（temperature-YYYY.csv）を読み込み、
+epoch-hour キーで時刻を揃えて結合し、学習・テスト用データセットを作成するモジュール。
+CSV解析・結合は年別特徴量ブロック（common/year_blocks.py）として年ごとに1回だけ行い、
+年の組み合わせはブロックの連結のみで組み立てる。
+学習スクリプトはメモリマップで読み込むバイナリデータセット（data/dataset/、
+common/dataset_io.py）を使用し、CSVはエクスポート用として出力する。
+
+使用例:
+    py -3.10 data/data.py 2019,2020,2021
+    （最も新しい年をテスト年、それ以前を学習年として分割）
+    py -3.10 data/data.py 2000,...,2021 --shards
+    （多年・多エリア向け: エリア・年単位で逐次処理し data/shards/ にシャードとして出力）
+"""
+
+# 標準ライブラリインポート
+import os
+import sys
+import time
+import traceback
+import warnings
+import logging
+import gc
+import glob
+from typing import List, Optional, Dict
+from dataclasses import dataclass
+
+# サードパーティライブラリインポート
+import numpy as np
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import config as block_config, feature_columns, load_split, split_years, write_split_csv
+from common.dataset_io import write_dataset
+from common.shards import config as shard_config, discover_areas, write_shards
+
+# パフォーマンス最適化設定（統合版）
+warnings.filterwarnings('ignore', category=UserWarning)
+warnings.filterwarnings('ignore', category=FutureWarning)
+np.set_printoptions(suppress=True, precision=4)
+
+# ログ設定（詳細化）
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# 統一設定クラス（統合版）
+@dataclass(frozen=True)
+class DatasetConfig:
+    """学習用データセット作成設定クラス（設定値統一管理）"""
+    DATA_DIR: str = os.path.join(PROJECT_ROOT, 'data')
+
+    # 単年指定時のテスト割合（末尾から時系列順に確保）
+    SINGLE_YEAR_TEST_SIZE: float = block_config.SINGLE_YEAR_TEST_SIZE
+
+    # バイナリデータセットの出力先ディレクトリ名（出力ディレクトリ配下）
+    DATASET_SUBDIR: str = "dataset"
+    # CSVエクスポート（X/Xtrain/Xtest/Ytrain/Ytest.csv）を出力するか
+    EXPORT_CSV: bool = True
+
+
+# 統一設定インスタンス
+config = DatasetConfig()
+
+
+def safe_file_operation(operation: str):
+    """
+    ファイル操作エラーハンドリングデコレータ
+
+    Args:
+        operation: 操作名（ログ出力用）
+    """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            start_time = time.time()
+            try:
+                logger.info(f"{operation}開始")
+                result = func(*args, **kwargs)
+                logger.info(f"{operation}完了 (実行時間: {time.time() - start_time:.3f}秒)")
+                return result
+            except FileNotFoundError as e:
+                error_msg = f"{operation}失敗 - ファイルが見つかりません: {e}"
+                logger.error(error_msg)
+                raise FileNotFoundError(error_msg)
+            except Exception as e:
+                error_msg = f"{operation}失敗 - 予期しないエラー: {e}"
+                logger.error(error_msg)
+                traceback.print_exc()
+                raise
+        return wrapper
+    return decorator
+
+
+def get_available_years(data_dir: Optional[str] = None) -> List[int]:
+    """
+    電力需要・気温の両方が揃っている年を取得する
+
+    Args:
+        data_dir: データディレクトリ（デフォルト: config値）
+
+    Returns:
+        List[int]: 利用可能な年（昇順）
+    """
+    data_dir = data_dir or config.DATA_DIR
+    juyo_years = {os.path.basename(p)[5:9] for p in glob.glob(os.path.join(data_dir, "juyo-*.csv"))}
+    temp_years = {os.path.basename(p)[12:16] for p in glob.glob(os.path.join(data_dir, "temperature-*.csv"))}
+    return sorted(int(y) for y in juyo_years & temp_years if y.isdigit())
+
+
+def parse_years(arg: Optional[str]) -> List[int]:
+    """
+    "2019,2020,2021" 形式の年指定を整数リストに変換する
+
+    Args:
+        arg: カンマ区切りの年指定（None・空文字の場合は空リスト）
+
+    Returns:
+        List[int]: 年リスト（指定順を保持、重複は除去）
+
+    Raises:
+        ValueError: 年として解釈できない要素がある場合
+    """
+    if not arg:
+        return []
+    years: List[int] = []
+    for token in arg.split(','):
+        token = token.strip()
+        if not token:
+            continue
+        if not token.isdigit():
+            raise ValueError(f"年の指定が不正です: {token}")
+        if int(token) not in years:
+            years.append(int(token))
+    return years
+
+
+@safe_file_operation("学習用データセット作成")
+def build_dataset(years: List[int], data_dir: Optional[str] = None, output_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    指定年の学習用データセットを作成し、バイナリデータセット（dataset/）と
+    X/Xtrain/Xtest/Ytrain/Ytest CSV（エクスポート用）を出力する
+
+    複数年指定時は最も新しい年をテスト年、それ以前を学習年とする（年組み合わせ最適化と同じ規約）。
+    単年指定時は末尾 SINGLE_YEAR_TEST_SIZE の割合を時系列順にテストとする。
+
+    Args:
+        years: 対象年リスト（最も新しい年をテスト年とする）
+        data_dir: 入力データディレクトリ（デフォルト: config値）
+        output_dir: 出力ディレクトリ（デフォルト: data_dir）
+
+    Returns:
+        Dict[str, int]: 各出力の行数
+
+    Raises:
+        ValueError: 年が指定されていない場合、または学習・テストデータが空の場合
+    """
+    data_dir = data_dir or config.DATA_DIR
+    output_dir = output_dir or data_dir
+    if not years:
+        raise ValueError("対象年が指定されていません")
+
+    # 時系列分割エンジンによる分割（ランダム分割は未来の時刻が学習側に混入するため使用しない）
+    X_train, X_test, y_train, y_test = load_split(years, config.SINGLE_YEAR_TEST_SIZE, data_dir)
+
+    if len(X_train) == 0 or len(X_test) == 0:
+        raise ValueError(f"学習またはテストデータが空です (学習={len(X_train)}行, テスト={len(X_test)}行)")
+
+    counts: Dict[str, int] = {}
+    if config.EXPORT_CSV:
+        counts.update(write_split_csv(output_dir, X_train, X_test, y_train, y_test))
+
+    # バイナリデータセットはCSVの後に書き込む（学習スクリプトはCSVより新しい場合のみ使用する）
+    dataset_dir = os.path.join(output_dir, config.DATASET_SUBDIR)
+    header = write_dataset(X_train, X_test, y_train, y_test,
+                           feature_columns(), block_config.TARGET_COLUMNS,
+                           dataset_dir, extra={'years': [int(y) for y in years]})
+    counts.update({f"{name}.npy": shape['shape'][0] for name, shape in header['arrays'].items()})
+    logger.info(f"データセット作成完了: 年={years}, 学習={len(X_train):,}行, テスト={len(X_test):,}行, 出力={dataset_dir}")
+    return counts
+
+
+@safe_file_operation("シャードデータセット作成")
+def build_shards(years: List[int], shard_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    指定年のデータセットをアウトオブコアで作成しシャードとして出力する
+
+    data/areas/<エリア名>/ にエリア別入力データがあれば全エリアを対象とし、
+    無ければ data/ 直下の入力データを単一エリアとして扱う。
+
+    Args:
+        years: 対象年リスト（最も新しい年をテスト年とする）
+        shard_dir: 出力ディレクトリ（デフォルト: common/shards.py の config値）
+
+    Returns:
+        Dict[str, int]: 学習・テストの行数
+    """
+    areas = discover_areas() or None
+    if areas:
+        print(f"エリア別入力データ: {list(areas)}")
+    manifest = write_shards(years, areas, shard_dir)
+    counts = {'train': 0, 'test': 0}
+    for shard in manifest['shards']:
+        counts[shard['split']] += shard['rows']
+    logger.info(f"シャードデータセット作成完了: 年={years}, シャード数={len(manifest['shards'])}, "
+                f"出力={shard_dir or shard_config.SHARD_DIR}")
+    return counts
+
+
+def main() -> None:
+    """
+    メイン関数（統一パターン）
+
+    年指定の優先順位: コマンドライン引数 > 環境変数AI_TARGET_YEARS > 利用可能な全年
+    """
+    start_time = time.time()
+
+    try:
+        print("=== 学習用データセット作成開始 ===")
+
+        args = [a for a in sys.argv[1:] if not a.startswith('--')]
+        use_shards = '--shards' in sys.argv[1:]
+        years = parse_years(args[0] if args else os.environ.get('AI_TARGET_YEARS', ''))
+        if not years:
+            years = get_available_years()
+            print(f"年指定なし - 利用可能な全年を使用: {years}")
+        else:
+            print(f"対象年: {years}（テスト年: {split_years(years)[1] if len(years) >= 2 else '末尾' + str(int(config.SINGLE_YEAR_TEST_SIZE * 100)) + '%'}）")
+
+        counts = build_shards(years) if use_shards else build_dataset(years)
+        for name, count in counts.items():
+            print(f"{name}: {count:,}行")
+
+        gc.collect()
+        elapsed_time = time.time() - start_time
+        print(f"=== 学習用データセット作成完了 (実行時間: {elapsed_time:.2f}秒) ===")
+
+    except Exception as e:
+        print(f"学習用データセット作成エラー: {e}")
+        traceback.print_exc()
+        sys.exit(1)
+
+
+# メイン実行部（モジュールとして実行された場合）
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+テスト共通フィクスチャ
+
+学習・翌日予測スクリプトはパッケージではないため、ファイルパスから読み込む（load_script）。
+入力データは気象庁・電力会社のCSVと同じ形式の合成データを一時ディレクトリに作成し、
+年別特徴量ブロックの入力・キャッシュディレクトリをそこに切り替える（synthetic_years）。
+"""
+
+import os
+import sys
+import dataclasses
+import importlib.util
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# 合成データの対象年
+SYNTHETIC_YEARS = (2019, 2020)
+
+
+def load_script(relative_path: str):
+    """プロジェクトルートからの相対パスでスクリプトをモジュールとして読み込む"""
+    name = os.path.splitext(os.path.basename(relative_path))[0]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(PROJECT_ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_synthetic_year(data_dir: str, year: int, rng: np.random.Generator) -> None:
+    """1年分の電力需要・気温CSV（SHIFT-JIS、実データと同じヘッダー行数・日時形式）を作成する"""
+    import pandas as pd
+    hours = pd.date_range(f'{year}-01-01', f'{year}-12-31 23:00', freq='h')
+    phase = np.arange(len(hours))
+    kw = (3000 + 800 * np.sin(phase / 24 * 2 * np.pi) + rng.normal(0, 50, len(hours))).astype(int)
+    with open(os.path.join(data_dir, f'juyo-{year}.csv'), 'w', encoding='shift_jis') as f:
+        f.write(f'{year}/12/31 23:55 UPDATE\n\nDATE,TIME,実績(万kW)\n')
+        for t, k in zip(hours, kw):
+            f.write(f'{t.year}/{t.month}/{t.day},{t.hour}:00,{k}\n')
+    # 気温CSVは新しい時刻が先頭（1時間後の時刻を記録）
+    temp = np.round(15 + 10 * np.sin(phase / 8760 * 2 * np.pi) + rng.normal(0, 1, len(hours)), 1)
+    with open(os.path.join(data_dir, f'temperature-{year}.csv'), 'w', encoding='shift_jis') as f:
+        f.write('ダウンロードした時刻：2025/01/01 00:00:00\n\n,東京,東京,東京\n'
+                '年月日時,気温(℃),気温(℃),気温(℃)\n,,品質情報,均質番号\n')
+        for t, v in zip((hours + pd.Timedelta(hours=1))[::-1], temp):
+            f.write(f'{t.year}/{t.month}/{t.day} {t.hour}:00:00,{v},8,1\n')
+
+
+@pytest.fixture(scope='session')
+def synthetic_data_dir(tmp_path_factory) -> str:
+    """合成入力CSVのディレクトリ（セッション内で1回作成）"""
+    data_dir = str(tmp_path_factory.mktemp('data'))
+    rng = np.random.default_rng(0)
+    for year in SYNTHETIC_YEARS:
+        write_synthetic_year(data_dir, year, rng)
+    return data_dir
+
+
+@pytest.fixture
+def synthetic_years(synthetic_data_dir, tmp_path, monkeypatch):
+    """
+    年別特徴量ブロックの入力を合成データに切り替え、学習・予測が書き込むキャッシュ
+    （特徴量ブロック・LightGBM Dataset・グラフのフォント・スレッド予算のリース）と
+    作業ディレクトリを一時ディレクトリに切り替える（リポジトリの data/cache には書き込まない）
+    """
+    from common import year_blocks, lgb_dataset_cache, plot_style, thread_budget
+    monkeypatch.setattr(year_blocks, 'config', dataclasses.replace(
+        year_blocks.config, DATA_DIR=synthetic_data_dir, CACHE_DIR=str(tmp_path / 'blocks')))
+    monkeypatch.setattr(lgb_dataset_cache, 'config', dataclasses.replace(
+        lgb_dataset_cache.config, CACHE_DIR=str(tmp_path / 'lgb_datasets')))
+    monkeypatch.setattr(plot_style, 'config', dataclasses.replace(
+        plot_style.config, FONT_CACHE_FILE=str(tmp_path / 'plot_font.json')))
+    monkeypatch.setattr(thread_budget, 'config', dataclasses.replace(
+        thread_budget.config, LEASE_DIR=str(tmp_path / 'thread_budget')))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('MPLBACKEND', 'Agg')
+    return list(SYNTHETIC_YEARS)
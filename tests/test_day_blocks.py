@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""日単位データセット（common/day_blocks.py）の組み替えと1行1時刻への復元のテスト"""
+
+import numpy as np
+
+from common.day_blocks import DayLayout
+
+COLUMNS = ["MONTH", "WEEK", "HOUR", "TEMP", "CALENDAR"]
+# 2020-01-01 00:00 の epoch-hour
+BASE_KEY = 18262 * 24
+
+
+def hourly_rows(keys: np.ndarray):
+    """時刻キーから1行1時刻の特徴量（TEMP は行ごとに異なる値）と目的変数を作成する"""
+    day = keys // 24 - keys[0] // 24
+    X = np.column_stack([
+        np.ones(len(keys)), (day + 2) % 7, keys % 24, np.arange(len(keys)) * 0.5 + 10, day % 2,
+    ]).astype(np.float32)
+    y = (3000 + np.arange(len(keys))).astype(np.float32)
+    return X, y
+
+
+def partial_days_with_gaps() -> np.ndarray:
+    """1日目は 05時から、4日目は 16時まで、2日目の 10・11時と3日目の 00時が欠けた時刻キー"""
+    keys = np.arange(BASE_KEY + 5, BASE_KEY + 3 * 24 + 17, dtype=np.int64)
+    missing = [BASE_KEY + 24 + 10, BASE_KEY + 24 + 11, BASE_KEY + 48]
+    return keys[~np.isin(keys, missing)]
+
+
+def test_round_trip_with_missing_hours_and_partial_days():
+    keys = partial_days_with_gaps()
+    X, y = hourly_rows(keys)
+    layout = DayLayout(COLUMNS)
+    blocks = layout.to_day_blocks(X, y, keys, complete_only=False)
+    assert len(blocks) == 4
+    assert blocks.coverage == 1.0
+
+    temp = blocks.X[:, len(layout.day_columns):].reshape(4, 24)
+    # 日単位の予測値を1行1時刻に戻すと元の行順の値になる（TEMP を予測値とみなす）
+    np.testing.assert_array_equal(blocks.to_hourly(temp), X[:, COLUMNS.index("TEMP")])
+
+    first_row = {int(k): i for i, k in enumerate(keys)}
+    temp_of = lambda key: X[first_row[key], COLUMNS.index("TEMP")]
+    # 1日目の先頭の欠けた時刻は最初の時刻（05時）で補う
+    np.testing.assert_array_equal(temp[0, :5], temp_of(BASE_KEY + 5))
+    # 途中の欠けた時刻は直前の時刻で補う
+    assert temp[1, 10] == temp[1, 11] == temp_of(BASE_KEY + 24 + 9)
+    assert temp[2, 0] == temp_of(BASE_KEY + 48 + 1)
+    # 最終日の末尾は 16時の値で補う
+    np.testing.assert_array_equal(temp[3, 17:], temp_of(BASE_KEY + 72 + 16))
+    # 欠けた時刻の目的変数は NaN
+    assert np.isnan(blocks.y[1, 10]) and np.isnan(blocks.y[0, 0]) and not np.isnan(blocks.y[0, 5])
+
+
+def test_hour_wraparound_matches_time_keys():
+    keys = partial_days_with_gaps()
+    X, y = hourly_rows(keys)
+    layout = DayLayout(COLUMNS)
+    by_keys = layout.to_day_blocks(X, y, keys, complete_only=False)
+    by_hour = layout.to_day_blocks(X, y, complete_only=False)
+    np.testing.assert_array_equal(by_hour.row_index, by_keys.row_index)
+    np.testing.assert_array_equal(by_hour.X, by_keys.X)
+
+
+def test_training_uses_complete_days_only():
+    keys = partial_days_with_gaps()
+    X, y = hourly_rows(keys)
+    blocks = DayLayout(COLUMNS).to_day_blocks(X, y, keys)
+    # 先頭・末尾は途中からの日、中の2日は欠けた時刻があるため、24 時間そろった日は無い
+    assert len(blocks) == 0
+
+    full = np.arange(BASE_KEY, BASE_KEY + 3 * 24, dtype=np.int64)
+    X, y = hourly_rows(np.delete(full, 30))
+    blocks = DayLayout(COLUMNS).to_day_blocks(X, y, np.delete(full, 30))
+    assert len(blocks) == 2 and not np.isnan(blocks.y).any()
+    np.testing.assert_array_equal(blocks.hourly_targets(), np.concatenate([y[:24], y[-24:]]))
+    # 日で一定の列は1列、HOUR は含めない
+    assert blocks.columns[:3] == ["MONTH", "WEEK", "CALENDAR"] and "HOUR" not in blocks.columns
+
+
+def test_duplicate_hour_uses_later_row():
+    keys = np.arange(BASE_KEY, BASE_KEY + 24, dtype=np.int64)
+    keys = np.insert(keys, 11, BASE_KEY + 10)
+    X, y = hourly_rows(keys)
+    blocks = DayLayout(COLUMNS).to_day_blocks(X, y, keys)
+    assert len(blocks) == 1
+    assert blocks.row_index[0, 10] == 11 and blocks.y[0, 10] == y[11]
+    # 使用されなかった重複行は1行1時刻に戻したとき NaN
+    hourly = blocks.to_hourly(blocks.y)
+    assert np.isnan(hourly[10]) and hourly[11] == y[11]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""需要ラグ・移動窓特徴量（common/demand_features.py）と学習データへの付加のテスト"""
+
+import dataclasses
+
+import numpy as np
+
+from common import year_blocks
+from common.demand_features import DEFAULT_SPEC, DemandFeatureStore, compute_demand_features
+
+
+def demand_history(rng: np.random.Generator, start: int, hours: int):
+    """欠損時刻を含む需要履歴（epoch-hour, KW）"""
+    keys = np.arange(start, start + hours, dtype=np.int64)
+    kw = 3000 + 800 * np.sin(keys / 24 * 2 * np.pi) + rng.normal(0, 50, hours)
+    keep = rng.random(hours) > 0.02
+    return keys[keep], kw[keep]
+
+
+def test_features_only_reference_settled_days():
+    # 当日の日中に実行した翌日予測で、翌日の全時刻が前日以前の需要のみを参照する
+    assert DEFAULT_SPEC.min_offset >= 48
+
+
+def test_store_ingest_matches_batch_computation():
+    rng = np.random.default_rng(0)
+    keys, kw = demand_history(rng, 400_000, 24 * 30)
+    store = DemandFeatureStore(history_hours=24 * 40)
+    # 日ごとに取り込み、途中で過去の値の訂正も取り込む
+    for day in range(30):
+        in_day = (keys >= 400_000 + day * 24) & (keys < 400_000 + (day + 1) * 24)
+        store.ingest(keys[in_day], kw[in_day])
+    corrected = kw.copy()
+    corrected[100] += 500.0
+    store.ingest(keys[100:101], corrected[100:101])
+
+    targets = np.arange(keys.min(), keys.max() + DEFAULT_SPEC.max_offset + 1, dtype=np.int64)
+    expected = compute_demand_features(keys, corrected, target_keys=targets)
+    np.testing.assert_allclose(store.lookup(targets), expected, rtol=1e-6, equal_nan=True)
+
+
+def test_training_rows_without_run_in_are_dropped(synthetic_years, monkeypatch):
+    monkeypatch.setattr(year_blocks, 'config', dataclasses.replace(year_blocks.config, DEMAND_FEATURES=True))
+    X_train, X_test, y_train, y_test = year_blocks.load_split(synthetic_years)
+
+    assert X_train.shape[1] == len(year_blocks.feature_columns())
+    assert np.isfinite(X_train).all() and np.isfinite(X_test).all()
+    # 最初の年は前年データが無いため、先頭の参照範囲分の行を除く
+    first_year = year_blocks.load_year_block(synthetic_years[0])
+    test_year = year_blocks.load_year_block(synthetic_years[-1])
+    assert len(X_train) == len(first_year.keys) - DEFAULT_SPEC.max_offset
+    assert len(X_test) == len(test_year.keys)
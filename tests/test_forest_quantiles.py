@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""分位点予測の予測区間の較正（common/forest_quantiles.py）のテスト"""
+
+import os
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from common.forest_quantiles import (
+    build_leaf_samples, calibrate_interval, interval_coverage, load_leaf_samples, save_leaf_samples,
+)
+
+
+def make_noisy(rng: np.random.Generator, n_rows: int):
+    """入力によってばらつきの大きさが変わる目的変数"""
+    X = rng.uniform(-2, 2, (n_rows, 4))
+    y = np.sin(X[:, 0] * 2) + X[:, 1] + (0.2 + 0.3 * np.abs(X[:, 2])) * rng.standard_normal(n_rows)
+    return X, y
+
+
+def test_calibrated_interval_reaches_target_coverage(tmp_path):
+    X, y = make_noisy(np.random.default_rng(0), 4000)
+    model = RandomForestRegressor(n_estimators=50, min_samples_leaf=1, random_state=0).fit(X, y)
+    samples = build_leaf_samples(model, X, y)
+    margin, oob_coverage = calibrate_interval(samples, model, X, y)
+    samples.interval_margin = margin
+    assert margin > 0 and oob_coverage < 0.8
+
+    model_path = os.path.join(tmp_path, 'model.sav')
+    joblib.dump(model, model_path)
+    save_leaf_samples(samples, model_path)
+    loaded = load_leaf_samples(model_path)
+    assert loaded is not None and loaded.interval_margin == margin
+
+    X_test, y_test = make_noisy(np.random.default_rng(1), 2000)
+    bands = loaded.predict_interval(model.apply(X_test))
+    raw = interval_coverage(y_test, bands[:, 0] + margin, bands[:, 1] - margin)
+    coverage = interval_coverage(y_test, bands[:, 0], bands[:, 1])
+    assert raw < 0.75
+    assert 0.75 <= coverage <= 0.88
+
+
+def test_trees_can_be_excluded_per_row():
+    X, y = make_noisy(np.random.default_rng(0), 500)
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+    samples = build_leaf_samples(model, X, y)
+    use_tree = np.ones((3, 5), dtype=bool)
+    use_tree[1] = False
+    use_tree[2, 1:] = False
+    leaves = model.apply(X[:3])
+
+    result = samples.predict_quantiles(leaves, (0.5,), use_tree=use_tree)
+    assert result[0, 0] == samples.predict_quantiles(leaves[:1], (0.5,))[0, 0]
+    # 使用する木が無い行は NaN
+    assert np.isnan(result[1, 0])
+    # 最初の木のみを使用する行は、その木の葉の学習行の値になる
+    node = leaves[2, 0] + samples.node_offset[0]
+    start, count = samples.leaf_start[node], samples.leaf_count[node]
+    assert result[2, 0] in samples.values[start:start + count]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""日本のカレンダーテーブル（common/jp_calendar.py）の祝日・フラグのテスト"""
+
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from common.jp_calendar import (
+    FLAG_BRIDGE, FLAG_HOLIDAY, FLAG_OBON, FLAG_YEAR_END, calendar_flags, national_holidays,
+)
+
+
+def noon(*ymd: int) -> int:
+    """日付の正午の epoch-hour"""
+    return (dt.date(*ymd) - dt.date(1970, 1, 1)).days * 24 + 12
+
+
+@pytest.mark.parametrize('year', [2009, 2015, 2026])
+def test_silver_week(year):
+    # 敬老の日（月）と秋分の日（水）に挟まれた火曜日は国民の休日
+    holidays = national_holidays(year)
+    assert {dt.date(year, 9, 21), dt.date(year, 9, 22), dt.date(year, 9, 23)} <= holidays
+    assert dt.date(year, 9, 24) not in holidays
+
+
+def test_enthronement_2019():
+    holidays = national_holidays(2019)
+    golden_week = {dt.date(2019, 4, 27) + dt.timedelta(days=i) for i in range(10)}
+    weekdays = {d for d in golden_week if d.weekday() < 5}
+    # 4/29〜5/6 の平日（即位の日・国民の休日・振替休日）は全て休日
+    assert weekdays <= holidays
+    assert dt.date(2019, 10, 22) in holidays
+    # 天皇誕生日は 2019年には無い
+    assert dt.date(2019, 12, 23) not in holidays and dt.date(2019, 2, 23) not in holidays
+
+
+@pytest.mark.parametrize('year, moved, regular', [
+    (2020, [(7, 23), (7, 24), (8, 10)], [(7, 20), (8, 11), (10, 12)]),
+    (2021, [(7, 22), (7, 23), (8, 8), (8, 9)], [(7, 19), (8, 11), (10, 11)]),
+])
+def test_olympic_moves(year, moved, regular):
+    holidays = national_holidays(year)
+    assert {dt.date(year, m, d) for m, d in moved} <= holidays
+    assert not {dt.date(year, m, d) for m, d in regular} & holidays
+
+
+def test_substitute_holiday_2021_08_09():
+    # 日曜日の山の日（8/8）の振替休日
+    assert dt.date(2021, 8, 8).weekday() == 6
+    assert dt.date(2021, 8, 9) in national_holidays(2021)
+
+
+def test_calendar_flags():
+    hours = np.array([
+        noon(2019, 5, 1),    # 即位の日
+        noon(2016, 5, 2),    # 日曜日と憲法記念日に挟まれた月曜日
+        noon(2020, 8, 14),   # お盆の平日
+        noon(2021, 12, 30),  # 年末
+        noon(2022, 1, 1),    # 元日（祝日かつ年始）
+        noon(2021, 6, 9),    # 平日
+    ])
+    np.testing.assert_array_equal(calendar_flags(hours), [
+        FLAG_HOLIDAY, FLAG_BRIDGE, FLAG_OBON, FLAG_YEAR_END, FLAG_HOLIDAY | FLAG_YEAR_END, 0,
+    ])
+    # 同じ日の全時刻が同じフラグ
+    day = noon(2019, 5, 1) - 12 + np.arange(24)
+    assert (calendar_flags(day) == FLAG_HOLIDAY).all()
+
+
+def test_flags_outside_table_are_zero():
+    hours = np.array([noon(1999, 12, 31), noon(2000, 1, 1), noon(2050, 12, 31), noon(2051, 1, 1)])
+    flags = calendar_flags(hours)
+    assert flags.dtype == np.uint8
+    np.testing.assert_array_equal(flags, [0, FLAG_HOLIDAY | FLAG_YEAR_END, FLAG_YEAR_END, 0])
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""LightGBM Dataset バイナリキャッシュ（common/lgb_dataset_cache.py）のカテゴリ変数の指定のテスト"""
+
+import json
+import os
+import warnings
+
+import lightgbm as lgb
+import numpy as np
+
+from common.lgb_dataset_cache import cached_dataset
+from conftest import load_script
+
+PARAMS = {'objective': 'regression', 'verbose': -1, 'min_child_samples': 5, 'seed': 0}
+
+
+def categorical_data():
+    """偶数・奇数のカテゴリで需要が分かれる（大小の順序では分割しにくい）データ"""
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.integers(0, 8, 2000), rng.normal(size=2000)]).astype(np.float32)
+    y = np.where(X[:, 0] % 2 == 0, 3000.0, 2000.0) + 10 * X[:, 1]
+    return X, y
+
+
+def has_categorical_split(booster: lgb.Booster) -> bool:
+    return '"decision_type": "=="' in json.dumps(booster.dump_model())
+
+
+def test_categorical_feature_is_passed_to_dataset(tmp_path):
+    X, y = categorical_data()
+    cache_dir = str(tmp_path / 'lgb_datasets')
+    with warnings.catch_warnings():
+        # params 内の categorical_feature は LightGBM が警告して無視する
+        warnings.simplefilter('error')
+        for _ in range(2):  # 作成・キャッシュ読み込み
+            train_set = cached_dataset(X, y, PARAMS, cache_dir=cache_dir, categorical_feature=[0])
+            valid_set = cached_dataset(X[:200], y[:200], PARAMS, reference=train_set, cache_dir=cache_dir,
+                                       categorical_feature=[0])
+            booster = lgb.train(PARAMS, train_set, num_boost_round=5, valid_sets=[valid_set])
+            assert has_categorical_split(booster)
+    assert len(os.listdir(cache_dir)) == 2
+
+    # カテゴリ変数の指定はキャッシュキーに含める
+    numeric_set = cached_dataset(X, y, PARAMS, cache_dir=cache_dir)
+    assert numeric_set.cache_key != train_set.cache_key
+    assert not has_categorical_split(lgb.train(PARAMS, numeric_set, num_boost_round=5))
+
+
+def test_booster_params_leave_categoricals_to_dataset(synthetic_years):
+    tm = load_script('train/LightGBM/LightGBM_train.py')
+    assert tm.categorical_indices()
+    assert 'categorical_feature' not in tm.booster_params(tm.create_lightgbm_model())
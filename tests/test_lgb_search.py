@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""LightGBM ハイパーパラメータ探索（common/lgb_search.py）のテスト"""
+
+import dataclasses
+import json
+import os
+
+import numpy as np
+import pytest
+
+from common import lgb_search
+from common.lgb_search import AshaScheduler, load_best_params, run_search, save_best_params, tuned_params_mismatch
+
+BASE_PARAMS = {'objective': 'regression', 'verbose': -1, 'seed': 0, 'deterministic': True}
+
+
+@pytest.fixture
+def small_search(monkeypatch):
+    """ラング 2, 6, 18 回・9試行の小さな探索設定"""
+    monkeypatch.setattr(lgb_search, 'config', dataclasses.replace(
+        lgb_search.config, N_TRIALS=9, MIN_ROUNDS=2, MAX_ROUNDS=18, REDUCTION_FACTOR=3))
+
+
+def synthetic_data():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((600, 4))
+    y = 3000 + 500 * X[:, 0] + 200 * np.sin(X[:, 1]) + rng.normal(0, 20, len(X))
+    return X[:500], y[:500], X[500:], y[500:]
+
+
+def test_asha_promotes_top_fraction_of_each_rung():
+    scheduler = AshaScheduler([2, 6, 18], n_trials=9, reduction_factor=3, seed=0)
+    # 評価済みが3件未満の間は新しい試行を開始する
+    assert [scheduler.next_job() for _ in range(3)] == [(0, 0), (1, 0), (2, 0)]
+    for trial_id, rmse in [(0, 30.0), (1, 10.0), (2, 20.0)]:
+        scheduler.report(trial_id, 0, rmse)
+    # 3件中の上位1件（RMSE 最小の試行1）をラング1へ昇格させ、同じ試行は再昇格しない
+    assert scheduler.next_job() == (1, 1)
+    assert scheduler.next_job() == (3, 0)
+
+    # 評価済み4件の上位1件が入れ替わった場合は新しい上位の試行を昇格させる
+    scheduler.report(3, 0, 5.0)
+    assert scheduler.next_job() == (3, 1)
+    assert scheduler.next_job() == (4, 0)
+    scheduler.report(4, 0, 40.0)
+    assert scheduler.next_job() == (5, 0)
+    scheduler.report(5, 0, 50.0)
+    # 6件中の上位2件（試行3, 1）は昇格済みのため新しい試行を開始する
+    assert scheduler.next_job() == (6, 0)
+    scheduler.report(1, 1, 9.0)
+    scheduler.report(3, 1, 4.0)
+    # ラング1は評価済み2件のため、まだ昇格させない
+    assert scheduler.next_job() == (7, 0)
+    scheduler.report(6, 0, 60.0)
+    scheduler.report(7, 0, 60.0)
+    assert scheduler.next_job() == (8, 0)
+    scheduler.report(8, 0, 1.0)
+    # 上位ラングの昇格を優先し、試行数に達した後は残りの昇格のみ
+    assert scheduler.next_job() == (8, 1)
+    scheduler.report(8, 1, 8.0)
+    assert scheduler.next_job() == (3, 2)
+    assert scheduler.next_job() is None
+
+
+def test_search_evaluates_rungs_and_resumes_from_cache(small_search, tmp_path):
+    X_train, y_train, X_val, y_val = synthetic_data()
+    cache_dir = str(tmp_path / 'cache')
+    first = run_search(X_train, y_train, X_val, y_val, BASE_PARAMS, n_workers=1, threads_per_trial=1,
+                       cache_dir=cache_dir)
+
+    assert first.rungs == [2, 6, 18]
+    per_rung = [sorted(r.trial_id for r in first.results if r.rung == k) for k in range(3)]
+    assert per_rung[0] == list(range(9))
+    assert len(per_rung[1]) == 3 and len(per_rung[2]) == 1
+    assert set(per_rung[2]) <= set(per_rung[1])
+    assert not any(r.cached for r in first.results)
+    assert first.best.rmse == min(r.rmse for r in first.results)
+
+    # 評価結果は1件1行でデータハッシュごとのファイルに追記される
+    cache_path = os.path.join(cache_dir, f"{first.data_hash}.jsonl")
+    with open(cache_path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == len(first.results)
+    # スレッド数は結果に影響しないためキャッシュに含めない
+    assert not any("num_threads" in line["params"] for line in lines)
+
+    # 中断で途中まで書かれた行は無視し、同じ試行列をキャッシュのみで再開する
+    with open(cache_path, 'a', encoding='utf-8') as f:
+        f.write('{"params": {"num_leaves"')
+    second = run_search(X_train, y_train, X_val, y_val, BASE_PARAMS, n_workers=1, threads_per_trial=1,
+                        cache_dir=cache_dir)
+    assert all(r.cached for r in second.results)
+    evaluations = lambda result: [(r.trial_id, r.rung, r.rmse) for r in result.results]
+    assert evaluations(second) == evaluations(first)
+    assert second.best.params == first.best.params
+
+    # データが変わった場合は別のキャッシュファイルになる
+    assert run_search(X_train, y_train + 1.0, X_val, y_val, BASE_PARAMS, n_workers=1, threads_per_trial=1,
+                      cache_dir=cache_dir).data_hash != first.data_hash
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_tuned_params_are_rejected_for_other_training_data(small_search, tmp_path):
+    X_train, y_train, X_val, y_val = synthetic_data()
+    result = run_search(X_train, y_train, X_val, y_val, BASE_PARAMS, n_workers=1, threads_per_trial=1,
+                        cache_dir=str(tmp_path / 'cache'))
+    training_hash = lgb_search.training_data_hash(X_train, y_train)
+    path = str(tmp_path / 'LightGBM_params.json')
+    save_best_params(result, path=path, training_hash=training_hash, target_years="2020,2019")
+
+    tuned = load_best_params(path)
+    assert tuned['num_boost_round'] == result.best.rounds and tuned['target_years'] == [2019, 2020]
+    # 対象年の指定は順序・空白に依らず照合する
+    assert tuned_params_mismatch(tuned, training_hash, " 2019, 2020") is None
+    assert "対象年" in tuned_params_mismatch(tuned, training_hash, "2019")
+    assert "照合できません" in tuned_params_mismatch(tuned, None, "2019,2020")
+    other_hash = lgb_search.training_data_hash(X_train, y_train + 1.0)
+    assert "異なります" in tuned_params_mismatch(tuned, other_hash, "2019,2020")
+    assert load_best_params(str(tmp_path / 'missing.json')) is None
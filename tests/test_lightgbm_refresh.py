@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""LightGBM 差分更新のウォーターマーク（train/LightGBM/LightGBM_train.py）のテスト"""
+
+import dataclasses
+
+import numpy as np
+
+from common.year_blocks import load_since, training_keys, training_watermark
+from conftest import load_script
+
+
+def test_training_watermark_skips_holdout_rows(synthetic_years):
+    keys = training_keys(synthetic_years)
+    assert training_watermark(synthetic_years) == keys[-1]
+    assert training_watermark(synthetic_years, holdout_rows=10) == keys[-11]
+
+
+def test_refresh_window_starts_after_validation_split(synthetic_years, tmp_path, monkeypatch):
+    tm = load_script('train/LightGBM/LightGBM_train.py')
+    monkeypatch.setattr(tm, 'config', dataclasses.replace(tm.config, EARLY_STOPPING=True, USE_TUNED_PARAMS=False))
+    out = tmp_path / 'out'
+    model_sav = str(out / 'LightGBM_model.sav')
+    result = tm.train('Xtrain.csv', 'Xtest.csv', 'Ytrain.csv', 'Ytest.csv', model_sav,
+                      str(out / 'Ypred.csv'), str(out / 'Ypred.png'), str(out / 'Ypred_7d.png'),
+                      target_years=','.join(str(y) for y in synthetic_years))
+    assert result is not None
+
+    metadata = tm.load_model_metadata(model_sav)
+    n_val = metadata['validation_rows']
+    keys = training_keys(synthetic_years)
+    assert n_val > 0
+    # ウォーターマークは学習した最終行（検証データの直前）
+    assert metadata['watermark'] == keys[-n_val - 1]
+
+    # 差分更新の新規行は検証データの先頭から始まり、検証データを全て含む
+    new_keys, X_new, y_new = load_since(metadata['watermark'])
+    np.testing.assert_array_equal(new_keys[:n_val], keys[-n_val:])
+    assert len(X_new) == len(y_new) == len(new_keys)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Keras 全結合ネットワークの NumPy 推論エンジン（common/mlp_inference.py）のテスト"""
+
+import os
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from common import mlp_inference
+from common.mlp_inference import (
+    AffineScaler, NumpyMLP, convert_keras_snapshots, export_for_model, load_for_model, load_mlp_file, save_mlp,
+    stack_mlps,
+)
+
+
+def random_mlp(rng: np.random.Generator, n_features: int = 6) -> NumpyMLP:
+    """Keras_train.py と同じ構成（Dense + relu / tanh / linear）の乱数重みのモデル"""
+    sizes = [n_features, 16, 8, 1]
+    return NumpyMLP(
+        kernels=[rng.standard_normal((a, b)).astype(np.float32) * 0.5 for a, b in zip(sizes, sizes[1:])],
+        biases=[rng.standard_normal(b).astype(np.float32) * 0.1 for b in sizes[1:]],
+        activations=['relu', 'tanh', 'linear'],
+        x_scaler=AffineScaler(np.zeros(n_features, np.float32), np.ones(n_features, np.float32)),
+        y_scaler=AffineScaler(np.zeros(1, np.float32), np.ones(1, np.float32)),
+    )
+
+
+@pytest.fixture(scope='module')
+def keras_model(tmp_path_factory):
+    """学習済みの小さな Keras モデル（.h5）と標準化スケーラー"""
+    tf = pytest.importorskip('tensorflow')
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((512, 6)).astype(np.float32)
+    y = (np.sin(X[:, :1]) + X[:, 1:2] ** 2).astype(np.float32)
+    x_scaler, y_scaler = StandardScaler().fit(X), StandardScaler().fit(y)
+
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(6,)),
+        tf.keras.layers.Dense(16, activation='relu'),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.Dense(8, activation='tanh'),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer='adam', loss='mse')
+    model.fit(x_scaler.transform(X), y_scaler.transform(y), epochs=2, batch_size=64, verbose=0)
+    model_path = str(tmp_path_factory.mktemp('keras') / 'Keras_model.h5')
+    model.save(model_path)
+    return model, x_scaler, y_scaler, model_path
+
+
+def test_numpy_predictions_match_keras(keras_model):
+    model, x_scaler, y_scaler, model_path = keras_model
+    assert export_for_model(model, x_scaler, y_scaler, model_path) is not None
+    mlp = load_for_model(model_path)
+    assert mlp is not None
+
+    X = x_scaler.transform(np.random.default_rng(1).standard_normal((300, 6))).astype(np.float32)
+    np.testing.assert_allclose(mlp.predict(X), model.predict(X, verbose=0), rtol=0, atol=1e-5)
+    # 元スケール（kW）の予測も標準化スケーラーの逆変換と一致する
+    raw = x_scaler.inverse_transform(X)
+    np.testing.assert_allclose(mlp.predict_kw(raw), y_scaler.inverse_transform(model.predict(X, verbose=0)),
+                               rtol=1e-5, atol=1e-4)
+
+
+def test_stale_export_is_rejected(keras_model):
+    model, x_scaler, y_scaler, model_path = keras_model
+    export_for_model(model, x_scaler, y_scaler, model_path)
+    assert load_for_model(model_path) is not None
+
+    # 変換後に学習済みモデルが更新された場合は TensorFlow で読み込ませる
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_for_model(model_path) is None
+
+
+def test_stacked_prediction_is_member_mean(tmp_path):
+    rng = np.random.default_rng(0)
+    members = [random_mlp(rng) for _ in range(4)]
+    stacked = stack_mlps(members)
+    assert stacked.n_snapshots == 4
+
+    # 1チャンクに収まる行数と、CHUNK_ELEMENTS を超えて分割される行数
+    chunk_rows = mlp_inference.config.CHUNK_ELEMENTS // (stacked.n_snapshots * 16)
+    for rows in (14, chunk_rows * 3 + 7):
+        X = rng.standard_normal((rows, 6)).astype(np.float32)
+        expected = np.mean([m.predict(X) for m in members], axis=0)
+        np.testing.assert_allclose(stacked.predict(X), expected, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(stacked.predict(X), np.mean([m.predict(X) for m in stacked.members()], axis=0),
+                                   rtol=1e-5, atol=1e-6)
+
+    # 積み重ねた重みの保存・読み込み
+    path = str(tmp_path / 'stacked_mlp.npz')
+    save_mlp(stacked, path)
+    loaded = load_mlp_file(path)
+    X = rng.standard_normal((50, 6)).astype(np.float32)
+    np.testing.assert_array_equal(loaded.predict(X), stacked.predict(X))
+
+
+def test_stack_rejects_different_architectures():
+    rng = np.random.default_rng(0)
+    with pytest.raises(ValueError):
+        stack_mlps([random_mlp(rng), random_mlp(rng, n_features=5)])
+
+
+def test_keras_snapshots_are_averaged(keras_model):
+    model, x_scaler, y_scaler, _ = keras_model
+    weights = model.get_weights()
+    perturbed = [w + np.float32(0.05) for w in weights]
+    stacked = convert_keras_snapshots(model, [perturbed, weights], x_scaler, y_scaler)
+    # 変換後は元の重みに戻る
+    assert all(np.array_equal(a, b) for a, b in zip(model.get_weights(), weights))
+
+    X = x_scaler.transform(np.random.default_rng(2).standard_normal((40, 6))).astype(np.float32)
+    current = model.predict(X, verbose=0)
+    model.set_weights(perturbed)
+    try:
+        previous = model.predict(X, verbose=0)
+    finally:
+        model.set_weights(weights)
+    np.testing.assert_allclose(stacked.predict(X), (current + previous) / 2, rtol=0, atol=1e-5)
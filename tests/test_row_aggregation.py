@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""学習行の集約（common/row_aggregation.py）のテスト"""
+
+import numpy as np
+import pytest
+
+from common.row_aggregation import aggregate_rows
+
+
+def discrete_rows(rng: np.random.Generator, n_rows: int = 2000):
+    """MONTH / HOUR / TEMP（0.1℃単位）のような離散的な特徴量で重複の多い学習データ"""
+    X = np.column_stack([
+        rng.integers(1, 3, n_rows), rng.integers(0, 4, n_rows), rng.integers(50, 60, n_rows) / 10,
+    ]).astype(np.float32)
+    y = 3000 + 100 * X[:, 1] + rng.normal(0, 50, n_rows)
+    return X, y
+
+
+def test_weighted_loss_equals_source_loss_up_to_constant():
+    rng = np.random.default_rng(0)
+    X, y = discrete_rows(rng)
+    agg = aggregate_rows(X, y, dtype='float64')
+    assert len(agg.X) < len(X) and agg.weight.sum() == len(X)
+
+    # 集約行の重み付き二乗誤差と元データの二乗誤差の差は予測値に依らず Σ(y_i - ȳ)^2
+    within = np.sum((y - agg.y[agg.inverse]) ** 2)
+    for _ in range(3):
+        f = rng.normal(3100, 200, len(agg.X))
+        source_loss = np.sum((f[agg.inverse] - y) ** 2)
+        weighted_loss = np.sum(agg.weight * (f - agg.y) ** 2)
+        assert source_loss == pytest.approx(weighted_loss + within, rel=1e-10)
+        # L2損失の勾配の和も一致する
+        np.testing.assert_allclose(np.bincount(agg.inverse, weights=f[agg.inverse] - y),
+                                   agg.weight * (f - agg.y), rtol=1e-9, atol=1e-6)
+
+
+def test_rows_are_in_first_occurrence_order():
+    X = np.array([[2, 0], [1, 0], [2, 0], [3, 1], [1, 0], [3, 1], [0, 0]], dtype=np.float32)
+    y = np.array([10, 20, 30, 40, 50, 60, 70], dtype=np.float32)
+    agg = aggregate_rows(X, y)
+
+    np.testing.assert_array_equal(agg.X, [[2, 0], [1, 0], [3, 1], [0, 0]])
+    np.testing.assert_array_equal(agg.inverse, [0, 1, 0, 2, 1, 2, 3])
+    np.testing.assert_array_equal(agg.weight, [2, 2, 2, 1])
+    np.testing.assert_array_equal(agg.y, [20, 35, 50, 70])
+    assert agg.X.dtype == np.float32 and agg.n_source_rows == 7
+
+
+def test_inverse_restores_source_rows():
+    rng = np.random.default_rng(1)
+    X, y = discrete_rows(rng)
+    X[::97, 2] = np.nan
+    agg = aggregate_rows(X, y)
+    # inverse で元の各行の特徴量を復元でき、集約行は初出の行から時系列順に並ぶ
+    np.testing.assert_array_equal(agg.X[agg.inverse], X)
+    first_rows = np.array([np.argmax(agg.inverse == i) for i in range(len(agg.X))])
+    assert (np.diff(first_rows) > 0).all()
+
+
+def test_empty_and_mismatched_input():
+    agg = aggregate_rows(np.empty((0, 3), np.float32), np.empty(0))
+    assert len(agg.X) == 0 and agg.reduction == 0.0
+    with pytest.raises(ValueError):
+        aggregate_rows(np.zeros((3, 2)), np.zeros(2))
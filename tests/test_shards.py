@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""シャードデータセット（common/shards.py）のエリア別の行範囲・検証データ分割のテスト"""
+
+import numpy as np
+
+from common.shards import ShardSet, write_shards
+
+
+def test_validation_tail_is_taken_from_each_area(synthetic_years, synthetic_data_dir, tmp_path):
+    shard_dir = str(tmp_path / 'shards')
+    areas = {'east': synthetic_data_dir, 'west': synthetic_data_dir}
+    write_shards(synthetic_years, areas, shard_dir=shard_dir, max_shard_rows=3000)
+    train = ShardSet(shard_dir, 'train')
+
+    ranges = train.area_ranges()
+    assert [area for area, _, _ in ranges] == ['east', 'west']
+    assert ranges[0][1] == 0 and ranges[0][2] == ranges[1][1] and ranges[1][2] == len(train)
+
+    fit_ranges, val_ranges = train.tail_split(0.1)
+    assert len(fit_ranges) == len(val_ranges) == 2
+    for (area, start, stop), (fit_start, fit_stop), (val_start, val_stop) in zip(ranges, fit_ranges, val_ranges):
+        assert (fit_start, fit_stop, val_stop) == (start, val_start, stop)
+        assert val_stop - val_start == int((stop - start) * 0.1)
+        # 検証データは各エリアの学習期間の最新の時刻
+        keys = train.rows(start, stop, 'keys')
+        assert (train.rows(val_start, val_stop, 'keys') > keys[:fit_stop - start].max()).all()
+
+    # 検証データに全エリアの行が含まれる（エリア番号列は最後の列）
+    area_codes = np.concatenate([train.rows(lo, hi)[:, -1] for lo, hi in val_ranges])
+    assert set(area_codes.tolist()) == {0.0, 1.0}
+    assert train.tail_split(0.0) == ([(start, stop) for _, start, stop in ranges], [])
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""CPUスレッド予算（common/thread_budget.py）の割当のテスト"""
+
+import os
+import sys
+import json
+import dataclasses
+import subprocess
+
+import pytest
+
+from common import thread_budget
+
+
+@pytest.fixture
+def budget(tmp_path, monkeypatch):
+    """全8スレッド・一時リースディレクトリの予算（環境変数の要求数は無効にする）"""
+    monkeypatch.setattr(thread_budget, 'config', dataclasses.replace(
+        thread_budget.config, TOTAL_THREADS=8, LEASE_DIR=str(tmp_path / 'leases')))
+    monkeypatch.delenv(thread_budget.config.ENV_VAR, raising=False)
+    os.makedirs(thread_budget.config.LEASE_DIR)
+    return thread_budget.config.LEASE_DIR
+
+
+@pytest.fixture
+def other_job():
+    """リースを登録する別の実行中プロセス"""
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    yield process.pid
+    process.kill()
+    process.wait()
+
+
+def write_lease(lease_dir: str, pid: int, threads: int) -> str:
+    path = os.path.join(lease_dir, f"{pid}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'pid': pid, 'job': 'other', 'threads': threads, 'started': ''}, f)
+    return path
+
+
+def finished_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+@pytest.mark.parametrize('with_psutil', [True, False])
+def test_pid_alive(with_psutil, monkeypatch):
+    if not with_psutil:
+        # psutil が無い環境の確認方法（Windows は OpenProcess、それ以外は os.kill(pid, 0)）
+        monkeypatch.setitem(sys.modules, 'psutil', None)
+    assert thread_budget._pid_alive(os.getpid())
+    assert not thread_budget._pid_alive(finished_pid())
+
+
+def test_single_job_gets_all_threads(budget):
+    allocation = thread_budget.allocate("学習", lease_dir=budget)
+    assert allocation.threads == 8
+    allocation.release()
+    assert os.listdir(budget) == []
+
+
+def test_stale_lease_is_removed(budget):
+    stale = write_lease(budget, finished_pid(), 8)
+    allocation = thread_budget.allocate("学習", lease_dir=budget)
+    assert allocation.threads == 8
+    assert not os.path.exists(stale)
+    allocation.release()
+
+
+def test_concurrent_jobs_share_threads(budget, other_job):
+    write_lease(budget, other_job, 4)
+    allocation = thread_budget.allocate("学習", lease_dir=budget)
+    assert allocation.threads == 4
+    assert sorted(lease['pid'] for lease in thread_budget.active_leases(budget)) == sorted([other_job, os.getpid()])
+    allocation.release()
+
+    # 他のジョブが全スレッドを使用中でも最低1スレッド、要求数は空きスレッドまで
+    write_lease(budget, other_job, 8)
+    assert thread_budget.allocate("予測", lease_dir=budget).threads == 1
+    write_lease(budget, other_job, 2)
+    assert thread_budget.allocate("予測", requested=16, lease_dir=budget).threads == 6
+
+
+def test_default_share_reserves_threads_when_configured(budget, monkeypatch):
+    monkeypatch.setattr(thread_budget, 'config', dataclasses.replace(thread_budget.config, DEFAULT_SHARE_JOBS=2))
+    assert thread_budget.allocate("学習", lease_dir=budget).threads == 4
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""時系列分割エンジン（common/time_split.py）のテスト"""
+
+import numpy as np
+import pytest
+
+from common.time_split import expanding_window, rolling_origin, take_rows, year_holdout, years_of
+
+# 2019-01-01 00:00 の epoch-hour
+KEY_2019 = 17897 * 24
+
+
+def hourly_keys(start: int, hours: int, missing=()) -> np.ndarray:
+    keys = np.arange(start, start + hours, dtype=np.int64)
+    return keys[~np.isin(keys, np.asarray(missing, dtype=np.int64) + start)]
+
+
+def window_bounds(keys: np.ndarray, split):
+    """分割の学習・テスト期間（先頭・末尾の時刻キー、先頭からの相対時間）"""
+    first = keys[0]
+    train, test = keys[split.train_index] - first, keys[split.test_index] - first
+    return (int(train[0]), int(train[-1])), (int(test[0]), int(test[-1]))
+
+
+def test_rolling_origin_window_bounds():
+    keys = hourly_keys(KEY_2019, 240, missing=[100, 101, 150])
+    splits = rolling_origin(keys, train_hours=48, test_hours=24)
+    # オリジン 48, 72, ..., 216（テスト窓が末尾に収まる範囲）
+    assert len(splits) == 8
+    for k, split in enumerate(splits):
+        origin = 48 + 24 * k
+        (train_lo, train_hi), (test_lo, test_hi) = window_bounds(keys, split)
+        assert train_lo == origin - 48 and train_hi == origin - 1
+        assert test_lo >= origin and test_hi <= origin + 23
+        assert split.name == f"rolling_origin[{k}]"
+    # 欠損時刻があっても窓は時刻で決まる（行数が減る）
+    assert splits[3].n_train == 46 and splits[4].n_test == 23 and splits[1].n_test == 24
+
+
+def test_gap_and_n_splits():
+    keys = hourly_keys(KEY_2019, 240)
+    splits = rolling_origin(keys, train_hours=48, test_hours=24, gap_hours=6, step_hours=12, n_splits=3)
+    assert len(splits) == 3
+    for split in splits:
+        (_, train_hi), (test_lo, _) = window_bounds(keys, split)
+        # 学習窓の終端とテスト開始の間は gap_hours 空ける
+        assert test_lo - train_hi == 7
+    # オリジン 54, 66, ..., 210 のうち最新側の分割を採用する
+    assert [window_bounds(keys, s)[1] for s in splits] == [(186, 209), (198, 221), (210, 233)]
+
+
+def test_expanding_window_keeps_start():
+    keys = hourly_keys(KEY_2019, 240)
+    splits = expanding_window(keys, test_hours=48, min_train_hours=96, gap_hours=2)
+    assert [s.n_train for s in splits] == [96, 144]
+    for split in splits:
+        (train_lo, train_hi), (test_lo, test_hi) = window_bounds(keys, split)
+        assert train_lo == 0 and test_lo == train_hi + 3 and test_hi - test_lo == 47
+
+    with pytest.raises(ValueError):
+        expanding_window(keys, test_hours=24, min_train_hours=0)
+    with pytest.raises(ValueError):
+        rolling_origin(keys, train_hours=48, test_hours=0)
+    assert rolling_origin(keys[:0], train_hours=48, test_hours=24) == []
+
+
+def test_masks_match_indices():
+    keys = hourly_keys(KEY_2019, 240)
+    split = rolling_origin(keys, train_hours=48, test_hours=24, n_splits=1)[0]
+    train_mask, test_mask = split.masks(len(keys))
+    np.testing.assert_array_equal(np.flatnonzero(train_mask), split.train_index)
+    np.testing.assert_array_equal(np.flatnonzero(test_mask), split.test_index)
+    assert not (train_mask & test_mask).any()
+
+    # 連続区間はビューとして取り出す
+    X = np.arange(len(keys) * 2, dtype=np.float32).reshape(-1, 2)
+    X_train, X_test, _, _ = split.apply(X, keys)
+    assert np.shares_memory(X_train, X) and np.shares_memory(X_test, X)
+    assert not np.shares_memory(take_rows(X, np.array([0, 2])), X)
+
+
+def test_year_holdout_is_chronological():
+    keys = hourly_keys(KEY_2019, 24 * (365 + 366 + 365))
+    years = years_of(keys)
+    assert years[0] == 2019 and years[-1] == 2021
+
+    split = year_holdout(keys, 2021)
+    assert set(years[split.train_index]) == {2019, 2020}
+    assert set(years[split.test_index]) == {2021}
+    assert set(years[year_holdout(keys, 2021, train_years=[2019]).train_index]) == {2019}
+
+    # テスト年以降の学習年・空の学習データ・空のテストデータは誤り
+    with pytest.raises(ValueError, match="テスト期間以降"):
+        year_holdout(keys, 2020, train_years=[2019, 2021])
+    with pytest.raises(ValueError, match="空"):
+        year_holdout(keys, 2019)
+    with pytest.raises(ValueError, match="空"):
+        year_holdout(keys, 2022)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""決定木推論エンジン（common/tree_inference.py）の予測が元モデルと一致することのテスト"""
+
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+
+from common.tree_inference import export_for_model, load_for_model
+
+# 元モデルの predict との許容誤差（木ごとの葉の値の加算順の違いのみ）
+TOLERANCE = 1e-9
+
+
+def make_regression(rng: np.random.Generator, n_rows: int = 2000, n_features: int = 8):
+    """非線形な目的変数と、欠損値・整数カテゴリの列を含む特徴量"""
+    X = rng.standard_normal((n_rows, n_features))
+    X[:, 0] = rng.integers(0, 6, n_rows)
+    y = np.sin(X[:, 1] * 2) + X[:, 2] ** 2 + 0.5 * X[:, 0] + 0.1 * rng.standard_normal(n_rows)
+    X[rng.random(n_rows) < 0.05, 3] = np.nan
+    return X, y
+
+
+def round_trip(model, tmp_path):
+    """学習済みモデルを保存して変換し、保存した変換済みファイルを読み込む"""
+    model_path = os.path.join(tmp_path, 'model.sav')
+    joblib.dump(model, model_path)
+    assert export_for_model(model, model_path) is not None
+    compiled = load_for_model(model_path)
+    assert compiled is not None
+    return compiled
+
+
+def test_lightgbm_predictions_match(tmp_path):
+    lgb = pytest.importorskip('lightgbm')
+    rng = np.random.default_rng(0)
+    X, y = make_regression(rng)
+    model = lgb.LGBMRegressor(n_estimators=50, num_leaves=31, verbose=-1)
+    model.fit(X, y, categorical_feature=[0])
+
+    compiled = round_trip(model, tmp_path)
+    X_test, _ = make_regression(np.random.default_rng(1), n_rows=500)
+    np.testing.assert_allclose(compiled.predict(X_test), model.predict(X_test), rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('estimator', [RandomForestRegressor, ExtraTreesRegressor])
+def test_sklearn_forest_predictions_match(estimator, tmp_path):
+    rng = np.random.default_rng(0)
+    X, y = make_regression(rng)
+    X = np.nan_to_num(X)
+    model = estimator(n_estimators=20, min_samples_leaf=2, random_state=0).fit(X, y)
+
+    compiled = round_trip(model, tmp_path)
+    X_test, _ = make_regression(np.random.default_rng(1), n_rows=500)
+    X_test = np.nan_to_num(X_test)
+    np.testing.assert_allclose(compiled.predict(X_test), model.predict(X_test), rtol=0, atol=TOLERANCE)
+
+
+def test_stale_compiled_file_is_ignored(tmp_path):
+    rng = np.random.default_rng(0)
+    X, y = make_regression(rng, n_rows=200)
+    X = np.nan_to_num(X)
+    model = RandomForestRegressor(n_estimators=3, random_state=0).fit(X, y)
+    model_path = os.path.join(tmp_path, 'model.sav')
+    joblib.dump(model, model_path)
+    export_for_model(model, model_path)
+
+    # 変換後に学習済みモデルが上書きされた場合は元モデルで予測させる
+    joblib.dump(RandomForestRegressor(n_estimators=4, random_state=1).fit(X, y), model_path)
+    assert load_for_model(model_path) is None
@@ -4,71 +4,93 @@
 
 学習済みKerasモデルを使用し明日の電力需要を予測し、
 予測結果をCSVファイルとグラフで出力するモジュール。
+
+TensorFlow・pandas・scikit-learn・matplotlib は使用する関数の中で読み込み、警告抑制などの
+実行環境設定はスクリプト実行時（configure_runtime）のみ適用する（インポート時の副作用なし）。
 """
 
+from __future__ import annotations
+
 # 必要なライブラリのインポート
 import os
+import sys
 import time
 import gc
+import importlib.util
 from datetime import datetime, timedelta
-from typing import Tuple, Any
+from typing import TYPE_CHECKING, Tuple, Any, Optional
 from dataclasses import dataclass
 from functools import wraps
 import glob
 import warnings
 
-import pandas as pd
 import pickle
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error
 import traceback
 
-# パフォーマンス監視
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-    print("psutil: 利用可能 - メモリ監視機能を有効化")
-except ImportError:
-    print("警告: psutilが利用できません。メモリ監視機能を無効化します。")
-    PSUTIL_AVAILABLE = False
-
-# パフォーマンス最適化設定（統合版）
-warnings.filterwarnings('ignore', category=UserWarning)
-warnings.filterwarnings('ignore', category=FutureWarning)
-warnings.filterwarnings('ignore', category=DeprecationWarning)
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
-np.set_printoptions(suppress=True, precision=4)
-
-# メモリ管理設定（パフォーマンス最適化）
-gc.set_threshold(700, 10, 10)  # ガベージコレクション最適化
-pd.set_option('mode.copy_on_write', True)  # pandasメモリ効率化
-
-# matplotlib最適化設定（統一版）
-plt.rcParams['figure.figsize'] = (16, 9)  # 16:9アスペクト比統一
-plt.rcParams['figure.dpi'] = 100
-plt.rcParams['savefig.dpi'] = 300
-plt.rcParams['savefig.bbox'] = 'tight'
-plt.rcParams['savefig.pad_inches'] = 0.1
-plt.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams['font.size'] = 12
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['lines.linewidth'] = 2.0
-plt.rcParams['axes.linewidth'] = 1.0
-
-print("Keras Tomorrow: パフォーマンス最適化設定を適用しました")
-
-try:
-    from tensorflow.keras.models import load_model
-    TENSORFLOW_AVAILABLE = True
-    print("TensorFlow: 利用可能")
-except ImportError:
-    print("警告: TensorFlowが利用できません。互換性モードで実行します。")
-    TENSORFLOW_AVAILABLE = False
-    load_model = None
+if TYPE_CHECKING:
+    from sklearn.preprocessing import StandardScaler
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import feature_columns
+from common.thread_budget import configure_threads
+from common.mlp_inference import load_for_model
+from common.day_blocks import DayLayout, load_layout
+from common.plot_style import pyplot
+
+# パフォーマンス監視（psutil はメモリ使用量の取得時に読み込む）
+PSUTIL_AVAILABLE = importlib.util.find_spec('psutil') is not None
+
+# matplotlib最適化設定（統一版、グラフ作成時に適用）
+PLOT_RC = {
+    'figure.figsize': (16, 9),  # 16:9アスペクト比統一
+    'figure.dpi': 100,
+    'savefig.dpi': 300,
+    'savefig.bbox': 'tight',
+    'savefig.pad_inches': 0.1,
+    'font.size': 12,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'lines.linewidth': 2.0,
+    'axes.linewidth': 1.0,
+}
+
+
+def configure_runtime() -> None:
+    """スクリプト実行時の警告抑制・表示・メモリ管理設定（統合版）"""
+    import pandas as pd
+    warnings.filterwarnings('ignore', category=UserWarning)
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    np.set_printoptions(suppress=True, precision=4)
+    gc.set_threshold(700, 10, 10)  # ガベージコレクション最適化
+    pd.set_option('mode.copy_on_write', True)  # pandasメモリ効率化
+    print(f"Keras Tomorrow: パフォーマンス最適化設定を適用しました"
+          f"（psutil: {'利用可能 - メモリ監視機能を有効化' if PSUTIL_AVAILABLE else '利用不可 - メモリ監視機能を無効化'}）")
+
+
+def tensorflow_load_model():
+    """
+    TensorFlow の load_model を取得する
+
+    TensorFlow の読み込みには数秒・数百MBかかるため、NumPy 推論エンジン（common/mlp_inference.py）
+    が無い場合にのみ呼び出す。
+
+    Returns:
+        load_model 関数（TensorFlow が利用できない場合は None）
+    """
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    try:
+        from tensorflow.keras.models import load_model
+        print("TensorFlow: 利用可能")
+        return load_model
+    except ImportError:
+        print("警告: TensorFlowが利用できません。互換性モードで実行します。")
+        return None
 
 
 @dataclass
@@ -134,11 +156,11 @@ def robust_model_operation(func):
             raise
     return wrapper
 
-# 日本語フォント設定（利用可能なフォントを順番に試行）
-JAPANESE_FONTS: list = ['Yu Gothic', 'Meiryo', 'MS Gothic', 'DejaVu Sans']
+# 日本語フォント設定（利用可能なフォントを順番に試行、無い場合は DejaVu Sans、common/plot_style.py）
+JAPANESE_FONTS: list = ['Yu Gothic', 'Meiryo', 'MS Gothic']
 
 # 入力に使用するデータ列の指定
-X_COLS: list = ["MONTH", "WEEK", "HOUR", "TEMP"]
+X_COLS: list = feature_columns()
 
 # 出力に使用するデータ列の指定
 Y_COLS: list = ["KW"]
@@ -147,6 +169,7 @@ Y_COLS: list = ["KW"]
 def monitor_memory_usage(stage: str) -> float:
     """メモリ使用量監視（統一版）"""
     if PSUTIL_AVAILABLE:
+        import psutil
         memory_gb = psutil.virtual_memory().used / (1024**3)
         print(f"[{stage}] メモリ使用量: {memory_gb:.2f} GB")
         return memory_gb
@@ -172,6 +195,7 @@ def load_training_data(xtrain_path: str, xtest_path: str, ytrain_path: str) -> T
         FileNotFoundError: ファイルが見つからない場合
         Exception: データ読み込み時のエラー
     """
+    import pandas as pd
     try:
         start_time = time.time()
         monitor_memory_usage("データ読み込み開始")
@@ -218,6 +242,7 @@ def load_test_and_tomorrow_data(ytest_path: str, xtomorrow_path: str) -> Tuple[n
         FileNotFoundError: ファイルが見つからない場合
         Exception: データ読み込み時のエラー
     """
+    import pandas as pd
     try:
         start_time = time.time()
         monitor_memory_usage("テスト・明日データ読み込み開始")
@@ -226,7 +251,7 @@ def load_test_and_tomorrow_data(ytest_path: str, xtomorrow_path: str) -> Tuple[n
         ytest = pd.read_csv(ytest_path).values.astype('float32')  # メモリ効率化
         
         print(f"明日予測用データを読み込んでいます: {xtomorrow_path}")
-        xtomorrow = pd.read_csv(xtomorrow_path).values.astype('float32')  # メモリ効率化
+        xtomorrow = pd.read_csv(xtomorrow_path)[X_COLS].values.astype('float32')  # メモリ効率化
         
         elapsed_time = time.time() - start_time
         monitor_memory_usage("テスト・明日データ読み込み完了")
@@ -285,7 +310,8 @@ def load_scaler_and_model(model_path: str) -> Tuple[StandardScaler, object]:
         except Exception as pickle_error:
             print(f"Pickleモデル読み込み失敗: {pickle_error}")
             # フォールバック: Kerasモデル読み込み
-            if os.path.exists(h5_model_path) and load_model is not None:
+            load_model = tensorflow_load_model() if os.path.exists(h5_model_path) else None
+            if load_model is not None:
                 print(f"Kerasモデル（.h5）を読み込んでいます: {h5_model_path}")
                 # 絶対パスに変換してエンコーディング問題を回避
                 abs_path = os.path.abspath(h5_model_path)
@@ -305,15 +331,21 @@ def load_scaler_and_model(model_path: str) -> Tuple[StandardScaler, object]:
 
 
 @robust_model_operation
-def predict_with_model(model: object, scaler: StandardScaler, xtest: np.ndarray, xtomorrow: np.ndarray, y_scaler: object = None) -> Tuple[np.ndarray, np.ndarray]:
+def predict_with_model(model: object, scaler: StandardScaler, xtest: np.ndarray, xtomorrow: np.ndarray, y_scaler: object = None,
+                       day_layout: Optional[DayLayout] = None) -> Tuple[np.ndarray, np.ndarray]:
     """
     学習済みモデルで予測を実行（パフォーマンス最適化・堅牢版）
     
+    日単位モデル（day_layout 指定時）は1行1時刻のデータを1行1日に組み替え、1日1回の順伝播で
+    24時間分を予測してから元の1行1時刻に戻す（common/day_blocks.py）。
+    
     Args:
         model: 学習済みモデル
         scaler: 標準化スケーラー
         xtest: テストデータ
         xtomorrow: 翌日予測データ
+        y_scaler: 目的変数の標準化スケーラー
+        day_layout: 日単位モデルの入力構成（1行1時刻のモデルは None）
         
     Returns:
         Tuple[np.ndarray, np.ndarray]: テスト予測結果、翌日予測結果
@@ -326,11 +358,18 @@ def predict_with_model(model: object, scaler: StandardScaler, xtest: np.ndarray,
         xtest = xtest.astype(np.float32)
         xtomorrow = xtomorrow.astype(np.float32)
         
+        # 日単位モデル: 1行1日（日で一定の列 + 24時間分の気温など）に組み替える（欠けた時刻は同じ日の前後で補う）
+        test_days = tomorrow_days = None
+        if day_layout is not None:
+            test_days = day_layout.to_day_blocks(xtest, complete_only=False)
+            tomorrow_days = day_layout.to_day_blocks(xtomorrow, complete_only=False)
+            print(f"日単位モデル: テスト {len(test_days)}日, 翌日予測 {len(tomorrow_days)}日（1行1日・24時間出力）")
+        
         print(f"テストデータ標準化開始: {xtest.shape}")
-        xtest_scaled = scaler.transform(xtest).astype(np.float32)
+        xtest_scaled = scaler.transform(test_days.X if test_days is not None else xtest).astype(np.float32)
         
         print(f"翌日データ標準化開始: {xtomorrow.shape}")
-        xtomorrow_scaled = scaler.transform(xtomorrow).astype(np.float32)
+        xtomorrow_scaled = scaler.transform(tomorrow_days.X if tomorrow_days is not None else xtomorrow).astype(np.float32)
         
         monitor_memory_usage("データ標準化完了")
         
@@ -348,6 +387,8 @@ def predict_with_model(model: object, scaler: StandardScaler, xtest: np.ndarray,
             if hasattr(ypred, 'numpy'):
                 ypred = ypred.numpy()
             ypred = np.array(ypred, dtype=np.float32)
+            if test_days is not None:
+                ypred = test_days.to_hourly(ypred).reshape(-1, 1)
 
         except Exception as e:
             print(f"[WARN] テストデータ予測でエラー: {e}")
@@ -369,6 +410,8 @@ def predict_with_model(model: object, scaler: StandardScaler, xtest: np.ndarray,
             if hasattr(ytomorrow_pred, 'numpy'):
                 ytomorrow_pred = ytomorrow_pred.numpy()
             ytomorrow_pred = np.array(ytomorrow_pred, dtype=np.float32)
+            if tomorrow_days is not None:
+                ytomorrow_pred = tomorrow_days.to_hourly(ytomorrow_pred).reshape(-1, 1)
             
         except Exception as e:
             print(f"[WARN] 翌日データ予測でエラー: {e}")
@@ -443,6 +486,7 @@ def save_tomorrow_predictions(ytomorrow_pred: np.ndarray, output_path: str) -> N
     Raises:
         Exception: ファイル保存時のエラー
     """
+    import pandas as pd
     try:
         start_time = time.time()
         monitor_memory_usage("CSV保存開始")
@@ -527,6 +571,7 @@ def calculate_evaluation_metrics(ypred: np.ndarray, ytest: np.ndarray) -> Tuple[
         
         # MAE計算（ダッシュボード抽出用統一フォーマット）
         try:
+            from sklearn.metrics import mean_absolute_error
             mae = mean_absolute_error(ytest, ypred)
         except Exception:
             mae = float(np.mean(np.abs(ypred - ytest)))
@@ -564,6 +609,14 @@ def load_model_and_scaler(model_path: str) -> Tuple[Any, Any]:
         
         print(f"モデルディレクトリ: {model_dir}")
         
+        # 手法0: NumPy 推論エンジン（学習時に書き出した重み・標準化パラメータの .npz、TensorFlow 不要）
+        # スナップショットアンサンブルのモデルは積み重ねた重みで全スナップショットを1回で順伝播し平均する
+        mlp = load_for_model(h5_model_path)
+        if mlp is not None:
+            elapsed_time = time.time() - start_time
+            print(f"[OK] NumPy推論エンジン読み込み成功: {mlp.summary()} (実行時間: {elapsed_time * 1000:.1f}ms)")
+            return mlp, mlp.x_scaler, mlp.y_scaler
+        
         # スケーラーを先に読み込み
         scaler = None
         if os.path.exists(scaler_path):
@@ -574,11 +627,11 @@ def load_model_and_scaler(model_path: str) -> Tuple[Any, Any]:
             except Exception as e:
                 print(f"[WARN] スケーラー読み込み失敗: {e}")
         
-        # モデル読み込み（複数手法で試行）
+        # モデル読み込み（複数手法で試行、スナップショットアンサンブルの場合は最後のスナップショットのみ）
         keras_model = None
         
         # 手法1: H5ファイル直接読み込み
-        if TENSORFLOW_AVAILABLE and os.path.exists(h5_model_path):
+        if os.path.exists(h5_model_path) and tensorflow_load_model() is not None:
             try:
                 import tensorflow as tf
 
@@ -702,19 +755,11 @@ def create_prediction_visualization(ypred: np.ndarray, ytest: np.ndarray, ytomor
     """
     try:
         print(f"予測結果のグラフを作成しています: {output_path}")
+        import pandas as pd
+        import matplotlib.dates as mdates
         
-        # 日本語フォント設定
-        font_set = False
-        for font in JAPANESE_FONTS:
-            try:
-                plt.rcParams['font.family'] = font
-                font_set = True
-                break
-            except:
-                continue
-        
-        if not font_set:
-            print("警告: 日本語フォントが見つかりません。英語表示になります。")
+        # 描画設定・日本語フォント設定（利用可能なフォントが無い場合は英語表示）
+        plt = pyplot(PLOT_RC, japanese_fonts=JAPANESE_FONTS)
         
         # 少ないデータ数に合わせる
         min_length = min(len(ytomorrow_pred), len(ytest))
@@ -819,11 +864,16 @@ def tomorrow(
         print("訓練済みモデルとスケーラーを読み込んでいます...")
         keras_info, scaler, y_scaler = load_model_and_scaler(model_sav)
         
+        # 日単位モデル（24時間出力）の入力構成（1行1時刻のモデルは None）
+        day_layout = load_layout(model_sav)
+        if day_layout is not None:
+            print(f"日単位モデルを検出しました（入力: {len(day_layout.feature_columns)}列 / 出力: 24時間）")
+        
         # メモリ監視
         monitor_memory_usage("モデル読み込み完了")
         
         # 予測の実行（メモリ効率化）
-        Ypred, Ytomorrow_pred = predict_with_model(keras_info, scaler, Xtest, Xtomorrow, y_scaler)
+        Ypred, Ytomorrow_pred = predict_with_model(keras_info, scaler, Xtest, Xtomorrow, y_scaler, day_layout)
 
         # もし y_scaler があれば逆変換は既に適用済み
         if y_scaler is None:
@@ -878,12 +928,16 @@ def main() -> None:
         start_memory = 0.0
         
         if PSUTIL_AVAILABLE:
+            import psutil
             process = psutil.Process()
             start_memory = process.memory_info().rss / 1024 / 1024
             print(f"開始時メモリ使用量: {start_memory:.1f}MB")
         
         print("=== Keras Tomorrow 電力需要予測開始（統一アーキテクチャ版） ===")
         
+        # CPUスレッド割当（環境変数 AI_THREADS で指定）: TensorFlow の intra/inter-op スレッド数に適用
+        configure_threads("Keras翌日予測")
+        
         # 統一設定使用
         XTRAIN_CSV: str = os.path.join(config.DATA_DIR, 'Xtrain.csv')
         XTEST_CSV: str = os.path.join(config.DATA_DIR, 'Xtest.csv')
@@ -944,6 +998,7 @@ if __name__ == "__main__":
     # 起動時に監査ログとして AI_TARGET_YEARS を出力
     print(f"AI_TARGET_YEARS={os.environ.get('AI_TARGET_YEARS')}")
     print("=== Keras Tomorrow プログラム開始 ===")
+    configure_runtime()
     try:
         main()
         print("=== Keras Tomorrow プログラム正常終了 ===")
@@ -4,51 +4,50 @@
 
 学習済みLightGBMモデルを使用して明日の電力需要を予測し、
 結果をCSVファイルとグラフで出力するモジュール。
+
+pandas・scikit-learn・matplotlib は使用する関数の中で読み込む（インポート時の副作用なし）。
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from sklearn.preprocessing import StandardScaler
+from __future__ import annotations
+
 import pickle
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import traceback
 import os
+import sys
 import datetime
 import time
 import gc
-import psutil
 from dataclasses import dataclass
 from functools import wraps
-from typing import Tuple, Optional, Dict, Any
+from typing import TYPE_CHECKING, Tuple, Optional, Dict, Any
 
-# matplotlib日本語フォント設定
-plt.rcParams['figure.dpi'] = 100
-plt.rcParams['savefig.dpi'] = 100
-plt.rcParams['savefig.bbox'] = 'tight'
-plt.rcParams['savefig.pad_inches'] = 0.1
-try:
-    from matplotlib import font_manager
-    preferred_fonts = ['Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic', 'TakaoPGothic', 'IPAPGothic', 'DejaVu Sans']
-    available = {f.name for f in font_manager.fontManager.ttflist}
-    chosen = None
-    for fname in preferred_fonts:
-        if fname in available:
-            chosen = fname
-            break
-    if chosen:
-        plt.rcParams['font.family'] = [chosen, 'DejaVu Sans']
-    else:
-        plt.rcParams['font.family'] = 'DejaVu Sans'
-    plt.rcParams['axes.unicode_minus'] = False
-except Exception:
-    plt.rcParams['font.family'] = 'DejaVu Sans'
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import feature_columns
+from common.thread_budget import configure_threads
+from common.tree_inference import CompiledEnsemble, load_for_model
+from common.plot_style import pyplot
 
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['lines.linewidth'] = 1.5
-plt.rcParams['axes.linewidth'] = 0.8
+# matplotlib 描画設定（グラフ生成時に適用、日本語フォントは common/plot_style.py で選択）
+PLOT_RC = {
+    'figure.dpi': 100,
+    'savefig.dpi': 100,
+    'savefig.bbox': 'tight',
+    'savefig.pad_inches': 0.1,
+    'font.size': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'lines.linewidth': 1.5,
+    'axes.linewidth': 0.8,
+}
+PLOT_FONTS = ['Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic', 'TakaoPGothic', 'IPAPGothic']
 
 @dataclass
 class LightGBMTomorrowConfig:
@@ -78,14 +77,18 @@ class LightGBMTomorrowConfig:
     HISTORY_PNG: str = ''
     
     # データ列
-    X_COLS: tuple = ("MONTH","WEEK","HOUR","TEMP")
+    X_COLS: tuple = tuple(feature_columns())
     Y_COLS: tuple = ("KW",)
+    
+    # 予測スレッド数（common/thread_budget.py の割当、None の場合は LightGBM の既定）
+    THREADS: Optional[int] = None
 
 def robust_model_operation(operation_name: str):
     """モデル操作の堅牢性を保証するデコレータ"""
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            import psutil
             start_time = time.time()
             initial_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
             
@@ -113,27 +116,29 @@ def robust_model_operation(operation_name: str):
         return wrapper
     return decorator
 
-@robust_model_operation("学習データ読み込み")
-def load_training_data(config: LightGBMTomorrowConfig) -> Tuple[pd.DataFrame, StandardScaler]:
-    """学習データを読み込み、標準化スケーラーを作成"""
-    X_train = pd.read_csv(config.XTRAIN_CSV)
-    
-    # 標準化スケーラーを作成・学習
-    scaler = StandardScaler()
-    scaler.fit(X_train)
-    X_train_scaled = pd.DataFrame(scaler.transform(X_train), columns=X_train.columns)
-    
-    print(f"学習データ形状: {X_train_scaled.shape}")
-    return X_train_scaled, scaler
+def load_model_scaler(config: LightGBMTomorrowConfig) -> Optional[StandardScaler]:
+    """学習時に保存したスケーラーを読み込み（標準化せずに学習したモデルの場合は None）"""
+    scaler_path = config.MODEL_SAV.replace('.sav', '_scaler.pkl')
+    if not os.path.exists(scaler_path):
+        print("スケーラーなし（木モデルのため生の特徴量で予測）")
+        return None
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+    print(f"スケーラー読み込み完了: {scaler_path}")
+    return scaler
 
 @robust_model_operation("テスト・翌日データ読み込み")
-def load_test_and_tomorrow_data(config: LightGBMTomorrowConfig, scaler: StandardScaler) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """テストデータと翌日データを読み込み、標準化"""
+def load_test_and_tomorrow_data(config: LightGBMTomorrowConfig, scaler: Optional[StandardScaler]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """テストデータと翌日データを読み込み、（スケーラーがある場合は）標準化"""
+    import pandas as pd
     y_test = pd.read_csv(config.YTEST_CSV).values.astype('int32').flatten()
-    Xtomorrow = pd.read_csv(config.XTOMORROW_CSV)
+    Xtomorrow = pd.read_csv(config.XTOMORROW_CSV, dtype='float32')[list(config.X_COLS)]
     
-    # 翌日データを標準化
-    Xtomorrow_scaled = pd.DataFrame(scaler.transform(Xtomorrow), columns=Xtomorrow.columns)
+    # 学習時に標準化したモデルの場合のみ翌日データを標準化
+    if scaler is None:
+        Xtomorrow_scaled = Xtomorrow
+    else:
+        Xtomorrow_scaled = pd.DataFrame(scaler.transform(Xtomorrow), columns=Xtomorrow.columns)
     
     print(f"テストデータ形状: {y_test.shape}")
     print(f"翌日データ形状: {Xtomorrow_scaled.shape}")
@@ -141,24 +146,35 @@ def load_test_and_tomorrow_data(config: LightGBMTomorrowConfig, scaler: Standard
 
 @robust_model_operation("モデル読み込み")
 def load_model(config: LightGBMTomorrowConfig):
-    """保存済みモデルを読み込み"""
+    """保存済みモデルを読み込み（学習時に書き出した NumPy 推論エンジンがあればそれを使用）"""
+    compiled = load_for_model(config.MODEL_SAV)
+    if compiled is not None:
+        print(f"NumPy推論エンジン読み込み完了: {compiled.summary()}")
+        return compiled
     with open(config.MODEL_SAV, 'rb') as f:
         model = pickle.load(f)
     print(f"モデル読み込み完了: {config.MODEL_SAV}")
     return model
 
 @robust_model_operation("予測実行")
-def predict_with_model(model, Xtomorrow_scaled: pd.DataFrame, y_test: pd.DataFrame) -> Tuple[pd.DataFrame, float, float, float]:
+def predict_with_model(model, Xtomorrow_scaled: pd.DataFrame, y_test: pd.DataFrame,
+                       threads: Optional[int] = None) -> Tuple[pd.DataFrame, float, float, float]:
     """モデルを使用して予測を実行し、精度指標を計算"""
-    # 予測実行
-    Ytomorrow = model.predict(Xtomorrow_scaled)
+    from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+    # 予測実行（LightGBM モデルでスレッド数指定時は num_threads として渡す）
+    predict_params = {'num_threads': threads} if threads and not isinstance(model, CompiledEnsemble) else {}
+    Ytomorrow = model.predict(Xtomorrow_scaled, **predict_params)
     
     # データ長を合わせる
     min_length = min(len(Xtomorrow_scaled), len(y_test))
     
     # 精度計算
     try:
-        accuracy = model.score(Xtomorrow_scaled[:min_length], y_test[:min_length])
+        # score を持たないモデル（lgb.train の Booster・NumPy推論エンジン）は決定係数を直接計算する
+        if hasattr(model, 'score'):
+            accuracy = model.score(Xtomorrow_scaled[:min_length], y_test[:min_length])
+        else:
+            accuracy = r2_score(y_test[:min_length], Ytomorrow[:min_length])
         print(f'テスト精度: {accuracy:.4f}')
     except Exception as e:
         print(f'精度計算でエラーが発生: {e}')
@@ -180,6 +196,7 @@ def predict_with_model(model, Xtomorrow_scaled: pd.DataFrame, y_test: pd.DataFra
 @robust_model_operation("翌日予測結果保存")
 def save_tomorrow_predictions(config: LightGBMTomorrowConfig, Ytomorrow: pd.DataFrame) -> None:
     """翌日予測結果をCSVファイルに保存"""
+    import pandas as pd
     y_tomorrow_csv = pd.DataFrame(Ytomorrow, columns=list(config.Y_COLS))
     y_tomorrow_csv.to_csv(config.YTOMORROW_CSV, index=False)
     print(f"予測結果保存完了: {config.YTOMORROW_CSV} ({len(y_tomorrow_csv)}行)")
@@ -187,6 +204,9 @@ def save_tomorrow_predictions(config: LightGBMTomorrowConfig, Ytomorrow: pd.Data
 @robust_model_operation("グラフ生成")
 def generate_prediction_graph(config: LightGBMTomorrowConfig, Ytomorrow: pd.DataFrame, y_test: pd.DataFrame) -> None:
     """予測結果のグラフを生成"""
+    import pandas as pd
+    import matplotlib.dates as mdates
+    plt = pyplot(PLOT_RC, japanese_fonts=PLOT_FONTS)
     # データフレーム作成
     df_result1 = pd.DataFrame({"Predict[kW]": Ytomorrow.ravel()})
     df_result2 = pd.DataFrame({"Actual[kW]": y_test.ravel()})
@@ -254,10 +274,8 @@ def tomorrow(Xtrain_csv, Xtest_csv, Ytrain_csv, Ytest_csv, model_sav, Ypred_csv,
 @robust_model_operation("LightGBM翌日予測メイン処理")
 def execute_tomorrow_prediction(config: LightGBMTomorrowConfig) -> Tuple[float, float]:
     """統一されたLightGBM翌日予測処理"""
-    # 1. 学習データ読み込み・標準化スケーラー作成
-    X_train_scaled, scaler = load_training_data(config)
-    if X_train_scaled is None or scaler is None:
-        return None, None
+    # 1. 学習時のスケーラー読み込み（木モデルは標準化しないため通常は無し）
+    scaler = load_model_scaler(config)
     
     # 2. テスト・翌日データ読み込み・標準化
     y_test, Xtomorrow_scaled = load_test_and_tomorrow_data(config, scaler)
@@ -270,7 +288,7 @@ def execute_tomorrow_prediction(config: LightGBMTomorrowConfig) -> Tuple[float,
         return None, None
     
     # 4. 予測実行・精度計算
-    Ytomorrow, REG_RMSE, REG_SCORE, accuracy = predict_with_model(model, Xtomorrow_scaled, y_test)
+    Ytomorrow, REG_RMSE, REG_SCORE, accuracy = predict_with_model(model, Xtomorrow_scaled, y_test, config.THREADS)
     if Ytomorrow is None:
         return None, None
     
@@ -283,8 +301,9 @@ def execute_tomorrow_prediction(config: LightGBMTomorrowConfig) -> Tuple[float,
     return REG_RMSE, REG_SCORE
 
 if __name__ == "__main__":
-    # 設定初期化
+    # 設定初期化（CPUスレッド割当は環境変数 AI_THREADS で指定）
     config = LightGBMTomorrowConfig()
+    config.THREADS = configure_threads("LightGBM翌日予測")
     # 起動時に監査ログとして AI_TARGET_YEARS を出力
     import os as _os
     print(f"AI_TARGET_YEARS={_os.environ.get('AI_TARGET_YEARS')}")
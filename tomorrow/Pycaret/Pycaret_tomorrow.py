@@ -4,36 +4,45 @@
 
 学習済みPyCaretモデルを使用して明日の電力需要を予測し、
 結果をCSVファイルとグラフで出力するモジュール。
+
+PyCaret・pandas・scikit-learn・matplotlib は使用する関数の中で読み込む（インポート時の副作用なし）。
 """
 
 import datetime
 import glob
 import os
+import sys
 import traceback
 import time
 import gc
-import psutil
 from dataclasses import dataclass
 from functools import wraps
 from typing import Optional, Tuple, Any
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-from pycaret.regression import load_model, predict_model
-from sklearn.metrics import mean_squared_error, r2_score
 
-# matplotlib日本語フォント設定
-plt.rcParams['figure.dpi'] = 100
-plt.rcParams['savefig.dpi'] = 100
-plt.rcParams['savefig.bbox'] = 'tight'
-plt.rcParams['savefig.pad_inches'] = 0.1
-plt.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['lines.linewidth'] = 1.5
-plt.rcParams['axes.linewidth'] = 0.8
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import feature_columns
+from common.thread_budget import configure_threads
+from common.plot_style import pyplot
+
+# matplotlib 描画設定（グラフ生成時に適用）
+PLOT_RC = {
+    'figure.dpi': 100,
+    'savefig.dpi': 100,
+    'savefig.bbox': 'tight',
+    'savefig.pad_inches': 0.1,
+    'font.family': 'DejaVu Sans',
+    'font.size': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'lines.linewidth': 1.5,
+    'axes.linewidth': 0.8,
+}
 
 @dataclass
 class PycaretTomorrowConfig:
@@ -63,7 +72,7 @@ class PycaretTomorrowConfig:
     HISTORY_PNG: str = ""
     
     # データ列
-    X_COLS: tuple = ("MONTH", "WEEK", "HOUR", "TEMP")
+    X_COLS: tuple = tuple(feature_columns())
     Y_COLS: tuple = ("KW",)
 
 def robust_model_operation(operation_name: str):
@@ -71,6 +80,7 @@ def robust_model_operation(operation_name: str):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            import psutil
             start_time = time.time()
             initial_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
             
@@ -102,13 +112,14 @@ def robust_model_operation(operation_name: str):
 @robust_model_operation("テスト・翌日データ読み込み")
 def load_test_and_tomorrow_data(config: PycaretTomorrowConfig) -> Tuple[np.ndarray, np.ndarray]:
     """テストデータと翌日データを読み込み"""
+    import pandas as pd
     if not os.path.exists(config.YTEST_CSV):
         raise FileNotFoundError(f"テストデータファイルが見つかりません: {config.YTEST_CSV}")
     if not os.path.exists(config.XTOMORROW_CSV):
         raise FileNotFoundError(f"予測用データファイルが見つかりません: {config.XTOMORROW_CSV}")
     
     y_test = pd.read_csv(config.YTEST_CSV).values.astype('int32').flatten()
-    x_tomorrow = pd.read_csv(config.XTOMORROW_CSV).to_numpy().astype('float32')
+    x_tomorrow = pd.read_csv(config.XTOMORROW_CSV)[list(config.X_COLS)].to_numpy().astype('float32')
     
     print(f"データ読み込み完了 - y_test: {y_test.shape}, x_tomorrow: {x_tomorrow.shape}")
     return y_test, x_tomorrow
@@ -116,6 +127,7 @@ def load_test_and_tomorrow_data(config: PycaretTomorrowConfig) -> Tuple[np.ndarr
 @robust_model_operation("Pycaretモデル読み込み")
 def load_pycaret_model(config: PycaretTomorrowConfig):
     """Pycaretモデルを読み込み"""
+    from pycaret.regression import load_model
     if not os.path.exists(f"{config.MODEL_SAV}.pkl"):
         raise FileNotFoundError(f"Pycaretモデルファイルが見つかりません: {config.MODEL_SAV}.pkl")
     
@@ -126,6 +138,8 @@ def load_pycaret_model(config: PycaretTomorrowConfig):
 @robust_model_operation("Pycaret予測実行")
 def predict_with_pycaret_model(config: PycaretTomorrowConfig, model, x_tomorrow: np.ndarray) -> np.ndarray:
     """Pycaretモデルを使用して予測を実行"""
+    import pandas as pd
+    from pycaret.regression import predict_model
     if x_tomorrow.shape[1] != len(config.X_COLS):
         raise ValueError(f"入力データの特徴量数が不正です。期待値: {len(config.X_COLS)}, 実際値: {x_tomorrow.shape[1]}")
     
@@ -147,6 +161,7 @@ def predict_with_pycaret_model(config: PycaretTomorrowConfig, model, x_tomorrow:
 @robust_model_operation("予測結果保存")
 def save_prediction_results(config: PycaretTomorrowConfig, y_tomorrow: np.ndarray) -> None:
     """予測結果をCSVファイルに保存"""
+    import pandas as pd
     os.makedirs(os.path.dirname(config.YTOMORROW_CSV), exist_ok=True)
     
     y_tomorrow_df = pd.DataFrame(y_tomorrow, columns=list(config.Y_COLS))
@@ -157,6 +172,7 @@ def save_prediction_results(config: PycaretTomorrowConfig, y_tomorrow: np.ndarra
 @robust_model_operation("精度指標計算")
 def calculate_metrics(y_test: np.ndarray, y_tomorrow: np.ndarray) -> Tuple[float, float]:
     """予測精度指標を計算（統一フォーマット対応）"""
+    from sklearn.metrics import mean_squared_error, r2_score
     min_length = min(len(y_test), len(y_tomorrow))
     if min_length == 0:
         raise ValueError("比較するデータがありません")
@@ -186,6 +202,8 @@ def calculate_metrics(y_test: np.ndarray, y_tomorrow: np.ndarray) -> Tuple[float
 @robust_model_operation("グラフ生成")
 def create_prediction_visualization(config: PycaretTomorrowConfig, y_test: np.ndarray, y_tomorrow: np.ndarray) -> None:
     """予測結果の可視化グラフを作成"""
+    import pandas as pd
+    plt = pyplot(PLOT_RC)
     os.makedirs(os.path.dirname(config.YTOMORROW_PNG), exist_ok=True)
     
     min_length = min(len(y_test), len(y_tomorrow))
@@ -306,8 +324,9 @@ def execute_tomorrow_prediction(config: PycaretTomorrowConfig) -> Optional[Tuple
 
 
 if __name__ == "__main__":
-    # 設定初期化
+    # 設定初期化（CPUスレッド割当は環境変数 AI_THREADS で指定、BLAS / OpenMP に適用）
     config = PycaretTomorrowConfig()
+    configure_threads("PyCaret翌日予測")
     
     # 起動時に監査ログとして AI_TARGET_YEARS を出力
     import os as _os
@@ -4,37 +4,51 @@
 
 学習済みRandomForestモデルを使用して明日の電力需要を予測し、
 結果をCSVファイルとグラフで出力するモジュール。
+
+pandas・scikit-learn・matplotlib は使用する関数の中で読み込む（インポート時の副作用なし）。
 """
 
 import datetime
 import glob
 import os
+import sys
 import pickle
 import traceback
 import time
 import gc
-import psutil
 from dataclasses import dataclass
 from functools import wraps
 from typing import Optional, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-from sklearn.metrics import mean_squared_error, r2_score
-from sklearn.preprocessing import StandardScaler
 
-# matplotlib日本語フォント設定
-plt.rcParams['figure.dpi'] = 100
-plt.rcParams['savefig.dpi'] = 100
-plt.rcParams['savefig.bbox'] = 'tight'
-plt.rcParams['savefig.pad_inches'] = 0.1
-plt.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['lines.linewidth'] = 1.5
-plt.rcParams['axes.linewidth'] = 0.8
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import feature_columns
+from common.thread_budget import configure_threads
+from common.tree_inference import load_for_model
+from common.forest_artifacts import load_forest
+from common.tree_engines import load_engine_metadata, is_bagging
+from common import forest_quantiles
+from common.forest_quantiles import load_leaf_samples
+from common.plot_style import pyplot
+
+# matplotlib 描画設定（グラフ生成時に適用）
+PLOT_RC = {
+    'figure.dpi': 100,
+    'savefig.dpi': 100,
+    'savefig.bbox': 'tight',
+    'savefig.pad_inches': 0.1,
+    'font.family': 'DejaVu Sans',
+    'font.size': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'lines.linewidth': 1.5,
+    'axes.linewidth': 0.8,
+}
 
 @dataclass
 class RandomForestTomorrowConfig:
@@ -64,14 +78,21 @@ class RandomForestTomorrowConfig:
     HISTORY_PNG: str = ""
     
     # データ列
-    X_COLS: tuple = ("MONTH", "WEEK", "HOUR", "TEMP")
+    X_COLS: tuple = tuple(feature_columns())
     Y_COLS: tuple = ("KW",)
+    # 予測区間の列（下限 P10 / 上限 P90、学習時に葉の学習行を保存したモデルのみ出力）
+    # ダッシュボードは各行の最初の数値を読むため、列名に数字を含めない
+    INTERVAL_COLS: tuple = ("KW_LOWER", "KW_UPPER")
+    
+    # 予測スレッド数（common/thread_budget.py の割当、None の場合はモデル保存時の n_jobs）
+    THREADS: Optional[int] = None
 
 def robust_model_operation(operation_name: str):
     """モデル操作の堅牢性を保証するデコレータ"""
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            import psutil
             start_time = time.time()
             initial_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
             
@@ -100,67 +121,106 @@ def robust_model_operation(operation_name: str):
     return decorator
 
 
-@robust_model_operation("学習・テスト・翌日データ読み込み")
-def load_training_and_test_data(config: RandomForestTomorrowConfig) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-    """学習データ、テストデータ、翌日データを読み込み"""
-    if not os.path.exists(config.XTRAIN_CSV):
-        raise FileNotFoundError(f"学習用データファイルが見つかりません: {config.XTRAIN_CSV}")
+@robust_model_operation("テスト・翌日データ読み込み")
+def load_test_and_tomorrow_data(config: RandomForestTomorrowConfig) -> Tuple[np.ndarray, np.ndarray]:
+    """テストデータ、翌日データを読み込み"""
+    import pandas as pd
     if not os.path.exists(config.YTEST_CSV):
         raise FileNotFoundError(f"テストデータファイルが見つかりません: {config.YTEST_CSV}")
     if not os.path.exists(config.XTOMORROW_CSV):
         raise FileNotFoundError(f"予測用データファイルが見つかりません: {config.XTOMORROW_CSV}")
     
-    x_train = pd.read_csv(config.XTRAIN_CSV).to_numpy().astype('float32')
     y_test = pd.read_csv(config.YTEST_CSV).values.astype('int32').flatten()
-    x_tomorrow = pd.read_csv(config.XTOMORROW_CSV).to_numpy().astype('float32')
+    x_tomorrow = pd.read_csv(config.XTOMORROW_CSV)[list(config.X_COLS)].to_numpy().astype('float32')
     
-    print(f"データ読み込み完了 - x_train: {x_train.shape}, y_test: {y_test.shape}, x_tomorrow: {x_tomorrow.shape}")
-    return x_train, y_test, x_tomorrow
+    print(f"データ読み込み完了 - y_test: {y_test.shape}, x_tomorrow: {x_tomorrow.shape}")
+    return y_test, x_tomorrow
 
 @robust_model_operation("データ標準化")
-def standardize_data(x_train: np.ndarray, x_tomorrow: np.ndarray) -> Tuple[np.ndarray, np.ndarray, StandardScaler]:
-    """データの標準化を実行"""
-    scaler = StandardScaler()
-    x_train_scaled = scaler.fit_transform(x_train)
+def standardize_data(config: RandomForestTomorrowConfig, x_tomorrow: np.ndarray) -> np.ndarray:
+    """学習時に保存したスケーラーがある場合のみ翌日データを標準化（木モデルは通常そのまま）"""
+    scaler_path = config.MODEL_SAV.replace('.sav', '_scaler.pkl')
+    if not os.path.exists(scaler_path):
+        print("スケーラーなし（木モデルのため生の特徴量で予測）")
+        return x_tomorrow
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
     x_tomorrow_scaled = scaler.transform(x_tomorrow)
     
-    print(f"データ標準化完了 - 学習データ: {x_train_scaled.shape}, 翌日データ: {x_tomorrow_scaled.shape}")
-    return x_train_scaled, x_tomorrow_scaled, scaler
+    print(f"データ標準化完了 - 翌日データ: {x_tomorrow_scaled.shape}")
+    return x_tomorrow_scaled
 
 @robust_model_operation("RandomForestモデル読み込み")
 def load_random_forest_model(config: RandomForestTomorrowConfig):
-    """RandomForestモデルを読み込み"""
+    """RandomForestモデルを読み込み（学習時に書き出した NumPy 推論エンジンがあればそれを使用）"""
     if not os.path.exists(config.MODEL_SAV):
         raise FileNotFoundError(f"RandomForestモデルファイルが見つかりません: {config.MODEL_SAV}")
     
-    with open(config.MODEL_SAV, 'rb') as f:
-        model = pickle.load(f)
+    # 学習時のエンジン（random_forest / extra_trees / hist_gradient_boosting）をメタデータから判定する
+    engine = load_engine_metadata(config.MODEL_SAV)['engine']
+    print(f"決定木エンジン: {engine}")
     
-    print(f"RandomForestモデル読み込み完了: {config.MODEL_SAV}")
+    compiled = load_for_model(config.MODEL_SAV)
+    if compiled is not None:
+        print(f"NumPy推論エンジン読み込み完了: {compiled.summary()}")
+        return compiled
+    
+    # joblib 形式のモデルはノード配列をメモリマップで読み込む（従来の pickle 形式にも対応）
+    model = load_forest(config.MODEL_SAV)
+    if config.THREADS and is_bagging(engine):
+        # HistGradientBoosting は n_jobs を持たず、OpenMP のスレッド割当に従う
+        model.set_params(n_jobs=config.THREADS)
+    
+    print(f"{type(model).__name__} モデル読み込み完了: {config.MODEL_SAV}")
     return model
 
 @robust_model_operation("RandomForest予測実行")
 def predict_with_model(model, x_tomorrow: np.ndarray, y_test: np.ndarray) -> np.ndarray:
     """RandomForestモデルを使用して予測を実行"""
+    from sklearn.metrics import r2_score
     min_length = min(len(x_tomorrow), len(y_test))
     
-    # テスト精度を確認（参考値）
-    if min_length > 0:
-        test_accuracy = model.score(x_tomorrow[:min_length], y_test[:min_length])
-        print(f"テスト精度（R²スコア参考値）: {test_accuracy:.3f}")
-    
     # 予測実行
     y_tomorrow = model.predict(x_tomorrow)
     
+    # テスト精度を確認（参考値、予測結果から計算して再予測を避ける）
+    if min_length > 0:
+        test_accuracy = r2_score(y_test[:min_length], y_tomorrow[:min_length])
+        print(f"テスト精度（R²スコア参考値）: {test_accuracy:.3f}")
+    
     print(f"予測完了 - 予測結果形状: {y_tomorrow.shape}")
     return y_tomorrow
 
+@robust_model_operation("予測区間計算")
+def predict_intervals(config: RandomForestTomorrowConfig, x_tomorrow: np.ndarray) -> Optional[np.ndarray]:
+    """学習済みフォレストの葉の学習行から予測区間（P10 / P90）を計算（葉の学習行が無いモデルは None）"""
+    samples = load_leaf_samples(config.MODEL_SAV)
+    if samples is None:
+        print("予測区間なし（学習時に葉の学習行を保存していないモデル）")
+        return None
+    
+    # 到達した葉の番号が必要なため、NumPy 推論エンジン使用時も元のフォレストを読み込む
+    forest = load_forest(config.MODEL_SAV)
+    if config.THREADS:
+        forest.set_params(n_jobs=config.THREADS)
+    bands = samples.predict_interval(forest.apply(x_tomorrow))
+    
+    lower_q, upper_q = forest_quantiles.config.INTERVAL
+    print(f"予測区間 P{lower_q * 100:.0f}-P{upper_q * 100:.0f} 計算完了 - 平均幅: "
+          f"{np.mean(bands[:, 1] - bands[:, 0]):.1f} kW (較正による拡幅 {samples.interval_margin:.1f} kW)")
+    return bands
+
 @robust_model_operation("予測結果保存")
-def save_prediction_results(config: RandomForestTomorrowConfig, y_tomorrow: np.ndarray) -> None:
-    """予測結果をCSVファイルに保存"""
+def save_prediction_results(config: RandomForestTomorrowConfig, y_tomorrow: np.ndarray,
+                            bands: Optional[np.ndarray] = None) -> None:
+    """予測結果をCSVファイルに保存（予測区間がある場合は KW の隣に下限・上限の列を追加）"""
+    import pandas as pd
     os.makedirs(os.path.dirname(config.YTOMORROW_CSV), exist_ok=True)
     
     y_tomorrow_df = pd.DataFrame(y_tomorrow, columns=list(config.Y_COLS))
+    if bands is not None:
+        for i, column in enumerate(config.INTERVAL_COLS):
+            y_tomorrow_df[column] = bands[:, i]
     y_tomorrow_df.to_csv(config.YTOMORROW_CSV, index=False)
     
     print(f"予測結果保存完了: {config.YTOMORROW_CSV} ({len(y_tomorrow_df)}行)")
@@ -168,6 +228,7 @@ def save_prediction_results(config: RandomForestTomorrowConfig, y_tomorrow: np.n
 @robust_model_operation("精度指標計算")
 def calculate_metrics(y_test: np.ndarray, y_tomorrow: np.ndarray) -> Tuple[float, float]:
     """予測精度指標を計算（統一フォーマット対応）"""
+    from sklearn.metrics import mean_squared_error, r2_score
     min_length = min(len(y_test), len(y_tomorrow))
     if min_length == 0:
         raise ValueError("比較するデータがありません")
@@ -195,8 +256,11 @@ def calculate_metrics(y_test: np.ndarray, y_tomorrow: np.ndarray) -> Tuple[float
     return rmse, r2_score_value
 
 @robust_model_operation("グラフ生成")
-def create_prediction_visualization(config: RandomForestTomorrowConfig, y_test: np.ndarray, y_tomorrow: np.ndarray) -> None:
-    """予測結果の可視化グラフを作成"""
+def create_prediction_visualization(config: RandomForestTomorrowConfig, y_test: np.ndarray, y_tomorrow: np.ndarray,
+                                    bands: Optional[np.ndarray] = None) -> None:
+    """予測結果の可視化グラフを作成（予測区間がある場合は帯で表示）"""
+    import pandas as pd
+    plt = pyplot(PLOT_RC)
     os.makedirs(os.path.dirname(config.YTOMORROW_PNG), exist_ok=True)
     
     min_length = min(len(y_test), len(y_tomorrow))
@@ -219,6 +283,10 @@ def create_prediction_visualization(config: RandomForestTomorrowConfig, y_test:
     # グラフ描画
     plt.figure(figsize=(16, 9))
     plt.plot(df_result1.index, df_result1['Predict[kW]'], label='Predict[kW]')
+    if bands is not None:
+        lower_q, upper_q = forest_quantiles.config.INTERVAL
+        plt.fill_between(df_result1.index, bands[:, 0], bands[:, 1], alpha=0.2,
+                         label=f'P{lower_q * 100:.0f}-P{upper_q * 100:.0f}[kW]')
     plt.plot(df_result2.index[:min_length], df_result2['Actual[kW]'][:min_length], label='Actual[kW]')
     
     # タイトル設定
@@ -279,13 +347,13 @@ def tomorrow(
 def execute_tomorrow_prediction(config: RandomForestTomorrowConfig) -> Optional[Tuple[float, float]]:
     """統一されたRandomForest翌日予測処理"""
     # 1. データ読み込み
-    x_train, y_test, x_tomorrow = load_training_and_test_data(config)
-    if x_train is None or y_test is None or x_tomorrow is None:
+    y_test, x_tomorrow = load_test_and_tomorrow_data(config)
+    if y_test is None or x_tomorrow is None:
         return None, None
     
-    # 2. データ標準化
-    x_train_scaled, x_tomorrow_scaled, scaler = standardize_data(x_train, x_tomorrow)
-    if x_train_scaled is None or x_tomorrow_scaled is None:
+    # 2. データ標準化（学習時に標準化したモデルの場合のみ）
+    x_tomorrow_scaled = standardize_data(config, x_tomorrow)
+    if x_tomorrow_scaled is None:
         return None, None
     
     # 3. モデル読み込み
@@ -298,8 +366,11 @@ def execute_tomorrow_prediction(config: RandomForestTomorrowConfig) -> Optional[
     if y_tomorrow is None:
         return None, None
     
+    # 予測区間（葉の学習行を保存したモデルのみ）
+    bands = predict_intervals(config, x_tomorrow_scaled)
+    
     # 5. 予測結果保存
-    save_prediction_results(config, y_tomorrow)
+    save_prediction_results(config, y_tomorrow, bands)
     
     # 6. 精度指標計算
     rmse, r2_score_value = calculate_metrics(y_test, y_tomorrow)
@@ -307,14 +378,15 @@ def execute_tomorrow_prediction(config: RandomForestTomorrowConfig) -> Optional[
         return None, None
     
     # 7. 可視化作成
-    create_prediction_visualization(config, y_test, y_tomorrow)
+    create_prediction_visualization(config, y_test, y_tomorrow, bands)
     
     return rmse, r2_score_value
 
 
 if __name__ == "__main__":
-    # 設定初期化
+    # 設定初期化（CPUスレッド割当は環境変数 AI_THREADS で指定）
     config = RandomForestTomorrowConfig()
+    config.THREADS = configure_threads("RandomForest翌日予測")
     # 起動時に監査ログとして AI_TARGET_YEARS を出力
     import os as _os
     print(f"AI_TARGET_YEARS={_os.environ.get('AI_TARGET_YEARS')}")
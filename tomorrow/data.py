@@ -31,6 +31,14 @@ try:
 except Exception:
     psutil = None
 
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.timekeys import to_epoch_hours
+from common.demand_features import DemandFeatureStore
+
 # パフォーマンス最適化設定（統合版）
 warnings.filterwarnings('ignore', category=UserWarning)
 warnings.filterwarnings('ignore', category=FutureWarning)
@@ -159,6 +167,9 @@ class TomorrowDataConfig:
     REQUEST_TIMEOUT: int = 30
     MEMORY_THRESHOLD_MB: float = 100.0
     
+    # 需要ラグ・移動窓特徴量ストア（取り込んだ時刻の影響範囲のみ増分更新）
+    DEMAND_FEATURE_STORE: str = "tomorrow/demand_features.npz"
+    
     # URL設定
     TEPCO_URL_TEMPLATE: str = "https://www.tepco.co.jp/forecast/html/images/{year:04d}{month:02d}_power_usage.zip"
     
@@ -613,6 +624,9 @@ def create_tomorrow_prediction_dataset(
 
         df_kw = df
 
+        # 需要特徴量ストアの増分更新
+        update_demand_feature_store(df_kw, config.DEMAND_FEATURE_STORE)
+
         # 温度データの読み込み・処理
         return process_temperature_and_create_dataset(df_kw, Ytest_csv, past_days, forecast_days)
         
@@ -622,6 +636,28 @@ def create_tomorrow_prediction_dataset(
         traceback.print_exc()
         return error_msg
 
+def update_demand_feature_store(df_kw: pd.DataFrame, store_path: str) -> None:
+    """
+    取得済み電力需要を需要特徴量ストアへ取り込む（失敗しても予測処理は継続）
+
+    ストアは前回までの需要を保持しており、値が新規・変更された時刻の
+    影響範囲のみ特徴量を再計算する。
+
+    Args:
+        df_kw: 日時インデックス付き電力データフレーム（KW列）
+        store_path: ストア保存先パス（.npz）
+    """
+    try:
+        kw = pd.to_numeric(df_kw['KW'], errors='coerce')
+        valid = kw.notna().to_numpy()
+        store = DemandFeatureStore.load(store_path)
+        recomputed = store.ingest(to_epoch_hours(df_kw.index[valid]), kw.to_numpy(dtype=np.float64)[valid])
+        store.save(store_path)
+        logger.info(f"需要特徴量ストア更新: 再計算 {recomputed} 時刻 ({store_path})")
+    except Exception as e:
+        logger.warning(f"需要特徴量ストア更新に失敗しました（予測処理は継続します）: {e}")
+
+
 @safe_file_operation("温度データ処理・データセット作成")
 def process_temperature_and_create_dataset(
     df_kw: pd.DataFrame, 
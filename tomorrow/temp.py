@@ -26,6 +26,17 @@ import datetime as dt
 import requests
 from urllib3.exceptions import InsecureRequestWarning
 
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.timekeys import now_epoch_hour, to_epoch_hours
+from common.jp_calendar import calendar_flags
+from common.demand_features import DemandFeatureStore
+from common.year_blocks import config as block_config, feature_columns
+from common.forecast_archive import append_issuance
+
 # システム監視ライブラリインポート（オプション）
 try:
     import psutil
@@ -71,11 +82,14 @@ class TempConfig:
     DEFAULT_TIMEZONE: str = "Asia%2FTokyo"
     DEFAULT_PAST_DAYS: int = 7
     DEFAULT_FORECAST_DAYS: int = 7
-    REQUIRED_COLUMNS: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "HOUR", "TEMP"])
+    REQUIRED_COLUMNS: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "HOUR", "TEMP", "CALENDAR"])
     API_TIMEOUT: int = 30  # APIタイムアウト（秒）
     FLOAT_PRECISION: str = "float32"  # メモリ効率化
     MAX_WORKERS: int = 4  # 並列処理ワーカー数
     MEMORY_THRESHOLD_MB: int = 1000  # メモリ使用量監視閾値
+    ARCHIVE_FORECASTS: bool = True  # 取得した予報を発表時刻ごとにアーカイブ
+    FORECAST_ARCHIVE_DIR: str = "tomorrow/forecast_archive"
+    DEMAND_FEATURE_STORE: str = "tomorrow/demand_features.npz"  # tomorrow/data.py が更新する需要特徴量ストア
 
 # 統一設定インスタンス
 config = TempConfig()
@@ -310,10 +324,27 @@ def create_temperature_dataframe(api_data: Dict[str, Any]) -> pd.DataFrame:
         df['MONTH'] = df['time'].dt.month.astype('int64')
         df['WEEK'] = df['time'].dt.weekday.astype('int64')  
         df['HOUR'] = df['time'].dt.hour.astype('int64')
+        df['CALENDAR'] = calendar_flags(to_epoch_hours(df['time'])).astype('int64')  # 祝日・飛び石・お盆・年末年始
         df['TEMP'] = df['TEMP'].astype(config.FLOAT_PRECISION)  # メモリ効率化
         
+        # 需要ラグ・移動窓特徴量（学習時と同じ定義）
+        columns = list(config.REQUIRED_COLUMNS)
+        if block_config.DEMAND_FEATURES:
+            store = DemandFeatureStore.load(config.DEMAND_FEATURE_STORE)
+            demand = store.lookup(to_epoch_hours(df['time']))
+            # 参照先の需要が未確定の時刻は学習データに存在しない NaN となるため、予測せず中止する
+            missing = ~np.isfinite(demand).all(axis=1)
+            if missing.any():
+                raise ValueError(
+                    f"需要特徴量の参照先が未確定の時刻が {int(missing.sum())}行あります "
+                    f"（最初: {df['time'][missing].iloc[0]}）。需要特徴量は翌日までの予測のみ対応のため、"
+                    f"予測日数を短くするか DEMAND_FEATURES を無効にしてください")
+            for i, name in enumerate(store.spec.columns):
+                df[name] = demand[:, i]
+            columns = feature_columns()
+        
         # 必要なカラムのみ選択（メモリ削減）
-        result_df = df[config.REQUIRED_COLUMNS].copy()
+        result_df = df[columns].copy()
         
         # 不要なオブジェクトを即座に削除
         del df
@@ -329,6 +360,30 @@ def create_temperature_dataframe(api_data: Dict[str, Any]) -> pd.DataFrame:
         traceback.print_exc()
         raise ValueError(error_msg)
 
+def archive_forecast_issuance(api_data: Dict[str, Any], archive_dir: str) -> None:
+    """
+    取得した気温予報を発表時刻（取得時刻）ごとにアーカイブへ追記する
+
+    tomorrow.csv は毎回上書きされるため、予測に実際に使用した予報値を
+    後から参照できるよう追記専用アーカイブに保存する。
+    アーカイブ失敗は予測処理を止めないよう警告のみとする。
+
+    Args:
+        api_data: Open-Meteo APIレスポンスデータ
+        archive_dir: アーカイブディレクトリ
+    """
+    try:
+        appended = append_issuance(
+            now_epoch_hour(),
+            api_data['hourly']['time'],
+            np.array(api_data['hourly']['temperature_2m'], dtype='float64'),
+            archive_dir=archive_dir
+        )
+        if appended:
+            logger.info(f"気温予報アーカイブ保存完了: {archive_dir}")
+    except Exception as e:
+        logger.warning(f"気温予報アーカイブ保存に失敗しました（処理は継続）: {e}")
+
 @safe_api_operation("CSV保存")
 def save_temperature_csv(df: pd.DataFrame, output_path: str) -> None:
     """
@@ -407,6 +462,10 @@ def temp(
         # APIから気温データ取得
         api_data = fetch_temperature_data(latitude, longitude, timezone, past_days, forecast_days)
         
+        # 予報発表のアーカイブ（追記のみ）
+        if config.ARCHIVE_FORECASTS:
+            archive_forecast_issuance(api_data, config.FORECAST_ARCHIVE_DIR)
+        
         # データフレーム作成
         temperature_df = create_temperature_dataframe(api_data)
         
@@ -22,6 +22,13 @@ from datetime import datetime
 import glob
 import re
 
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import assemble_combination
+
 # 設定
 @dataclass
 class OptimizationConfig:
@@ -135,18 +142,16 @@ class YearCombinationOptimizer:
             script_dir = os.path.dirname(os.path.abspath(__file__))
             ai_dir = os.path.join(script_dir, "..", "..")
             ai_dir = os.path.abspath(ai_dir)
-            data_script = os.path.join(ai_dir, "data", "data.py")
-            
-            # データ処理実行
-            data_cmd = [config.PYTHON_PATH, config.PYTHON_VERSION, data_script, ','.join(train_years + [test_year])]
-            data_result = subprocess.run(data_cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore', env=env, cwd=ai_dir, timeout=300)
-            
-            if data_result.returncode != 0:
+            # 年別特徴量ブロックの作成・検証（学習スクリプトは AI_TARGET_YEARS から
+            # 同じブロックを時系列分割して直接読み込むため、分割CSVは書き出さない）
+            try:
+                assemble_combination([int(y) for y in train_years], int(test_year))
+            except Exception as e:
                 return {
                     'train_years': train_years,
                     'test_year': test_year,
                     'success': False,
-                    'error': f"Data processing failed: {data_result.stderr}",
+                    'error': f"Data processing failed: {e}",
                     'execution_time': time.time() - start_time
                 }
             
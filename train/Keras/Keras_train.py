@@ -6,6 +6,8 @@
 電力消費予測のための予測モデルを作成するモジュール。
 """
 
+from __future__ import annotations
+
 # 標準ライブラリインポート
 import os
 import sys
@@ -13,88 +15,77 @@ import time
 import traceback
 import warnings
 import gc
-from typing import List, Tuple, Optional, Dict, Any, Union
+from typing import TYPE_CHECKING, List, Tuple, Optional, Dict, Any, Union
 from dataclasses import dataclass, field
+from functools import lru_cache
 
 # サードパーティライブラリインポート
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
 
-# 機械学習ライブラリインポート
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
-
-# Keras/TensorFlowインポート
-from keras.models import Sequential
-from keras.layers import Dense, Dropout
-from keras.optimizers import Adam
-from keras import regularizers
-from tensorflow.python.keras.callbacks import EarlyStopping
-
-# 再現性確保のためのランダムシード固定
-import random
-import tensorflow as tf
-random.seed(42)
-np.random.seed(42) 
-tf.random.set_seed(42)
-
-# パフォーマンス最適化設定（統合版）
-warnings.filterwarnings('ignore', category=UserWarning)
-warnings.filterwarnings('ignore', category=FutureWarning)
-warnings.filterwarnings('ignore', category=DeprecationWarning)
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # TensorFlow警告抑制
-np.set_printoptions(suppress=True, precision=4)
-
-# pandas高速化設定（バージョン互換性対応）
-try:
-    pd.set_option('mode.copy_on_write', True)
-except Exception:
-    pass  # 古いバージョンでは無視
-
-# matplotlib最適化設定（16:9統一、可視化）
-plt.rcParams['figure.figsize'] = (16, 9)  # 16:9アスペクト比統一
-plt.rcParams['figure.dpi'] = 100
-plt.rcParams['savefig.dpi'] = 100
-plt.rcParams['savefig.bbox'] = 'tight'
-plt.rcParams['savefig.pad_inches'] = 0.1
-try:
-    from matplotlib import font_manager
-    preferred_fonts = ['Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic', 'DejaVu Sans']
-    available = {f.name for f in font_manager.fontManager.ttflist}
-    chosen = None
-    for fname in preferred_fonts:
-        if fname in available:
-            chosen = fname
-            break
-    if chosen:
-        plt.rcParams['font.family'] = [chosen, 'DejaVu Sans']
-    else:
-        plt.rcParams['font.family'] = 'DejaVu Sans'
-    plt.rcParams['axes.unicode_minus'] = False
-except Exception:
-    plt.rcParams['font.family'] = 'DejaVu Sans'
-
-plt.rcParams['font.size'] = 12  # タイトル用
-plt.rcParams['axes.titlesize'] = 12
-plt.rcParams['axes.labelsize'] = 12
-plt.rcParams['legend.fontsize'] = 11
-plt.rcParams['xtick.labelsize'] = 10
-plt.rcParams['ytick.labelsize'] = 10
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['lines.linewidth'] = 1.5
-plt.rcParams['axes.linewidth'] = 0.8
-plt.rcParams['figure.max_open_warning'] = 10
-
-print("Keras: 統一パフォーマンス最適化設定を適用しました")
+# 機械学習ライブラリ・Keras（型注釈のみ、使用する関数の中で読み込む）
+if TYPE_CHECKING:
+    from sklearn.preprocessing import StandardScaler
+    from keras.models import Sequential
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import load_split, feature_columns
+from common.dataset_io import load_training_arrays
+from common.shards import ShardSet
+from common.row_aggregation import aggregate_rows
+from common.thread_budget import configure_threads
+from common.mlp_inference import export_for_model, load_for_model
+from common import day_blocks
+from common.day_blocks import DayLayout, load_day_split, save_layout, remove_layout
+from common.plot_style import pyplot
+
+# matplotlib最適化設定（16:9統一、グラフ作成時に適用）
+PLOT_RC = {
+    'figure.figsize': (16, 9),  # 16:9アスペクト比統一
+    'figure.dpi': 100,
+    'savefig.dpi': 100,
+    'savefig.bbox': 'tight',
+    'savefig.pad_inches': 0.1,
+    'font.size': 12,  # タイトル用
+    'axes.titlesize': 12,
+    'axes.labelsize': 12,
+    'legend.fontsize': 11,
+    'xtick.labelsize': 10,
+    'ytick.labelsize': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'lines.linewidth': 1.5,
+    'axes.linewidth': 0.8,
+    'figure.max_open_warning': 10,
+}
+PLOT_FONTS = ['Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic']
+
+
+def configure_runtime() -> None:
+    """スクリプト実行時の警告抑制・表示設定（統合版）"""
+    import pandas as pd
+    warnings.filterwarnings('ignore', category=UserWarning)
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')  # TensorFlow警告抑制（読み込み前に指定）
+    np.set_printoptions(suppress=True, precision=4)
+    # pandas高速化設定（バージョン互換性対応）
+    try:
+        pd.set_option('mode.copy_on_write', True)
+    except Exception:
+        pass  # 古いバージョンでは無視
+    print("Keras: 統一パフォーマンス最適化設定を適用しました")
+
 
 # 統一設定クラス（統合版）
 @dataclass(frozen=True)
 class KerasConfig:
     """Keras学習設定クラス（設定値統一管理）"""
-    DEFAULT_FEATURE_COLUMNS: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "HOUR", "TEMP"])
+    DEFAULT_FEATURE_COLUMNS: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "HOUR", "TEMP", "CALENDAR"])
     DEFAULT_TARGET_COLUMNS: List[str] = field(default_factory=lambda: ["KW"])
     DEFAULT_LEARNING_RATE: float = 0.001
     DEFAULT_EPOCHS: int = 500
@@ -104,6 +95,26 @@ class KerasConfig:
     NEURAL_NETWORK_UNITS: int = 128  # ユニット数を128に増加
     RANDOM_STATE: int = 42
     
+    # 同一特徴量の学習行を集約し、行数をサンプル重みとして学習する（common/row_aggregation.py）
+    AGGREGATE_ROWS: bool = False
+    
+    # 学習データの入力方法（'tf_data': tf.data パイプライン・大きなバッチ・学習率ウォームアップ、
+    # 'numpy': NumPy 配列を DEFAULT_BATCH_SIZE で直接入力、common/keras_pipeline.py）
+    INPUT_PIPELINE: str = 'tf_data'
+    
+    # モデル構成（'hourly': 1行1時刻・1出力、'day_block': 1行1日（24時間の気温 + カレンダー）・
+    # 24出力で1回の順伝播で1日分を予測、common/day_blocks.py。環境変数 AI_KERAS_ARCHITECTURE で指定）
+    ARCHITECTURE: str = 'hourly'
+    
+    # スナップショットアンサンブル（学習率を SNAPSHOT_CYCLE_EPOCHS エポック周期の余弦で下げ、各周期の終わりの
+    # 重みを保存して平均する。早期終了は行わず SNAPSHOT_CYCLES x SNAPSHOT_CYCLE_EPOCHS エポック学習する。
+    # 環境変数 AI_KERAS_SNAPSHOTS=1 で有効化、common/keras_pipeline.py・common/mlp_inference.py）
+    SNAPSHOT_ENSEMBLE: bool = False
+    SNAPSHOT_CYCLES: int = 5
+    SNAPSHOT_CYCLE_EPOCHS: int = 40
+    SNAPSHOT_MIN_LR_RATIO: float = 0.01  # 各周期の最小学習率（最大学習率との比）
+    SNAPSHOT_KEEP: int = 3  # アンサンブルに使用する直近のスナップショット数（初回周期は初期値からの学習のため除く、0: 全て）
+    
     # 正則化設定（軽微な正則化で過学習防止）
     DROPOUT_RATE: float = 0.1  # 軽微なドロップアウト
     L2_REGULARIZATION: float = 0.001  # 軽微なL2正則化
@@ -183,11 +194,9 @@ def load_training_data(xtrain_csv: str,
     """
     print("学習データを読み込み中...")
     
-    # メモリ効率化された読み込み
-    X_train = pd.read_csv(xtrain_csv).to_numpy().astype(config.DTYPE_CONFIG['float_dtype'])
-    X_test = pd.read_csv(xtest_csv).to_numpy().astype(config.DTYPE_CONFIG['float_dtype'])
-    y_train = pd.read_csv(ytrain_csv).values.astype(config.DTYPE_CONFIG['float_dtype']).flatten()
-    y_test = pd.read_csv(ytest_csv).values.astype(config.DTYPE_CONFIG['float_dtype']).flatten()
+    # バイナリデータセット（data/dataset/）があればメモリマップで読み込み、無ければCSVを読み込む
+    X_train, X_test, y_train, y_test, _ = load_training_arrays(
+        xtrain_csv, xtest_csv, ytrain_csv, ytest_csv, dtype=config.DTYPE_CONFIG['float_dtype'])
     
     print(f"学習データ形状: X_train={X_train.shape}, y_train={y_train.shape}")
     print(f"テストデータ形状: X_test={X_test.shape}, y_test={y_test.shape}")
@@ -199,11 +208,78 @@ def load_training_data(xtrain_csv: str,
     return X_train, X_test, y_train, y_test
 
 
+@robust_model_operation("学習データ取得（年別特徴量ブロック）")
+def load_training_views(target_years: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    年指定から学習・テストデータを年別特徴量ブロックのビューとして取得する（CSV読み込みなし）
+
+    時系列分割エンジンにより、最も新しい年をテスト年・それ以前を学習年として分割する。
+
+    Args:
+        target_years: カンマ区切りの年指定（例: "2019,2020,2021"）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: 
+            X_train, X_test, y_train, y_test
+    """
+    print(f"年別特徴量ブロックから学習データを取得中... (対象年: {target_years})")
+    years = [int(y) for y in target_years.split(',') if y.strip()]
+    X_train, X_test, y_train, y_test = (
+        a.astype(config.DTYPE_CONFIG['float_dtype'], copy=False) for a in load_split(years)
+    )
+
+    print(f"学習データ形状: X_train={X_train.shape}, y_train={y_train.shape}")
+    print(f"テストデータ形状: X_test={X_test.shape}, y_test={y_test.shape}")
+
+    return X_train, X_test, y_train, y_test
+
+
+@robust_model_operation("学習データ取得（日単位・24時間ブロック）")
+def load_day_training_data(target_years: Optional[str],
+                           xtrain_csv: str,
+                           xtest_csv: str,
+                           ytrain_csv: str,
+                           ytest_csv: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    学習・テストデータを日単位（1行1日・24時間分の目的変数）で取得する（日単位モデル用）
+
+    年指定時は年別特徴量ブロックの時刻キーで、CSV読み込み時は HOUR 列で日を区切り、
+    24 時間そろった日のみを使用する（common/day_blocks.py）。
+
+    Args:
+        target_years: 対象年（指定時はCSVを読まず年別特徴量ブロックから直接取得）
+        xtrain_csv: 学習用特徴量データのパス
+        xtest_csv: テスト用特徴量データのパス
+        ytrain_csv: 学習用目的変数データのパス
+        ytest_csv: テスト用目的変数データのパス
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: 
+            X_train, X_test（日数 x 日単位の特徴量数）, y_train, y_test（日数 x 24）
+    """
+    if target_years:
+        years = [int(y) for y in target_years.split(',') if y.strip()]
+        train_days, test_days = load_day_split(years)
+    else:
+        X_train, X_test, y_train, y_test = load_training_data(xtrain_csv, xtest_csv, ytrain_csv, ytest_csv)
+        layout = DayLayout(feature_columns())
+        train_days, test_days = layout.to_day_blocks(X_train, y_train), layout.to_day_blocks(X_test, y_test)
+
+    dtype = config.DTYPE_CONFIG['float_dtype']
+    print(f"日単位データ: 学習={len(train_days):,}日（元の行の{train_days.coverage:.1%}）, "
+          f"テスト={len(test_days):,}日（元の行の{test_days.coverage:.1%}）, 特徴量={len(train_days.columns)}列")
+    if len(train_days) == 0 or len(test_days) == 0:
+        raise ValueError("24時間そろった日がありません")
+    return (train_days.X.astype(dtype, copy=False), test_days.X.astype(dtype, copy=False),
+            train_days.y.astype(dtype, copy=False), test_days.y.astype(dtype, copy=False))
+
+
 @robust_model_operation("データ標準化")
 def prepare_data_with_scaling(X_train: np.ndarray, 
                              X_test: np.ndarray,
                              y_train: np.ndarray,
-                             y_test: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, StandardScaler, StandardScaler]:
+                             y_test: np.ndarray,
+                             sample_weight: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, StandardScaler, StandardScaler]:
     """
     データの標準化を実行する（目的変数正規化対応版）
     
@@ -212,6 +288,7 @@ def prepare_data_with_scaling(X_train: np.ndarray,
         X_test: テスト用特徴量データ
         y_train: 学習用目的変数データ
         y_test: テスト用目的変数データ
+        sample_weight: 学習行のサンプル重み（集約時、標準化パラメータも重み付きで計算）
         
     Returns:
         Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, StandardScaler, StandardScaler]: 
@@ -220,6 +297,7 @@ def prepare_data_with_scaling(X_train: np.ndarray,
     Raises:
         ValueError: データ形式エラーの場合
     """
+    from sklearn.preprocessing import StandardScaler
     print("データの標準化を実行中...")
     
     # データ検証
@@ -228,20 +306,21 @@ def prepare_data_with_scaling(X_train: np.ndarray,
     
     # 特徴量標準化
     x_scaler = StandardScaler()
-    x_scaler.fit(X_train)
+    x_scaler.fit(X_train, sample_weight=sample_weight)
     X_train_scaled = x_scaler.transform(X_train).astype(config.DTYPE_CONFIG['float_dtype'])
     X_test_scaled = x_scaler.transform(X_test).astype(config.DTYPE_CONFIG['float_dtype'])
     
     # 目的変数正規化（過学習対策）
     y_scaler = StandardScaler()
-    y_train_scaled = y_scaler.fit_transform(y_train.reshape(-1, 1)).flatten().astype(config.DTYPE_CONFIG['float_dtype'])
-    y_test_scaled = y_scaler.transform(y_test.reshape(-1, 1)).flatten().astype(config.DTYPE_CONFIG['float_dtype'])
+    # （日単位モデルの 24 時間分の目的変数も全時刻共通の1組の標準化パラメータとし、形状は保つ）
+    y_train_scaled = y_scaler.fit(y_train.reshape(-1, 1), sample_weight=sample_weight).transform(y_train.reshape(-1, 1)).reshape(y_train.shape).astype(config.DTYPE_CONFIG['float_dtype'])
+    y_test_scaled = y_scaler.transform(y_test.reshape(-1, 1)).reshape(y_test.shape).astype(config.DTYPE_CONFIG['float_dtype'])
     
     print(f"標準化完了: 特徴量数={X_train_scaled.shape[1]}, 目的変数正規化適用")
     return X_train_scaled, X_test_scaled, y_train_scaled, y_test_scaled, x_scaler, y_scaler
 
 @robust_model_operation("Kerasモデル構築")
-def create_keras_model(input_dim: int, learning_rate: float = None) -> Sequential:
+def create_keras_model(input_dim: int, learning_rate: float = None, n_outputs: int = 1) -> Sequential:
     """
     Kerasディープニューラルネットワークモデルを作成する（改善版v3）
     
@@ -255,6 +334,7 @@ def create_keras_model(input_dim: int, learning_rate: float = None) -> Sequentia
     Args:
         input_dim: 入力次元数
         learning_rate: 学習率（デフォルト: config値）
+        n_outputs: 出力数（1: 1行1時刻、24: 日単位モデル）
         
     Returns:
         Sequential: 構築されたKerasモデル
@@ -269,13 +349,19 @@ def create_keras_model(input_dim: int, learning_rate: float = None) -> Sequentia
         raise ValueError(f"無効な入力次元数: {input_dim}")
         
     print(f"Kerasモデルを構築中... (入力次元: {input_dim})")
-    print(f"改善版v3アーキテクチャ: 128→128→64→32→1")
+    print(f"改善版v3アーキテクチャ: 128→128→64→32→{n_outputs}")
     print(f"過学習対策v3: Dropout={config.DROPOUT_RATE}, L2正則化={config.L2_REGULARIZATION}, Batch={config.DEFAULT_BATCH_SIZE}")
     
-    # より深いモデル構築（精度向上のため）
-    from keras.layers import Dropout
+    from keras.models import Sequential
+    from keras.layers import Dense, Dropout
+    from keras.optimizers import Adam
     from keras import regularizers
+    from keras.utils import set_random_seed
     
+    # 再現性確保のためのランダムシード固定（random / NumPy / TensorFlow）
+    set_random_seed(config.RANDOM_STATE)
+    
+    # より深いモデル構築（精度向上のため）
     model = Sequential([
         Dense(config.NEURAL_NETWORK_UNITS, input_dim=input_dim, activation='relu', 
               kernel_regularizer=regularizers.l2(config.L2_REGULARIZATION), name='hidden1'),
@@ -286,7 +372,7 @@ def create_keras_model(input_dim: int, learning_rate: float = None) -> Sequentia
         Dense(64, activation='relu',
               kernel_regularizer=regularizers.l2(config.L2_REGULARIZATION), name='hidden3'),
         Dense(32, activation='relu', name='hidden4'),
-        Dense(1, name='output')
+        Dense(n_outputs, name='output')
     ])
     
     # コンパイル
@@ -308,7 +394,8 @@ def train_model_with_validation(model: Sequential,
                                epochs: int = None,
                                validation_split: float = None,
                                batch_size: int = None,
-                               patience: int = None):
+                               patience: int = None,
+                               sample_weight: Optional[np.ndarray] = None):
     """
     モデルの学習を実行する（最適化版）
     
@@ -318,8 +405,9 @@ def train_model_with_validation(model: Sequential,
         y_train: 学習用目的変数データ
         epochs: エポック数（デフォルト: config値）
         validation_split: 検証データの割合（デフォルト: config値）
-        batch_size: バッチサイズ（デフォルト: config値）
+        batch_size: バッチサイズ（デフォルト: tf.data 入力は common/keras_pipeline.py、NumPy 入力は config値）
         patience: Early Stoppingの忍耐度（デフォルト: config値）
+        sample_weight: 学習行のサンプル重み（集約時）
         
     Returns:
         学習履歴オブジェクト
@@ -327,13 +415,16 @@ def train_model_with_validation(model: Sequential,
     Raises:
         ValueError: 学習パラメータエラーの場合
     """
+    from tensorflow.python.keras.callbacks import EarlyStopping
+    from common import keras_pipeline
+    from common.keras_pipeline import make_datasets, scaled_learning_rate, LinearWarmup, EpochTimer
     # デフォルト値設定
     if epochs is None:
         epochs = config.DEFAULT_EPOCHS
     if validation_split is None:
         validation_split = config.DEFAULT_VALIDATION_SPLIT
     if batch_size is None:
-        batch_size = config.DEFAULT_BATCH_SIZE
+        batch_size = keras_pipeline.config.BATCH_SIZE if config.INPUT_PIPELINE == 'tf_data' else config.DEFAULT_BATCH_SIZE
     if patience is None:
         patience = config.DEFAULT_PATIENCE
     
@@ -352,18 +443,108 @@ def train_model_with_validation(model: Sequential,
         verbose=1
     )
     
-    # 学習実行
-    history = model.fit(
-        X_train, y_train,
-        epochs=epochs,
-        validation_split=validation_split,
-        batch_size=batch_size,
-        verbose=1,
-        callbacks=[early_stopping]
-    )
+    timer = EpochTimer()
+    
+    if config.INPUT_PIPELINE == 'tf_data':
+        # tf.data パイプライン: 大きなバッチ・拡大した学習率（ウォームアップ付き）・時系列順の末尾を検証データ
+        train_ds, val_ds, steps = make_datasets(X_train, y_train, sample_weight, validation_split, batch_size)
+        base_lr = float(model.optimizer.learning_rate.numpy())
+        target_lr = scaled_learning_rate(base_lr, batch_size)
+        warmup_steps = steps * keras_pipeline.config.WARMUP_EPOCHS
+        print(f"tf.data入力: batch_size={batch_size}, {steps}ステップ/エポック, "
+              f"学習率 {base_lr} → {target_lr:.5f}（ウォームアップ {warmup_steps}ステップ）")
+        history = model.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=epochs,
+            verbose=1,
+            callbacks=[LinearWarmup(target_lr, warmup_steps), timer] + ([early_stopping] if val_ds is not None else [])
+        )
+    else:
+        # 学習実行
+        history = model.fit(
+            X_train, y_train,
+            sample_weight=sample_weight,
+            epochs=epochs,
+            validation_split=validation_split,
+            batch_size=batch_size,
+            verbose=1,
+            callbacks=[timer, early_stopping]
+        )
     
     print(f"学習完了 (実際のエポック数: {len(history.history['loss'])})")
+    print(f"学習時間（{config.INPUT_PIPELINE}）: {timer.summary()}")
     return history
+
+@robust_model_operation("スナップショットアンサンブル学習")
+def train_snapshot_ensemble(model: Sequential,
+                            X_train: np.ndarray,
+                            y_train: np.ndarray,
+                            validation_split: float = None,
+                            batch_size: int = None,
+                            sample_weight: Optional[np.ndarray] = None) -> Tuple[Any, List[List[np.ndarray]]]:
+    """
+    周期的な学習率（余弦）で1回学習し、各周期の終わりの重みをスナップショットとして取得する
+    
+    学習率は周期ごとに最大値（tf.data 入力はバッチサイズで拡大した学習率）から
+    SNAPSHOT_MIN_LR_RATIO 倍まで下がり、次の周期の先頭で最大値に戻る。学習後のモデルは
+    最後のスナップショットの重みを持つ。
+    
+    Args:
+        model: 学習対象のKerasモデル
+        X_train: 学習用特徴量データ
+        y_train: 学習用目的変数データ
+        validation_split: 検証データの割合（デフォルト: config値、各スナップショットの検証損失の表示に使用）
+        batch_size: バッチサイズ（デフォルト: tf.data 入力は common/keras_pipeline.py、NumPy 入力は config値）
+        sample_weight: 学習行のサンプル重み（集約時）
+        
+    Returns:
+        Tuple[Any, List[List[np.ndarray]]]: 学習履歴オブジェクト, 各スナップショットの重み
+        
+    Raises:
+        ValueError: 学習パラメータエラーの場合
+    """
+    from common import keras_pipeline
+    from common.keras_pipeline import make_datasets, scaled_learning_rate, time_ordered_split, CosineSnapshots, EpochTimer
+    if validation_split is None:
+        validation_split = config.DEFAULT_VALIDATION_SPLIT
+    if batch_size is None:
+        batch_size = keras_pipeline.config.BATCH_SIZE if config.INPUT_PIPELINE == 'tf_data' else config.DEFAULT_BATCH_SIZE
+    cycles, cycle_epochs = config.SNAPSHOT_CYCLES, config.SNAPSHOT_CYCLE_EPOCHS
+    if cycles <= 0 or cycle_epochs <= 0 or batch_size <= 0:
+        raise ValueError("学習パラメータは正の値である必要があります")
+    epochs = cycles * cycle_epochs
+    
+    timer = EpochTimer()
+    base_lr = float(model.optimizer.learning_rate.numpy())
+    if config.INPUT_PIPELINE == 'tf_data':
+        train_ds, val_ds, steps = make_datasets(X_train, y_train, sample_weight, validation_split, batch_size)
+        max_lr = scaled_learning_rate(base_lr, batch_size)
+    else:
+        n_fit, _ = time_ordered_split(len(X_train), validation_split)
+        steps = int(np.ceil(n_fit / batch_size))
+        max_lr = base_lr
+    schedule = CosineSnapshots(max_lr, max_lr * config.SNAPSHOT_MIN_LR_RATIO, cycle_epochs, steps)
+    print(f"スナップショットアンサンブル学習開始 ({cycles}周期 x {cycle_epochs}エポック, batch_size: {batch_size}, "
+          f"学習率 {max_lr:.5f} → {max_lr * config.SNAPSHOT_MIN_LR_RATIO:.6f}（余弦）, 早期終了なし)")
+    
+    if config.INPUT_PIPELINE == 'tf_data':
+        history = model.fit(train_ds, validation_data=val_ds, epochs=epochs, verbose=1, callbacks=[schedule, timer])
+    else:
+        history = model.fit(
+            X_train, y_train,
+            sample_weight=sample_weight,
+            epochs=epochs,
+            validation_split=validation_split,
+            batch_size=batch_size,
+            verbose=1,
+            callbacks=[schedule, timer]
+        )
+    
+    snapshots = schedule.snapshots[-config.SNAPSHOT_KEEP:] if config.SNAPSHOT_KEEP > 0 else schedule.snapshots
+    print(f"学習完了: {schedule.summary()}, アンサンブルに使用 {len(snapshots)}個")
+    print(f"学習時間（{config.INPUT_PIPELINE}）: {timer.summary()}")
+    return history, snapshots
 @robust_model_operation("学習履歴可視化")
 def save_learning_history_plot(history, history_png: str) -> None:
     """
@@ -376,6 +557,7 @@ def save_learning_history_plot(history, history_png: str) -> None:
     Raises:
         ValueError: 履歴データエラーの場合
     """
+    plt = pyplot(PLOT_RC, japanese_fonts=PLOT_FONTS)
     ensure_directory_exists(history_png)
     
     if not history.history:
@@ -400,7 +582,9 @@ def save_learning_history_plot(history, history_png: str) -> None:
     print(f"学習履歴グラフ保存: {history_png}")
 
 @robust_model_operation("モデル・スケーラー保存")
-def save_model_files(model: Sequential, x_scaler: StandardScaler, y_scaler: StandardScaler, model_path: str) -> None:
+def save_model_files(model: Sequential, x_scaler: StandardScaler, y_scaler: StandardScaler, model_path: str,
+                     layout: Optional[DayLayout] = None,
+                     snapshots: Optional[List[List[np.ndarray]]] = None) -> None:
     """
     モデルとスケーラーを保存する（統一パターン）
     
@@ -409,6 +593,8 @@ def save_model_files(model: Sequential, x_scaler: StandardScaler, y_scaler: Stan
         x_scaler: 特徴量標準化オブジェクト
         y_scaler: 目的変数標準化オブジェクト
         model_path: モデル保存先パス
+        layout: 日単位モデルの入力構成（1行1時刻のモデルは None）
+        snapshots: スナップショットアンサンブルの各スナップショットの重み（NumPy 推論エンジンに積み重ねて保存）
         
     Raises:
         IOError: ファイル保存エラーの場合
@@ -419,6 +605,16 @@ def save_model_files(model: Sequential, x_scaler: StandardScaler, y_scaler: Stan
     model.save(model_path)
     print(f"Kerasモデル保存: {model_path}")
     
+    # 翌日予測用の NumPy 推論エンジン（重み・活性化関数・標準化パラメータの .npz）を書き出す
+    # （スナップショットアンサンブルは全スナップショットの重みを積み重ねて1ファイルに保存）
+    export_for_model(model, x_scaler, y_scaler, model_path, snapshots)
+    
+    # 日単位モデルの入力構成（翌日予測で1行1日に組み替えるため）
+    if layout is not None:
+        print(f"日単位モデルの入力構成保存: {save_layout(layout, model_path)}")
+    else:
+        remove_layout(model_path)
+    
     # pickle形式でも保存（互換性確保）
     pickle_path = model_path.replace('.h5', '.sav')
     with open(pickle_path, 'wb') as f:
@@ -446,7 +642,7 @@ def evaluate_model_performance(model: Sequential,
     モデルの性能を評価する（目的変数逆正規化対応版）
     
     Args:
-        model: 評価対象のKerasモデル
+        model: 評価対象のKerasモデル（またはスナップショットアンサンブルの NumPy 推論エンジン）
         X_test: テスト用特徴量データ
         y_test: テスト用目的変数データ（正規化済み）
         y_scaler: 目的変数の正規化用スケーラー
@@ -457,6 +653,7 @@ def evaluate_model_performance(model: Sequential,
     Raises:
         ValueError: データ形式エラーの場合
     """
+    from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
     print("モデル性能評価を実行中...")
     
     # データ検証
@@ -464,7 +661,12 @@ def evaluate_model_performance(model: Sequential,
         raise ValueError(f"テストデータのサンプル数が不一致: X={X_test.shape[0]}, y={y_test.shape[0]}")
     
     # テストデータでの評価（正規化空間）
-    loss, mae = model.evaluate(X_test, y_test, verbose=0)
+    if hasattr(model, 'evaluate'):
+        loss, mae = model.evaluate(X_test, y_test, verbose=0)
+    else:
+        # NumPy 推論エンジン（スナップショットアンサンブル）は予測値から計算する
+        error = model.predict(X_test).reshape(y_test.shape) - y_test
+        loss, mae = float(np.mean(error ** 2)), float(np.mean(np.abs(error)))
     print(f'テスト損失: {loss:.3f}, テストMAE: {mae:.3f}')
 
     # 予測値の計算（正規化空間）
@@ -486,6 +688,24 @@ def evaluate_model_performance(model: Sequential,
     return rmse, r2, mae_calc, y_pred_original
 
 
+def report_snapshot_scores(ensemble: Any, X_test: np.ndarray, y_test: np.ndarray, y_scaler: StandardScaler) -> None:
+    """
+    スナップショットごとのテストRMSE（元スケール）を出力する
+    
+    Args:
+        ensemble: 積み重ねた重みの NumPy 推論エンジン
+        X_test: テスト用特徴量データ
+        y_test: テスト用目的変数データ（正規化済み）
+        y_scaler: 目的変数の正規化用スケーラー
+    """
+    y_true = y_scaler.inverse_transform(y_test.reshape(-1, 1)).flatten()
+    scores = []
+    for member in ensemble.members():
+        y_pred = y_scaler.inverse_transform(member.predict(X_test).reshape(-1, 1)).flatten()
+        scores.append(float(np.sqrt(np.mean((y_pred - y_true) ** 2))))
+    print(f"スナップショットごとのテストRMSE: {', '.join(f'{score:.3f}' for score in scores)} kW")
+
+
 def save_predictions_to_csv(y_pred: np.ndarray, output_path: str) -> None:
     """
     予測結果をCSVファイルに保存する
@@ -494,6 +714,7 @@ def save_predictions_to_csv(y_pred: np.ndarray, output_path: str) -> None:
         y_pred: 予測値配列
         output_path: 保存先ファイルパス
     """
+    import pandas as pd
     try:
         ensure_directory_exists(output_path)
         
@@ -521,6 +742,8 @@ def create_prediction_plots(y_pred: np.ndarray,
         full_period_png: 全期間グラフの保存先
         week_period_png: 1週間グラフの保存先
     """
+    import pandas as pd
+    plt = pyplot(PLOT_RC, japanese_fonts=PLOT_FONTS)
     try:
         ensure_directory_exists(full_period_png)
         ensure_directory_exists(week_period_png)
@@ -566,6 +789,185 @@ def create_prediction_plots(y_pred: np.ndarray,
         print(f"グラフ作成・保存でエラー: {e}")
         traceback.print_exc()
 
+@lru_cache(maxsize=None)
+def shard_batch_dataset_class() -> type:
+    """ShardBatchDataset クラス（PyDataset の派生クラスのため、Keras の読み込み時に定義する）"""
+    from keras.utils import PyDataset
+
+    class ShardBatchDataset(PyDataset):
+        """
+        シャードからミニバッチを供給する Keras データセット（アウトオブコア学習用）
+
+        行範囲 [start, stop) のリストをメモリ予算内の行数（チャンク）に区切り、参照中のチャンクのみを
+        標準化してメモリに保持する。シャッフル時はエポックごとにチャンクの順序と
+        チャンク内の行順を入れ替える（時系列順の検証データには使用しない）。
+        """
+
+        def __init__(self,
+                     shards: ShardSet,
+                     ranges: List[Tuple[int, int]],
+                     x_scaler: StandardScaler,
+                     y_scaler: StandardScaler,
+                     batch_size: int,
+                     chunk_rows: int,
+                     shuffle: bool = True):
+            super().__init__()
+            self.shards = shards
+            self.x_scaler = x_scaler
+            self.y_scaler = y_scaler
+            self.batch_size = batch_size
+            self.shuffle = shuffle
+            chunk_rows = max(batch_size, chunk_rows // batch_size * batch_size)
+            self.chunks = [(lo, min(lo + chunk_rows, stop)) for start, stop in ranges
+                           for lo in range(start, stop, chunk_rows)]
+            self.order = [(c, offset) for c, (lo, hi) in enumerate(self.chunks) for offset in range(0, hi - lo, batch_size)]
+            self.rng = np.random.default_rng(config.RANDOM_STATE)
+            self._chunk_id = None
+            self._chunk = None
+            self.on_epoch_end()
+
+        def __len__(self) -> int:
+            return len(self.order)
+
+        def _load_chunk(self, c: int) -> Tuple[np.ndarray, np.ndarray]:
+            lo, hi = self.chunks[c]
+            dtype = config.DTYPE_CONFIG['float_dtype']
+            X = self.x_scaler.transform(self.shards.rows(lo, hi)).astype(dtype)
+            y = self.y_scaler.transform(self.shards.rows(lo, hi, 'y').reshape(-1, 1)).flatten().astype(dtype)
+            if self.shuffle:
+                perm = self.rng.permutation(len(X))
+                X, y = X[perm], y[perm]
+            return X, y
+
+        def __getitem__(self, idx: int) -> Tuple[np.ndarray, np.ndarray]:
+            c, offset = self.order[idx]
+            if self._chunk_id != c:
+                self._chunk_id, self._chunk = c, self._load_chunk(c)
+            X, y = self._chunk
+            return X[offset:offset + self.batch_size], y[offset:offset + self.batch_size]
+
+        def on_epoch_end(self) -> None:
+            if not self.shuffle:
+                return
+            # チャンク単位で順序を入れ替え、同じチャンクのバッチは連続させる（読み込みは1エポック1チャンク1回）
+            # チャンク内の行順は読み込み時に入れ替える
+            self.order = [(int(c), offset) for c in self.rng.permutation(len(self.chunks))
+                          for offset in range(0, self.chunks[c][1] - self.chunks[c][0], self.batch_size)]
+            self._chunk_id = None
+
+    return ShardBatchDataset
+
+
+@robust_model_operation("データ標準化（シャード逐次集計）")
+def fit_scalers_on_shards(shards: ShardSet,
+                          memory_budget_mb: Optional[float] = None) -> Tuple[StandardScaler, StandardScaler]:
+    """
+    シャードをメモリ予算内の行数ずつ読み込み、特徴量・目的変数の標準化パラメータを逐次集計する
+
+    Args:
+        shards: 学習シャード
+        memory_budget_mb: メモリ予算（MB、デフォルト: common/shards.py の config値）
+
+    Returns:
+        Tuple[StandardScaler, StandardScaler]: x_scaler, y_scaler
+    """
+    from sklearn.preprocessing import StandardScaler
+    x_scaler, y_scaler = StandardScaler(), StandardScaler()
+    for X, y in shards.iter_chunks(memory_budget_mb=memory_budget_mb):
+        x_scaler.partial_fit(X)
+        y_scaler.partial_fit(np.asarray(y).reshape(-1, 1))
+    print(f"標準化パラメータ集計完了: {len(shards):,}行")
+    return x_scaler, y_scaler
+
+
+@robust_model_operation("Kerasシャード学習統合処理")
+def train_from_shards(shard_dir: str,
+                      model_sav: str,
+                      ypred_csv: str,
+                      ypred_png: str,
+                      ypred_7d_png: str,
+                      learning_rate: float,
+                      epochs: int,
+                      validation_split: float,
+                      history_png: Optional[str] = None,
+                      memory_budget_mb: Optional[float] = None) -> Tuple[float, float, float]:
+    """
+    シャードデータセット（data/data.py --shards）から学習・評価を行う
+
+    学習シャードのエリアごとの末尾 validation_split の割合を時系列順の検証データとし、
+    ShardBatchDataset でメモリ予算内のチャンクずつ読み込みながら学習する。
+
+    Args:
+        shard_dir: シャードデータセットのディレクトリ
+        model_sav: モデル保存先パス
+        ypred_csv: 予測結果CSV保存先パス
+        ypred_png: 予測結果グラフ（全期間）保存先パス
+        ypred_7d_png: 予測結果グラフ（1週間）保存先パス
+        learning_rate: 学習率
+        epochs: エポック数
+        validation_split: 検証データの割合
+        history_png: 学習履歴グラフ保存先パス
+        memory_budget_mb: メモリ予算（MB、デフォルト: common/shards.py の config値）
+
+    Returns:
+        Tuple[float, float, float]: RMSE, R2スコア, MAE
+    """
+    from tensorflow.python.keras.callbacks import EarlyStopping
+    from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+    train_shards = ShardSet(shard_dir, 'train')
+    test_shards = ShardSet(shard_dir, 'test')
+    print(f"シャードデータセット: 学習={len(train_shards):,}行, テスト={len(test_shards):,}行, "
+          f"特徴量={train_shards.feature_columns}")
+
+    x_scaler, y_scaler = fit_scalers_on_shards(train_shards, memory_budget_mb)
+
+    # 標準化後のコピーを含めてメモリ予算内に収まるチャンク行数
+    chunk_rows = train_shards.budget_rows(memory_budget_mb, copies=2)
+    ShardBatchDataset = shard_batch_dataset_class()
+    batch_size = config.DEFAULT_BATCH_SIZE
+    # 複数エリアでは全体の末尾が最後のエリアのみとなるため、エリアごとの末尾を検証データとする
+    fit_ranges, val_ranges = train_shards.tail_split(validation_split)
+    n_fit = sum(stop - start for start, stop in fit_ranges)
+    n_val = sum(stop - start for start, stop in val_ranges)
+    train_data = ShardBatchDataset(train_shards, fit_ranges, x_scaler, y_scaler, batch_size, chunk_rows)
+    val_data = ShardBatchDataset(train_shards, val_ranges, x_scaler, y_scaler,
+                                 batch_size, chunk_rows, shuffle=False)
+    print(f"学習={n_fit:,}行, 検証={n_val:,}行（{len(train_shards.area_ranges())}エリアの各末尾）, "
+          f"チャンク={chunk_rows:,}行")
+
+    model = create_keras_model(train_shards.n_features, learning_rate)
+    early_stopping = EarlyStopping(
+        monitor='val_loss',
+        min_delta=0.0001,
+        patience=config.DEFAULT_PATIENCE,
+        restore_best_weights=True,
+        verbose=1
+    )
+    history = model.fit(train_data, validation_data=val_data if n_val else None,
+                        epochs=epochs, verbose=1, callbacks=[early_stopping] if n_val else [])
+    print(f"学習完了 (実際のエポック数: {len(history.history['loss'])})")
+
+    if history_png and n_val:
+        save_learning_history_plot(history, history_png)
+    save_model_files(model, x_scaler, y_scaler, model_sav)
+
+    # テストシャードをチャンクずつ予測（元スケール）
+    y_pred_scaled = np.concatenate([
+        model.predict(x_scaler.transform(X).astype(config.DTYPE_CONFIG['float_dtype']), verbose=0).flatten()
+        for X, _ in test_shards.iter_chunks(memory_budget_mb=memory_budget_mb)
+    ])
+    y_pred = y_scaler.inverse_transform(y_pred_scaled.reshape(-1, 1)).flatten()
+    y_test = test_shards.labels()
+    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+    r2 = r2_score(y_test, y_pred)
+    mae = mean_absolute_error(y_test, y_pred)
+    print(f"最終結果 - RMSE: {rmse:.3f} kW, R2スコア: {r2:.4f}, MAE: {mae:.3f} kW")
+
+    save_predictions_to_csv(y_pred, ypred_csv)
+    create_prediction_plots(y_pred, y_test, ypred_png, ypred_7d_png)
+    return rmse, r2, mae
+
+
 def train(xtrain_csv: str,
           xtest_csv: str,
           ytrain_csv: str,
@@ -577,7 +979,12 @@ def train(xtrain_csv: str,
           learning_rate: float = None,
           epochs: int = None,
           validation_split: float = None,
-          history_png: str = None) -> Optional[Tuple[float, float]]:
+          history_png: str = None,
+          target_years: Optional[str] = None,
+          shard_dir: Optional[str] = None,
+          memory_budget_mb: Optional[float] = None,
+          architecture: Optional[str] = None,
+          snapshots: Optional[bool] = None) -> Optional[Tuple[float, float]]:
     """
     Kerasを使用した電力需要予測モデルの学習を実行する（最適化版）
     
@@ -594,6 +1001,11 @@ def train(xtrain_csv: str,
         epochs: エポック数
         validation_split: 検証データの割合
         history_png: 学習履歴グラフ保存先パス
+        target_years: 対象年（指定時はCSVを読まず年別特徴量ブロックから直接取得）
+        shard_dir: シャードデータセットのディレクトリ（指定時はシャードから逐次学習）
+        memory_budget_mb: シャード読み込みのメモリ予算（MB）
+        architecture: モデル構成（'hourly' / 'day_block'、デフォルト: config値）
+        snapshots: スナップショットアンサンブルで学習するか（デフォルト: config値、有効時は epochs を使用しない）
         
     Returns:
         Optional[Tuple[float, float]]: RMSE, R2スコア（エラー時はNone）
@@ -607,16 +1019,45 @@ def train(xtrain_csv: str,
         epochs = config.DEFAULT_EPOCHS
     if validation_split is None:
         validation_split = config.DEFAULT_VALIDATION_SPLIT
+    architecture = architecture or config.ARCHITECTURE
+    if architecture not in ('hourly', 'day_block'):
+        raise ValueError(f"未対応のモデル構成です: {architecture}（'hourly' / 'day_block'）")
+    day_block = architecture == 'day_block'
+    snapshot = config.SNAPSHOT_ENSEMBLE if snapshots is None else snapshots
     
     try:
-        # 1. データの読み込み
-        X_train, X_test, y_train, y_test = load_training_data(
-            xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
-        )
+        if shard_dir and day_block:
+            raise ValueError("日単位モデル（day_block）はシャード学習に未対応です")
+        if shard_dir and snapshot:
+            raise ValueError("スナップショットアンサンブルはシャード学習に未対応です")
+        if shard_dir:
+            return train_from_shards(shard_dir, model_sav, ypred_csv, ypred_png, ypred_7d_png,
+                                     learning_rate, epochs, validation_split, history_png, memory_budget_mb)
+
+        # 1. データの読み込み（日単位モデルは1行1日・24時間分の目的変数）
+        if day_block:
+            X_train, X_test, y_train, y_test = load_day_training_data(
+                target_years, xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
+            )
+        elif target_years:
+            X_train, X_test, y_train, y_test = load_training_views(target_years)
+        else:
+            X_train, X_test, y_train, y_test = load_training_data(
+                xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
+            )
+
+        # 学習行の集約（同一特徴量行を1行にまとめ、行数をサンプル重みとする）
+        sample_weight = None
+        if config.AGGREGATE_ROWS and day_block:
+            print("日単位モデルでは学習行の集約を行いません")
+        elif config.AGGREGATE_ROWS:
+            aggregated = aggregate_rows(X_train, y_train, config.DTYPE_CONFIG['float_dtype'])
+            print(aggregated.summary())
+            X_train, y_train, sample_weight = aggregated.X, aggregated.y, aggregated.weight
 
         # 2. データの標準化（目的変数正規化対応）
         X_train_scaled, X_test_scaled, y_train_scaled, y_test_scaled, x_scaler, y_scaler = prepare_data_with_scaling(
-            X_train, X_test, y_train, y_test
+            X_train, X_test, y_train, y_test, sample_weight
         )
 
         # 追加チェック: 学習/テストの特徴量数が一致するかを厳密に確認
@@ -625,22 +1066,42 @@ def train(xtrain_csv: str,
 
         # 3. モデルの作成
         input_dim = X_train_scaled.shape[1]
-        model = create_keras_model(input_dim, learning_rate)
+        n_outputs = y_train_scaled.shape[1] if day_block else 1
+        model = create_keras_model(input_dim, learning_rate, n_outputs)
 
-        # 4. モデルの学習（正規化済み目的変数使用）
-        history = train_model_with_validation(
-            model, X_train_scaled, y_train_scaled, epochs, validation_split
-        )
+        # 4. モデルの学習（正規化済み目的変数使用、日単位モデルは BATCH_DAYS 日ずつ）
+        batch_size = day_blocks.config.BATCH_DAYS if day_block else None
+        snapshot_weights = None
+        if snapshot:
+            history, snapshot_weights = train_snapshot_ensemble(
+                model, X_train_scaled, y_train_scaled, validation_split,
+                batch_size=batch_size, sample_weight=sample_weight
+            )
+        else:
+            history = train_model_with_validation(
+                model, X_train_scaled, y_train_scaled, epochs, validation_split,
+                batch_size=batch_size, sample_weight=sample_weight
+            )
 
         # 5. 学習履歴の保存
         if history_png:
             save_learning_history_plot(history, history_png)
 
         # 6. モデルの保存（両方のスケーラー保存）
-        save_model_files(model, x_scaler, y_scaler, model_sav)
+        save_model_files(model, x_scaler, y_scaler, model_sav,
+                         layout=DayLayout(feature_columns()) if day_block else None,
+                         snapshots=snapshot_weights)
 
-        # 7. モデルの評価（逆正規化対応）
-        rmse, r2, mae, y_pred = evaluate_model_performance(model, X_test_scaled, y_test_scaled, y_scaler)
+        # 7. モデルの評価（逆正規化対応、スナップショットアンサンブルは保存した NumPy 推論エンジンで評価）
+        evaluated = model
+        if snapshot_weights:
+            ensemble = load_for_model(model_sav)
+            if ensemble is not None:
+                report_snapshot_scores(ensemble, X_test_scaled, y_test_scaled, y_scaler)
+                evaluated = ensemble
+            else:
+                print("NumPy推論エンジンが無いため、最後のスナップショット（Kerasモデル）で評価します")
+        rmse, r2, mae, y_pred = evaluate_model_performance(evaluated, X_test_scaled, y_test_scaled, y_scaler)
 
         # 8. 予測結果の保存（元スケール）
         save_predictions_to_csv(y_pred, ypred_csv)
@@ -669,11 +1130,15 @@ def main() -> None:
     - 年組み合わせ最適化の自動実行
     - 最優秀組み合わせでの学習実行
     """
+    configure_runtime()
     start_time = time.time()
     
     try:
         print("=== Keras学習開始 ===")
         
+        # CPUスレッド割当（環境変数 AI_THREADS で指定）: TensorFlow の intra/inter-op スレッド数に適用
+        configure_threads("Keras学習")
+        
         # 環境変数による年指定の確認
         target_years_env = os.environ.get('AI_TARGET_YEARS', '')
         if target_years_env:
@@ -699,7 +1164,12 @@ def main() -> None:
             learning_rate=config.DEFAULT_LEARNING_RATE,
             epochs=config.DEFAULT_EPOCHS,
             validation_split=config.DEFAULT_VALIDATION_SPLIT,
-            history_png=history_png
+            history_png=history_png,
+            target_years=os.environ.get('AI_TARGET_YEARS'),
+            shard_dir=os.environ.get('AI_SHARD_DIR'),
+            memory_budget_mb=float(os.environ['AI_MEMORY_BUDGET_MB']) if os.environ.get('AI_MEMORY_BUDGET_MB') else None,
+            architecture=os.environ.get('AI_KERAS_ARCHITECTURE'),
+            snapshots=(os.environ['AI_KERAS_SNAPSHOTS'] == '1') if os.environ.get('AI_KERAS_SNAPSHOTS') else None
         )
         
         if result:
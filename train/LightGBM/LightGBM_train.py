@@ -4,69 +4,76 @@
 
 勾配ブースティング決定木を構築し電力需要で学習を行い、
 電力消費予測のための予測モデルを作成するモジュール。
+
+LightGBM・pandas・scikit-learn・matplotlib は使用する関数の中で読み込み、警告抑制などの
+実行環境設定はスクリプト実行時（configure_runtime）のみ適用する（インポート時の副作用なし）。
 """
 
-import pandas as pd
+from __future__ import annotations
+
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
+import json
 import traceback
 import os
 import sys
 import time
+import datetime as dt
 import gc
 from dataclasses import dataclass
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import lightgbm as lgb
-from typing import Tuple, Optional, Any, Callable
+from typing import TYPE_CHECKING, Tuple, Optional, Any, Callable, Dict, List, Union
 import warnings
-from functools import wraps
-
-# パフォーマンス最適化設定（統合版）
-warnings.filterwarnings('ignore', category=UserWarning)
-warnings.filterwarnings('ignore', category=FutureWarning)
-warnings.filterwarnings('ignore', category=pd.errors.SettingWithCopyWarning)
-np.set_printoptions(suppress=True, precision=4)
-
-# matplotlib最適化設定（16:9統一、日本語対応）
-plt.rcParams['figure.figsize'] = (16, 9)
-plt.rcParams['figure.dpi'] = 100
-plt.rcParams['savefig.dpi'] = 300
-plt.rcParams['savefig.bbox'] = 'tight'
-plt.rcParams['savefig.pad_inches'] = 0.1
-# フォント優先リスト：Windows 環境では Meiryo / Yu Gothic を最優先にし、それ以外は DejaVu Sans にフォールバック
-try:
-    from matplotlib import font_manager
-    preferred_fonts = ['Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic', 'TakaoPGothic', 'IPAPGothic', 'DejaVu Sans']
-    available = {f.name for f in font_manager.fontManager.ttflist}
-    chosen = None
-    for fname in preferred_fonts:
-        if fname in available:
-            chosen = fname
-            break
-    if chosen:
-        # font.family はリストで指定してフォールバックを明示
-        plt.rcParams['font.family'] = [chosen, 'DejaVu Sans']
-    else:
-        plt.rcParams['font.family'] = 'DejaVu Sans'
-    # マイナス記号が化ける場合の対策
-    plt.rcParams['axes.unicode_minus'] = False
-except Exception:
-    # フォント周りで何かあれば最悪デフォルトに戻す
-    plt.rcParams['font.family'] = 'DejaVu Sans'
-
-plt.rcParams['font.size'] = 12
-plt.rcParams['axes.titlesize'] = 14
-plt.rcParams['axes.labelsize'] = 12
-plt.rcParams['legend.fontsize'] = 11
-plt.rcParams['xtick.labelsize'] = 10
-plt.rcParams['ytick.labelsize'] = 10
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['lines.linewidth'] = 2.0
-plt.rcParams['axes.linewidth'] = 1.0
-print("=== LightGBM統一最適化設定適用完了 ===")
+from functools import wraps, lru_cache
+
+# 型注釈のみ
+if TYPE_CHECKING:
+    import lightgbm as lgb
+    from sklearn.preprocessing import StandardScaler
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import load_split, load_since, training_watermark, feature_columns
+from common.dataset_io import load_training_arrays
+from common.shards import ShardSet
+from common.row_aggregation import aggregate_rows
+from common.lgb_search import run_search, save_best_params, load_best_params, training_data_hash, tuned_params_mismatch
+from common.thread_budget import configure_threads
+from common.tree_inference import export_for_model
+
+from common.plot_style import pyplot
+
+# matplotlib最適化設定（16:9統一、日本語対応、グラフ作成時に適用）
+PLOT_RC = {
+    'figure.figsize': (16, 9),
+    'figure.dpi': 100,
+    'savefig.dpi': 300,
+    'savefig.bbox': 'tight',
+    'savefig.pad_inches': 0.1,
+    'font.size': 12,
+    'axes.titlesize': 14,
+    'axes.labelsize': 12,
+    'legend.fontsize': 11,
+    'xtick.labelsize': 10,
+    'ytick.labelsize': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'lines.linewidth': 2.0,
+    'axes.linewidth': 1.0,
+}
+PLOT_FONTS = ['Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic', 'TakaoPGothic', 'IPAPGothic']
+
+
+def configure_runtime() -> None:
+    """スクリプト実行時の警告抑制・表示設定（統合版）"""
+    import pandas as pd
+    warnings.filterwarnings('ignore', category=UserWarning)
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    warnings.filterwarnings('ignore', category=pd.errors.SettingWithCopyWarning)
+    np.set_printoptions(suppress=True, precision=4)
+    print("=== LightGBM統一最適化設定適用完了 ===")
 
 
 @dataclass
@@ -77,6 +84,11 @@ class LightGBMConfig:
     TARGET_COLUMNS: list = None
     RANDOM_STATE: int = 42
     
+    # 前処理設定（決定木の分割は単調変換に不変のため、既定では標準化しない）
+    ENABLE_SCALING: bool = False
+    # カテゴリ変数として扱う特徴量（標準化しない場合のみ有効）
+    CATEGORICAL_FEATURES: list = None
+    
     # LightGBMハイパーパラメータ
     DEFAULT_N_ESTIMATORS: int = 100
     DEFAULT_LEARNING_RATE: float = 0.1
@@ -90,6 +102,28 @@ class LightGBMConfig:
     MEMORY_OPTIMIZATION: bool = True
     DATA_TYPE: str = 'float32'
     VERBOSE_LEVEL: int = -1
+    # 使用スレッド数（common/thread_budget.py の割当、None の場合は LightGBM の既定＝全コア）
+    NUM_THREADS: Optional[int] = None
+    # 同一特徴量の学習行を集約し、行数をサンプル重みとして学習する（common/row_aggregation.py）
+    AGGREGATE_ROWS: bool = False
+    # 構築済み lgb.Dataset をバイナリキャッシュから再利用する（common/lgb_dataset_cache.py）
+    DATASET_CACHE: bool = True
+    
+    # 早期終了設定（学習期間の末尾 VALIDATION_WEEKS 週を時系列順の検証データとする）
+    EARLY_STOPPING: bool = False
+    VALIDATION_WEEKS: int = 8
+    MAX_N_ESTIMATORS: int = 5000
+    EARLY_STOPPING_ROUNDS: int = 50
+    
+    # 差分更新設定（保存済みモデルにウォーターマーク以降の行で木を追加する）
+    REFRESH_ROUNDS: int = 20
+    REFRESH_MIN_ROWS: int = 24
+    # 全学習からの経過日数・新規行のRMSE悪化率（全学習時のテストRMSE比）の上限（超過時は全学習）
+    REFRESH_MAX_AGE_DAYS: int = 30
+    REFRESH_MAX_DRIFT: float = 1.5
+    
+    # ハイパーパラメータ探索（common/lgb_search.py）の最良パラメータがあれば学習に適用する
+    USE_TUNED_PARAMS: bool = True
     
     # 可視化設定
     FIGURE_SIZE: Tuple[int, int] = (16, 9)
@@ -101,6 +135,8 @@ class LightGBMConfig:
     def __post_init__(self):
         if self.TARGET_COLUMNS is None:
             self.TARGET_COLUMNS = ["KW"]
+        if self.CATEGORICAL_FEATURES is None:
+            self.CATEGORICAL_FEATURES = ["MONTH", "WEEK", "HOUR"]
 
 
 # 統一設定インスタンス
@@ -175,15 +211,15 @@ def load_training_data(xtrain_csv: str,
     Raises:
         Exception: ファイル読み込みエラー時
     """
+    import pandas as pd
     print("学習データを読み込み中...")
     
     # pandas設定最適化
     pd.set_option('mode.copy_on_write', True)
     
-    X_train = pd.read_csv(xtrain_csv).to_numpy().astype(config.DATA_TYPE)
-    X_test = pd.read_csv(xtest_csv).to_numpy().astype(config.DATA_TYPE)
-    y_train = pd.read_csv(ytrain_csv).values.astype(config.DATA_TYPE).flatten()
-    y_test = pd.read_csv(ytest_csv).values.astype(config.DATA_TYPE).flatten()
+    # バイナリデータセット（data/dataset/）があればメモリマップで読み込み、無ければCSVを読み込む
+    X_train, X_test, y_train, y_test, _ = load_training_arrays(
+        xtrain_csv, xtest_csv, ytrain_csv, ytest_csv, dtype=config.DATA_TYPE)
     
     print(f"学習データ形状: X_train={X_train.shape}, y_train={y_train.shape}")
     print(f"テストデータ形状: X_test={X_test.shape}, y_test={y_test.shape}")
@@ -192,24 +228,60 @@ def load_training_data(xtrain_csv: str,
     return X_train, X_test, y_train, y_test
 
 
+@robust_model_operation("学習データ取得（年別特徴量ブロック）")
+def load_training_views(target_years: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    年指定から学習・テストデータを年別特徴量ブロックのビューとして取得する（CSV読み込みなし）
+
+    時系列分割エンジンにより、最も新しい年をテスト年・それ以前を学習年として分割する。
+
+    Args:
+        target_years: カンマ区切りの年指定（例: "2019,2020,2021"）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: 
+            X_train, X_test, y_train, y_test
+    """
+    print(f"年別特徴量ブロックから学習データを取得中... (対象年: {target_years})")
+    years = [int(y) for y in target_years.split(',') if y.strip()]
+    X_train, X_test, y_train, y_test = (
+        a.astype(config.DATA_TYPE, copy=False) for a in load_split(years)
+    )
+
+    print(f"学習データ形状: X_train={X_train.shape}, y_train={y_train.shape}")
+    print(f"テストデータ形状: X_test={X_test.shape}, y_test={y_test.shape}")
+
+    return X_train, X_test, y_train, y_test
+
+
 @robust_model_operation("データ標準化処理")
 def prepare_data_with_scaling(X_train: np.ndarray, 
-                             X_test: np.ndarray) -> Tuple[np.ndarray, np.ndarray, StandardScaler]:
+                             X_test: np.ndarray,
+                             sample_weight: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, Optional[StandardScaler]]:
     """
     データの標準化を実行する（メモリ最適化済み）
     
+    ENABLE_SCALING が無効（既定）の場合は標準化せず、生の特徴量を float32 で返す。
+    
     Args:
         X_train: 学習用特徴量データ
         X_test: テスト用特徴量データ
+        sample_weight: 学習行のサンプル重み（集約時）
         
     Returns:
-        Tuple[np.ndarray, np.ndarray, StandardScaler]: 
-            標準化後のX_train, X_test, scaler（float32最適化済み）
+        Tuple[np.ndarray, np.ndarray, Optional[StandardScaler]]: 
+            標準化後のX_train, X_test, scaler（float32最適化済み、標準化しない場合 scaler は None）
     """
+    from sklearn.preprocessing import StandardScaler
+    if not config.ENABLE_SCALING:
+        print("データ標準化をスキップします（木モデルのため生の特徴量を使用）")
+        return (X_train.astype(config.DATA_TYPE, copy=False),
+                X_test.astype(config.DATA_TYPE, copy=False), None)
+    
     print("データの標準化を実行中...")
     scaler = StandardScaler()
     
-    X_train_scaled = scaler.fit_transform(X_train).astype(config.DATA_TYPE)
+    X_train_scaled = scaler.fit(X_train, sample_weight=sample_weight).transform(X_train).astype(config.DATA_TYPE)
     X_test_scaled = scaler.transform(X_test).astype(config.DATA_TYPE)
     
     print(f"データの標準化が完了しました（{config.DATA_TYPE}最適化済み）")
@@ -239,6 +311,7 @@ def create_lightgbm_model(n_estimators: int = None,
     Returns:
         lgb.LGBMRegressor: 構築されたLightGBMモデル
     """
+    import lightgbm as lgb
     print("LightGBMモデルを構築中...")
     
     # 設定値の適用（引数優先、次にconfig値）
@@ -251,6 +324,7 @@ def create_lightgbm_model(n_estimators: int = None,
         'subsample': subsample or config.DEFAULT_SUBSAMPLE,
         'colsample_bytree': colsample_bytree or config.DEFAULT_COLSAMPLE_BYTREE,
         'random_state': config.RANDOM_STATE,
+        'n_jobs': config.NUM_THREADS,
         'verbose': config.VERBOSE_LEVEL
     }
     
@@ -263,34 +337,180 @@ def create_lightgbm_model(n_estimators: int = None,
 @robust_model_operation("LightGBMモデル学習")
 def train_lightgbm_model(model: lgb.LGBMRegressor,
                         X_train: np.ndarray,
-                        y_train: np.ndarray) -> lgb.LGBMRegressor:
+                        y_train: np.ndarray,
+                        sample_weight: Optional[np.ndarray] = None,
+                        X_val: Optional[np.ndarray] = None,
+                        y_val: Optional[np.ndarray] = None) -> Union[lgb.LGBMRegressor, lgb.Booster]:
     """
     LightGBMモデルの学習を実行する
     
+    DATASET_CACHE 有効時は、ビン化済みの lgb.Dataset をキャッシュから取得（無ければ構築・保存）し
+    lgb.train で学習する。同じ学習データでの再学習ではビン化が省略される。
+    検証データ指定時は早期終了を行い、予測には最良反復までの木のみを使用する。
+    
     Args:
-        model: 学習対象のLightGBMモデル
+        model: 学習対象のLightGBMモデル（DATASET_CACHE 有効時はハイパーパラメータのみ使用）
         X_train: 学習用特徴量データ
         y_train: 学習用目的変数データ
+        sample_weight: 学習行のサンプル重み（集約時）
+        X_val: 早期終了用の検証特徴量データ（時系列順で学習データより後の期間）
+        y_val: 早期終了用の検証目的変数データ
         
     Returns:
-        lgb.LGBMRegressor: 学習済みモデル
+        Union[lgb.LGBMRegressor, lgb.Booster]: 学習済みモデル（DATASET_CACHE 有効時は Booster）
     """
+    import lightgbm as lgb
+    from common.lgb_dataset_cache import cached_dataset
     print("LightGBMモデルの学習を開始します...")
     
-    model.fit(X_train, y_train)
+    callbacks, eval_history = [], {}
+    if X_val is not None:
+        callbacks += [lgb.early_stopping(config.EARLY_STOPPING_ROUNDS, verbose=False),
+                      lgb.record_evaluation(eval_history)]
+    
+    start_time = time.time()
+    if config.DATASET_CACHE:
+        params, categorical = booster_params(model), categorical_indices() or 'auto'
+        train_set = cached_dataset(X_train, y_train, params, weight=sample_weight, categorical_feature=categorical)
+        valid_sets = ([cached_dataset(X_val, y_val, params, reference=train_set, categorical_feature=categorical)]
+                      if X_val is not None else None)
+        model = lgb.train(params, train_set, num_boost_round=model.n_estimators,
+                          valid_sets=valid_sets, callbacks=callbacks)
+    else:
+        eval_set = [(X_val, y_val)] if X_val is not None else None
+        model.fit(X_train, y_train, sample_weight=sample_weight, eval_set=eval_set, callbacks=callbacks,
+                  categorical_feature=categorical_indices() or 'auto')
+    elapsed = time.time() - start_time
+    
+    if X_val is not None:
+        # 早期終了後の Booster は最良反復までに切り詰められるため、学習反復数は評価履歴から求める
+        rounds = max((len(v) for metrics in eval_history.values() for v in metrics.values()), default=0)
+        best = best_iteration_of(model)
+        # 固定反復数での学習時間は計測ではなく、1反復あたりの平均時間からの推定値（学習反復数が
+        # 固定反復数を超えた場合は短縮なしとして 0 とする）
+        estimate = elapsed / max(rounds, 1) * config.DEFAULT_N_ESTIMATORS
+        saved = max(0.0, estimate - elapsed)
+        print(f"早期終了: 最良反復 {best}回 / 学習 {rounds}回 (上限 {config.MAX_N_ESTIMATORS}回)")
+        print(f"学習時間: {elapsed:.2f}秒 (固定{config.DEFAULT_N_ESTIMATORS}回の推定値 {estimate:.2f}秒, "
+              f"推定短縮 {saved:.2f}秒), 予測使用木数: {best}/{rounds}")
     
     print("LightGBMモデルの学習が完了しました")
     return model
 
 
+def trained_rounds(model: Union[lgb.LGBMRegressor, lgb.Booster]) -> int:
+    """学習済みのブースティング反復数"""
+    import lightgbm as lgb
+    booster = model if isinstance(model, lgb.Booster) else model.booster_
+    return booster.current_iteration()
+
+
+def best_iteration_of(model: Union[lgb.LGBMRegressor, lgb.Booster]) -> int:
+    """早期終了の最良反復数（早期終了なしの場合は学習済み反復数）"""
+    import lightgbm as lgb
+    best = model.best_iteration if isinstance(model, lgb.Booster) else model.best_iteration_
+    return int(best) if best else trained_rounds(model)
+
+
+def split_validation_tail(X_train: np.ndarray,
+                          y_train: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    学習データ末尾の VALIDATION_WEEKS 週（時間単位の行）を早期終了用の検証データとして分割する
+
+    学習データは時系列順に並んでいるため、末尾の行が最も新しい期間となる。
+    検証データは学習データの最大20%までとする。
+
+    Args:
+        X_train: 学習用特徴量データ（時系列順）
+        y_train: 学習用目的変数データ
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: X_fit, X_val, y_fit, y_val
+    """
+    n_val = min(config.VALIDATION_WEEKS * 7 * 24, len(X_train) // 5)
+    if n_val <= 0:
+        raise ValueError(f"検証データを確保できません (学習データ={len(X_train)}行)")
+    n_fit = len(X_train) - n_val
+    print(f"早期終了用検証データ: 学習期間末尾 {n_val:,}行 (学習={n_fit:,}行)")
+    return X_train[:n_fit], X_train[n_fit:], y_train[:n_fit], y_train[n_fit:]
+
+
+@robust_model_operation("モデルメタデータ保存")
+def save_model_metadata(model: Union[lgb.LGBMRegressor, lgb.Booster],
+                        model_path: str,
+                        extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    モデルのメタデータ（反復数・最良反復など）を <モデル名>_meta.json に保存する
+
+    Args:
+        model: 学習済みLightGBMモデル
+        model_path: モデル保存先パス
+        extra: 追加するメタデータ
+
+    Returns:
+        Dict[str, Any]: 保存したメタデータ
+    """
+    metadata = {
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'model_type': type(model).__name__,
+        'n_estimators': trained_rounds(model),
+        'best_iteration_': best_iteration_of(model),
+        'early_stopping': bool(config.EARLY_STOPPING),
+    }
+    metadata.update(extra or {})
+    meta_path = model_path.replace('.sav', '_meta.json')
+    ensure_directory_exists(meta_path)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    print(f"モデルメタデータを {meta_path} に保存しました")
+    return metadata
+
+
+def booster_params(model: lgb.LGBMRegressor) -> Dict[str, Any]:
+    """
+    LGBMRegressor のハイパーパラメータを lgb.train 用のパラメータに変換する
+
+    Args:
+        model: ハイパーパラメータを保持するLightGBMモデル
+
+    カテゴリ変数は params に含めると LightGBM が無視するため、lgb.Dataset の
+    categorical_feature 引数（categorical_indices()）で別途指定する。
+
+    Returns:
+        Dict[str, Any]: lgb.train 用パラメータ（n_estimators は num_boost_round として別途指定）
+    """
+    # sklearn API 専用の引数を除き、LightGBM のパラメータとして渡す
+    params = {k: v for k, v in model.get_params().items()
+              if v is not None and k not in ('n_estimators', 'importance_type', 'class_weight')}
+    params['objective'] = params.get('objective') or 'regression'
+    return params
+
+
+def categorical_indices() -> List[int]:
+    """
+    カテゴリ変数として扱う特徴量（CATEGORICAL_FEATURES）の列番号を取得する
+
+    標準化した特徴量は整数値でなくなるため、ENABLE_SCALING 有効時は空とする。
+
+    Returns:
+        List[int]: 特徴量行列内の列番号
+    """
+    if config.ENABLE_SCALING:
+        return []
+    columns = feature_columns()
+    return [columns.index(name) for name in config.CATEGORICAL_FEATURES if name in columns]
+
+
 @robust_model_operation("モデル・スケーラー保存")
-def save_model_and_scaler(model: lgb.LGBMRegressor, scaler: StandardScaler, model_path: str) -> None:
+def save_model_and_scaler(model: Union[lgb.LGBMRegressor, lgb.Booster],
+                          scaler: Optional[StandardScaler],
+                          model_path: str) -> None:
     """
     モデルとスケーラーを保存する
     
     Args:
         model: 学習済みLightGBMモデル
-        scaler: 標準化オブジェクト
+        scaler: 標準化オブジェクト（標準化しない場合は None）
         model_path: モデル保存先パス
     """
     ensure_directory_exists(model_path)
@@ -300,15 +520,23 @@ def save_model_and_scaler(model: lgb.LGBMRegressor, scaler: StandardScaler, mode
         pickle.dump(model, f)
     print(f"LightGBMモデルを {model_path} に保存しました")
     
-    # スケーラーを保存
+    # 翌日予測用の NumPy 推論エンジン（連結済みノード配列の .npz）を書き出す
+    export_for_model(model, model_path)
+    
+    # スケーラーを保存（標準化しない場合は、翌日予測で誤って適用されないよう古いスケーラーを削除）
     scaler_path = model_path.replace('.sav', '_scaler.pkl')
+    if scaler is None:
+        if os.path.exists(scaler_path):
+            os.remove(scaler_path)
+            print(f"古いスケーラー {scaler_path} を削除しました")
+        return
     with open(scaler_path, 'wb') as f:
         pickle.dump(scaler, f)
     print(f"スケーラーを {scaler_path} に保存しました")
 
 
 @robust_model_operation("モデル性能評価")
-def evaluate_model_performance(model: lgb.LGBMRegressor,
+def evaluate_model_performance(model: Union[lgb.LGBMRegressor, lgb.Booster],
                               X_test: np.ndarray,
                               y_test: np.ndarray) -> Tuple[float, float, float, np.ndarray]:
     """
@@ -322,16 +550,33 @@ def evaluate_model_performance(model: lgb.LGBMRegressor,
     Returns:
         Tuple[float, float, float, np.ndarray]: RMSE, R2スコア, MAE, 予測値
     """
+    from sklearn.metrics import r2_score
     print("=== モデル性能評価開始 ===")
     print("モデル性能評価を実行中...")
     
-    # テストスコア
-    test_score = model.score(X_test, y_test)
-    print(f'テストスコア: {test_score:.4f}')
-
     # 予測値の計算
     y_pred = model.predict(X_test).astype(config.DATA_TYPE)
     
+    # テストスコア（決定係数、LGBMRegressor.score と同じ指標）
+    test_score = r2_score(y_test, y_pred)
+    print(f'テストスコア: {test_score:.4f}')
+    
+    rmse, r2, mae = report_metrics(y_test, y_pred)
+    return rmse, r2, mae, y_pred
+
+
+def report_metrics(y_test: np.ndarray, y_pred: np.ndarray) -> Tuple[float, float, float]:
+    """
+    性能指標を計算して出力する
+
+    Args:
+        y_test: 実際値
+        y_pred: 予測値
+
+    Returns:
+        Tuple[float, float, float]: RMSE, R2スコア, MAE
+    """
+    from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
     # 性能指標の計算
     mse = mean_squared_error(y_test, y_pred)
     rmse = np.sqrt(mse)
@@ -344,7 +589,117 @@ def evaluate_model_performance(model: lgb.LGBMRegressor,
     print(f'MAE: {mae:.3f} kW')
     print("=== モデル性能評価完了 ===")
     
-    return rmse, r2, mae, y_pred
+    return rmse, r2, mae
+
+
+@lru_cache(maxsize=None)
+def shard_sequence_class() -> type:
+    """ShardSequence クラス（lgb.Sequence の派生クラスのため、LightGBM の読み込み時に定義する）"""
+    import lightgbm as lgb
+
+    class ShardSequence(lgb.Sequence):
+        """
+        シャード1つ分の特徴量を（標準化する場合は標準化しながら）LightGBM に渡すシーケンス
+
+        LightGBM は Dataset 構築時（ビン境界のサンプリングとビン化）のみ参照し、
+        batch_size 行ずつ読み込むため、特徴量行列全体はメモリに展開されない。
+        """
+
+        def __init__(self, X: np.ndarray, scaler: Optional[StandardScaler], batch_size: int):
+            self.X = X
+            self.mean = scaler.mean_ if scaler is not None else None
+            self.scale = scaler.scale_ if scaler is not None else None
+            self.batch_size = batch_size
+
+        def __getitem__(self, idx):
+            # 行ごとの参照（サンプリング時）が多いため、scaler.transform ではなく直接標準化する
+            # （LightGBM のサンプリングは float64 を要求する）
+            rows = np.asarray(self.X[idx], dtype=np.float64)
+            return rows if self.mean is None else (rows - self.mean) / self.scale
+
+        def __len__(self) -> int:
+            return len(self.X)
+
+    return ShardSequence
+
+
+@robust_model_operation("データ標準化処理（シャード逐次集計）")
+def fit_scaler_on_shards(shards: ShardSet, memory_budget_mb: Optional[float] = None) -> StandardScaler:
+    """
+    シャードをメモリ予算内の行数ずつ読み込み、標準化パラメータを逐次集計する
+
+    Args:
+        shards: 学習シャード
+        memory_budget_mb: メモリ予算（MB、デフォルト: common/shards.py の config値）
+
+    Returns:
+        StandardScaler: 学習済みスケーラー
+    """
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    for X, _ in shards.iter_chunks(memory_budget_mb=memory_budget_mb):
+        scaler.partial_fit(X)
+    print(f"標準化パラメータ集計完了: {len(shards):,}行")
+    return scaler
+
+
+@robust_model_operation("LightGBMモデル学習（シャード）")
+def train_lightgbm_on_shards(model: lgb.LGBMRegressor,
+                             shards: ShardSet,
+                             scaler: Optional[StandardScaler],
+                             memory_budget_mb: Optional[float] = None) -> lgb.Booster:
+    """
+    シャードから LightGBM Dataset を逐次構築して学習する
+
+    Args:
+        model: ハイパーパラメータを保持するLightGBMモデル（未学習）
+        shards: 学習シャード
+        scaler: 学習済みスケーラー（標準化しない場合は None）
+        memory_budget_mb: メモリ予算（MB、デフォルト: common/shards.py の config値）
+
+    Returns:
+        lgb.Booster: 学習済みモデル（predict は LGBMRegressor と同じく使用可能）
+    """
+    import lightgbm as lgb
+    batch_size = shards.budget_rows(memory_budget_mb)
+    ShardSequence = shard_sequence_class()
+    sequences = [ShardSequence(shards.shard_array(i), scaler, batch_size) for i in range(len(shards.shards))]
+
+    params = booster_params(model)
+
+    print(f"LightGBM Dataset構築中... (シャード数: {len(sequences)}, 読み込み単位: {batch_size:,}行)")
+    train_set = lgb.Dataset(sequences, label=shards.labels(), params=params,
+                            categorical_feature=categorical_indices() or 'auto', free_raw_data=True)
+    booster = lgb.train(params, train_set, num_boost_round=model.n_estimators)
+
+    print("LightGBMモデルの学習が完了しました")
+    return booster
+
+
+@robust_model_operation("モデル性能評価（シャード）")
+def evaluate_model_on_shards(model: Any,
+                             shards: ShardSet,
+                             scaler: Optional[StandardScaler],
+                             memory_budget_mb: Optional[float] = None) -> Tuple[float, float, float, np.ndarray, np.ndarray]:
+    """
+    テストシャードをメモリ予算内の行数ずつ予測して性能を評価する
+
+    Args:
+        model: 学習済みモデル
+        shards: テストシャード
+        scaler: 学習済みスケーラー（標準化しない場合は None）
+        memory_budget_mb: メモリ予算（MB、デフォルト: common/shards.py の config値）
+
+    Returns:
+        Tuple[float, float, float, np.ndarray, np.ndarray]: RMSE, R2スコア, MAE, 予測値, 実際値
+    """
+    y_pred = np.concatenate([
+        model.predict(X if scaler is None else scaler.transform(X)).astype(config.DATA_TYPE)
+        for X, _ in shards.iter_chunks(memory_budget_mb=memory_budget_mb)
+    ])
+    y_test = shards.labels().astype(config.DATA_TYPE)
+    rmse, r2, mae = report_metrics(y_test, y_pred)
+    return rmse, r2, mae, y_pred, y_test
 
 
 @robust_model_operation("予測結果CSV保存")
@@ -356,6 +711,7 @@ def save_predictions_to_csv(y_pred: np.ndarray, output_path: str) -> None:
         y_pred: 予測値配列
         output_path: 保存先ファイルパス
     """
+    import pandas as pd
     ensure_directory_exists(output_path)
     
     y_pred_df = pd.DataFrame(y_pred, columns=config.TARGET_COLUMNS)
@@ -378,6 +734,8 @@ def create_prediction_plots(y_pred: np.ndarray,
         full_period_png: 全期間グラフの保存先
         week_period_png: 1週間グラフの保存先
     """
+    import pandas as pd
+    plt = pyplot(PLOT_RC, japanese_fonts=PLOT_FONTS)
     ensure_directory_exists(full_period_png)
     ensure_directory_exists(week_period_png)
     
@@ -416,6 +774,288 @@ def create_prediction_plots(y_pred: np.ndarray,
     plt.close()
     print(f"1週間グラフを {week_period_png} に保存しました（16:9統一フォーマット）")
 
+def parse_learning_rate(learning_rate: Any) -> float:
+    """
+    学習率指定（文字列または数値）を解釈する（無効な場合はデフォルト値）
+
+    Args:
+        learning_rate: 学習率指定
+
+    Returns:
+        float: 学習率
+    """
+    lr = config.DEFAULT_LEARNING_RATE
+    if learning_rate is not None:
+        try:
+            # 文字列または数値の場合の処理
+            if isinstance(learning_rate, str) and learning_rate.strip():
+                lr = float(learning_rate)
+            elif isinstance(learning_rate, (int, float)):
+                lr = float(learning_rate)
+            print(f"学習率を {lr} に設定しました")
+        except (ValueError, TypeError):
+            print(f"無効な学習率: {learning_rate}、デフォルト値 {config.DEFAULT_LEARNING_RATE} を使用します")
+    return lr
+
+
+@robust_model_operation("LightGBMシャード学習統合処理")
+def train_from_shards(shard_dir: str,
+                      model_sav: str,
+                      ypred_csv: str,
+                      ypred_png: str,
+                      ypred_7d_png: str,
+                      learning_rate: Any = None,
+                      memory_budget_mb: Optional[float] = None) -> Tuple[float, float, float]:
+    """
+    シャードデータセット（data/data.py --shards）から学習・評価を行う
+
+    特徴量行列はメモリ予算内の行数ずつ読み込み、全体をメモリに展開しない。
+
+    Args:
+        shard_dir: シャードデータセットのディレクトリ
+        model_sav: モデル保存先パス
+        ypred_csv: 予測結果CSV保存先パス
+        ypred_png: 予測結果グラフ（全期間）保存先パス
+        ypred_7d_png: 予測結果グラフ（1週間）保存先パス
+        learning_rate: 学習率
+        memory_budget_mb: メモリ予算（MB、デフォルト: common/shards.py の config値）
+
+    Returns:
+        Tuple[float, float, float]: RMSE, R2スコア, MAE
+    """
+    train_shards = ShardSet(shard_dir, 'train')
+    test_shards = ShardSet(shard_dir, 'test')
+    print(f"シャードデータセット: 学習={len(train_shards):,}行, テスト={len(test_shards):,}行, "
+          f"特徴量={train_shards.feature_columns}")
+
+    scaler = fit_scaler_on_shards(train_shards, memory_budget_mb) if config.ENABLE_SCALING else None
+    model = apply_tuned_params(create_lightgbm_model(learning_rate=parse_learning_rate(learning_rate)))
+    booster = train_lightgbm_on_shards(model, train_shards, scaler, memory_budget_mb)
+    save_model_and_scaler(booster, scaler, model_sav)
+
+    rmse, r2, mae, y_pred, y_test = evaluate_model_on_shards(booster, test_shards, scaler, memory_budget_mb)
+    save_predictions_to_csv(y_pred, ypred_csv)
+    create_prediction_plots(y_pred, y_test, ypred_png, ypred_7d_png)
+
+    print("=== LightGBM電力需要予測モデル学習完了（シャード） ===")
+    return rmse, r2, mae
+
+
+def load_model_metadata(model_path: str) -> Optional[Dict[str, Any]]:
+    """
+    <モデル名>_meta.json を読み込む（存在しない場合は None）
+
+    Args:
+        model_path: モデル保存先パス
+
+    Returns:
+        Optional[Dict[str, Any]]: メタデータ
+    """
+    meta_path = model_path.replace('.sav', '_meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def full_retrain_reason(metadata: Optional[Dict[str, Any]],
+                        drift: Optional[float] = None) -> Optional[str]:
+    """
+    差分更新ではなく全学習が必要な理由を返す（差分更新可能な場合は None）
+
+    Args:
+        metadata: 保存済みモデルのメタデータ
+        drift: 新規行の更新前RMSE / 全学習時のテストRMSE
+
+    Returns:
+        Optional[str]: 全学習が必要な理由
+    """
+    if not metadata or metadata.get('watermark') is None or not metadata.get('full_trained_at'):
+        return "ウォーターマークが記録されていません"
+    age = dt.datetime.now() - dt.datetime.fromisoformat(metadata['full_trained_at'])
+    if age > dt.timedelta(days=config.REFRESH_MAX_AGE_DAYS):
+        return f"全学習から{age.days}日経過しています（上限 {config.REFRESH_MAX_AGE_DAYS}日）"
+    if drift is not None and drift > config.REFRESH_MAX_DRIFT:
+        return f"新規データの誤差が全学習時の{drift:.2f}倍に悪化しています（上限 {config.REFRESH_MAX_DRIFT}倍）"
+    return None
+
+
+@robust_model_operation("LightGBM差分更新")
+def refresh(xtrain_csv: str,
+            xtest_csv: str,
+            ytrain_csv: str,
+            ytest_csv: str,
+            model_sav: str,
+            ypred_csv: str,
+            ypred_png: str,
+            ypred_7d_png: str,
+            learning_rate: Optional[str] = None,
+            target_years: Optional[str] = None) -> Optional[Tuple[float, float, float]]:
+    """
+    保存済みモデルをウォーターマーク以降の新規行で差分更新する
+
+    保存済みの Booster を init_model として REFRESH_ROUNDS 回のブースティングを追加し、
+    メタデータのウォーターマークを新規行の最終時刻に進める。スケーラーは全学習時に標準化した場合のみ使用する。
+    ウォーターマーク未記録・全学習からの経過日数超過・新規行の誤差悪化（ドリフト）の場合は
+    train() による全学習に切り替える（年指定は引数、無ければ全学習時の記録を使用）。
+
+    Args:
+        xtrain_csv 〜 ypred_7d_png: train() と同じ（全学習に切り替える場合に使用）
+        learning_rate: 学習率（全学習に切り替える場合に使用）
+        target_years: 対象年（全学習に切り替える場合に使用）
+
+    Returns:
+        Optional[Tuple[float, float, float]]: 新規行に対する更新前の RMSE, R2スコア, MAE
+            （全学習に切り替えた場合は train() の結果、新規行が不足する場合は None）
+    """
+    import lightgbm as lgb
+    print("=== LightGBM差分更新開始 ===")
+    metadata = load_model_metadata(model_sav)
+
+    def full_retrain(reason: str) -> Optional[Tuple[float, float, float]]:
+        print(f"全学習に切り替えます: {reason}")
+        years = target_years or (metadata or {}).get('target_years')
+        return train(xtrain_csv, xtest_csv, ytrain_csv, ytest_csv, model_sav,
+                     ypred_csv, ypred_png, ypred_7d_png, learning_rate=learning_rate, target_years=years)
+
+    reason = full_retrain_reason(metadata) if os.path.exists(model_sav) else "保存済みモデルがありません"
+    if reason:
+        return full_retrain(reason)
+
+    # 1. ウォーターマーク以降の新規行を取得
+    keys, X_new, y_new = load_since(metadata['watermark'])
+    print(f"新規行: {len(keys):,}行 (ウォーターマーク以降)")
+    if len(keys) < config.REFRESH_MIN_ROWS:
+        print(f"新規行が {config.REFRESH_MIN_ROWS}行未満のため更新しません")
+        return None
+    if X_new.shape[1] != metadata.get('feature_count', X_new.shape[1]):
+        return full_retrain(f"特徴量数が変わっています ({metadata['feature_count']} → {X_new.shape[1]})")
+
+    # 2. 保存済みモデル・スケーラーの読み込みと新規行の標準化
+    with open(model_sav, 'rb') as f:
+        model = pickle.load(f)
+    scaler = None
+    scaler_path = model_sav.replace('.sav', '_scaler.pkl')
+    if os.path.exists(scaler_path):
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+    booster = model if isinstance(model, lgb.Booster) else model.booster_
+    X_new = (X_new if scaler is None else scaler.transform(X_new)).astype(config.DATA_TYPE)
+    y_new = np.asarray(y_new, dtype=config.DATA_TYPE)
+
+    # 3. 更新前の新規行に対する誤差でドリフトを判定
+    rmse, r2, mae = report_metrics(y_new, booster.predict(X_new))
+    drift = rmse / metadata['reference_rmse'] if metadata.get('reference_rmse') else None
+    reason = full_retrain_reason(metadata, drift)
+    if reason:
+        return full_retrain(reason)
+
+    # 4. 保存済み Booster を初期モデルとしてブースティングを追加
+    start_time = time.time()
+    # カテゴリ変数は params ではなく Dataset に指定する（以前のモデルの params に残る指定は除く）
+    params = {k: v for k, v in booster.params.items()
+              if k not in ('num_iterations', 'early_stopping_round', 'early_stopping_rounds', 'categorical_feature')}
+    if config.NUM_THREADS:
+        params['n_jobs'] = config.NUM_THREADS
+    base_rounds = booster.current_iteration()
+    new_set = lgb.Dataset(X_new, label=y_new, params={'verbose': -1},
+                          categorical_feature=categorical_indices() or 'auto')
+    booster = lgb.train(params, new_set,
+                        num_boost_round=config.REFRESH_ROUNDS,
+                        init_model=booster, keep_training_booster=True)
+    print(f"差分学習: {base_rounds}回 → {booster.current_iteration()}回 "
+          f"({len(keys):,}行, {time.time() - start_time:.2f}秒)")
+
+    # 5. モデル・メタデータの保存（ウォーターマークを進める）
+    save_model_and_scaler(booster, scaler, model_sav)
+    extra = {k: v for k, v in metadata.items() if k not in ('trained_at', 'model_type', 'n_estimators', 'best_iteration_')}
+    extra.update({
+        'watermark': int(keys[-1]),
+        'refresh_count': int(metadata.get('refresh_count', 0)) + 1,
+        'refresh_rows': len(keys),
+        'refresh_drift': drift,
+    })
+    save_model_metadata(booster, model_sav, extra)
+
+    print("=== LightGBM差分更新完了 ===")
+    return rmse, r2, mae
+
+
+def apply_tuned_params(model: lgb.LGBMRegressor,
+                       params_file: Optional[str] = None,
+                       training_hash: Optional[str] = None,
+                       target_years: Optional[str] = None) -> lgb.LGBMRegressor:
+    """
+    ハイパーパラメータ探索で保存した最良パラメータをモデルに適用する
+
+    探索時の対象年・学習データ（内容ハッシュ）が現在の学習と一致する場合のみ適用し、
+    一致しない場合（データ更新・対象年変更後の古い探索結果）は既定のパラメータで学習する。
+    早期終了時はブースティング回数の上限（MAX_N_ESTIMATORS）を維持し、
+    それ以外は探索で評価した回数を n_estimators とする。
+
+    Args:
+        model: 未学習のLightGBMモデル
+        params_file: 最良パラメータのJSON（デフォルト: common/lgb_search.py の config値）
+        training_hash: 現在の学習データの training_data_hash（照合できない場合は None）
+        target_years: 現在の対象年
+
+    Returns:
+        lgb.LGBMRegressor: パラメータ適用後のモデル
+    """
+    tuned = load_best_params(params_file) if config.USE_TUNED_PARAMS else None
+    if tuned is None:
+        return model
+    reason = tuned_params_mismatch(tuned, training_hash, target_years)
+    if reason:
+        print(f"探索済みパラメータを使用しません（既定のパラメータで学習）: {reason}")
+        return model
+    model.set_params(**tuned['params'])
+    if not config.EARLY_STOPPING:
+        model.set_params(n_estimators=tuned['num_boost_round'])
+    print(f"探索済みパラメータを適用しました (検証RMSE {tuned['rmse']:.3f}, {tuned['created']}): "
+          f"{tuned['params']}, n_estimators={model.n_estimators}")
+    return model
+
+
+@robust_model_operation("LightGBMハイパーパラメータ探索")
+def search(xtrain_csv: str,
+           xtest_csv: str,
+           ytrain_csv: str,
+           ytest_csv: str,
+           target_years: Optional[str] = None,
+           params_file: Optional[str] = None,
+           n_trials: Optional[int] = None,
+           n_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    学習期間末尾の検証データで LightGBM のハイパーパラメータを探索し、最良設定を保存する
+
+    テストデータは探索に使用しない。評価済みの試行は common/lgb_search.py のキャッシュから再開する。
+
+    Args:
+        xtrain_csv 〜 ytest_csv: train() と同じ
+        target_years: 対象年（指定時は年別特徴量ブロックから取得）
+        params_file: 最良パラメータの保存先（デフォルト: common/lgb_search.py の config値）
+        n_trials: 試行数
+        n_workers: 並列ワーカー数
+
+    Returns:
+        Dict[str, Any]: 保存した最良パラメータ
+    """
+    print("=== LightGBMハイパーパラメータ探索開始 ===")
+    if target_years:
+        X_train, X_test, y_train, y_test = load_training_views(target_years)
+    else:
+        X_train, X_test, y_train, y_test = load_training_data(xtrain_csv, xtest_csv, ytrain_csv, ytest_csv)
+    
+    X_fit, X_val, y_fit, y_val = split_validation_tail(X_train, y_train)
+    X_fit, X_val, scaler = prepare_data_with_scaling(X_fit, X_val)
+    
+    base_params = booster_params(create_lightgbm_model())
+    result = run_search(X_fit, y_fit, X_val, y_val, base_params, n_trials=n_trials, n_workers=n_workers,
+                        thread_budget=config.NUM_THREADS, categorical_feature=categorical_indices() or 'auto')
+    return save_best_params(result, params_file, training_data_hash(X_train, y_train), target_years)
+
+
 @robust_model_operation("LightGBM学習統合処理")
 def train(xtrain_csv: str,
           xtest_csv: str,
@@ -428,7 +1068,11 @@ def train(xtrain_csv: str,
           learning_rate: Optional[str] = None,
           epochs: Optional[str] = None,
           validation_split: Optional[str] = None,
-          history_png: Optional[str] = None) -> Optional[Tuple[float, float, float]]:
+          history_png: Optional[str] = None,
+          target_years: Optional[str] = None,
+          shard_dir: Optional[str] = None,
+          memory_budget_mb: Optional[float] = None,
+          params_file: Optional[str] = None) -> Optional[Tuple[float, float, float]]:
     """
     LightGBMを使用した電力需要予測モデルの学習を実行する（統一パターン対応）
     
@@ -445,37 +1089,59 @@ def train(xtrain_csv: str,
         epochs: エポック数（使用されない、互換性のため）
         validation_split: 検証データ割合（使用されない、互換性のため）
         history_png: 学習履歴グラフ（使用されない、互換性のため）
+        target_years: 対象年（指定時はCSVを読まず年別特徴量ブロックから直接取得）
+        shard_dir: シャードデータセットのディレクトリ（指定時はシャードから逐次学習）
+        memory_budget_mb: シャード読み込みのメモリ予算（MB）
+        params_file: ハイパーパラメータ探索の最良パラメータJSON（デフォルト: common/lgb_search.py の config値）
         
     Returns:
         Optional[Tuple[float, float, float]]: RMSE, R2スコア, MAE（エラー時はNone）
     """
     print("=== LightGBM電力需要予測モデル学習開始 ===")
     
+    if shard_dir:
+        return train_from_shards(shard_dir, model_sav, ypred_csv, ypred_png, ypred_7d_png,
+                                 learning_rate, memory_budget_mb)
+
     # 1. データの読み込み
-    X_train, X_test, y_train, y_test = load_training_data(
-        xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
-    )
+    if target_years:
+        X_train, X_test, y_train, y_test = load_training_views(target_years)
+    else:
+        X_train, X_test, y_train, y_test = load_training_data(
+            xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
+        )
+    
+    # 探索済みパラメータの照合用（検証データ分割・集約・標準化の前の学習データ）
+    training_hash = training_data_hash(X_train, y_train) if config.USE_TUNED_PARAMS else None
+    
+    # 早期終了用の検証データ（学習期間の末尾、集約より前に時系列順で分割）
+    X_val = y_val = None
+    if config.EARLY_STOPPING:
+        X_train, X_val, y_train, y_val = split_validation_tail(X_train, y_train)
+    
+    # 学習行の集約（同一特徴量行を1行にまとめ、行数をサンプル重みとする）
+    sample_weight = None
+    if config.AGGREGATE_ROWS:
+        aggregated = aggregate_rows(X_train, y_train, config.DATA_TYPE)
+        print(aggregated.summary())
+        X_train, y_train, sample_weight = aggregated.X, aggregated.y, aggregated.weight
     
     # 2. データの標準化
-    X_train_scaled, X_test_scaled, scaler = prepare_data_with_scaling(X_train, X_test)
+    X_train_scaled, X_test_scaled, scaler = prepare_data_with_scaling(X_train, X_test, sample_weight)
+    if X_val is not None:
+        X_val = (X_val if scaler is None else scaler.transform(X_val)).astype(config.DATA_TYPE)
     
     # 3. モデルの作成（学習率の設定）
-    lr = config.DEFAULT_LEARNING_RATE
-    if learning_rate is not None:
-        try:
-            # 文字列または数値の場合の処理
-            if isinstance(learning_rate, str) and learning_rate.strip():
-                lr = float(learning_rate)
-            elif isinstance(learning_rate, (int, float)):
-                lr = float(learning_rate)
-            print(f"学習率を {lr} に設定しました")
-        except (ValueError, TypeError):
-            print(f"無効な学習率: {learning_rate}、デフォルト値 {config.DEFAULT_LEARNING_RATE} を使用します")
-    
-    model = create_lightgbm_model(learning_rate=lr)
+    # （早期終了時は反復数の上限を MAX_N_ESTIMATORS とし、最良反復を自動で決定する）
+    model = create_lightgbm_model(
+        n_estimators=config.MAX_N_ESTIMATORS if config.EARLY_STOPPING else None,
+        learning_rate=parse_learning_rate(learning_rate)
+    )
+    # 探索済みの最良パラメータがあれば適用（学習率・木の数などを上書き）
+    model = apply_tuned_params(model, params_file, training_hash, target_years)
     
     # 4. モデルの学習
-    trained_model = train_lightgbm_model(model, X_train_scaled, y_train)
+    trained_model = train_lightgbm_model(model, X_train_scaled, y_train, sample_weight, X_val, y_val)
     
     # 5. モデルとスケーラーの保存
     save_model_and_scaler(trained_model, scaler, model_sav)
@@ -483,6 +1149,23 @@ def train(xtrain_csv: str,
     # 6. モデルの評価
     rmse, r2, mae, y_pred = evaluate_model_performance(trained_model, X_test_scaled, y_test)
     
+    # 差分更新用のウォーターマーク（モデルが学習した最終行の時刻、年指定時のみ）と評価結果をメタデータに記録
+    # （早期終了時は学習データ末尾の検証データを学習していないため、差分更新で検証データの行から学習する）
+    years = [int(y) for y in target_years.split(',') if y.strip()] if target_years else []
+    n_val = 0 if X_val is None else len(X_val)
+    save_model_metadata(trained_model, model_sav, {
+        'validation_rows': n_val,
+        'train_rows': len(X_train_scaled),
+        'feature_count': int(X_train_scaled.shape[1]),
+        'scaled': scaler is not None,
+        'categorical_features': [feature_columns()[i] for i in categorical_indices()],
+        'target_years': target_years or None,
+        'watermark': training_watermark(years, holdout_rows=n_val) if years else None,
+        'full_trained_at': dt.datetime.now().isoformat(timespec='seconds'),
+        'reference_rmse': float(rmse),
+        'refresh_count': 0,
+    })
+    
     # 7. 予測結果の保存
     save_predictions_to_csv(y_pred, ypred_csv)
     
@@ -508,9 +1191,13 @@ def main() -> None:
     """
     start_time = time.time()
     
+    configure_runtime()
     try:
         print("=== LightGBM学習開始 ===")
         
+        # CPUスレッド割当（環境変数 AI_THREADS で指定、未指定時は実行中ジョブ間で等分）
+        config.NUM_THREADS = configure_threads("LightGBM学習")
+        
         # ファイルパス設定
         xtrain_csv = r"data/Xtrain.csv"
         xtest_csv = r"data/Xtest.csv"
@@ -527,15 +1214,35 @@ def main() -> None:
         validation_split = ''
         history_png = r'train/LightGBM/LightGBM_history.png'
 
-        # 学習実行
-        result = train(
-            xtrain_csv, xtest_csv, ytrain_csv, ytest_csv,
-            model_sav, ypred_csv, ypred_png, ypred_7d_png,
-            learning_rate=learning_rate_param,
-            epochs=epochs,
-            validation_split=validation_split,
-            history_png=history_png
-        )
+        # ハイパーパラメータ探索（AI_LGB_SEARCH=1 の場合、探索後に最良パラメータで学習する）
+        if os.environ.get('AI_LGB_SEARCH') == '1':
+            search(
+                xtrain_csv, xtest_csv, ytrain_csv, ytest_csv,
+                target_years=os.environ.get('AI_TARGET_YEARS'),
+                n_trials=int(os.environ['AI_LGB_SEARCH_TRIALS']) if os.environ.get('AI_LGB_SEARCH_TRIALS') else None
+            )
+        
+        # 差分更新（AI_REFRESH=1 の場合、ウォーターマーク以降の新規行で保存済みモデルを更新）
+        if os.environ.get('AI_REFRESH') == '1':
+            result = refresh(
+                xtrain_csv, xtest_csv, ytrain_csv, ytest_csv,
+                model_sav, ypred_csv, ypred_png, ypred_7d_png,
+                learning_rate=learning_rate_param,
+                target_years=os.environ.get('AI_TARGET_YEARS')
+            )
+        else:
+            # 学習実行
+            result = train(
+                xtrain_csv, xtest_csv, ytrain_csv, ytest_csv,
+                model_sav, ypred_csv, ypred_png, ypred_7d_png,
+                learning_rate=learning_rate_param,
+                epochs=epochs,
+                validation_split=validation_split,
+                history_png=history_png,
+                target_years=os.environ.get('AI_TARGET_YEARS'),
+                shard_dir=os.environ.get('AI_SHARD_DIR'),
+                memory_budget_mb=float(os.environ['AI_MEMORY_BUDGET_MB']) if os.environ.get('AI_MEMORY_BUDGET_MB') else None
+            )
         
         if result:
             rmse, r2, mae = result
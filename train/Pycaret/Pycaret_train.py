@@ -4,11 +4,14 @@
 
 自動機械学習ライブラリを使用し電力需要で学習を行い、
 電力消費予測のための予測モデルを作成するモジュール。
+
+PyCaret・pandas・scikit-learn・matplotlib は使用する関数の中で読み込み、警告抑制などの実行環境設定は
+スクリプト実行時（configure_runtime）のみ適用する（インポート時の副作用なし）。
 """
 
+from __future__ import annotations
+
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import traceback
 import os
 import sys
@@ -19,45 +22,39 @@ from typing import Tuple, Optional, Any, Dict, List, Callable
 from pathlib import Path
 import warnings
 
-# PyCaret regression モジュール
-from pycaret.regression import *
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-
-# パフォーマンス最適化設定（統合版）
-warnings.filterwarnings('ignore', category=UserWarning)
-warnings.filterwarnings('ignore', category=FutureWarning)
-warnings.filterwarnings('ignore', category=DeprecationWarning)
-np.set_printoptions(suppress=True, precision=4)
-
-# matplotlib最適化設定（16:9アスペクト比統一）
-plt.rcParams['figure.dpi'] = 100
-plt.rcParams['savefig.dpi'] = 100
-plt.rcParams['savefig.bbox'] = 'tight'
-plt.rcParams['savefig.pad_inches'] = 0.1
-try:
-    from matplotlib import font_manager
-    preferred_fonts = ['Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic', 'DejaVu Sans']
-    available = {f.name for f in font_manager.fontManager.ttflist}
-    chosen = None
-    for fname in preferred_fonts:
-        if fname in available:
-            chosen = fname
-            break
-    if chosen:
-        plt.rcParams['font.family'] = [chosen, 'DejaVu Sans']
-    else:
-        plt.rcParams['font.family'] = 'DejaVu Sans'
-    plt.rcParams['axes.unicode_minus'] = False
-except Exception:
-    plt.rcParams['font.family'] = 'DejaVu Sans'
-
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['lines.linewidth'] = 1.5
-plt.rcParams['axes.linewidth'] = 0.8
-plt.rcParams['figure.max_open_warning'] = 10
-print("PyCaret: パフォーマンス最適化設定を適用しました")
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import load_split, feature_columns
+from common.dataset_io import load_training_arrays
+from common.thread_budget import configure_threads
+from common.plot_style import pyplot
+
+# matplotlib最適化設定（16:9アスペクト比統一、グラフ作成時に適用）
+PLOT_RC = {
+    'figure.dpi': 100,
+    'savefig.dpi': 100,
+    'savefig.bbox': 'tight',
+    'savefig.pad_inches': 0.1,
+    'font.size': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'lines.linewidth': 1.5,
+    'axes.linewidth': 0.8,
+    'figure.max_open_warning': 10,
+}
+PLOT_FONTS = ['Meiryo', 'Yu Gothic', 'Noto Sans CJK JP', 'IPAexGothic']
+
+
+def configure_runtime() -> None:
+    """スクリプト実行時の警告抑制・表示設定（統合版）"""
+    warnings.filterwarnings('ignore', category=UserWarning)
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    np.set_printoptions(suppress=True, precision=4)
+    print("PyCaret: パフォーマンス最適化設定を適用しました")
 
 
 @dataclass
@@ -71,7 +68,7 @@ class PyCaretConfig:
     - 自動ML: PyCaret最適化パラメータ
     """
     # データ設定
-    feature_columns: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "HOUR", "TEMP"])
+    feature_columns: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "HOUR", "TEMP", "CALENDAR"])
     target_columns: List[str] = field(default_factory=lambda: ["KW"])
     target_column_name: str = "KW"
     prediction_column_name: str = 'prediction_label'
@@ -82,6 +79,7 @@ class PyCaretConfig:
     cv_folds: int = 10
     session_id: int = 123
     silent_mode: bool = True
+    n_jobs: int = -1  # common/thread_budget.py の割当で上書き
     
     # 可視化設定（16:9アスペクト比統一）
     figure_size: Tuple[int, int] = (16, 9)
@@ -99,6 +97,7 @@ class PyCaretConfig:
         """PyCaretセットアップパラメータを取得"""
         base_params = {
             'session_id': self.session_id,
+            'n_jobs': self.n_jobs,
         }
         
         # バージョン互換性のための段階的パラメータ
@@ -180,23 +179,15 @@ def load_training_data(config: PyCaretConfig,
     dtype = config.data_dtype
     
     print("学習データを読み込み中...")
-    # CSVのヘッダを保持して読み込み、実際の特徴量列名を config に反映する
-    X_train_df = pd.read_csv(xtrain_csv)
-    X_test_df = pd.read_csv(xtest_csv)
+    # バイナリデータセット（data/dataset/）があればメモリマップで読み込み、無ければCSVを読み込む
+    # （列名はデータセットのヘッダまたはCSVのヘッダから取得する）
+    X_train, X_test, y_train, y_test, cols = load_training_arrays(
+        xtrain_csv, xtest_csv, ytrain_csv, ytest_csv, dtype=dtype)
 
     # 読み込んだ実際の列名を config.feature_columns に設定（後続処理で使用されるため）
-    try:
-        cols = list(X_train_df.columns)
-        if cols:
-            config.feature_columns = cols
-            print(f"設定: 読み込んだ特徴量列を config.feature_columns に反映しました ({len(cols)} 列)")
-    except Exception as e:
-        print(f"特徴量列の反映に失敗しました: {e}")
-
-    X_train = X_train_df.to_numpy().astype(dtype)
-    X_test = X_test_df.to_numpy().astype(dtype)
-    y_train = pd.read_csv(ytrain_csv).values.astype(dtype).flatten()
-    y_test = pd.read_csv(ytest_csv).values.astype(dtype).flatten()
+    if cols:
+        config.feature_columns = cols
+        print(f"設定: 読み込んだ特徴量列を config.feature_columns に反映しました ({len(cols)} 列)")
     
     print(f"学習データ形状: X_train={X_train.shape}, y_train={y_train.shape}")
     print(f"テストデータ形状: X_test={X_test.shape}, y_test={y_test.shape}")
@@ -208,6 +199,35 @@ def load_training_data(config: PyCaretConfig,
     return X_train, X_test, y_train, y_test
 
 
+@robust_model_operation("学習データ取得（年別特徴量ブロック）")
+def load_training_views(config: PyCaretConfig,
+                        target_years: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    年指定から学習・テストデータを年別特徴量ブロックのビューとして取得する（CSV読み込みなし）
+
+    時系列分割エンジンにより、最も新しい年をテスト年・それ以前を学習年として分割する。
+
+    Args:
+        config: PyCaret設定オブジェクト
+        target_years: カンマ区切りの年指定（例: "2019,2020,2021"）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: 
+            X_train, X_test, y_train, y_test
+    """
+    print(f"年別特徴量ブロックから学習データを取得中... (対象年: {target_years})")
+    years = [int(y) for y in target_years.split(',') if y.strip()]
+    X_train, X_test, y_train, y_test = (
+        a.astype(config.data_dtype, copy=False) for a in load_split(years)
+    )
+    config.feature_columns = feature_columns()
+
+    print(f"学習データ形状: X_train={X_train.shape}, y_train={y_train.shape}")
+    print(f"テストデータ形状: X_test={X_test.shape}, y_test={y_test.shape}")
+
+    return X_train, X_test, y_train, y_test
+
+
 @robust_model_operation("PyCaret実験環境セットアップ")
 def setup_pycaret_experiment(config: PyCaretConfig, 
                             X_train: np.ndarray, 
@@ -223,6 +243,8 @@ def setup_pycaret_experiment(config: PyCaretConfig,
     Returns:
         Any: PyCaretの実験オブジェクト
     """
+    import pandas as pd
+    from pycaret.regression import setup
     # データフレームの作成
     train_data = pd.concat([
         pd.DataFrame(X_train, columns=config.feature_columns),
@@ -269,6 +291,7 @@ def create_pycaret_model(config: PyCaretConfig) -> Any:
     Returns:
         Any: 学習済みPyCaretモデル
     """
+    from pycaret.regression import create_model
     print(f"PyCaretモデル（{config.model_type}）を作成・学習中...")
     
     model = create_model(config.model_type, fold=config.cv_folds)
@@ -289,6 +312,7 @@ def save_pycaret_model(config: PyCaretConfig, model: Any, model_path: str) -> No
         model: 学習済みPyCaretモデル
         model_path: モデル保存先パス
     """
+    from pycaret.regression import save_model
     ensure_directory_exists(model_path + '.pkl')  # PyCaretは拡張子を自動付加
     
     save_model(model, model_name=model_path)
@@ -310,6 +334,8 @@ def predict_with_pycaret_model(config: PyCaretConfig,
     Returns:
         np.ndarray: 予測値配列
     """
+    import pandas as pd
+    from pycaret.regression import predict_model
     # テストデータをDataFrameに変換
     test_df = pd.DataFrame(X_test, columns=config.feature_columns)
     
@@ -345,6 +371,7 @@ def evaluate_model_performance(config: PyCaretConfig,
     Returns:
         Tuple[float, float]: RMSE, R2スコア
     """
+    from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
     # PyCaretモデルのスコア（参考値）
     try:
         test_score = model.score(X_test, y_test)
@@ -376,6 +403,7 @@ def save_predictions_to_csv(config: PyCaretConfig,
         y_pred: 予測値配列
         output_path: 保存先ファイルパス
     """
+    import pandas as pd
     ensure_directory_exists(output_path)
     
     y_pred_df = pd.DataFrame(y_pred, columns=config.target_columns)
@@ -400,6 +428,8 @@ def create_prediction_plots(config: PyCaretConfig,
         full_period_png: 全期間グラフの保存先
         week_period_png: 1週間グラフの保存先
     """
+    import pandas as pd
+    plt = pyplot(PLOT_RC, japanese_fonts=PLOT_FONTS)
     ensure_directory_exists(full_period_png)
     ensure_directory_exists(week_period_png)
     
@@ -455,7 +485,9 @@ def train(xtrain_csv: str,
           learning_rate: Optional[str] = None,
           epochs: Optional[str] = None,
           validation_split: Optional[str] = None,
-          history_png: Optional[str] = None) -> Optional[Tuple[float, float]]:
+          history_png: Optional[str] = None,
+          target_years: Optional[str] = None,
+          threads: Optional[int] = None) -> Optional[Tuple[float, float]]:
     """
     PyCaretを使用した電力需要予測モデルの学習を実行する（統一仕様版）
     
@@ -472,17 +504,22 @@ def train(xtrain_csv: str,
         epochs: エポック数（使用されない、互換性のため）
         validation_split: 検証データ割合（使用されない、互換性のため）
         history_png: 学習履歴グラフ（使用されない、互換性のため）
+        target_years: 対象年（指定時はCSVを読まず年別特徴量ブロックから直接取得）
+        threads: 使用スレッド数（n_jobs、common/thread_budget.py の割当。未指定時は設定値）
         
     Returns:
         Optional[Tuple[float, float]]: RMSE, R2スコア（エラー時はNone）
     """
-    # 設定オブジェクト初期化
-    config = PyCaretConfig()
+    # 設定オブジェクト初期化（スレッド数指定時は n_jobs を割当に合わせる）
+    config = PyCaretConfig(n_jobs=threads) if threads else PyCaretConfig()
     
     # 1. データの読み込み
-    X_train, X_test, y_train, y_test = load_training_data(
-        config, xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
-    )
+    if target_years:
+        X_train, X_test, y_train, y_test = load_training_views(config, target_years)
+    else:
+        X_train, X_test, y_train, y_test = load_training_data(
+            config, xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
+        )
     
     # 2. PyCaret実験環境のセットアップ
     exp = setup_pycaret_experiment(config, X_train, y_train)
@@ -515,6 +552,7 @@ def main() -> None:
     PyCaretConfigを使用した設定管理で、
     電力需要予測モデルの学習プロセスを実行
     """
+    configure_runtime()
     print("="*60)
     print("PyCaret電力需要予測AIモデル学習システム")
     print("統一リファクタリング仕様 - PyCaretConfig対応版")
@@ -537,11 +575,16 @@ def main() -> None:
     history_png = r'train/Pycaret/Pycaret_history.png'
 
     try:
+        # CPUスレッド割当（環境変数 AI_THREADS で指定、未指定時は実行中ジョブ間で等分）
+        threads = configure_threads("PyCaret学習")
+        
         # 学習実行
         result = train(
             xtrain_csv, xtest_csv, ytrain_csv, ytest_csv, model_sav,
             ypred_csv, ypred_png, ypred_7d_png,
-            learning_rate, epochs, validation_split, history_png
+            learning_rate, epochs, validation_split, history_png,
+            target_years=os.environ.get('AI_TARGET_YEARS'),
+            threads=threads
         )
         
         if result:
@@ -4,45 +4,72 @@
 
 ランダムフォレスト回帰を構築し電力需要で学習を行い、
 電力消費予測のための予測モデルを作成するモジュール。
+
+pandas・scikit-learn・matplotlib は使用する関数の中で読み込み、警告抑制などの実行環境設定は
+スクリプト実行時（configure_runtime）のみ適用する（インポート時の副作用なし）。
 """
 
-import pandas as pd
+from __future__ import annotations
+
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
 import traceback
 import os
 import sys
 import gc
+import time
 import functools
 from dataclasses import dataclass, field
-from typing import Tuple, Optional, List, Callable
+from typing import TYPE_CHECKING, Tuple, Optional, List, Callable
 from pathlib import Path
 import warnings
 
-# sklearn関連
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-
-# パフォーマンス最適化設定（統合版）
-warnings.filterwarnings('ignore', category=UserWarning)
-warnings.filterwarnings('ignore', category=FutureWarning)
-np.set_printoptions(suppress=True, precision=4)
-
-# matplotlib最適化設定（16:9アスペクト比統一）
-plt.rcParams['figure.dpi'] = 100
-plt.rcParams['savefig.dpi'] = 100
-plt.rcParams['savefig.bbox'] = 'tight'
-plt.rcParams['savefig.pad_inches'] = 0.1
-plt.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
-plt.rcParams['lines.linewidth'] = 1.5
-plt.rcParams['axes.linewidth'] = 0.8
-plt.rcParams['figure.max_open_warning'] = 10
-print("RandomForest: パフォーマンス最適化設定を適用しました")
+# sklearn関連（型注釈のみ）
+if TYPE_CHECKING:
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.base import RegressorMixin
+
+# 共通モジュール（common/）をインポート可能にする
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common.year_blocks import load_split, feature_columns
+from common.dataset_io import load_training_arrays
+from common.row_aggregation import aggregate_rows
+from common.thread_budget import configure_threads
+from common.tree_inference import export_for_model
+from common.forest_artifacts import save_forest, load_forest, select_size_budget
+from common.forest_growth import GrowthResult, grow_with_oob, oob_sweep
+from common.tree_engines import engine_class, is_bagging, save_engine_metadata
+from common import forest_quantiles
+from common.forest_quantiles import (
+    build_leaf_samples, calibrate_interval, save_leaf_samples, remove_leaf_samples, interval_coverage,
+)
+from common.plot_style import pyplot
+
+# matplotlib最適化設定（16:9アスペクト比統一、グラフ作成時に適用）
+PLOT_RC = {
+    'figure.dpi': 100,
+    'savefig.dpi': 100,
+    'savefig.bbox': 'tight',
+    'savefig.pad_inches': 0.1,
+    'font.family': 'DejaVu Sans',
+    'font.size': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'lines.linewidth': 1.5,
+    'axes.linewidth': 0.8,
+    'figure.max_open_warning': 10,
+}
+
+
+def configure_runtime() -> None:
+    """スクリプト実行時の警告抑制・表示設定（統合版）"""
+    warnings.filterwarnings('ignore', category=UserWarning)
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    np.set_printoptions(suppress=True, precision=4)
+    print("RandomForest: パフォーマンス最適化設定を適用しました")
 
 
 @dataclass
@@ -59,18 +86,44 @@ class RandomForestConfig:
     target_columns: List[str] = field(default_factory=lambda: ["KW"])
     data_dtype: str = 'float32'
     
-    # RandomForest モデル設定
+    # 決定木エンジン（random_forest / extra_trees / hist_gradient_boosting、common/tree_engines.py）
+    engine: str = 'random_forest'
+    
+    # RandomForest モデル設定（extra_trees も同じパラメータを使用）
     n_estimators: int = 100
     max_depth: Optional[int] = None
     min_samples_split: int = 2
     min_samples_leaf: int = 1
     max_features: str = 'sqrt'
+    # 各木のブートストラップ抽出行数（割合、None の場合は全行数）
+    max_samples: Optional[float] = None
     n_jobs: int = -1  # すべてのCPUコアを使用（パフォーマンス最適化）
     random_state: int = 42
     
-    # データ前処理設定
-    enable_scaling: bool = True
+    # HistGradientBoosting モデル設定（max_depth・random_state は上記と共通）
+    hgb_max_iter: int = 300
+    hgb_learning_rate: float = 0.1
+    hgb_max_leaf_nodes: int = 63
+    hgb_min_samples_leaf: int = 20
+    # カテゴリ変数として扱う特徴量（標準化無効時のみ）
+    hgb_categorical_features: List[str] = field(default_factory=lambda: ["MONTH", "WEEK", "HOUR"])
+    
+    # データ前処理設定（決定木の分割は単調変換に不変のため、既定では標準化しない）
+    enable_scaling: bool = False
     scaler_type: str = 'StandardScaler'
+    # 同一特徴量の学習行を集約し、行数をサンプル重みとして学習する（common/row_aggregation.py）
+    aggregate_rows: bool = False
+    
+    # 保存サイズの目標（MB、指定時は max_depth / min_samples_leaf / max_samples を自動選択、common/forest_artifacts.py）
+    size_budget_mb: Optional[float] = None
+    
+    # OOB誤差による段階的学習（warm_start で木を追加し、OOB RMSE の改善停止で打ち切る、common/forest_growth.py）
+    oob_growth: bool = False
+    # OOB RMSE によるハイパーパラメータ探索（候補ごとに段階的学習1回、oob_growth を含む）
+    oob_sweep: bool = False
+    
+    # 予測区間（葉ごとの学習行を保存し、翌日予測で P10 / P90 を出力する、common/forest_quantiles.py）
+    prediction_intervals: bool = False
     
     # 可視化設定（16:9アスペクト比統一）
     figure_size: Tuple[int, int] = (16, 9)
@@ -85,16 +138,42 @@ class RandomForestConfig:
     enable_garbage_collection: bool = True
     
     def get_model_params(self) -> dict:
-        """RandomForestモデルパラメータを取得"""
-        return {
+        """選択中のエンジンのモデルパラメータを取得"""
+        if self.engine == 'hist_gradient_boosting':
+            # 検証用の早期終了はランダム分割（時系列順でない）のため使用しない
+            # スレッド数は n_jobs ではなく OpenMP の割当（common/thread_budget.py）に従う
+            return {
+                'max_iter': self.hgb_max_iter,
+                'learning_rate': self.hgb_learning_rate,
+                'max_leaf_nodes': self.hgb_max_leaf_nodes,
+                'max_depth': self.max_depth,
+                'min_samples_leaf': self.hgb_min_samples_leaf,
+                'categorical_features': self.categorical_indices() or None,
+                'early_stopping': False,
+                'random_state': self.random_state
+            }
+        params = {
             'n_estimators': self.n_estimators,
             'max_depth': self.max_depth,
             'min_samples_split': self.min_samples_split,
             'min_samples_leaf': self.min_samples_leaf,
             'max_features': self.max_features,
+            'max_samples': self.max_samples,
             'n_jobs': self.n_jobs,
             'random_state': self.random_state
         }
+        if self.engine == 'extra_trees' and (self.max_samples is not None or self.oob_growth or self.oob_sweep
+                                             or self.prediction_intervals):
+            # max_samples・OOB誤差・予測区間の較正はブートストラップ抽出時のみ有効（ExtraTrees の既定は bootstrap=False）
+            params['bootstrap'] = True
+        return params
+    
+    def categorical_indices(self) -> List[int]:
+        """カテゴリ変数として扱う特徴量の列番号（標準化した特徴量は整数値でなくなるため、標準化有効時は空）"""
+        if self.enable_scaling:
+            return []
+        columns = feature_columns()
+        return [columns.index(name) for name in self.hgb_categorical_features if name in columns]
     
     def optimize_memory_if_enabled(self) -> None:
         """メモリ最適化実行（有効時のみ）"""
@@ -166,10 +245,9 @@ def load_training_data(config: RandomForestConfig,
     dtype = config.data_dtype
     
     print("学習データを読み込み中...")
-    X_train = pd.read_csv(xtrain_csv).to_numpy().astype(dtype)
-    X_test = pd.read_csv(xtest_csv).to_numpy().astype(dtype)
-    y_train = pd.read_csv(ytrain_csv).values.astype(dtype).flatten()
-    y_test = pd.read_csv(ytest_csv).values.astype(dtype).flatten()
+    # バイナリデータセット（data/dataset/）があればメモリマップで読み込み、無ければCSVを読み込む
+    X_train, X_test, y_train, y_test, _ = load_training_arrays(
+        xtrain_csv, xtest_csv, ytrain_csv, ytest_csv, dtype=dtype)
     
     print(f"学習データ形状: X_train={X_train.shape}, y_train={y_train.shape}")
     print(f"テストデータ形状: X_test={X_test.shape}, y_test={y_test.shape}")
@@ -181,10 +259,39 @@ def load_training_data(config: RandomForestConfig,
     return X_train, X_test, y_train, y_test
 
 
+@robust_model_operation("学習データ取得（年別特徴量ブロック）")
+def load_training_views(config: RandomForestConfig,
+                        target_years: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    年指定から学習・テストデータを年別特徴量ブロックのビューとして取得する（CSV読み込みなし）
+
+    時系列分割エンジンにより、最も新しい年をテスト年・それ以前を学習年として分割する。
+
+    Args:
+        config: RandomForest設定オブジェクト
+        target_years: カンマ区切りの年指定（例: "2019,2020,2021"）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: 
+            X_train, X_test, y_train, y_test
+    """
+    print(f"年別特徴量ブロックから学習データを取得中... (対象年: {target_years})")
+    years = [int(y) for y in target_years.split(',') if y.strip()]
+    X_train, X_test, y_train, y_test = (
+        a.astype(config.data_dtype, copy=False) for a in load_split(years)
+    )
+
+    print(f"学習データ形状: X_train={X_train.shape}, y_train={y_train.shape}")
+    print(f"テストデータ形状: X_test={X_test.shape}, y_test={y_test.shape}")
+
+    return X_train, X_test, y_train, y_test
+
+
 @robust_model_operation("データ標準化")
 def prepare_data_with_scaling(config: RandomForestConfig,
                              X_train: np.ndarray, 
-                             X_test: np.ndarray) -> Tuple[np.ndarray, np.ndarray, StandardScaler]:
+                             X_test: np.ndarray,
+                             sample_weight: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, StandardScaler]:
     """
     データの標準化を実行する（設定統一版）
     
@@ -192,17 +299,20 @@ def prepare_data_with_scaling(config: RandomForestConfig,
         config: RandomForest設定オブジェクト
         X_train: 学習用特徴量データ
         X_test: テスト用特徴量データ
+        sample_weight: 学習行のサンプル重み（集約時）
         
     Returns:
         Tuple[np.ndarray, np.ndarray, StandardScaler]: 
             標準化後のX_train, X_test, scaler
     """
+    from sklearn.preprocessing import StandardScaler
     if not config.enable_scaling:
-        print("データ標準化をスキップします")
-        return X_train, X_test, None
+        print("データ標準化をスキップします（木モデルのため生の特徴量を使用）")
+        return (X_train.astype(config.data_dtype, copy=False),
+                X_test.astype(config.data_dtype, copy=False), None)
     
     scaler = StandardScaler()
-    scaler.fit(X_train)
+    scaler.fit(X_train, sample_weight=sample_weight)
     X_train_scaled = scaler.transform(X_train).astype(config.data_dtype)
     X_test_scaled = scaler.transform(X_test).astype(config.data_dtype)
     
@@ -213,29 +323,30 @@ def prepare_data_with_scaling(config: RandomForestConfig,
 
 
 @robust_model_operation("RandomForestモデル作成")
-def create_random_forest_model(config: RandomForestConfig) -> RandomForestRegressor:
+def create_random_forest_model(config: RandomForestConfig) -> RegressorMixin:
     """
-    Random Forestリグレッサーモデルを作成する（設定統一版）
+    設定のエンジン（RandomForest / ExtraTrees / HistGradientBoosting）のリグレッサーモデルを作成する
     
     Args:
         config: RandomForest設定オブジェクト
         
     Returns:
-        RandomForestRegressor: 構築されたRandom Forestモデル
+        RegressorMixin: 構築されたモデル
     """
     model_params = config.get_model_params()
-    print(f"Random Forestモデルパラメータ: {model_params}")
+    print(f"{engine_class(config.engine).__name__} モデルパラメータ: {model_params}")
     
-    model = RandomForestRegressor(**model_params)
+    model = engine_class(config.engine)(**model_params)
     
     return model
 
 
 @robust_model_operation("RandomForestモデル学習")
 def train_random_forest_model(config: RandomForestConfig,
-                             model: RandomForestRegressor,
+                             model: RegressorMixin,
                              X_train: np.ndarray,
-                             y_train: np.ndarray) -> RandomForestRegressor:
+                             y_train: np.ndarray,
+                             sample_weight: Optional[np.ndarray] = None) -> RegressorMixin:
     """
     Random Forestモデルの学習を実行する（設定統一版）
     
@@ -244,20 +355,90 @@ def train_random_forest_model(config: RandomForestConfig,
         model: 学習対象のRandom Forestモデル
         X_train: 学習用特徴量データ
         y_train: 学習用目的変数データ
+        sample_weight: 学習行のサンプル重み（集約時）
         
     Returns:
-        RandomForestRegressor: 学習済みモデル
+        RegressorMixin: 学習済みモデル
     """
-    model.fit(X_train, y_train)
+    model.fit(X_train, y_train, sample_weight=sample_weight)
     
     # メモリ最適化
     config.optimize_memory_if_enabled()
     
     return model
 
+@robust_model_operation("RandomForest OOB段階的学習")
+def train_random_forest_with_oob(config: RandomForestConfig,
+                                 X_train: np.ndarray,
+                                 y_train: np.ndarray,
+                                 sample_weight: Optional[np.ndarray] = None,
+                                 max_nodes: Optional[int] = None) -> GrowthResult:
+    """
+    OOB誤差が改善しなくなるまで木を追加して学習する（oob_sweep 有効時は候補設定を OOB RMSE で比較）
+    
+    Args:
+        config: RandomForest設定オブジェクト
+        X_train: 学習用特徴量データ
+        y_train: 学習用目的変数データ
+        sample_weight: 学習行のサンプル重み（集約時）
+        max_nodes: 全ての木のノード数の上限（サイズ予算の試験フォレストから推定、指定時は本数を制限）
+        
+    Returns:
+        GrowthResult: 学習済みモデルと OOB 誤差の推移
+    """
+    estimator_class = engine_class(config.engine)
+    if config.oob_sweep:
+        result, _ = oob_sweep(X_train, y_train, config.get_model_params(), sample_weight=sample_weight,
+                              estimator_class=estimator_class, max_nodes=max_nodes)
+    else:
+        result = grow_with_oob(X_train, y_train, config.get_model_params(), sample_weight,
+                               estimator_class=estimator_class, max_nodes=max_nodes)
+    print(result.summary())
+    print("OOB RMSE 推移: " + ", ".join(f"{n}本={rmse:.2f}" for n, rmse in result.curve))
+    
+    # 採用した本数・パラメータを設定に反映する
+    for name, value in result.params.items():
+        if hasattr(config, name):
+            setattr(config, name, value)
+    
+    # メモリ最適化
+    config.optimize_memory_if_enabled()
+    
+    return result
+
+
+@robust_model_operation("OOB誤差推移グラフ作成")
+def create_oob_curve_plot(config: RandomForestConfig,
+                          result: GrowthResult,
+                          history_png: str) -> None:
+    """
+    段階的学習の OOB RMSE 推移グラフを保存する（16:9アスペクト比）
+    
+    Args:
+        config: RandomForest設定オブジェクト
+        result: 段階的学習の結果
+        history_png: 保存先パス
+    """
+    plt = pyplot(PLOT_RC)
+    ensure_directory_exists(history_png)
+    n_trees, rmse = zip(*result.curve)
+    plt.figure(figsize=config.figure_size, dpi=config.figure_dpi)
+    plt.plot(n_trees, rmse, marker='o', label="OOB RMSE[kW]")
+    plt.xlabel('Number of trees', fontsize=config.font_size_label)
+    plt.ylabel('OOB RMSE [kW]', fontsize=config.font_size_label)
+    plt.title('RandomForest OOB Error Curve', fontsize=config.font_size_title)
+    plt.legend(fontsize=config.font_size_legend)
+    plt.xticks(fontsize=config.font_size_tick)
+    plt.yticks(fontsize=config.font_size_tick)
+    plt.tight_layout()
+    plt.savefig(history_png)
+    plt.close()
+    print(f"OOB誤差推移グラフを {history_png} に保存しました")
+
+
 @robust_model_operation("モデル・スケーラー保存")
 def save_model_and_scaler(config: RandomForestConfig,
-                         model: RandomForestRegressor, 
+                         model: RegressorMixin, 
                          scaler: Optional[StandardScaler], 
                          model_path: str) -> None:
     """
@@ -271,10 +452,20 @@ def save_model_and_scaler(config: RandomForestConfig,
     """
     ensure_directory_exists(model_path)
     
-    # モデルをpickle形式で保存
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
-    print(f"Random Forestモデルを {model_path} に保存しました")
+    # モデルを joblib 形式（非圧縮）で保存し、翌日予測ではメモリマップで読み込む
+    size_mb = save_forest(model, model_path)
+    start_time = time.perf_counter()
+    load_forest(model_path)
+    load_sec = time.perf_counter() - start_time
+    print(f"{type(model).__name__} モデルを {model_path} に保存しました "
+          f"({size_mb:.1f}MB, メモリマップ読み込み {load_sec * 1000:.1f}ms)")
+    
+    # 翌日予測でエンジンを判定するためのメタデータ
+    save_engine_metadata(model_path, config.engine, config.get_model_params(),
+                         {'artifact_mb': round(size_mb, 3), 'feature_count': int(model.n_features_in_)})
+    
+    # 翌日予測用の NumPy 推論エンジン（連結済みノード配列の .npz）を書き出す
+    export_for_model(model, model_path)
     
     # スケーラーを保存（存在する場合のみ）
     if scaler is not None:
@@ -283,12 +474,60 @@ def save_model_and_scaler(config: RandomForestConfig,
             pickle.dump(scaler, f)
         print(f"スケーラーを {scaler_path} に保存しました")
     else:
+        # 以前の学習で保存したスケーラーが残っていると翌日予測で誤って適用されるため削除する
+        scaler_path = model_path.replace('.sav', '_scaler.pkl')
+        if os.path.exists(scaler_path):
+            os.remove(scaler_path)
+            print(f"古いスケーラー {scaler_path} を削除しました")
         print("スケーラーなし（標準化無効のため保存をスキップ）")
 
 
+@robust_model_operation("予測区間用の葉の学習行保存")
+def save_prediction_intervals(config: RandomForestConfig,
+                              model: RegressorMixin,
+                              X_train: np.ndarray,
+                              y_train: np.ndarray,
+                              sample_weight: Optional[np.ndarray],
+                              X_test: np.ndarray,
+                              y_test: np.ndarray,
+                              model_path: str) -> None:
+    """
+    各葉に属する学習行と OOB 行で較正した区間の拡幅量を保存し、テストデータで予測区間の被覆率を確認する
+    
+    Args:
+        config: RandomForest設定オブジェクト
+        model: 学習済みモデル（RandomForest / ExtraTrees）
+        X_train: 学習用特徴量データ（学習に使用したもの）
+        y_train: 学習用目的変数データ
+        sample_weight: 学習行のサンプル重み（集約時）
+        X_test: テスト用特徴量データ
+        y_test: テスト用目的変数データ
+        model_path: 保存済みモデルのパス
+    """
+    samples = build_leaf_samples(model, X_train, y_train, sample_weight)
+    margin, oob_coverage = calibrate_interval(samples, model, X_train, y_train, sample_weight)
+    samples.interval_margin = margin
+    if np.isnan(oob_coverage):
+        print("予測区間の較正: ブートストラップ抽出を行わないモデルのため拡幅しません")
+    else:
+        print(f"予測区間の較正: OOB被覆率 {oob_coverage * 100:.1f}% → 下限・上限を {margin:.1f} kW 拡幅")
+    save_leaf_samples(samples, model_path)
+    
+    lower_q, upper_q = forest_quantiles.config.INTERVAL
+    bands = samples.predict_interval(model.apply(X_test))
+    coverage = interval_coverage(y_test, bands[:, 0], bands[:, 1])
+    raw_coverage = interval_coverage(y_test, bands[:, 0] + margin, bands[:, 1] - margin)
+    print(f"予測区間 P{lower_q * 100:.0f}-P{upper_q * 100:.0f}: テスト被覆率 {coverage * 100:.1f}% "
+          f"(較正前 {raw_coverage * 100:.1f}%, 目標 {(upper_q - lower_q) * 100:.0f}%), "
+          f"平均幅 {np.mean(bands[:, 1] - bands[:, 0]):.1f} kW")
+    
+    # メモリ最適化
+    config.optimize_memory_if_enabled()
+
+
 @robust_model_operation("モデル性能評価")
 def evaluate_model_performance(config: RandomForestConfig,
-                              model: RandomForestRegressor,
+                              model: RegressorMixin,
                               X_test: np.ndarray,
                               y_test: np.ndarray) -> Tuple[float, float, float, np.ndarray]:
     """
@@ -303,6 +542,7 @@ def evaluate_model_performance(config: RandomForestConfig,
     Returns:
         Tuple[float, float, np.ndarray]: RMSE, R2スコア, 予測値
     """
+    from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
     # テストスコア
     test_score = model.score(X_test, y_test)
     print(f'テストスコア: {test_score:.3f}')
@@ -337,6 +577,7 @@ def save_predictions_to_csv(config: RandomForestConfig,
         y_pred: 予測値配列
         output_path: 保存先ファイルパス
     """
+    import pandas as pd
     ensure_directory_exists(output_path)
     
     y_pred_df = pd.DataFrame(y_pred, columns=config.target_columns)
@@ -361,6 +602,8 @@ def create_prediction_plots(config: RandomForestConfig,
         full_period_png: 全期間グラフの保存先
         week_period_png: 1週間グラフの保存先
     """
+    import pandas as pd
+    plt = pyplot(PLOT_RC)
     ensure_directory_exists(full_period_png)
     ensure_directory_exists(week_period_png)
     
@@ -416,7 +659,14 @@ def train(xtrain_csv: str,
           learning_rate: Optional[str] = None,
           epochs: Optional[str] = None,
           validation_split: Optional[str] = None,
-          history_png: Optional[str] = None) -> Optional[Tuple[float, float]]:
+          history_png: Optional[str] = None,
+          target_years: Optional[str] = None,
+          threads: Optional[int] = None,
+          size_budget_mb: Optional[float] = None,
+          oob_growth: bool = False,
+          oob_sweep: bool = False,
+          engine: Optional[str] = None,
+          prediction_intervals: bool = False) -> Optional[Tuple[float, float]]:
     """
     Random Forestを使用した電力需要予測モデルの学習を実行する（統一仕様版）
     
@@ -432,33 +682,89 @@ def train(xtrain_csv: str,
         learning_rate: 学習率（使用されない、互換性のため）
         epochs: エポック数（使用されない、互換性のため）
         validation_split: 検証データ割合（使用されない、互換性のため）
-        history_png: 学習履歴グラフ（使用されない、互換性のため）
+        history_png: 学習履歴グラフ（OOB段階的学習時は OOB RMSE の推移を保存）
+        target_years: 対象年（指定時はCSVを読まず年別特徴量ブロックから直接取得）
+        threads: 使用スレッド数（n_jobs、common/thread_budget.py の割当。未指定時は設定値）
+        size_budget_mb: 保存サイズの目標（MB、指定時は木の大きさの制限を自動選択）
+        oob_growth: OOB誤差の改善停止まで木を段階的に追加して学習する
+        oob_sweep: 候補設定を OOB RMSE で比較し、最良の設定のフォレストを採用する
+        engine: 決定木エンジン（random_forest / extra_trees / hist_gradient_boosting、未指定時は設定値）
+        prediction_intervals: 葉ごとの学習行を保存し、翌日予測で予測区間（P10 / P90）を出力する
         
     Returns:
         Optional[Tuple[float, float]]: RMSE, R2スコア（エラー時はNone）
     """
-    # 設定オブジェクト初期化
-    config = RandomForestConfig()
+    # 設定オブジェクト初期化（スレッド数指定時は n_jobs を割当に合わせる）
+    config = RandomForestConfig(n_jobs=threads) if threads else RandomForestConfig()
+    if size_budget_mb:
+        config.size_budget_mb = size_budget_mb
+    config.oob_growth = config.oob_growth or oob_growth
+    config.oob_sweep = config.oob_sweep or oob_sweep
+    config.prediction_intervals = config.prediction_intervals or prediction_intervals
+    if engine:
+        config.engine = engine
+    engine_class(config.engine)
+    if not is_bagging(config.engine) and (config.size_budget_mb or config.oob_growth or config.oob_sweep
+                                          or config.prediction_intervals):
+        # サイズ予算・OOB誤差・予測区間はバギング系（木を独立に学習するエンジン）のみ対応
+        print(f"{config.engine} はサイズ予算・OOB段階的学習・予測区間に対応していないため、通常の学習を行います")
+        config.size_budget_mb, config.oob_growth, config.oob_sweep = None, False, False
+        config.prediction_intervals = False
     
     # 1. データの読み込み
-    X_train, X_test, y_train, y_test = load_training_data(
-        config, xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
-    )
+    if target_years:
+        X_train, X_test, y_train, y_test = load_training_views(config, target_years)
+    else:
+        X_train, X_test, y_train, y_test = load_training_data(
+            config, xtrain_csv, xtest_csv, ytrain_csv, ytest_csv
+        )
+    
+    # 学習行の集約（同一特徴量行を1行にまとめ、行数をサンプル重みとする）
+    sample_weight = None
+    if config.aggregate_rows:
+        aggregated = aggregate_rows(X_train, y_train, config.data_dtype)
+        print(aggregated.summary())
+        X_train, y_train, sample_weight = aggregated.X, aggregated.y, aggregated.weight
     
     # 2. データの標準化
     X_train_scaled, X_test_scaled, scaler = prepare_data_with_scaling(
-        config, X_train, X_test
+        config, X_train, X_test, sample_weight
     )
     
-    # 3. モデルの作成
-    model = create_random_forest_model(config)
-    
-    # 4. モデルの学習
-    trained_model = train_random_forest_model(config, model, X_train_scaled, y_train)
+    # サイズ予算: 目標サイズ以下で検証精度が最も高い木の大きさの制限を選択する
+    # （OOB段階的学習では本数が変わるため、試験フォレストから求めたノード数の上限で本数を制限する）
+    max_nodes = None
+    if config.size_budget_mb:
+        chosen, _ = select_size_budget(X_train_scaled, y_train, config.get_model_params(),
+                                       config.size_budget_mb, sample_weight,
+                                       estimator_class=engine_class(config.engine))
+        for name, value in chosen.params.items():
+            setattr(config, name, value)
+        max_nodes = chosen.max_nodes(config.size_budget_mb)
+    
+    if config.oob_growth or config.oob_sweep:
+        # 3-4. OOB誤差による段階的学習（本数・候補設定を OOB RMSE で決定）
+        growth = train_random_forest_with_oob(config, X_train_scaled, y_train, sample_weight, max_nodes)
+        trained_model = growth.model
+        if history_png:
+            create_oob_curve_plot(config, growth, history_png)
+    else:
+        # 3. モデルの作成
+        model = create_random_forest_model(config)
+        
+        # 4. モデルの学習
+        trained_model = train_random_forest_model(config, model, X_train_scaled, y_train, sample_weight)
     
     # 5. モデルとスケーラーの保存
     save_model_and_scaler(config, trained_model, scaler, model_sav)
     
+    # 予測区間用の葉の学習行（無効時は古いファイルが翌日予測で使われないよう削除する）
+    if config.prediction_intervals:
+        save_prediction_intervals(config, trained_model, X_train_scaled, y_train, sample_weight,
+                                  X_test_scaled, y_test, model_sav)
+    else:
+        remove_leaf_samples(model_sav)
+    
     # 6. モデルの評価
     rmse, r2, mae, y_pred = evaluate_model_performance(config, trained_model, X_test_scaled, y_test)
     
@@ -478,6 +784,7 @@ def main() -> None:
     RandomForestConfigを使用した設定管理で、
     電力需要予測モデルの学習プロセスを実行
     """
+    configure_runtime()
     print("="*60)
     print("RandomForest電力需要予測AIモデル学習システム")
     print("統一リファクタリング仕様 - RandomForestConfig対応版")
@@ -500,11 +807,21 @@ def main() -> None:
     history_png = r'train/RandomForest/RandomForest_history.png'
 
     try:
+        # CPUスレッド割当（環境変数 AI_THREADS で指定、未指定時は実行中ジョブ間で等分）
+        threads = configure_threads("RandomForest学習")
+        
         # 学習実行
         result = train(
             xtrain_csv, xtest_csv, ytrain_csv, ytest_csv, model_sav,
             ypred_csv, ypred_png, ypred_7d_png,
-            learning_rate, epochs, validation_split, history_png
+            learning_rate, epochs, validation_split, history_png,
+            target_years=os.environ.get('AI_TARGET_YEARS'),
+            threads=threads,
+            size_budget_mb=float(os.environ['AI_RF_SIZE_BUDGET_MB']) if os.environ.get('AI_RF_SIZE_BUDGET_MB') else None,
+            oob_growth=os.environ.get('AI_RF_OOB_GROWTH') == '1',
+            oob_sweep=os.environ.get('AI_RF_OOB_SWEEP') == '1',
+            engine=os.environ.get('AI_RF_ENGINE'),
+            prediction_intervals=os.environ.get('AI_RF_INTERVALS') == '1'
         )
         
         if result: